@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк batch mode: инстансов в секунду на ядро.
+
+Генерирует M uniform-random инстансов (N ~ U[n_min, n_max]) и решает их:
+- solve_batch() на тёплом пуле (n_workers процессов);
+- (с --baseline) последовательные вызовы solve(coords=...) — solve_small
+  в одном процессе, setup на каждый вызов, на первых --baseline инстансах.
+
+Метрики: instances/s, instances/s/core, средняя длина на город
+(качество при одинаковом бюджете).
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/bench_batch.py --m 200 --budget 0.2
+  PYTHONPATH=. python3 scripts/bench_batch.py --m 100 --budget 0.5 --workers 4 --baseline 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.core.batch import solve_batch
+
+
+def make_instances(m: int, n_min: int, n_max: int, seed: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(n_min, n_max + 1, size=m)
+    return [rng.random((int(n), 2)) * 1e4 for n in sizes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch mode benchmark')
+    parser.add_argument('--m', type=int, default=200, help='Число инстансов')
+    parser.add_argument('--n-min', type=int, default=200)
+    parser.add_argument('--n-max', type=int, default=2000)
+    parser.add_argument('--budget', type=float, default=0.2, help='Секунды на инстанс')
+    parser.add_argument('--workers', type=int, default=0, help='0 = все ядра')
+    parser.add_argument('--baseline', type=int, default=0,
+                        help='Сколько инстансов прогнать через solve() для сравнения')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    instances = make_instances(args.m, args.n_min, args.n_max, args.seed)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    total_cities = sum(len(c) for c in instances)
+    print(f'{args.m} instances, N in [{args.n_min}, {args.n_max}], '
+          f'budget {args.budget}s, {workers} workers')
+
+    t0 = time.perf_counter()
+    first = None
+    lengths = np.zeros(args.m)
+    for res in solve_batch(instances, budget_per_instance=args.budget, n_workers=workers):
+        if first is None:
+            first = time.perf_counter() - t0
+        lengths[res['index']] = res['length']
+    wall = time.perf_counter() - t0
+    rate = args.m / wall
+    per_city = float(np.mean(lengths / np.sqrt([len(c) * 1e8 for c in instances])))
+    print(f'solve_batch: {wall:.1f}s wall, first result {first:.2f}s, '
+          f'{rate:.2f} inst/s, {rate / workers:.2f} inst/s/core, '
+          f'{total_cities / wall:.0f} cities/s, L/sqrt(N*A)={per_city:.4f}')
+
+    if args.baseline > 0:
+        from src.core.hybrid_solver import solve
+        k = min(args.baseline, args.m)
+        t0 = time.perf_counter()
+        base = [solve(coords=instances[i], time_budget=args.budget)['length'] for i in range(k)]
+        wall = time.perf_counter() - t0
+        ratio = float(np.mean(np.array(base) / lengths[:k]))
+        print(f'solve() x{k}:  {wall:.1f}s wall, {k / wall:.2f} inst/s (1 core), '
+              f'length vs batch x{ratio:.4f}')
+
+
+if __name__ == '__main__':
+    main()
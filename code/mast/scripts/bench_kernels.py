@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark numba-ядер numba_sparse / eax_sparse с историей.
+
+Каждое ядро гоняется на синтетических инстансах src/core/synthetic
+(по умолчанию uniform и clustered, --instances — любые KINDS;
+N = 1K, 10K, 100K, 1M; k-NN k=10, стартовый тур — NN) и даёт:
+  evals_per_s     — оценки кандидатов/с (work-счётчик: 2-opt/or-opt/3-opt)
+  moves_per_s     — применённые улучшающие ходы/с (там же)
+  ns_city_pass    — нс на город за один проход (или на вызов/итерацию)
+Ядра с work-счётчиком вызываются, как в solver-е, до локального оптимума
+или исчерпания --max-units (на больших N — часть прохода); ns_city_pass
+считается по числу просканированных позиций (WORK_USED / units на позицию).
+EAX выше --eax-max-n пропускается.
+Ядра без счётчиков (LK, seqLK) дают только ns_city_pass и gain_per_s
+(уменьшение длины тура в секунду).
+
+Каждый прогон дописывается в results/kernel_bench_history.jsonl (commit,
+хост, версии, synthetic.GENERATOR_VERSION); для каждой строки сравнивается
+с последним прогоном с тем же (kernel, instance, N) и версией генератора: медленнее на --threshold → REGRESSION.
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/bench_kernels.py
+  PYTHONPATH=. python3 scripts/bench_kernels.py --sizes 1000,10000 --kernels two_opt,lk
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numba
+import numpy as np
+from scipy.spatial import cKDTree
+
+from src.core.numba_sparse import (
+    WORK_USED,
+    WORK_CURSOR,
+    WORK_MOVES,
+    new_work_jit,
+    warmup_sparse,
+    tour_length_coords_jit,
+    nn_tour_coords_jit,
+    two_opt_pass_nn_coords_jit,
+    or_opt_pass_coords_jit,
+    three_opt_full_pass_coords_jit,
+    lk_opt_coords_jit,
+    lk_sequential_coords_jit,
+    double_bridge_coords_jit,
+    subgradient_alpha_jit,
+)
+from src.core.eax_sparse import eax_crossover_jit
+from src.core import synthetic
+
+_ROOT = Path(__file__).resolve().parent.parent
+HISTORY = _ROOT / 'results' / 'kernel_bench_history.jsonl'
+
+KNN_K = 10
+KERNELS = ('nn_tour', 'two_opt', 'or_opt', 'three_opt', 'lk', 'lk_seq',
+           'double_bridge', 'eax', 'alpha')
+
+
+# ═══════════════════════════════════════════════════════════
+#  INSTANCES
+# ═══════════════════════════════════════════════════════════
+
+class Instance:
+    """coords + k-NN + стартовые туры (общие для всех ядер)."""
+
+    def __init__(self, kind: str, n: int, seed: int):
+        self.kind, self.n = kind, n
+        self.coords = np.ascontiguousarray(synthetic.generate(kind, n, seed))
+        d, idx = cKDTree(self.coords).query(self.coords, k=KNN_K + 1)
+        self.knn = np.ascontiguousarray(idx[:, 1:], dtype=np.int32)
+        self.knn_d = np.ascontiguousarray(d[:, 1:])
+        self.tour = nn_tour_coords_jit(self.coords, self.knn, self.knn_d, 0)
+        self._parents = None
+
+    def parents(self) -> tuple[np.ndarray, np.ndarray]:
+        """Два разных 2-opt-тура (родители EAX)."""
+        if self._parents is None:
+            tours = []
+            for start in (0, self.n // 2):
+                t = nn_tour_coords_jit(self.coords, self.knn, self.knn_d, start)
+                lk_opt_coords_jit(t, self.coords, self.knn, 1, 1)
+                tours.append(t)
+            self._parents = tuple(tours)
+        return self._parents
+
+
+# ═══════════════════════════════════════════════════════════
+#  KERNEL RUNNERS: (elapsed, city_passes, evals, moves, gain)
+# ═══════════════════════════════════════════════════════════
+
+def _timed(fn, min_time: float, max_reps: int = 1000):
+    """fn() повторяется до min_time (≥ 1 раза); fn сама готовит копии вне замера."""
+    times, acc = [], []
+    while not times or (sum(times) < min_time and len(times) < max_reps):
+        elapsed, out = fn()
+        times.append(elapsed)
+        acc.append(out)
+    return times, acc
+
+
+def _work_pass(kernel, units: int, inst: Instance, max_units: int):
+    """
+    Как в solver-е: вызовы до локального оптимума или исчерпания work
+    (or-opt / 3-opt — first improvement, каждый вызов — новый скан).
+    Просканированные позиции = WORK_USED / units (units на позицию у ядра).
+    """
+    tour = inst.tour.copy()
+    work = new_work_jit(max_units)
+    t0 = time.perf_counter()
+    while kernel(tour, inst.coords, inst.knn, work) and work[WORK_CURSOR] == 0:
+        pass
+    elapsed = time.perf_counter() - t0
+    positions = work[WORK_USED] / units
+    return elapsed, (max(positions / inst.n, 1e-9), int(work[WORK_USED]), int(work[WORK_MOVES]), 0.0)
+
+
+def bench_kernel(name: str, inst: Instance, min_time: float, max_units: int) -> dict:
+    n, coords, knn, knn_d = inst.n, inst.coords, inst.knn, inst.knn_d
+    start_len = float(tour_length_coords_jit(inst.tour, coords))
+
+    def lk_run(kernel, *extra):
+        def run():
+            tour = inst.tour.copy()
+            t0 = time.perf_counter()
+            iters = kernel(tour, coords, knn, 1, 1, *extra)
+            elapsed = time.perf_counter() - t0
+            gain = start_len - float(tour_length_coords_jit(tour, coords))
+            return elapsed, (float(iters), None, None, gain)
+        return run
+
+    def simple(fn, passes=1.0):
+        def run():
+            t0 = time.perf_counter()
+            fn()
+            return time.perf_counter() - t0, (passes, None, None, 0.0)
+        return run
+
+    if name in ('two_opt', 'or_opt', 'three_opt'):
+        kernel, units = {
+            'two_opt': (two_opt_pass_nn_coords_jit, KNN_K),
+            'or_opt': (or_opt_pass_coords_jit, KNN_K),
+            'three_opt': (three_opt_full_pass_coords_jit, KNN_K * KNN_K),
+        }[name]
+        run = lambda: _work_pass(kernel, units, inst, max_units)  # noqa: E731
+    elif name == 'lk':
+        run = lk_run(lk_opt_coords_jit)
+    elif name == 'lk_seq':
+        run = lk_run(lk_sequential_coords_jit, 3)
+    elif name == 'nn_tour':
+        run = simple(lambda: nn_tour_coords_jit(coords, knn, knn_d, 0))
+    elif name == 'double_bridge':
+        run = simple(lambda: double_bridge_coords_jit(inst.tour))
+    elif name == 'alpha':
+        iters = 10
+        run = simple(lambda: subgradient_alpha_jit(n, knn, knn_d, coords, iters), passes=iters)
+    elif name == 'eax':
+        a, b = inst.parents()
+        successes = []
+
+        def run():
+            t0 = time.perf_counter()
+            child = eax_crossover_jit(a, b, coords, knn)
+            successes.append(child[0] >= 0)
+            return time.perf_counter() - t0, (1.0, None, None, 0.0)
+    else:
+        raise ValueError(f'unknown kernel {name!r}')
+
+    times, acc = _timed(run, min_time)
+    total = sum(times)
+    # ns/city-pass — медиана по повторам (устойчивее к шуму соседей на VM)
+    ns = [t / (a[0] * n) * 1e9 for t, a in zip(times, acc)]
+    evals = [a[1] for a in acc if a[1] is not None]
+    moves = [a[2] for a in acc if a[2] is not None]
+    out = {
+        'kernel': name, 'instance': inst.kind, 'n': n, 'reps': len(times),
+        'time': total,
+        'ns_city_pass': float(np.median(ns)),
+        'evals_per_s': sum(evals) / total if evals else None,
+        'moves_per_s': sum(moves) / total if moves else None,
+        'gain_per_s': sum(a[3] for a in acc) / total if name in ('lk', 'lk_seq') else None,
+    }
+    if name == 'eax':
+        out['success_rate'] = float(np.mean(successes))
+    return out
+
+
+# ═══════════════════════════════════════════════════════════
+#  HISTORY
+# ═══════════════════════════════════════════════════════════
+
+def _key(row: dict) -> tuple:
+    return row['kernel'], row['instance'], row['n']
+
+
+def load_previous(path: Path) -> dict:
+    """Последнее значение на (kernel, instance, N) из истории (та же версия генератора)."""
+    prev: dict = {}
+    if not path.exists():
+        return prev
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get('generator') != synthetic.GENERATOR_VERSION:
+                continue
+            for row in record['results']:
+                prev[_key(row)] = dict(row, commit=record.get('commit'))
+    return prev
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _fmt(v, spec: str, width: int = 10) -> str:
+    return format(v, spec).rjust(width) if v is not None else '-'.rjust(width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kernel micro-benchmarks with history')
+    parser.add_argument('--sizes', type=str, default='1000,10000,100000,1000000')
+    parser.add_argument('--instances', type=str, default='uniform,clustered')
+    parser.add_argument('--kernels', type=str, default=','.join(KERNELS))
+    parser.add_argument('--min-time', type=float, default=0.3, help='Min seconds per measurement')
+    parser.add_argument('--max-units', type=int, default=50_000_000,
+                        help='Work units per local search pass (partial pass on large N)')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Relative slowdown of ns/city-pass flagged as regression')
+    parser.add_argument('--eax-max-n', type=int, default=100_000,
+                        help='Skip EAX above this N (one crossover on 1M takes minutes)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--history', type=str, default=str(HISTORY))
+    parser.add_argument('--no-save', action='store_true', help='Do not append to history')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    kinds = args.instances.split(',')
+    kernels = args.kernels.split(',')
+    history = Path(args.history)
+    previous = load_previous(history)
+
+    # Компиляция вне замеров (EAX не входит в warmup_sparse)
+    warmup_sparse()
+    tiny = Instance('uniform', 300, args.seed)
+    for name in kernels:
+        bench_kernel(name, tiny, 0.0, args.max_units)
+
+    print(f'{"Kernel":<14} {"Inst":<10} {"N":>8} {"ns/city-pass":>13} {"evals/s":>10} '
+          f'{"moves/s":>10} {"gain/s":>10} {"prev":>10} {"Δ":>7}')
+    rows, regressions = [], []
+    for n in sizes:
+        for kind in kinds:
+            inst = Instance(kind, n, args.seed)
+            for name in kernels:
+                if name == 'eax' and n > args.eax_max_n:
+                    continue
+                row = bench_kernel(name, inst, args.min_time, args.max_units)
+                prev = previous.get(_key(row))
+                delta = None
+                if prev is not None:
+                    delta = row['ns_city_pass'] / prev['ns_city_pass'] - 1.0
+                    row['delta_vs_prev'] = delta
+                    if delta > args.threshold:
+                        regressions.append(f'{name}/{kind}/{n}: {delta:+.0%} vs {prev.get("commit")}')
+                rows.append(row)
+                print(f'{name:<14} {kind:<10} {n:>8} {row["ns_city_pass"]:>13.1f} '
+                      f'{_fmt(row["evals_per_s"], ".3g")} {_fmt(row["moves_per_s"], ".3g")} '
+                      f'{_fmt(row["gain_per_s"], ".3g")} '
+                      f'{_fmt(prev["ns_city_pass"] if prev else None, ".1f")} '
+                      f'{_fmt(delta, "+.0%", 7)}'
+                      + ('  REGRESSION' if delta is not None and delta > args.threshold else ''))
+                sys.stdout.flush()
+            del inst
+
+    if not args.no_save:
+        history.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'host': platform.node(),
+            'cpu': platform.processor() or platform.machine(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'numba': numba.__version__,
+            'knn_k': KNN_K,
+            'generator': synthetic.GENERATOR_VERSION,
+            'results': rows,
+        }
+        with open(history, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f'\nAppended to {history}')
+
+    if regressions:
+        print(f'\nREGRESSIONS (> {args.threshold:.0%} slower):')
+        for r in regressions:
+            print(f'  {r}')
+
+
+if __name__ == '__main__':
+    main()
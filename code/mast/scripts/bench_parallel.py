@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Параллельный бенчмарк solve_v5 с резервом ядер и regression gating.
+
+run_benchmark_v6.py гоняет инстансы и повторы строго по очереди. Здесь
+каждый прогон — отдельный процесс (fork после warmup_sparse, ядра уже
+скомпилированы) с явным набором ядер: --cores-per-run ядер закрепляются за
+прогоном через sched_setaffinity, и он же получает n_workers. Прогоны
+упаковываются на --total-cores (по умолчанию cpu_count): крупные N первыми,
+свободные ядра добирают прогоны поменьше.
+
+На прогон пишутся: длина и gap, время по фазам (phases[*]['time']), пиковый
+RSS (phases['memory'] + воркеры листьев) и траектория (t, length) из
+anytime-событий (SolveControl) — из неё time-to-gap.
+
+Формат вывода совместим с run_benchmark_v6 (runs/mean/min/std/times/...),
+плюс phase_times, peak_rss_mb, trajectories, cores — такой JSON сам годится
+как baseline. С --baseline (например results/v6_benchmark_120s.json):
+  - gap: Mann-Whitney U (односторонний: текущие gap больше baseline);
+  - time-to-gap: время до gap ≤ target (target — --target-gap или медиана
+    gap baseline); прогон, не дошедший до target, цензурируется бюджетом.
+    Нужны траектории в baseline (вывод этого скрипта);
+  - регрессия = p ≤ --alpha и рост медианы больше --min-effect (доля) и
+    абсолютного порога (MIN_GAP_DELTA / MIN_TTG_DELTA). Если при таком
+    числе прогонов минимально достижимое p (1 / C(n+m, n): 3 vs 3 → 0.05)
+    больше alpha — предупреждение и решение только по порогам.
+Есть регрессии → код выхода 1 (для CI).
+
+Параллельные прогоны делят память и кэш L3 — абсолютные времена выше, чем
+у одиночного прогона; сравнивайте с baseline, снятым в той же упаковке.
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/bench_parallel.py --instances pcb442,fnl4461,d15112 \\
+      --budget 60 --runs 3 --cores-per-run 1 --baseline results/v6_benchmark_120s.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from run_benchmark_v6 import OPTIMAL, DEFAULT_INSTANCES, load_instance  # noqa: E402
+
+from src.core.anytime import SolveControl
+from src.core.checkpoint import to_jsonable
+from src.core.numba_sparse import warmup_sparse
+from src.core.ultra_solver import solve_v5
+
+# Абсолютный порог эффекта: меньшие сдвиги медиан — шум, не регрессия
+MIN_GAP_DELTA = 0.01   # % gap
+MIN_TTG_DELTA = 0.5    # секунды time-to-gap
+
+
+@dataclass
+class RunSpec:
+    """Один прогон: инстанс, номер повтора, число ядер."""
+    instance: str
+    run: int
+    n: int
+    cores: int
+
+
+# ═══════════════════════════════════════════════════════════
+#  CHILD: один прогон на закреплённых ядрах
+# ═══════════════════════════════════════════════════════════
+
+def _run_child(spec: RunSpec, core_ids: list[int], budget: float, solve_kwargs: dict, conn) -> None:
+    try:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, set(core_ids))
+        coords = load_instance(spec.instance)
+        trajectory: list[tuple[float, float]] = []
+
+        def on_event(ev) -> None:
+            if not trajectory or ev.length < trajectory[-1][1]:
+                trajectory.append((round(ev.time, 3), float(ev.length)))
+
+        control = SolveControl(callback=on_event, min_interval=0.1)
+        t0 = time.perf_counter()
+        result = solve_v5(coords, time_budget=budget, n_workers=spec.cores, verbose=False,
+                          control=control, **solve_kwargs)
+        elapsed = time.perf_counter() - t0
+        phases = result['phases']
+        memory = phases.get('memory', {})
+        trajectory.append((round(result['time_total'], 3), float(result['length'])))
+        conn.send({
+            'length': float(result['length']),
+            'time': elapsed,
+            'phase_times': {name: float(info['time']) for name, info in phases.items()
+                            if isinstance(info, dict) and 'time' in info},
+            'peak_rss_mb': memory.get('peak_rss_mb'),
+            'worker_peak_rss_mb': memory.get('worker_peak_rss_mb'),
+            'stitch_ratio': phases.get('stitching', {}).get('stitch_ratio'),
+            'trajectory': trajectory,
+        })
+    except BaseException as e:
+        conn.send({'error': f'{type(e).__name__}: {e}', 'traceback': traceback.format_exc()})
+    finally:
+        conn.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  SCHEDULER
+# ═══════════════════════════════════════════════════════════
+
+def run_parallel(
+    specs: list[RunSpec],
+    budget: float,
+    total_cores: int,
+    solve_kwargs: dict,
+) -> list[tuple[RunSpec, dict]]:
+    """
+    Упаковать прогоны на total_cores: очередь по убыванию N, запускается
+    первый прогон, которому хватает свободных ядер. Возвращает
+    (spec, результат ребёнка) в порядке завершения.
+    """
+    ctx = multiprocessing.get_context('fork')
+    queue = sorted(specs, key=lambda s: (-s.n, s.instance, s.run))
+    # Слоты ядер; total_cores больше доступных — слоты по кругу (oversubscribe)
+    allowed = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else [0]
+    free = [allowed[i % len(allowed)] for i in range(total_cores)]
+    running: dict = {}  # conn → (spec, process, core_ids, started)
+    done: list[tuple[RunSpec, dict]] = []
+
+    while queue or running:
+        launched = True
+        while launched:
+            launched = False
+            for i, spec in enumerate(queue):
+                if spec.cores <= len(free):
+                    core_ids, free = free[:spec.cores], free[spec.cores:]
+                    parent_conn, child_conn = ctx.Pipe(duplex=False)
+                    proc = ctx.Process(target=_run_child,
+                                       args=(spec, core_ids, budget, solve_kwargs, child_conn))
+                    proc.start()
+                    child_conn.close()
+                    running[parent_conn] = (spec, proc, core_ids, time.perf_counter())
+                    queue.pop(i)
+                    print(f'  start {spec.instance} run {spec.run + 1} (N={spec.n}) '
+                          f'on cores {core_ids}')
+                    launched = True
+                    break
+        if not running:
+            raise RuntimeError(f'no run fits into {total_cores} cores')
+
+        for conn in wait(list(running)):
+            spec, proc, core_ids, started = running.pop(conn)
+            try:
+                out = conn.recv()
+            except EOFError:
+                out = {'error': f'process exited with code {proc.exitcode}'}
+            proc.join()
+            free = sorted(free + core_ids)
+            done.append((spec, out))
+            if 'error' in out:
+                print(f'  FAIL  {spec.instance} run {spec.run + 1}: {out["error"]}')
+            else:
+                print(f'  done  {spec.instance} run {spec.run + 1}: '
+                      f'length={out["length"]:.0f}, {time.perf_counter() - started:.0f}s')
+    return done
+
+
+def aggregate(done: list[tuple[RunSpec, dict]], budget: float) -> dict:
+    """Результаты прогонов → формат run_benchmark_v6 + новые поля."""
+    results: dict = {}
+    for spec, out in sorted(done, key=lambda x: (x[0].n, x[0].instance, x[0].run)):
+        if 'error' in out:
+            continue
+        optimal = OPTIMAL[spec.instance]
+        entry = results.setdefault(spec.instance, {
+            'n': spec.n, 'optimal': optimal, 'budget': budget, 'cores': spec.cores,
+            'runs': [], 'times': [], 'phase_info': [], 'phase_times': [],
+            'peak_rss_mb': [], 'worker_peak_rss_mb': [], 'trajectories': [],
+        })
+        entry['runs'].append(round((out['length'] - optimal) / optimal * 100, 3))
+        entry['times'].append(round(out['time'], 1))
+        entry['phase_info'].append({'stitch_ratio': out['stitch_ratio']}
+                                   if out['stitch_ratio'] is not None else {})
+        entry['phase_times'].append({k: round(v, 3) for k, v in out['phase_times'].items()})
+        entry['peak_rss_mb'].append(out['peak_rss_mb'])
+        entry['worker_peak_rss_mb'].append(out['worker_peak_rss_mb'])
+        entry['trajectories'].append(out['trajectory'])
+    for entry in results.values():
+        gaps = entry['runs']
+        entry['mean'] = round(float(np.mean(gaps)), 3)
+        entry['min'] = round(float(min(gaps)), 3)
+        entry['std'] = round(float(np.std(gaps)), 3)
+    return results
+
+
+# ═══════════════════════════════════════════════════════════
+#  BASELINE DIFF
+# ═══════════════════════════════════════════════════════════
+
+def time_to_gap(trajectory, optimal: float, target_pct: float, budget: float) -> float:
+    """
+    Первое t, где gap ≤ target_pct; не дошёл — budget (цензурирование).
+    gap округляется как в runs (3 знака %), иначе target = медиана baseline
+    недостижим из-за округления.
+    """
+    for t, length in trajectory:
+        if round((length - optimal) / optimal * 100, 3) <= target_pct:
+            return float(t)
+    return float(budget)
+
+
+def _mann_whitney_greater(current: list[float], baseline: list[float]) -> float | None:
+    """p-value H1: current стохастически больше baseline (None — мало данных)."""
+    if len(current) < 2 or len(baseline) < 2:
+        return None
+    from scipy.stats import mannwhitneyu
+    if len(set(current) | set(baseline)) == 1:
+        return 1.0
+    return float(mannwhitneyu(current, baseline, alternative='greater').pvalue)
+
+
+def _significant(p: float | None, n_cur: int, n_base: int, alpha: float, label: str) -> bool:
+    """
+    p ≤ alpha. Тест не может дать p ≤ alpha при таком числе прогонов
+    (min p = 1 / C(n_cur + n_base, n_cur)) → warning и True: решают пороги.
+    """
+    if p is None:
+        return False
+    p_min = 1.0 / math.comb(n_cur + n_base, n_cur)
+    if p_min > alpha:
+        print(f'warning: {label}: {n_cur} vs {n_base} runs cannot reach p <= {alpha} '
+              f'(min p = {p_min:.3f}); threshold-only decision', file=sys.stderr)
+        return True
+    return p <= alpha
+
+
+def diff_baseline(
+    results: dict,
+    baseline: dict,
+    target_gap: float | None,
+    alpha: float,
+    min_effect: float,
+) -> dict:
+    """Сравнение с baseline по инстансам; ключ 'regressions' — список флагов."""
+    report: dict = {}
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not isinstance(base, dict) or not base.get('runs'):
+            continue
+        entry: dict = {}
+
+        # Итоговый gap
+        p = _mann_whitney_greater(cur['runs'], base['runs'])
+        med_cur, med_base = float(np.median(cur['runs'])), float(np.median(base['runs']))
+        entry['gap'] = {
+            'current_median': med_cur, 'baseline_median': med_base, 'p_value': p,
+            'regression': (_significant(p, len(cur['runs']), len(base['runs']), alpha, f'{name} gap')
+                           and med_cur - med_base > max(min_effect * abs(med_base), MIN_GAP_DELTA)),
+        }
+
+        # Time-to-gap (нужны траектории baseline; бюджеты могут отличаться)
+        target = target_gap if target_gap is not None else med_base
+        cur_t = [time_to_gap(tr, cur['optimal'], target, cur['budget']) for tr in cur['trajectories']]
+        entry['time_to_gap'] = {'target_gap': target, 'current': cur_t}
+        if base.get('trajectories'):
+            base_t = [time_to_gap(tr, base['optimal'], target, base['budget']) for tr in base['trajectories']]
+            p = _mann_whitney_greater(cur_t, base_t)
+            med_cur, med_base = float(np.median(cur_t)), float(np.median(base_t))
+            entry['time_to_gap'].update({
+                'baseline': base_t, 'current_median': med_cur, 'baseline_median': med_base,
+                'p_value': p,
+                'regression': (_significant(p, len(cur_t), len(base_t), alpha, f'{name} time-to-gap')
+                               and med_cur - med_base > max(min_effect * med_base, MIN_TTG_DELTA)),
+            })
+
+        # Фазы: медианы времени (информативно, без флагов)
+        if base.get('phase_times'):
+            phases = sorted({k for pt in cur['phase_times'] + base['phase_times'] for k in pt})
+            entry['phase_times'] = {
+                k: {'current': float(np.median([pt.get(k, 0.0) for pt in cur['phase_times']])),
+                    'baseline': float(np.median([pt.get(k, 0.0) for pt in base['phase_times']]))}
+                for k in phases
+            }
+        report[name] = entry
+
+    report['regressions'] = [
+        f'{name}: {metric}' for name, entry in report.items()
+        for metric in ('gap', 'time_to_gap') if entry.get(metric, {}).get('regression')
+    ]
+    return report
+
+
+def print_diff(report: dict) -> None:
+    print(f'\n{"="*92}')
+    print('BASELINE DIFF (median; p — Mann-Whitney U, H1: current worse)')
+    print(f'{"="*92}')
+    print(f'{"Instance":<14} {"Gap%":>7} {"base":>7} {"p":>6}   '
+          f'{"Target%":>7} {"TTG s":>7} {"base":>7} {"p":>6}  Flags')
+    for name, entry in report.items():
+        if name == 'regressions':
+            continue
+        g, t = entry['gap'], entry['time_to_gap']
+        flags = ' '.join(m.upper() for m in ('gap', 'time_to_gap') if entry[m].get('regression'))
+
+        def fmt(v, spec='>7.2f'):
+            return format(v, spec) if v is not None else format('N/A', spec[:2])
+
+        print(f'{name:<14} {fmt(g["current_median"])} {fmt(g["baseline_median"])} '
+              f'{fmt(g["p_value"], ">6.3f")}   {fmt(t["target_gap"])} '
+              f'{fmt(t.get("current_median", float(np.median(t["current"]))), ">7.1f")} '
+              f'{fmt(t.get("baseline_median"), ">7.1f")} {fmt(t.get("p_value"), ">6.3f")}  {flags}')
+    if report['regressions']:
+        print(f'\nREGRESSIONS: {", ".join(report["regressions"])}')
+    else:
+        print('\nNo significant regressions.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel MASTm benchmark with regression gating')
+    parser.add_argument('--instances', type=str, default=None, help='Comma-separated instance names')
+    parser.add_argument('--budget', type=float, default=120, help='Time budget per run (seconds)')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per instance')
+    parser.add_argument('--cores-per-run', type=int, default=1, help='Cores reserved per run (= n_workers)')
+    parser.add_argument('--total-cores', type=int, default=0, help='Cores to pack runs on (0 = cpu_count)')
+    parser.add_argument('--max-memory-mb', type=float, default=None, help='solve_v5 max_memory_mb per run')
+    parser.add_argument('--baseline', type=str, default=None, help='Baseline JSON (results/v6_*.json)')
+    parser.add_argument('--target-gap', type=float, default=None,
+                        help='Gap %% for time-to-gap (default: baseline median gap)')
+    parser.add_argument('--alpha', type=float, default=0.05, help='Significance level')
+    parser.add_argument('--min-effect', type=float, default=0.05,
+                        help='Min relative worsening of the median to flag')
+    parser.add_argument('--output', type=str, default=None, help='Output JSON file')
+    args = parser.parse_args()
+
+    instances = args.instances.split(',') if args.instances else DEFAULT_INSTANCES
+    total_cores = args.total_cores or multiprocessing.cpu_count()
+    cores = min(args.cores_per_run, total_cores)
+
+    specs = []
+    for name in instances:
+        if name not in OPTIMAL:
+            print(f'SKIP {name}: no optimal value known')
+            continue
+        try:
+            n = len(load_instance(name))  # заодно sidecar .npy для детей
+        except FileNotFoundError as e:
+            print(f'SKIP {name}: {e}')
+            continue
+        specs += [RunSpec(name, run, n, cores) for run in range(args.runs)]
+
+    print(f'MASTm parallel benchmark: {len(specs)} runs, budget={args.budget:.0f}s, '
+          f'{cores} cores/run on {total_cores} cores')
+    warmup_sparse()
+    solve_kwargs = {}
+    if args.max_memory_mb is not None:
+        solve_kwargs['max_memory_mb'] = args.max_memory_mb
+
+    t0 = time.perf_counter()
+    done = run_parallel(specs, args.budget, total_cores, solve_kwargs)
+    results = aggregate(done, args.budget)
+    print(f'\nWall time: {time.perf_counter() - t0:.0f}s '
+          f'(sequential: ~{len(specs) * args.budget:.0f}s)')
+
+    print(f'\n{"Instance":<14} {"N":>7} {"Mean%":>7} {"Min%":>7} {"Std%":>6} {"RSS MB":>7}')
+    for name, data in results.items():
+        rss = max((r for r in data['peak_rss_mb'] if r is not None), default=0.0)
+        print(f'{name:<14} {data["n"]:>7} {data["mean"]:>6.2f}% {data["min"]:>6.2f}% '
+              f'{data["std"]:>5.2f}% {rss:>7.0f}')
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report = diff_baseline(results, baseline, args.target_gap, args.alpha, args.min_effect)
+        print_diff(report)
+        regressions = report.pop('regressions')
+        for name, entry in report.items():
+            results[name]['baseline_diff'] = entry
+
+    _root = Path(__file__).resolve().parent.parent / 'results'
+    out_path = args.output or str(_root / f'parallel_benchmark_{args.budget:.0f}s.json')
+    with open(out_path, 'w') as f:
+        json.dump(to_jsonable(results), f, indent=2)
+    print(f'\nResults saved to {out_path}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк перенумерации городов (reorder) на Phase 5 throughput.
+
+Для каждого режима (none / hilbert / tour) строит oracle (k=30, как в global
+polish), стартовый тур NN + 2-opt и крутит ILS-цикл Phase 5
+(double_bridge + LK-DLB на cached edge costs) фиксированное время.
+Метрика: kicks/s и ns на город за kick.
+
+С --perf каждый режим запускается в отдельном процессе под `perf stat`
+(cache-misses, cache-references, instructions); из счётчиков прогона с ILS
+вычитается прогон без ILS (только setup) → misses на kick.
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/bench_reorder.py --n 100000 --seconds 20
+  PYTHONPATH=. python3 scripts/bench_reorder.py --instance pla85900 --perf
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.core.distance_oracle import DistanceOracle
+from src.core.numba_sparse import (
+    warmup_sparse,
+    nn_tour_coords_jit,
+    two_opt_nn_cached_jit,
+    double_bridge_coords_jit,
+    lk_opt_cached_jit,
+)
+from src.core.reorder import REORDER_MODES, hilbert_order, tour_order
+
+PERF_EVENTS = 'cache-misses,cache-references,instructions'
+
+
+def load_coords(args) -> np.ndarray:
+    """Инстанс: TSPLIB по имени или uniform random (перемешанный порядок id)."""
+    if args.instance:
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from run_benchmark_v6 import load_instance
+        return load_instance(args.instance)
+    rng = np.random.RandomState(args.seed)
+    return rng.rand(args.n, 2) * 1e6
+
+
+def measure(coords: np.ndarray, mode: str, seconds: float, seed: int) -> dict:
+    """Setup в режиме mode + ILS-цикл Phase 5 на seconds секунд."""
+    warmup_sparse()
+    t0 = time.perf_counter()
+    if mode == 'hilbert':
+        coords = np.ascontiguousarray(coords[hilbert_order(coords)])
+    oracle = DistanceOracle(coords, knn_k=30)
+    oracle.build_knn()
+    if mode == 'tour':
+        oracle = oracle.renumber(tour_order(oracle))
+        coords = oracle.coords
+    knn, knn_d = oracle.knn_indices, oracle.knn_dists
+
+    tour = nn_tour_coords_jit(coords, knn, knn_d, 0)
+    two_opt_nn_cached_jit(tour, coords, knn, knn_d, 20, 3)
+    setup_time = time.perf_counter() - t0
+
+    np.random.seed(seed)
+    kicks = 0
+    t0 = time.perf_counter()
+    t_end = t0 + seconds
+    while time.perf_counter() < t_end:
+        perturbed = double_bridge_coords_jit(tour)
+        lk_opt_cached_jit(perturbed, coords, knn[:, :0], knn, knn_d, 30, 2)
+        kicks += 1
+    ils_time = time.perf_counter() - t0
+
+    n = len(coords)
+    return {
+        'mode': mode,
+        'n': n,
+        'setup_time': setup_time,
+        'ils_time': ils_time,
+        'kicks': kicks,
+        'kicks_per_s': kicks / ils_time if ils_time > 0 else 0.0,
+        'ns_per_city_kick': ils_time / max(kicks, 1) / n * 1e9,
+    }
+
+
+def perf_counters(args, mode: str, seconds: float) -> dict | None:
+    """Запуск measure() в подпроцессе под perf stat. None если perf недоступен."""
+    cmd = [
+        'perf', 'stat', '-x', ',', '-e', PERF_EVENTS,
+        sys.executable, __file__, '--worker', mode, '--seconds', str(seconds),
+        '--seed', str(args.seed),
+    ]
+    cmd += ['--instance', args.instance] if args.instance else ['--n', str(args.n)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    counters = {}
+    for line in proc.stderr.splitlines():
+        parts = line.split(',')
+        if len(parts) >= 3 and parts[0].strip().isdigit():
+            counters[parts[2]] = int(parts[0])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['counters'] = counters
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reorder benchmark (Phase 5 throughput)')
+    parser.add_argument('--n', type=int, default=100000, help='N для uniform random')
+    parser.add_argument('--instance', type=str, default=None, help='TSPLIB инстанс')
+    parser.add_argument('--seconds', type=float, default=20.0, help='Время ILS на режим')
+    parser.add_argument('--modes', type=str, default=','.join(REORDER_MODES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--perf', action='store_true', help='perf stat cache-misses')
+    parser.add_argument('--worker', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    coords = load_coords(args)
+
+    if args.worker:
+        print(json.dumps(measure(coords, args.worker, args.seconds, args.seed)))
+        return
+
+    modes = args.modes.split(',')
+    use_perf = args.perf and shutil.which('perf') is not None
+    if args.perf and not use_perf:
+        print('perf not found: cache-miss counters skipped')
+
+    print(f'N={len(coords)}, ILS {args.seconds:.0f}s per mode')
+    print(f'{"mode":>8} {"setup":>7} {"kicks/s":>9} {"ns/city/kick":>13} {"misses/kick":>12}')
+    baseline = None
+    for mode in modes:
+        misses = ''
+        if use_perf:
+            full = perf_counters(args, mode, args.seconds)
+            empty = perf_counters(args, mode, 0.0)
+            if full is None or empty is None:
+                print(f'{mode:>8} perf stat failed')
+                continue
+            res = full
+            d_miss = full['counters'].get('cache-misses', 0) - empty['counters'].get('cache-misses', 0)
+            misses = f'{d_miss / max(full["kicks"], 1):12.0f}'
+        else:
+            res = measure(coords, mode, args.seconds, args.seed)
+        if baseline is None:
+            baseline = res['kicks_per_s']
+        speedup = res['kicks_per_s'] / baseline if baseline else 0.0
+        print(f'{mode:>8} {res["setup_time"]:6.2f}s {res["kicks_per_s"]:9.1f} '
+              f'{res["ns_per_city_kick"]:13.2f} {misses:>12}  x{speedup:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Startup-бенчмарк: время от import до первого вызова ядра в свежем процессе.
+
+Каждый сценарий — отдельный `python -c` (--repeats раз); время меряется
+внутри процесса от первой строки (до import numpy) до возврата первого
+вызова ядра, плюс wall процесса целиком (со стартом интерпретатора):
+  aot          — jit_cache.kernels(coords).tour_length: AOT-модуль bundle,
+                 без numba;
+  jit          — numba_sparse + первый вызов dispatcher'а (ядро из кэша bundle);
+  jit_warm     — numba_sparse + ensure_warm() (загрузка всех ядер, как
+                 solve_v5 с n_workers > 1);
+  solve_small  — import small_solver + solve_small на 200 городах, бюджет 0.05 с.
+
+Цель (--target, 300 мс) — для сценария aot: медиана выше или нет AOT
+(bundle не собран / устарел: scripts/build_jit_cache.py) → код выхода 1.
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/build_jit_cache.py
+  PYTHONPATH=. python3 scripts/bench_startup.py --repeats 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+TARGET_MS = 300.0
+
+_PRELUDE = 'import time\nt0 = time.perf_counter()\nimport numpy as np\n'
+_EPILOGUE = '''
+import json, sys
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({'ms': ms, 'kernels': kernels, 'numba': 'numba' in sys.modules}))
+'''
+
+SCENARIOS = {
+    'aot': '''
+from src.core.jit_cache import kernels as _kernels
+coords = np.random.rand(200, 2)
+K = _kernels(coords)
+K.tour_length(np.arange(200), coords)
+kernels = 'aot' if type(K).__name__ == 'module' else 'jit'
+''',
+    'jit': '''
+from src.core.numba_sparse import tour_length_coords_jit
+coords = np.random.rand(200, 2)
+tour_length_coords_jit(np.arange(200), coords)
+kernels = 'jit'
+''',
+    'jit_warm': '''
+from src.core.jit_cache import ensure_warm
+kernels = ensure_warm()
+''',
+    'solve_small': '''
+from src.core.small_solver import solve_small
+from src.core.jit_cache import kernels as _kernels
+coords = np.random.rand(200, 2) * 1000
+solve_small(coords, time_budget=0.05)
+kernels = 'aot' if type(_kernels(coords)).__name__ == 'module' else 'jit'
+''',
+}
+
+
+def run_scenario(name: str) -> dict:
+    """Один свежий процесс → {'ms', 'wall_ms', 'kernels', 'numba'}."""
+    env = dict(os.environ, PYTHONPATH=str(_ROOT))
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-c', _PRELUDE + SCENARIOS[name] + _EPILOGUE],
+        cwd=_ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f'{name} failed:\n{proc.stderr}')
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    out['wall_ms'] = wall
+    return out
+
+
+def interpreter_start_ms() -> float:
+    """Wall пустого `python -c pass` — старт интерпретатора, мс."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-to-first-kernel-call startup benchmark')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--scenarios', type=str, default=','.join(SCENARIOS))
+    parser.add_argument('--target', type=float, default=TARGET_MS, help='ms, for the aot scenario')
+    parser.add_argument('--output', type=str, default=None, help='JSON with all samples')
+    args = parser.parse_args()
+
+    names = args.scenarios.split(',')
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenarios {unknown}; choose from {list(SCENARIOS)}')
+
+    baseline = [interpreter_start_ms() for _ in range(args.repeats)]
+    print(f'interpreter start: {np.median(baseline):.0f} ms (median of {args.repeats})')
+    print(f'{"Scenario":<12} {"median":>8} {"min":>8} {"wall":>8}  kernels  numba')
+    results = {}
+    for name in names:
+        samples = [run_scenario(name) for _ in range(args.repeats)]
+        ms = [s['ms'] for s in samples]
+        results[name] = {
+            'median_ms': float(np.median(ms)),
+            'min_ms': float(np.min(ms)),
+            'wall_median_ms': float(np.median([s['wall_ms'] for s in samples])),
+            'kernels': samples[-1]['kernels'],
+            'numba_imported': samples[-1]['numba'],
+            'samples_ms': ms,
+        }
+        r = results[name]
+        print(f'{name:<12} {r["median_ms"]:>6.0f}ms {r["min_ms"]:>6.0f}ms {r["wall_median_ms"]:>6.0f}ms'
+              f'  {r["kernels"]:<8} {"yes" if r["numba_imported"] else "no"}')
+
+    ok = True
+    if 'aot' in results:
+        aot = results['aot']
+        if aot['kernels'] != 'aot':
+            print('\nFAIL: AOT kernels unavailable (bundle missing or stale) — run scripts/build_jit_cache.py')
+            ok = False
+        elif aot['median_ms'] > args.target:
+            print(f'\nFAIL: aot {aot["median_ms"]:.0f} ms > target {args.target:.0f} ms')
+            ok = False
+        else:
+            print(f'\nOK: aot {aot["median_ms"]:.0f} ms <= target {args.target:.0f} ms')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'target_ms': args.target, 'interpreter_ms': baseline, 'scenarios': results}, f, indent=2)
+        print(f'Saved to {args.output}')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
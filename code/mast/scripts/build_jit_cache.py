@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Сборка bundle скомпилированных ядер (src/core/jit_cache).
+
+Прогревает все варианты ядер (евклидовы coords, GraphMetric, EAX) в кэш
+bundle и собирает AOT-модуль coordinate-first пайплайна (numba.pycc,
+generic CPU). Повторный запуск с теми же исходниками — только загрузка
+из кэша и пересборка AOT (~10 с); после изменения numba_sparse / eax_sparse
+ядра компилируются заново (~2 мин).
+
+Bundle привязан к версиям numba / Python и платформе (каталог
+{MAST_JIT_CACHE или code/mast/.jit_cache}/{tag}); для другого окружения
+его нужно собрать там же.
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/build_jit_cache.py
+  MAST_JIT_CACHE=/opt/mast/jit PYTHONPATH=. python3 scripts/build_jit_cache.py --no-aot
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import src.core.numba_sparse  # noqa: F401 — install() bundle-locator до @njit
+from src.core import jit_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the compiled kernel cache bundle')
+    parser.add_argument('--no-aot', action='store_true', help='Only warm the numba cache')
+    parser.add_argument('--verbose', action='store_true', help='Verbose pycc build')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        manifest = jit_cache.build_bundle(aot=not args.no_aot, verbose=args.verbose)
+    except RuntimeError as e:
+        raise SystemExit(f'error: {e}')
+    directory = jit_cache.bundle_dir()
+    size_mb = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(directory) for name in names
+    ) / 2**20
+    print(f'Bundle: {directory}')
+    print(f'  variants: {", ".join(manifest["variants"])}')
+    print(f'  aot:      {manifest.get("aot") or "-"}')
+    print(f'  size:     {size_mb:.1f} MB, built in {time.perf_counter() - t0:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ Fingerprint Analysis + Ablation Study для MASTm v6.
 Запуск:
   cd code/mast
   PYTHONPATH=. python3 scripts/fingerprint_analysis.py [--mode fingerprint|ablation|both]
+      [--synthetic uniform-10K-s0,fl-10K-s0,pla-10K-s0]
 """
 
 from __future__ import annotations
@@ -24,6 +25,8 @@ from src.core.distance_oracle import DistanceOracle
 from src.core.fingerprint import (
     InstanceFingerprint, SolverConfig, StrategyRouter, compute_fingerprint,
 )
+from src.core.tsplib_io import read_tsp
+from src.core.synthetic import load_or_generate, parse_spec
 
 # TSPLIB оптимумы и пути
 OPTIMAL = {
@@ -40,22 +43,23 @@ PLOTS_DIR = _ROOT / 'results' / 'plots'
 
 
 def load_instance(name: str) -> np.ndarray:
-    """Загружает координаты из TSP файла."""
-    import tsplib95
+    """TSP файл (sidecar .npy после первого разбора) или синтетическая спецификация."""
+    if parse_spec(name) is not None:
+        return load_or_generate(name, TSP_DIR / 'synthetic')
     path = TSP_DIR / f'{name}.tsp'
     if not path.exists():
         raise FileNotFoundError(f'{path} not found')
-    prob = tsplib95.load(str(path))
-    nodes = list(prob.get_nodes())
-    return np.array([prob.node_coords[n] for n in nodes], dtype=np.float64)
+    return read_tsp(path)
 
 
-def compute_all_fingerprints() -> dict[str, tuple[InstanceFingerprint, SolverConfig]]:
-    """Вычисляет fingerprint для всех TSPLIB инстансов."""
+def compute_all_fingerprints(
+    synthetic: list[str] | None = None,
+) -> dict[str, tuple[InstanceFingerprint, SolverConfig]]:
+    """Вычисляет fingerprint для всех TSPLIB инстансов (+ синтетика по спецификациям)."""
     results = {}
     router = StrategyRouter()
 
-    for name in sorted(OPTIMAL.keys()):
+    for name in sorted(OPTIMAL.keys()) + list(synthetic or []):
         try:
             coords = load_instance(name)
         except FileNotFoundError:
@@ -287,11 +291,14 @@ def main():
     parser = argparse.ArgumentParser(description='MASTm Fingerprint Analysis')
     parser.add_argument('--mode', choices=['fingerprint', 'ablation', 'both'],
                         default='both')
+    parser.add_argument('--synthetic', type=str, default=None,
+                        help='Comma-separated synthetic specs, e.g. clustered-10K-s0,pla-10K-s0')
     args = parser.parse_args()
+    synthetic = args.synthetic.split(',') if args.synthetic else None
 
     if args.mode in ('fingerprint', 'both'):
         print('Computing fingerprints...')
-        fps = compute_all_fingerprints()
+        fps = compute_all_fingerprints(synthetic)
 
         print('\nGenerating plots...')
         plot_fingerprint_scatter(fps)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Генерация синтетических TSP-инстансов (src/core/synthetic) для scaling-исследований.
+
+Каждый (kind, N, seed) пишется потоково в {out}/{kind}-{N}-s{seed}.v{VERSION}.npy —
+тот же файл, который load_or_generate() ищет в run_benchmark_v6 /
+fingerprint_analysis, так что повторной генерации не будет.
+--tsp дополнительно пишет TSPLIB (EUC_2D, дробные координаты как %.10g;
+для 10M — несколько сотен МБ текста).
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/gen_synthetic.py
+  PYTHONPATH=. python3 scripts/gen_synthetic.py --kinds pla,mona --sizes 100K,1M,10M --seed 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.core import synthetic
+from src.core.tsplib_io import write_tsp
+
+_ROOT = Path(__file__).resolve().parent.parent
+OUT_DIR = _ROOT / 'benchmarks' / 'synthetic'
+
+
+def parse_size(text: str) -> int:
+    """'1000' / '10K' / '2.5M' → int."""
+    spec = synthetic.parse_spec(f'uniform-{text}')
+    if spec is None:
+        raise argparse.ArgumentTypeError(f'bad size: {text!r} (expected e.g. 1000, 10K, 1M)')
+    return spec[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic TSP instance generator')
+    parser.add_argument('--kinds', type=str, default=','.join(synthetic.KINDS),
+                        help=f'Comma-separated kinds from {synthetic.KINDS}')
+    parser.add_argument('--sizes', type=str, default='1K,10K,100K,1M',
+                        help='Comma-separated sizes (K/M suffixes allowed)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=str, default=str(OUT_DIR))
+    parser.add_argument('--tsp', action='store_true', help='Also write TSPLIB .tsp next to .npy')
+    parser.add_argument('--force', action='store_true', help='Regenerate existing files')
+    args = parser.parse_args()
+
+    kinds = args.kinds.split(',')
+    unknown = [k for k in kinds if k not in synthetic.KINDS]
+    if unknown:
+        parser.error(f'unknown kinds {unknown}; choose from {synthetic.KINDS}')
+    sizes = [parse_size(s) for s in args.sizes.split(',')]
+    out = Path(args.out)
+
+    print(f'{"Instance":<22} {"N":>9} {"time":>8} {"MB":>8}  path')
+    for n in sizes:
+        for kind in kinds:
+            name = synthetic.spec_name(kind, n, args.seed)
+            path = out / f'{name}.v{synthetic.GENERATOR_VERSION}.npy'
+            t0 = time.perf_counter()
+            if args.force or not path.exists():
+                synthetic.generate_npy(path, kind, n, args.seed)
+            elapsed = time.perf_counter() - t0
+            size_mb = os.path.getsize(path) / 2**20
+            print(f'{name:<22} {n:>9} {elapsed:>7.2f}s {size_mb:>8.1f}  {path}')
+
+            if args.tsp:
+                tsp_path = out / f'{name}.tsp'
+                t0 = time.perf_counter()
+                write_tsp(tsp_path, np.load(path, mmap_mode='r'), name=name,
+                          comment=f'synthetic {kind}, seed {args.seed}, '
+                                  f'generator v{synthetic.GENERATOR_VERSION}')
+                print(f'{"":<22} {"":>9} {time.perf_counter() - t0:>7.2f}s '
+                      f'{os.path.getsize(tsp_path) / 2**20:>8.1f}  {tsp_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,17 @@
 Запуск:
   cd code/mast
   PYTHONPATH=. python3 scripts/run_benchmark_v6.py [--instances X,Y] [--budget 120] [--runs 3] [--full]
+
+Синтетика (src/core/synthetic): --instances clustered-100K-s0,pla-1M-s1 —
+генерируется в benchmarks/synthetic/ при первом запуске; оптимума нет,
+gap считается к нижней оценке (solve_v5(compute_lower_bound=True)).
+
+Anytime-метрики по кривой сходимости result['convergence'] каждого прогона
+(относительно того же оптимума / нижней оценки):
+  time_to_target — первое t, где gap ≤ 5% / 2% / 1% (null — не достигнут);
+  auc            — primal integral: средний primal gap за [0, budget], %
+                   (src.core.anytime.primal_integral; меньше — быстрее).
+В сводке — медианы по прогонам (t недостигнутой цели считается ∞).
 """
 
 from __future__ import annotations
@@ -16,9 +27,13 @@ import time
 from pathlib import Path
 
 import numpy as np
-import tsplib95
 
+from src.core.anytime import primal_integral, time_to_target
 from src.core.ultra_solver import solve_v5
+from src.core.tsplib_io import read_tsp, write_tour
+from src.core.synthetic import load_or_generate, parse_spec
+
+TARGET_GAPS = (5.0, 2.0, 1.0)  # %
 
 # Оптимумы TSPLIB (из литературы)
 OPTIMAL = {
@@ -82,13 +97,16 @@ DEFAULT_INSTANCES = SMALL + MEDIUM + LARGE
 
 
 def load_instance(name: str) -> np.ndarray:
-    """Загружает координаты из TSP файла."""
+    """
+    Загружает координаты из TSP файла (sidecar .npy после первого разбора)
+    или синтетический инстанс по спецификации ('uniform-100K-s0').
+    """
+    if parse_spec(name) is not None:
+        return load_or_generate(name, TSP_DIR / 'synthetic')
     path = TSP_DIR / f'{name}.tsp'
     if not path.exists():
         raise FileNotFoundError(f'{path} not found')
-    prob = tsplib95.load(str(path))
-    nodes = list(prob.get_nodes())
-    return np.array([prob.node_coords[n] for n in nodes], dtype=np.float64)
+    return read_tsp(path)
 
 
 def run_benchmark(
@@ -97,12 +115,18 @@ def run_benchmark(
     n_runs: int,
     verbose: bool = False,
     checkpoint_path: str | None = None,
+    tour_dir: str | None = None,
+    seed: int | None = None,
 ) -> dict:
-    """Запускает бенчмарк."""
+    """
+    Запускает бенчмарк. tour_dir: лучший тур инстанса → {name}.tour.
+    seed: прогон r — solve_v5(seed=seed + r) (A/B сравнения на одинаковых потоках).
+    """
     results = {}
 
     for name in instances:
-        if name not in OPTIMAL:
+        synthetic = parse_spec(name) is not None
+        if name not in OPTIMAL and not synthetic:
             print(f'SKIP {name}: no optimal value known')
             continue
 
@@ -112,26 +136,44 @@ def run_benchmark(
             print(f'SKIP {name}: {e}')
             continue
 
-        optimal = OPTIMAL[name]
+        optimal = OPTIMAL.get(name)
         n = len(coords)
         gaps = []
         times_list = []
         phase_info = []
+        ttt = {f'{g:g}%': [] for g in TARGET_GAPS}
+        aucs = []
+        curves = []
+        best_result = None
 
         print(f'\n{"="*60}')
-        print(f'{name} (N={n}, optimal={optimal}, budget={budget}s, {n_runs} runs)')
+        reference = f'optimal={optimal}' if optimal is not None else 'gap vs lower bound'
+        print(f'{name} (N={n}, {reference}, budget={budget}s, {n_runs} runs)')
         print(f'{"="*60}')
 
         for run in range(n_runs):
             t0 = time.perf_counter()
-            result = solve_v5(coords, time_budget=budget, verbose=verbose)
+            result = solve_v5(coords, time_budget=budget, verbose=verbose,
+                              compute_lower_bound=optimal is None,
+                              seed=None if seed is None else seed + run)
             elapsed = time.perf_counter() - t0
 
             length = result['length']
-            gap = (length - optimal) / optimal * 100
+            if optimal is not None:
+                gap = (length - optimal) / optimal * 100
+            else:
+                gap = result['gap_to_lb'] * 100 if result['gap_to_lb'] is not None else float('nan')
             gaps.append(round(gap, 3))
             times_list.append(round(elapsed, 1))
 
+            reference_length = optimal if optimal is not None else result['lower_bound']
+            curve = result['convergence']
+            curves.append(curve)
+            if reference_length:
+                for g in TARGET_GAPS:
+                    ttt[f'{g:g}%'].append(time_to_target(curve, reference_length, g / 100))
+                aucs.append(round(primal_integral(curve, reference_length, budget) * 100, 3))
+
             # Собираем phase info
             phases = result.get('phases', {})
             info = {}
@@ -141,24 +183,40 @@ def run_benchmark(
                 info['vcycle_time'] = phases['v_cycle'].get('time', None)
                 info['vcycle_improvement'] = phases['v_cycle'].get('improvement', None)
             phase_info.append(info)
+            if best_result is None or length < best_result['length']:
+                best_result = result
 
-            print(f'  run {run+1}: length={length:.0f}, gap={gap:.2f}%, time={elapsed:.0f}s')
+            ttt_msg = ', '.join(f'{k}@{_fmt_time(v[-1])}' for k, v in ttt.items() if v)
+            print(f'  run {run+1}: length={length:.0f}, gap={gap:.2f}%, time={elapsed:.0f}s'
+                  + (f', auc={aucs[-1]:.2f}%, ttt {ttt_msg}' if aucs else ''))
 
         results[name] = {
             'n': n,
             'optimal': optimal,
+            'gap_to': 'optimal' if optimal is not None else 'lower_bound',
             'budget': budget,
             'runs': gaps,
             'mean': round(float(np.mean(gaps)), 3),
             'min': round(float(min(gaps)), 3),
             'std': round(float(np.std(gaps)), 3),
             'times': times_list,
+            'seed': seed,
+            'time_to_target': ttt,
+            'time_to_target_median': {k: _median_time(v) for k, v in ttt.items()},
+            'auc': aucs,
+            'auc_median': float(np.median(aucs)) if aucs else None,
+            'convergence': curves,
             'phase_info': phase_info,
         }
 
         print(f'  → mean={results[name]["mean"]:.2f}%, min={results[name]["min"]:.2f}%, '
               f'std={results[name]["std"]:.2f}%')
 
+        if tour_dir and best_result is not None:
+            Path(tour_dir).mkdir(parents=True, exist_ok=True)
+            write_tour(Path(tour_dir) / f'{name}.tour', best_result['tour'], name=f'{name}.tour',
+                       comment=f'MASTm v6, length {best_result["length"]:.0f}')
+
         # Инкрементальное сохранение после каждого инстанса
         if checkpoint_path:
             with open(checkpoint_path, 'w') as f:
@@ -167,22 +225,41 @@ def run_benchmark(
     return results
 
 
+def _median_time(values: list) -> float | None:
+    """Медиана time-to-target; None (не достигнуто) = ∞; медиана ∞ → None."""
+    if not values:
+        return None
+    med = float(np.median([v if v is not None else np.inf for v in values]))
+    return round(med, 2) if np.isfinite(med) else None
+
+
+def _fmt_time(t: float | None) -> str:
+    return f'{t:.1f}s' if t is not None else '-'
+
+
 def print_summary(results: dict, v53_baseline: dict | None = None):
-    """Печатает таблицу результатов."""
-    print(f'\n{"="*80}')
+    """Печатает таблицу результатов: anytime-метрики (медианы), затем gap в конце бюджета."""
+    targets = [f'{g:g}%' for g in TARGET_GAPS]
+    print(f'\n{"="*104}')
     print(f'BENCHMARK SUMMARY')
-    print(f'{"="*80}')
-    print(f'{"Instance":<14} {"N":>7} {"Budget":>6} {"Mean%":>7} {"Min%":>7} {"Std%":>6} '
-          f'{"v5.3%":>7} {"Delta":>7}')
-    print(f'{"-"*14} {"-"*7} {"-"*6} {"-"*7} {"-"*7} {"-"*6} {"-"*7} {"-"*7}')
+    print(f'{"="*104}')
+    print(f'{"Instance":<14} {"N":>7} {"Budget":>6} '
+          + ' '.join(f'{"t" + k:>7}' for k in targets)
+          + f' {"AUC%":>7} {"Mean%":>7} {"Min%":>7} {"Std%":>6} {"v5.3%":>7} {"Delta":>7}')
+    print(f'{"-"*14} {"-"*7} {"-"*6} ' + ' '.join('-' * 7 for _ in targets)
+          + f' {"-"*7} {"-"*7} {"-"*7} {"-"*6} {"-"*7} {"-"*7}')
 
     for name, data in sorted(results.items(), key=lambda x: x[1]['n']):
         v53 = v53_baseline.get(name, None) if v53_baseline else None
         delta = f'{data["min"] - v53:.2f}' if v53 is not None else 'N/A'
         v53_str = f'{v53:.2f}' if v53 is not None else 'N/A'
 
+        ttt = data.get('time_to_target_median', {})
+        auc = data.get('auc_median')
+        auc_str = f'{auc:.2f}' if auc is not None else 'N/A'
         print(f'{name:<14} {data["n"]:>7} {data["budget"]:>5}s '
-              f'{data["mean"]:>6.2f}% {data["min"]:>6.2f}% {data["std"]:>5.2f}% '
+              + ' '.join(f'{_fmt_time(ttt.get(k)):>7}' for k in targets)
+              + f' {auc_str:>7} {data["mean"]:>6.2f}% {data["min"]:>6.2f}% {data["std"]:>5.2f}% '
               f'{v53_str:>6} {delta:>7}')
 
 
@@ -200,6 +277,10 @@ def main():
                         help='Verbose solver output')
     parser.add_argument('--output', type=str, default=None,
                         help='Output JSON file')
+    parser.add_argument('--tours', type=str, default=None,
+                        help='Directory for best tours in TSPLIB .tour format')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Base seed: run r uses seed + r (default: unseeded)')
     args = parser.parse_args()
 
     if args.instances:
@@ -218,7 +299,7 @@ def main():
     checkpoint_path = out_path.replace('.json', '_checkpoint.json')
 
     results = run_benchmark(instances, args.budget, args.runs, args.verbose,
-                            checkpoint_path=checkpoint_path)
+                            checkpoint_path=checkpoint_path, tour_dir=args.tours, seed=args.seed)
 
     # v5.3 baseline (known best results)
     v53 = {
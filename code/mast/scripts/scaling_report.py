@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Scaling-отчёт solve_v5: время и память каждой фазы и под-шага при удвоении N.
+
+solve_v5 запускается на синтетических инстансах (src/core/synthetic) с
+фиксированной работой фаз (src/core/budget.WorkLimits: ILS-итерации листьев и
+polish, циклы V-cycle, поколения EAX; локальный поиск — до локального
+оптимума), n_workers=1 — листья в процессе, под-шаги видны профилю. Каждый
+N — отдельный процесс (fork после warmup_sparse), чтобы пики RSS не
+смешивались.
+
+Собирается:
+  фазы      — phases[*]['time'], память = пик RSS фазы − RSS на старте solve_v5;
+  под-шаги  — src.core.trace.step (find_boundary_cities, reassign декомпозиции,
+              meta-TSP, окна V-cycle, EAX crossover, ...): суммарное время и
+              максимальный прирост пика RSS за вызов.
+Стратегия закреплена: StrategyRouter решает один раз — по инстансу
+наибольшего N — и эта конфигурация (decompose, max_leaf_size, use_eax,
+use_sequential_lk, use_alpha) передаётся solve_v5(config=...) при всех N;
+иначе наклоны мерили бы смену конфигурации (EAX включается с N > 5000),
+а не рост стоимости. --leaf-size / --eax / --seq-lk / --alpha
+переопределяют решение роутера.
+Для каждой строки — наклон log-log регрессии (время ~ N^a, память ~ N^b) по
+точкам выше шумового порога (--min-time, --min-mb), нужно ≥ 3 точек.
+Показатель выше --threshold (1.2) → SUPERLINEAR; такие есть → код выхода 1.
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/scaling_report.py --kind uniform --sizes 5K,10K,20K,40K,80K
+  PYTHONPATH=. python3 scripts/scaling_report.py --kind clustered --min-n 10K --doublings 5 \\
+      --polish-kicks 100 --eax-generations 10 --output results/scaling_clustered.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.core import synthetic
+from src.core.budget import WorkLimits
+from src.core.distance_oracle import DistanceOracle
+from src.core.fingerprint import SolverConfig, StrategyRouter, compute_fingerprint
+from src.core.numba_sparse import warmup_sparse
+from src.core.trace import profile_steps
+from src.core.ultra_solver import solve_v5
+
+_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = _ROOT / 'results'
+
+THRESHOLD = 1.2
+MIN_POINTS = 3
+
+
+# ═══════════════════════════════════════════════════════════
+#  MEASUREMENT
+# ═══════════════════════════════════════════════════════════
+
+def pinned_config(kind: str, n: int, seed: int, budget: float, overrides: dict) -> SolverConfig:
+    """Решение StrategyRouter для инстанса размера n (+ overrides) — общее для всех N."""
+    oracle = DistanceOracle(synthetic.generate(kind, n, seed), knn_k=10)
+    oracle.build_knn()
+    config = StrategyRouter().route(compute_fingerprint(oracle), time_budget=budget)
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(config, name, value)
+    config.strategy_name += '+pinned'
+    return config
+
+
+def run_one(kind: str, n: int, seed: int, budget: float, limits: WorkLimits,
+            config: SolverConfig) -> dict:
+    """Один solve_v5 с профилем под-шагов → {'n', 'length', 'time_total', 'rows'}."""
+    coords = synthetic.generate(kind, n, seed)
+    with profile_steps() as prof:
+        result = solve_v5(coords, time_budget=budget, n_workers=1, verbose=False, limits=limits,
+                          config=config)
+    phases = result['phases']
+    memory = phases['memory']
+    rows = {}
+    for name, info in phases.items():
+        if not isinstance(info, dict) or 'time' not in info:
+            continue
+        peak = memory['phase_peak_rss_mb'].get(name)
+        rows[name] = {
+            'kind': 'phase',
+            'time': float(info['time']),
+            'mem_mb': peak - memory['start_rss_mb'] if peak is not None else None,
+        }
+    for name, info in prof.steps.items():
+        rows[name] = {
+            'kind': 'step',
+            'time': info['time'],
+            'calls': info['calls'],
+            'mem_mb': info['peak_mb'],
+        }
+    return {
+        'n': n,
+        'length': float(result['length']),
+        'time_total': float(result['time_total']),
+        'rows': rows,
+    }
+
+
+def fit_exponent(ns: list[int], values: list[Optional[float]], floor: float) -> Optional[float]:
+    """Наклон log(value) ~ log(N) по точкам value ≥ floor; < MIN_POINTS точек → None."""
+    points = [(n, v) for n, v in zip(ns, values) if v is not None and v >= floor]
+    if len(points) < MIN_POINTS:
+        return None
+    x = np.log([p[0] for p in points])
+    y = np.log([p[1] for p in points])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def build_report(runs: list[dict], threshold: float, min_time: float, min_mb: float) -> dict:
+    """Наклоны по всем фазам/под-шагам; flagged — показатель > threshold."""
+    ns = [run['n'] for run in runs]
+    names: dict[str, str] = {}
+    for run in runs:
+        for name, row in run['rows'].items():
+            names.setdefault(name, row['kind'])
+    fits = {}
+    flagged = []
+    for name, kind in names.items():
+        times = [run['rows'].get(name, {}).get('time') for run in runs]
+        mems = [run['rows'].get(name, {}).get('mem_mb') for run in runs]
+        time_exp = fit_exponent(ns, times, min_time)
+        mem_exp = fit_exponent(ns, mems, min_mb)
+        exceeded = [label for label, e in (('time', time_exp), ('memory', mem_exp))
+                    if e is not None and e > threshold]
+        fits[name] = {
+            'kind': kind,
+            'time': times,
+            'mem_mb': mems,
+            'time_exponent': time_exp,
+            'mem_exponent': mem_exp,
+            'superlinear': exceeded,
+        }
+        if exceeded:
+            flagged.append(name)
+    return {'sizes': ns, 'threshold': threshold, 'fits': fits, 'flagged': flagged}
+
+
+# ═══════════════════════════════════════════════════════════
+#  OUTPUT
+# ═══════════════════════════════════════════════════════════
+
+def _fmt(v, spec: str, width: int) -> str:
+    return format(v, spec).rjust(width) if v is not None else '-'.rjust(width)
+
+
+def print_report(report: dict) -> None:
+    ns = report['sizes']
+    print(f'\n{"Step":<26} {"kind":<5} ' + ' '.join(f'{n:>9}' for n in ns)
+          + f' {"t^a":>6} {"MB@max":>8} {"m^b":>6}')
+    order = sorted(report['fits'].items(),
+                   key=lambda item: (item[1]['kind'] != 'phase', -(item[1]['time'][-1] or 0.0)))
+    for name, fit in order:
+        cells = ' '.join(_fmt(t, '.3f', 9) for t in fit['time'])
+        flag = f'  SUPERLINEAR ({", ".join(fit["superlinear"])})' if fit['superlinear'] else ''
+        print(f'{name:<26} {fit["kind"]:<5} {cells} {_fmt(fit["time_exponent"], ".2f", 6)} '
+              f'{_fmt(fit["mem_mb"][-1], ".1f", 8)} {_fmt(fit["mem_exponent"], ".2f", 6)}{flag}')
+    if report['flagged']:
+        print(f'\nSUPERLINEAR (exponent > {report["threshold"]}): {", ".join(report["flagged"])}')
+    else:
+        print(f'\nNo step above N^{report["threshold"]}')
+
+
+def parse_sizes(text: str) -> list[int]:
+    sizes = []
+    for item in text.split(','):
+        spec = synthetic.parse_spec(f'uniform-{item}')
+        if spec is None:
+            raise SystemExit(f'bad size: {item!r} (expected e.g. 5000, 10K, 1M)')
+        sizes.append(spec[1])
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-phase complexity scaling report for solve_v5')
+    parser.add_argument('--kind', choices=synthetic.KINDS, default='uniform')
+    parser.add_argument('--sizes', type=str, default=None,
+                        help='Comma-separated N (K/M allowed); default: --min-n doubled --doublings times')
+    parser.add_argument('--min-n', type=str, default='5K')
+    parser.add_argument('--doublings', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=60.0,
+                        help='Nominal time budget passed to the strategy router only')
+    parser.add_argument('--leaf-kicks', type=int, default=WorkLimits.leaf_kicks)
+    parser.add_argument('--v-cycles', type=int, default=WorkLimits.v_cycles)
+    parser.add_argument('--polish-kicks', type=int, default=WorkLimits.polish_kicks)
+    parser.add_argument('--eax-generations', type=int, default=WorkLimits.eax_generations)
+    parser.add_argument('--leaf-size', type=int, default=None,
+                        help='Pinned max_leaf_size (default: router decision at the largest N)')
+    parser.add_argument('--eax', action=argparse.BooleanOptionalAction, default=None,
+                        help='Pin EAX in global polish on/off')
+    parser.add_argument('--seq-lk', action=argparse.BooleanOptionalAction, default=None,
+                        help='Pin sequential LK in global polish on/off')
+    parser.add_argument('--alpha', action=argparse.BooleanOptionalAction, default=None,
+                        help='Pin alpha-nearness candidate lists on/off')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--min-time', type=float, default=0.005,
+                        help='Seconds below which a point is timing noise (excluded from fit)')
+    parser.add_argument('--min-mb', type=float, default=1.0,
+                        help='MB below which a memory point is excluded from fit')
+    parser.add_argument('--output', type=str, default=None)
+    args = parser.parse_args()
+
+    if args.sizes:
+        sizes = parse_sizes(args.sizes)
+    else:
+        base = parse_sizes(args.min_n)[0]
+        sizes = [base * 2 ** i for i in range(args.doublings + 1)]
+    limits = WorkLimits(
+        leaf_kicks=args.leaf_kicks,
+        v_cycles=args.v_cycles,
+        polish_kicks=args.polish_kicks,
+        eax_generations=args.eax_generations,
+    )
+    config = pinned_config(args.kind, max(sizes), args.seed, args.budget, {
+        'max_leaf_size': args.leaf_size,
+        'use_eax': args.eax,
+        'use_sequential_lk': args.seq_lk,
+        'use_alpha': args.alpha,
+    })
+    print(f'Scaling report: kind={args.kind}, sizes={sizes}, limits={limits}')
+    print(f'Pinned config: {config.strategy_name}, decompose={config.use_decompose}, '
+          f'leaf={config.max_leaf_size}, eax={config.use_eax}, seq_lk={config.use_sequential_lk}, '
+          f'alpha={config.use_alpha}')
+
+    # Компиляция один раз; прогоны — fork-процессы с уже загруженными ядрами
+    warmup_sparse()
+    ctx = multiprocessing.get_context('fork')
+    runs = []
+    for n in sizes:
+        t0 = time.perf_counter()
+        with ctx.Pool(1) as pool:
+            run = pool.apply(run_one, (args.kind, n, args.seed, args.budget, limits, config))
+        runs.append(run)
+        print(f'  N={n:>9}: length={run["length"]:.0f}, solve={run["time_total"]:.1f}s '
+              f'(wall {time.perf_counter() - t0:.1f}s)')
+
+    report = build_report(runs, args.threshold, args.min_time, args.min_mb)
+    print_report(report)
+
+    out_path = Path(args.output) if args.output else RESULTS_DIR / f'scaling_{args.kind}.json'
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, 'w') as f:
+        json.dump({
+            'kind': args.kind,
+            'seed': args.seed,
+            'budget': args.budget,
+            'limits': asdict(limits),
+            'config': asdict(config),
+            'runs': runs,
+            **report,
+        }, f, indent=2)
+    print(f'Saved to {out_path}')
+    sys.exit(1 if report['flagged'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Локальный сервис задач solve_v5 (src.core.service) и клиент к нему.
+
+Сервер:
+  cd code/mast
+  PYTHONPATH=. python3 scripts/solver_service.py serve --unix /tmp/mast.sock --reserve 1
+  PYTHONPATH=. python3 scripts/solver_service.py serve --port 8765 --cores 8
+
+Клиент (тот же --unix / --port):
+  PYTHONPATH=. python3 scripts/solver_service.py submit --unix /tmp/mast.sock --n 5000 --budget 30 --wait
+  PYTHONPATH=. python3 scripts/solver_service.py submit --unix /tmp/mast.sock --instance pla85900 --priority 5 --cores 2
+  PYTHONPATH=. python3 scripts/solver_service.py status --unix /tmp/mast.sock [JOB]
+  PYTHONPATH=. python3 scripts/solver_service.py cancel --unix /tmp/mast.sock JOB
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.core.service import ServiceClient, run_service
+
+
+def make_client(args) -> ServiceClient:
+    return ServiceClient(host=args.host, port=args.port, unix_path=args.unix)
+
+
+def cmd_serve(args) -> None:
+    where = args.unix or f'{args.host}:{args.port}'
+    print(f'solver service on {where} (cores={args.cores or "all"}, reserve={args.reserve})')
+    run_service(
+        host=args.host, port=args.port, unix_path=args.unix,
+        total_cores=args.cores, reserve_cores=args.reserve, cache_size=args.cache,
+    )
+
+
+def cmd_submit(args) -> None:
+    if args.instance:
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from run_benchmark_v6 import load_instance
+        coords = load_instance(args.instance)
+    else:
+        coords = np.random.default_rng(args.seed).random((args.n, 2)) * 1e6
+    params = {'time_budget': args.budget}
+    if args.target_gap is not None:
+        params['target_gap'] = args.target_gap
+    client = make_client(args)
+    t0 = time.perf_counter()
+    job_id = client.submit(coords, priority=args.priority, cores=args.cores, **params)
+    print(f'submitted {job_id}: N={len(coords)}, priority={args.priority}, cores={args.cores}')
+    if not args.wait:
+        return
+    res = client.result(job_id, poll=1.0)
+    result = res.get('result') or {}
+    print(f'{job_id}: state={res["state"]}, length={result.get("length")}, '
+          f'oracle_cached={res["oracle_cached"]}, wall={time.perf_counter() - t0:.1f}s')
+
+
+def cmd_status(args) -> None:
+    client = make_client(args)
+    print(json.dumps(client.status(args.job) if args.job else
+                     {'service': client.status(), 'jobs': client.jobs()}, indent=1))
+
+
+def cmd_cancel(args) -> None:
+    print(json.dumps(make_client(args).cancel(args.job), indent=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local solve_v5 job service')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_endpoint(p):
+        p.add_argument('--unix', type=str, default=None, help='Unix socket path')
+        p.add_argument('--host', type=str, default='127.0.0.1')
+        p.add_argument('--port', type=int, default=8765)
+
+    p = sub.add_parser('serve', help='Запустить сервис')
+    add_endpoint(p)
+    p.add_argument('--cores', type=int, default=0, help='Ядер всего (0 = cpu_count)')
+    p.add_argument('--reserve', type=int, default=0, help='Ядер не отдавать задачам')
+    p.add_argument('--cache', type=int, default=8, help='Размер LRU-кэша oracle')
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser('submit', help='Поставить задачу')
+    add_endpoint(p)
+    p.add_argument('--n', type=int, default=5000, help='N для uniform random')
+    p.add_argument('--instance', type=str, default=None, help='TSPLIB инстанс')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--budget', type=float, default=30.0)
+    p.add_argument('--target-gap', type=float, default=None)
+    p.add_argument('--priority', type=int, default=0)
+    p.add_argument('--cores', type=int, default=1)
+    p.add_argument('--wait', action='store_true', help='Дождаться результата')
+    p.set_defaults(func=cmd_submit)
+
+    p = sub.add_parser('status', help='Состояние сервиса или задачи')
+    add_endpoint(p)
+    p.add_argument('job', nargs='?', default=None)
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser('cancel', help='Отменить задачу')
+    add_endpoint(p)
+    p.add_argument('job')
+    p.set_defaults(func=cmd_cancel)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+Anytime API для solve_v5: поток улучшающихся туров + кооперативная остановка.
+
+Два режима:
+- SolveControl (in-process): solve_v5(coords, control=SolveControl(callback=fn))
+  вызывает fn(SolveEvent) после каждой фазы и на улучшениях ILS/EAX.
+- AnytimeSolve (отдельный процесс): итератор событий + stop(), который сразу
+  (без ожидания numba-ядер, держащих GIL) возвращает лучший полученный тур.
+
+Остановка кооперативная: solve_v5 проверяет флаг между фазами, между листьями,
+окнами V-cycle, итерациями ILS и поколениями EAX, затем возвращает результат
+как обычно (result['stopped'] = True).
+
+Convergence — компактная кривая (t, лучшая длина, фаза), которую solve_v5
+пишет всегда (result['convergence']); time_to_target / primal_integral —
+anytime-метрики по ней для бенчмарков.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue as queue_mod
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+@dataclass
+class SolveEvent:
+    """Событие anytime-потока. tour — в id вызывающего (после reorder)."""
+    kind: str                  # 'phase' | 'improvement' | 'done'
+    phase: str                 # 'initial', 'stitching', 'v_cycle', 'ils', 'eax', ...
+    length: float
+    time: float                # секунды от старта solve_v5
+    tour: Optional[NDArray[np.int64]] = None
+
+
+class SolveControl:
+    """
+    Канал управления solve_v5: флаг остановки, лучший тур, callback событий.
+
+    report() хранит лучший тур всегда; callback для 'improvement' вызывается
+    не чаще min_interval (тур 100K городов = 800 KB на событие), отложенное
+    улучшение досылается при следующем should_stop(). 'phase'/'done' — всегда.
+
+    stop_event: threading.Event или multiprocessing Event (нужны set/is_set).
+    """
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[SolveEvent], None]] = None,
+        stop_event=None,
+        min_interval: float = 0.25,
+    ):
+        self.callback = callback
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.min_interval = min_interval
+        self.perm: Optional[NDArray[np.int64]] = None  # reorder: perm[new] = caller id
+        self.best_length = float('inf')
+        self._best_tour: Optional[NDArray[np.int64]] = None
+        self._best_phase = ''
+        self._t_start = time.perf_counter()
+        self._last_emit = -float('inf')
+        self._pending = False
+
+    def start(self) -> None:
+        """Отсчёт времени событий (вызывается в начале solve_v5)."""
+        self._t_start = time.perf_counter()
+
+    def stop(self) -> tuple[Optional[NDArray[np.int64]], float]:
+        """Запросить остановку. Возвращает текущий лучший (tour, length) сразу."""
+        self.stop_event.set()
+        return self.best()
+
+    def should_stop(self) -> bool:
+        """Флаг остановки; заодно досылает отложенное улучшение."""
+        if self._pending and time.perf_counter() - self._last_emit >= self.min_interval:
+            self._emit('improvement', self._best_phase, self.best_length)
+        return self.stop_event.is_set()
+
+    def best(self) -> tuple[Optional[NDArray[np.int64]], float]:
+        """Лучший тур (в id вызывающего) и его длина."""
+        return self._caller_tour(self._best_tour), self.best_length
+
+    def report(
+        self,
+        phase: str,
+        tour: NDArray[np.int64],
+        length: float,
+        kind: str = 'improvement',
+    ) -> None:
+        """Сообщить тур фазы. Лучший обновляется только при улучшении."""
+        length = float(length)
+        if length < self.best_length:
+            self._best_tour = np.array(tour, dtype=np.int64)
+            self.best_length = length
+            self._best_phase = phase
+            if kind == 'improvement':
+                self._pending = True
+        if kind != 'improvement':
+            self._emit(kind, phase, length, tour)
+        elif self._pending and time.perf_counter() - self._last_emit >= self.min_interval:
+            self._emit(kind, phase, self.best_length)
+
+    def _emit(
+        self,
+        kind: str,
+        phase: str,
+        length: float,
+        tour: Optional[NDArray[np.int64]] = None,
+    ) -> None:
+        self._last_emit = time.perf_counter()
+        if tour is None or length >= self.best_length:
+            tour, length = self._best_tour, self.best_length
+            self._pending = False
+        if self.callback is None:
+            return
+        self.callback(SolveEvent(
+            kind=kind,
+            phase=phase,
+            length=float(length),
+            time=self._last_emit - self._t_start,
+            tour=self._caller_tour(tour),
+        ))
+
+    def _caller_tour(self, tour: Optional[NDArray[np.int64]]) -> Optional[NDArray[np.int64]]:
+        if tour is None:
+            return None
+        tour = np.asarray(tour, dtype=np.int64)
+        return self.perm[tour] if self.perm is not None else tour.copy()
+
+
+# ═══════════════════════════════════════════════════════════
+#  CONVERGENCE CURVE
+# ═══════════════════════════════════════════════════════════
+
+class Convergence:
+    """
+    Кривая сходимости solve_v5: [t, лучшая длина, фаза] на каждом улучшении
+    (конец фазы с глобальным туром, ILS / EAX improvement).
+
+    Компактная: серия улучшений одной фазы, пока t - t_якоря < max(min_dt,
+    resolution · t), схлопывается в две точки — якорь (первое улучшение
+    серии) и последнее. Шаг по времени растёт с t, поэтому точек
+    O(log(T / min_dt) / resolution) на фазу, а не по точке на ILS kick;
+    кривая между якорем и хвостом чуть пессимистична (≤ resolution · t).
+    """
+
+    def __init__(self, t_start: Optional[float] = None, resolution: float = 0.02, min_dt: float = 0.01):
+        self.t_start = time.perf_counter() if t_start is None else t_start
+        self.resolution = resolution
+        self.min_dt = min_dt
+        self.points: list[list] = []
+
+    def record(self, phase: str, length: float) -> None:
+        """Тур фазы длины length; не улучшение — игнорируется."""
+        length = float(length)
+        points = self.points
+        if points and length >= points[-1][1]:
+            return
+        t = time.perf_counter() - self.t_start
+        point = [round(t, 4), length, phase]
+        if (len(points) >= 2 and points[-1][2] == phase and points[-2][2] == phase
+                and t - points[-2][0] < max(self.min_dt, self.resolution * t)):
+            points[-1] = point
+        else:
+            points.append(point)
+
+
+def _gap(length: float, reference: float) -> float:
+    return (length - reference) / reference
+
+
+def time_to_target(curve: list, reference: float, gap: float) -> Optional[float]:
+    """
+    Первое t кривой, где (length - reference) / reference ≤ gap (доля);
+    None — не достигнуто.
+    """
+    for t, length, _ in curve:
+        if _gap(length, reference) <= gap:
+            return float(t)
+    return None
+
+
+def primal_integral(curve: list, reference: float, horizon: float) -> float:
+    """
+    Площадь под кривой сходимости — средний primal gap на [0, horizon]:
+    (1 / horizon) ∫ γ(t) dt, γ(t) = (L(t) - ref) / max(L(t), ref) для лучшей
+    длины L(t), γ = 1 до первого тура (Berthold, primal integral). В [0, 1];
+    меньше — быстрее сходится. reference — оптимум или нижняя граница.
+    """
+    if horizon <= 0:
+        return 0.0
+    area = 0.0
+    t_prev, gamma = 0.0, 1.0
+    for t, length, _ in curve:
+        t = min(float(t), horizon)
+        area += gamma * (t - t_prev)
+        t_prev = t
+        gamma = max(0.0, length - reference) / max(length, reference)
+    area += gamma * (horizon - t_prev)
+    return area / horizon
+
+
+# ═══════════════════════════════════════════════════════════
+#  PROCESS-BASED STREAMING HANDLE
+# ═══════════════════════════════════════════════════════════
+
+def _stream_worker(coords, solve_kwargs, events, stop_event, min_interval) -> None:
+    """Дочерний процесс: solve_v5 с SolveControl, события → очередь."""
+    from src.core.ultra_solver import solve_v5
+
+    control = SolveControl(callback=events.put, stop_event=stop_event, min_interval=min_interval)
+    try:
+        result = solve_v5(coords, control=control, **solve_kwargs)
+        events.put(('result', result))
+    except BaseException:
+        events.put(('error', traceback.format_exc()))
+
+
+class AnytimeSolve:
+    """
+    solve_v5 в отдельном процессе с потоком SolveEvent.
+
+        run = AnytimeSolve(coords, time_budget=300)
+        for ev in run:                     # события до завершения
+            if ev.kind == 'phase' and ev.phase == 'stitching':
+                tour, length = run.stop()  # лучший тур — сразу
+        result = run.result()              # финальный dict solve_v5
+
+    stop() не ждёт решатель: numba-ядра держат GIL дочернего процесса, не
+    нашего. Возвращается лучший полученный тур (отстаёт от решателя не более
+    чем на min_interval); result() — точный лучший после кооперативного выхода.
+    """
+
+    def __init__(self, coords: NDArray[np.float64], min_interval: float = 0.25, **solve_kwargs):
+        solve_kwargs.setdefault('verbose', False)
+        ctx = multiprocessing.get_context('fork')
+        self._events = ctx.Queue()
+        self._stop_event = ctx.Event()
+        self._proc = ctx.Process(
+            target=_stream_worker,
+            args=(np.ascontiguousarray(coords, dtype=np.float64), solve_kwargs,
+                  self._events, self._stop_event, min_interval),
+        )
+        self._proc.start()
+        self.best_tour: Optional[NDArray[np.int64]] = None
+        self.best_length = float('inf')
+        self._result: Optional[dict] = None
+        self._error: Optional[str] = None
+        self._backlog: list[SolveEvent] = []
+
+    @property
+    def done(self) -> bool:
+        return self._result is not None or self._error is not None
+
+    def __iter__(self) -> Iterator[SolveEvent]:
+        while True:
+            if self._backlog:
+                yield self._backlog.pop(0)
+                continue
+            if self.done:
+                return
+            ev = self._receive(timeout=None)
+            if ev is not None:
+                yield ev
+
+    def stop(self) -> tuple[Optional[NDArray[np.int64]], float]:
+        """Остановить решатель; вернуть лучший полученный (tour, length) без ожидания."""
+        self._stop_event.set()
+        self._drain()
+        return self.best_tour, self.best_length
+
+    def cancel(self) -> None:
+        """Только флаг остановки, очередь не читается: безопасно из другого
+        потока, пока первый итерирует события."""
+        self._stop_event.set()
+
+    def result(self, timeout: Optional[float] = None) -> dict:
+        """Дождаться завершения solve_v5 и вернуть его result dict."""
+        t_end = None if timeout is None else time.perf_counter() + timeout
+        while not self.done:
+            left = None if t_end is None else max(0.0, t_end - time.perf_counter())
+            if left == 0.0:
+                raise TimeoutError('solve_v5 did not finish in time')
+            self._receive(timeout=left)
+        self._proc.join()
+        if self._error is not None:
+            raise RuntimeError(f'solve_v5 failed in worker:\n{self._error}')
+        return self._result
+
+    def close(self) -> None:
+        """Остановить и дождаться процесса (terminate, если не вышел за 5 с)."""
+        if self._proc.is_alive():
+            self._stop_event.set()
+            try:
+                self.result(timeout=5.0)
+            except TimeoutError:
+                self._proc.terminate()
+        self._proc.join()
+
+    def __enter__(self) -> 'AnytimeSolve':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _drain(self) -> None:
+        """Забрать всё, что уже в очереди (без блокировки)."""
+        while not self.done:
+            ev = self._receive(timeout=0.0)
+            if ev is None:
+                break
+            self._backlog.append(ev)
+
+    def _receive(self, timeout: Optional[float]) -> Optional[SolveEvent]:
+        """Одно сообщение из очереди; timeout=None — ждать, пока процесс жив."""
+        while True:
+            try:
+                if timeout == 0.0:
+                    item = self._events.get_nowait()
+                else:
+                    item = self._events.get(timeout=0.5 if timeout is None else timeout)
+                break
+            except queue_mod.Empty:
+                if not self._proc.is_alive() and self._events.empty():
+                    self._error = f'worker exited with code {self._proc.exitcode}'
+                    return None
+                if timeout is not None:
+                    return None
+        if isinstance(item, tuple):
+            tag, payload = item
+            if tag == 'result':
+                self._result = payload
+            else:
+                self._error = payload
+            return None
+        if item.length < self.best_length:
+            self.best_tour, self.best_length = item.tour, item.length
+        return item
+
+
+def solve_anytime(coords: NDArray[np.float64], **kwargs) -> AnytimeSolve:
+    """Запустить solve_v5 в фоне: AnytimeSolve(coords, **kwargs)."""
+    return AnytimeSolve(coords, **kwargs)
@@ -0,0 +1,108 @@
+"""
+Batch mode: много небольших инстансов (200-2000 городов) на тёплом пуле.
+
+solve() на каждый инстанс платит Python setup и warmup в своём процессе.
+solve_batch() вместо этого:
+- поднимает fork-пул один раз, jit_cache.ensure_warm() — в initializer
+  каждого воркера (кэшированные ядра грузятся один раз на процесс; при
+  свежем bundle небольшие инстансы идут через AOT-ядра без прогрева);
+- решает каждый инстанс coordinate-first пайплайном листа
+  (optimize_coords_small: k-NN → NN → 2-opt → Or-opt/3-opt → ILS),
+  крупные (N > large_n) — solve_v5 в воркере (n_workers=1);
+- раздаёт задачи в порядке LPT (крупные первыми) и отдаёт результаты по мере
+  готовности (imap_unordered).
+
+    for res in solve_batch(instances, budget_per_instance=0.5):
+        routes[res['index']] = res['tour']
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.core.jit_cache import ensure_warm
+from src.core.seeding import stream_seed
+from src.core.ultra_solver import optimize_coords_small, solve_v5
+
+
+def _init_worker() -> None:
+    """Initializer пула: прогрев JIT один раз на процесс (свежий bundle — без прогрева)."""
+    ensure_warm(lazy=True)
+
+
+def _solve_instance(args: tuple) -> dict:
+    """Worker: один инстанс → result dict (tour в id инстанса)."""
+    index, coords, budget, knn_k, large_n, seed = args
+    t_start = time.perf_counter()
+    n = len(coords)
+
+    if n > large_n:
+        res = solve_v5(coords, time_budget=budget, n_workers=1, knn_k=knn_k, verbose=False, seed=seed)
+        tour, length = res['tour'], float(res['length'])
+    else:
+        # setup (k-NN, конструкция, 2-opt) — из того же бюджета, остаток → ILS
+        tour, length = optimize_coords_small(coords, knn_k, budget, deadline=t_start + budget, seed=seed)
+        tour = tour.tolist()
+
+    return {
+        'index': index,
+        'tour': tour,
+        'length': length,
+        'n': n,
+        'time_total': time.perf_counter() - t_start,
+        'worker': os.getpid(),
+    }
+
+
+def solve_batch(
+    instances: Sequence[NDArray[np.float64]],
+    budget_per_instance: float = 1.0,
+    n_workers: int = 0,
+    knn_k: int = 10,
+    large_n: int = 5000,
+    seed: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Решить список инстансов, отдавая результаты по мере готовности.
+
+    Args:
+        instances: последовательность (N_i, 2) массивов координат
+        budget_per_instance: секунды на инстанс (с setup)
+        n_workers: процессы пула (0 = все ядра; 1 = в текущем процессе)
+        knn_k: ширина k-NN списков
+        large_n: выше — solve_v5 внутри воркера вместо пайплайна листа
+        seed: у инстанса i — поток stream_seed(seed, 'instance', i)
+            (src.core.seeding), не зависит от воркера и порядка задач
+
+    Yields:
+        dict: index (позиция в instances), tour, length, n, time_total, worker
+        — в порядке завершения, не в порядке instances.
+    """
+    if n_workers <= 0:
+        n_workers = os.cpu_count() or 1
+
+    # LPT: длинные задачи первыми → меньше хвост на последнем воркере
+    sizes = [len(c) for c in instances]
+    order = sorted(range(len(instances)), key=lambda i: -sizes[i])
+    tasks = [
+        (i, np.ascontiguousarray(instances[i], dtype=np.float64),
+         budget_per_instance, knn_k, large_n, stream_seed(seed, 'instance', i))
+        for i in order
+    ]
+
+    if n_workers == 1 or len(tasks) <= 1:
+        _init_worker()
+        for task in tasks:
+            yield _solve_instance(task)
+        return
+
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(min(n_workers, len(tasks)), initializer=_init_worker) as pool:
+        for res in pool.imap_unordered(_solve_instance, tasks, chunksize=1):
+            yield res
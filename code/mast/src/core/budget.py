@@ -0,0 +1,154 @@
+"""
+Бюджет времени: deadline для numba-ядер и ledger фаз solve_v5.
+
+run_sliced(kernel, *args, deadline=...) вызывает ядро с work-счётчиком
+(numba_sparse, WORK BUDGET) срезами по ~slice_seconds: первый срез короткий,
+дальше размер берётся из измеренной скорости (единиц/с, EMA по имени ядра на
+процесс). Прерванный проход продолжается со своего cursor, так что нарезка
+не теряет работу; после deadline ядро просто больше не вызывается —
+перерасход ограничен одним срезом, а не целым проходом на 100K городов.
+
+BudgetLedger — план/факт секунд по фазам → phases['budget_ledger'].
+
+WorkLimits — фиксированная работа по фазам вместо времени (solve_v5(limits=...),
+scaling-отчёт): время фаз тогда отражает стоимость работы при данном N, а не
+бюджет.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.core.numba_sparse import (
+    WORK_USED,
+    WORK_LIMIT,
+    WORK_CURSOR,
+    WORK_UNLIMITED,
+    kernel_stats,
+    new_work_jit,
+)
+
+# Бюджет solve_v5 при WorkLimits: дедлайны фаз не срабатывают (int() от долей — конечен)
+WORK_LIMITED_BUDGET = 1e9
+
+FIRST_SLICE_UNITS = 200_000   # ~1-5 ms на типичном ядре
+MIN_SLICE_UNITS = 10_000
+
+# units/s по имени ядра (калибровка живёт в процессе)
+_RATES: dict[str, float] = {}
+
+
+def run_sliced(
+    kernel: Callable,
+    *args,
+    deadline: Optional[float] = None,
+    slice_seconds: float = 0.05,
+) -> tuple[bool, NDArray[np.int64]]:
+    """
+    kernel(*args, work) срезами до естественного завершения или deadline
+    (time.perf_counter()). deadline=None — один вызов без ограничения.
+    При KERNEL_STATS после work передаётся kernel_stats() процесса.
+
+    Returns: (finished, work) — finished=False, если ядро прервано
+    дедлайном; work[WORK_MOVES] — число применённых ходов.
+    """
+    stats = kernel_stats()
+    if deadline is None:
+        work = new_work_jit(WORK_UNLIMITED)
+        _call(kernel, args, work, stats)
+        return True, work
+
+    work = new_work_jit(0)
+    name = getattr(kernel, '__name__', repr(kernel))
+    rate = _RATES.get(name, 0.0)
+    while True:
+        now = time.perf_counter()
+        left = deadline - now
+        if left <= 0.0:
+            return False, work
+        if rate > 0.0:
+            units = max(MIN_SLICE_UNITS, int(rate * min(slice_seconds, left)))
+        else:
+            units = FIRST_SLICE_UNITS
+        used_before = work[WORK_USED]
+        work[WORK_LIMIT] = used_before + units
+        _call(kernel, args, work, stats)
+        elapsed = time.perf_counter() - now
+        done = work[WORK_USED] - used_before
+        if elapsed > 0.0 and done > 0:
+            measured = done / elapsed
+            rate = measured if rate <= 0.0 else 0.5 * rate + 0.5 * measured
+            _RATES[name] = rate
+        if work[WORK_CURSOR] == 0:
+            return True, work
+
+
+def _call(kernel: Callable, args: tuple, work: NDArray[np.int64], stats) -> None:
+    # stats=None не передаётся: иначе numba компилирует лишнюю специализацию
+    if stats is None:
+        kernel(*args, work)
+    else:
+        kernel(*args, work, stats)
+
+
+@dataclass(frozen=True)
+class WorkLimits:
+    """
+    Фиксированная работа фаз solve_v5 (каждая фаза без дедлайна):
+
+    leaf_kicks       ILS-итераций (локальный kick + LK) на лист после 2-opt/Or-opt/3-opt;
+    v_cycles         циклов V-cycle (окна — все стыки и stress-рёбра);
+    polish_kicks     ILS-итераций global polish после локального поиска;
+    eax_generations  поколений EAX (N > 5000).
+
+    Локальный поиск (2-opt, Or-opt, 3-opt) идёт до локального оптимума —
+    его работа растёт с N сама.
+    """
+    leaf_kicks: int = 20
+    v_cycles: int = 1
+    polish_kicks: int = 50
+    eax_generations: int = 5
+
+
+class BudgetLedger:
+    """
+    План и факт секунд по фазам solve_v5.
+
+    plan(phase, seconds) — в момент, когда фазе выделен бюджет; actual
+    берётся из phases[phase]['time'] в close(). Фазы без плана (oracle,
+    warmup, stitching, ...) попадают в ledger только с фактом.
+    """
+
+    def __init__(self, time_budget: float):
+        self.time_budget = float(time_budget)
+        self.planned: dict[str, float] = {}
+
+    def plan(self, phase: str, seconds: float) -> None:
+        self.planned[phase] = max(0.0, float(seconds))
+
+    def close(self, phases: dict, total_time: float) -> dict:
+        """Сводка: по фазам planned/actual/overrun + общий перерасход."""
+        entries = {}
+        for phase, info in phases.items():
+            if not isinstance(info, dict) or 'time' not in info:
+                continue
+            actual = float(info['time'])
+            planned = self.planned.get(phase)
+            entries[phase] = {
+                'planned': planned,
+                'actual': actual,
+                'overrun': actual - planned if planned is not None else None,
+            }
+        for phase, planned in self.planned.items():
+            entries.setdefault(phase, {'planned': planned, 'actual': 0.0, 'overrun': -planned})
+        return {
+            'time_budget': self.time_budget,
+            'time_total': float(total_time),
+            'overrun': float(total_time) - self.time_budget,
+            'phases': entries,
+        }
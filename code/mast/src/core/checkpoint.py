@@ -0,0 +1,264 @@
+"""
+Checkpoint / resume для solve_v5.
+
+Каталог checkpoint_dir:
+  state.json           — версия, хэш координат, параметры, завершённые фазы,
+                         JSON-метаданные фаз (phases, config, stitch metrics)
+  oracle.npz           — k-NN (+ alpha_indices, perm при reorder)
+  decomposition.npz    — дерево декомпозиции (плоское, без туров)
+  leaf_optimization.npz — то же дерево с турами листьев
+  stitching.npz / v_cycle.npz / no_decompose.npz — тур после фазы
+  best.npz             — текущий лучший тур (обновляется и внутри polish)
+  population.npz       — популяция polish (ILS good_tours / EAX population)
+
+Каждый файл пишется во временный и атомарно переименовывается (os.replace),
+state.json — последним: фаза считается завершённой, только если её массивы
+уже на диске. Туры хранятся во внутренней нумерации (после reorder).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.core.hierarchy import HierNode
+
+CHECKPOINT_VERSION = 1
+STATE_FILE = 'state.json'
+
+
+def coords_hash(coords: NDArray[np.float64]) -> str:
+    """SHA-1 координат (float64, C-order) — идентичность инстанса."""
+    c = np.ascontiguousarray(coords, dtype=np.float64)
+    h = hashlib.sha1()
+    h.update(np.int64(c.shape[0]).tobytes())
+    h.update(c.tobytes())
+    return h.hexdigest()
+
+
+# ═══════════════════════════════════════════════════════════
+#  DECOMPOSITION TREE ↔ FLAT ARRAYS
+# ═══════════════════════════════════════════════════════════
+
+def flatten_tree(root: HierNode) -> dict[str, NDArray]:
+    """
+    Дерево → плоские массивы (preorder; parent[0] = -1).
+
+    cities узла k: cities[city_ptr[k]:city_ptr[k+1]], тур листа —
+    tours[tour_ptr[k]:tour_ptr[k+1]] (пустой, если тура нет).
+    """
+    nodes: list[HierNode] = []
+    parent: list[int] = []
+    stack = [(root, -1)]
+    while stack:
+        node, p = stack.pop()
+        parent.append(p)
+        idx = len(nodes)
+        nodes.append(node)
+        for child in reversed(node.children):
+            stack.append((child, idx))
+
+    sizes = np.array([node.n for node in nodes], dtype=np.int64)
+    tour_sizes = np.array(
+        [len(node.tour) if node.tour is not None else 0 for node in nodes], dtype=np.int64,
+    )
+    empty = np.empty(0, dtype=np.int64)
+    return {
+        'node_parent': np.array(parent, dtype=np.int64),
+        'node_level': np.array([node.level for node in nodes], dtype=np.int64),
+        'city_ptr': np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+        'cities': np.concatenate([np.asarray(node.cities, dtype=np.int64) for node in nodes]),
+        'tour_ptr': np.concatenate([[0], np.cumsum(tour_sizes)]).astype(np.int64),
+        'tours': np.concatenate(
+            [np.asarray(node.tour, dtype=np.int64) if node.tour is not None else empty
+             for node in nodes]
+        ),
+        'tour_lengths': np.array([node.tour_length for node in nodes], dtype=np.float64),
+    }
+
+
+def unflatten_tree(arrays: dict[str, NDArray]) -> HierNode:
+    """Обратно к HierNode (порядок детей и get_leaves() сохраняется)."""
+    parent = arrays['node_parent']
+    city_ptr = arrays['city_ptr']
+    tour_ptr = arrays['tour_ptr']
+    nodes: list[HierNode] = []
+    for k in range(len(parent)):
+        tour = None
+        if tour_ptr[k + 1] > tour_ptr[k]:
+            tour = arrays['tours'][tour_ptr[k]:tour_ptr[k + 1]].copy()
+        node = HierNode(
+            cities=arrays['cities'][city_ptr[k]:city_ptr[k + 1]].copy(),
+            level=int(arrays['node_level'][k]),
+            tour=tour,
+            tour_length=float(arrays['tour_lengths'][k]),
+        )
+        nodes.append(node)
+        if parent[k] >= 0:
+            nodes[parent[k]].children.append(node)
+    return nodes[0]
+
+
+# ═══════════════════════════════════════════════════════════
+#  STORE
+# ═══════════════════════════════════════════════════════════
+
+class CheckpointStore:
+    """
+    Атомарное хранилище состояния фаз solve_v5 в каталоге.
+
+    begin() — новый прогон (старое состояние сбрасывается), resume() —
+    продолжение: хэш координат и params должны совпасть, иначе ValueError.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.state: dict = {}
+
+    # ── lifecycle ──
+
+    def begin(self, coords: NDArray[np.float64], params: dict) -> None:
+        """Новый прогон: пустое состояние с хэшем координат и params."""
+        self.state = {
+            'version': CHECKPOINT_VERSION,
+            'coords_hash': coords_hash(coords),
+            'n': int(len(coords)),
+            'params': params,
+            'completed': [],
+            'info': {},
+            'best_length': None,
+            'time_used': 0.0,
+            'runs': 0,
+        }
+        for name in ('best', 'population'):
+            path = self._path(f'{name}.npz')
+            if os.path.exists(path):
+                os.remove(path)
+        self._write_state()
+
+    def resume(self, coords: NDArray[np.float64], params: dict) -> bool:
+        """
+        Загрузить состояние прогона. False (и begin()) — если состояния нет.
+        ValueError — другой инстанс, другие params или версия формата.
+        """
+        path = self._path(STATE_FILE)
+        if not os.path.exists(path):
+            self.begin(coords, params)
+            return False
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f'checkpoint version {state.get("version")} != {CHECKPOINT_VERSION}')
+        if state['coords_hash'] != coords_hash(coords):
+            raise ValueError(f'checkpoint in {self.directory} belongs to a different instance')
+        if state['params'] != params:
+            raise ValueError(f'checkpoint params {state["params"]} != {params}')
+        self.state = state
+        return True
+
+    def finish(self, elapsed: float) -> None:
+        """Учёт времени прогона (time_used накапливается между resume)."""
+        self.state['time_used'] += float(elapsed)
+        self.state['runs'] += 1
+        self._write_state()
+
+    # ── phases ──
+
+    def completed(self, phase: str) -> bool:
+        return phase in self.state.get('completed', [])
+
+    def info(self, phase: str) -> dict:
+        """JSON-метаданные завершённой фазы."""
+        return self.state['info'].get(phase, {})
+
+    def save_phase(
+        self,
+        phase: str,
+        arrays: Optional[dict[str, NDArray]] = None,
+        info: Optional[dict] = None,
+    ) -> None:
+        """Массивы фазы → {phase}.npz, затем отметка в state.json."""
+        if arrays:
+            self._write_npz(f'{phase}.npz', arrays)
+        self.state['info'][phase] = to_jsonable(info or {})
+        if phase not in self.state['completed']:
+            self.state['completed'].append(phase)
+        self._write_state()
+
+    def load_arrays(self, phase: str) -> dict[str, NDArray]:
+        with np.load(self._path(f'{phase}.npz')) as data:
+            return {key: data[key] for key in data.files}
+
+    # ── best tour / polish population ──
+
+    def save_best(
+        self,
+        tour: NDArray[np.int64],
+        length: float,
+        population: Optional[list[tuple[float, NDArray[np.int64]]]] = None,
+    ) -> None:
+        """Лучший тур (и популяция polish, если передана)."""
+        if population:
+            self._write_npz('population.npz', {
+                'lengths': np.array([l for l, _ in population], dtype=np.float64),
+                'tours': np.stack([np.asarray(t, dtype=np.int64) for _, t in population]),
+            })
+        best = self.state.get('best_length')
+        if best is not None and length >= best:
+            return
+        self._write_npz('best.npz', {'tour': np.asarray(tour, dtype=np.int64)})
+        self.state['best_length'] = float(length)
+        self._write_state()
+
+    def load_best(self) -> Optional[tuple[NDArray[np.int64], float]]:
+        if self.state.get('best_length') is None or not os.path.exists(self._path('best.npz')):
+            return None
+        return self.load_arrays('best')['tour'], float(self.state['best_length'])
+
+    def load_population(self) -> list[tuple[float, NDArray[np.int64]]]:
+        if not os.path.exists(self._path('population.npz')):
+            return []
+        data = self.load_arrays('population')
+        return [(float(l), t.copy()) for l, t in zip(data['lengths'], data['tours'])]
+
+    # ── atomic I/O ──
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write_npz(self, name: str, arrays: dict[str, NDArray]) -> None:
+        tmp = self._path(f'.{name}.{os.getpid()}.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(name))
+
+    def _write_state(self) -> None:
+        self.state['updated'] = time.time()
+        tmp = self._path(f'.{STATE_FILE}.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(STATE_FILE))
+
+
+def to_jsonable(obj):
+    """numpy-скаляры/массивы → Python для json.dump."""
+    if isinstance(obj, dict):
+        return {str(k): to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
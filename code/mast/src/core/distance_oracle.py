@@ -7,6 +7,10 @@ Distance Oracle — coordinate-first distance computation for Ultra-Scale TSP.
 - Sparse Laplacian из k-NN графа для спектрального анализа
 
 Память: ~230 MB для N=100K vs 80 GB с полной матрицей.
+
+graph=GraphMetric (src.core.graph_metric): k-NN — k самых дешёвых рёбер
+строки графа, metric (то, что получают numba-ядра) — сам граф; coords —
+координаты графа или None.
 """
 
 from __future__ import annotations
@@ -19,6 +23,9 @@ from scipy.sparse import csr_matrix, diags
 from scipy.sparse.csgraph import laplacian
 from scipy.spatial.distance import cdist
 
+from src.core.graph_metric import GraphMetric, graph_coords, metric_knn
+from src.core.numba_sparse import metric_n
+
 
 class DistanceOracle:
     """
@@ -31,18 +38,41 @@ class DistanceOracle:
     - 1-NN distance per city (для SOC stress)
     """
     
-    def __init__(self, coords: NDArray[np.float64], knn_k: int = 20):
-        self.coords = np.ascontiguousarray(coords, dtype=np.float64)
-        self.n = coords.shape[0]
+    def __init__(
+        self,
+        coords: Optional[NDArray[np.float64]],
+        knn_k: int = 20,
+        graph: Optional[GraphMetric] = None,
+    ):
+        if graph is not None:
+            # Метрика графа; coords (если есть) — только геометрия
+            self.coords = graph_coords(graph)
+            self.metric = graph
+            self.n = metric_n(graph)
+        else:
+            self.coords = np.ascontiguousarray(coords, dtype=np.float64)
+            self.metric = self.coords
+            self.n = coords.shape[0]
+        self.graph = graph
         self.knn_k = min(knn_k, self.n - 1)
         
         self.knn_indices: Optional[NDArray[np.int32]] = None
         self.knn_dists: Optional[NDArray[np.float64]] = None
         self.nn_dists: Optional[NDArray[np.float64]] = None  # 1-NN dist
+        # Dual candidate lists: alpha-ranked список рядом с distance-ranked knn
+        self.alpha_indices: Optional[NDArray[np.int32]] = None
+        # Сертифицированная нижняя граница Held-Karp (build_lower_bound)
+        self.lower_bound: Optional[float] = None
         self._tree: Optional[cKDTree] = None
         
     def build_knn(self):
         """Build k-NN graph using KDTree. O(N log N) build + O(Nk log N) query."""
+        if self.graph is not None:
+            # k самых дешёвых рёбер строки (короткие строки — хвост -1)
+            self.knn_indices, self.knn_dists = metric_knn(self.graph, self.knn_k)
+            self.knn_k = self.knn_indices.shape[1]
+            self.nn_dists = self.knn_dists[:, 0].copy()
+            return
         self._tree = cKDTree(self.coords)
         dists, indices = self._tree.query(self.coords, k=self.knn_k + 1)
         # Первый столбец = self (dist=0), пропускаем
@@ -52,12 +82,18 @@ class DistanceOracle:
         
     def dist(self, i: int, j: int) -> float:
         """Distance between two cities. O(1)."""
+        if self.graph is not None:
+            from src.core.numba_sparse import dist_jit
+            return float(dist_jit(self.graph, i, j))
         dx = self.coords[i, 0] - self.coords[j, 0]
         dy = self.coords[i, 1] - self.coords[j, 1]
         return float(np.sqrt(dx * dx + dy * dy))
     
     def tour_length(self, tour) -> float:
         """Tour length from coordinates. Vectorized O(N)."""
+        if self.graph is not None:
+            from src.core.numba_sparse import tour_length_coords_jit
+            return float(tour_length_coords_jit(np.asarray(tour, dtype=np.int64), self.graph))
         t = np.asarray(tour)
         c = self.coords[t]
         c_next = self.coords[np.roll(t, -1)]
@@ -164,8 +200,8 @@ class DistanceOracle:
 
         from src.core.numba_sparse import subgradient_alpha_jit, rerank_by_alpha_jit
 
-        alpha, pi = subgradient_alpha_jit(
-            self.n, self.knn_indices, self.knn_dists, self.coords, n_iters,
+        alpha, pi, _ = subgradient_alpha_jit(
+            self.n, self.knn_indices, self.knn_dists, self.metric, n_iters,
         )
 
         # Сохраняем alpha и pi для диагностики
@@ -187,34 +223,16 @@ class DistanceOracle:
 
         from src.core.numba_sparse import subgradient_alpha_jit, augment_knn_by_alpha_jit
 
-        alpha, pi = subgradient_alpha_jit(
-            self.n, self.knn_indices, self.knn_dists, self.coords, n_iters,
+        # MST parent возвращается субградиентом (финальный Prim на D_pi)
+        alpha, pi, mst_parent = subgradient_alpha_jit(
+            self.n, self.knn_indices, self.knn_dists, self.metric, n_iters,
         )
         self.alpha_values = alpha
         self.pi_values = pi
 
-        # Извлекаем MST parent из субградиентной оптимизации
-        from src.core.numba_sparse import sparse_kruskal_mst_jit
-        n = self.n
-        k = self.knn_k
-
-        # Строим edge list из k-NN + pi-weights для MST (vectorized)
-        row_idx = np.repeat(np.arange(n, dtype=np.int32), k)
-        col_idx = self.knn_indices.ravel().astype(np.int32)
-        valid = col_idx >= 0
-        edges_from = row_idx[valid]
-        edges_to = col_idx[valid]
-        edges_weight = (
-            self.knn_dists.ravel()[valid] + pi[edges_from] + pi[edges_to]
-        )
-
-        mst_parent, _, _, _ = sparse_kruskal_mst_jit(
-            n, edges_from, edges_to, edges_weight,
-        )
-
         # Расширяем k-NN
         new_indices, new_dists, new_k = augment_knn_by_alpha_jit(
-            self.knn_indices, self.knn_dists, alpha, self.coords,
+            self.knn_indices, self.knn_dists, alpha, self.metric,
             mst_parent, max_extra,
         )
 
@@ -222,6 +240,82 @@ class DistanceOracle:
         self.knn_dists = new_dists
         self.knn_k = new_k
 
+    def build_alpha_dual(self, n_iters: int = 50, alpha_k: int = 5) -> None:
+        """
+        Dual candidate lists: alpha-ranked список рядом с distance-ranked k-NN.
+
+        knn_indices/knn_dists НЕ меняются. alpha_indices[i] — alpha_k ближайших
+        по alpha-nearness кандидатов (из того же k-NN графа). LK-ядра *_dual_*
+        берут первый ход из alpha-списка, продолжение — из distance-списка,
+        поэтому alpha-кандидаты не вытесняют короткие рёбра.
+
+        alpha_indices остаётся валидным после build_knn() с другим k
+        (индексы городов, не позиции в списке).
+        """
+        if self.knn_indices is None:
+            self.build_knn()
+
+        from src.core.numba_sparse import subgradient_alpha_jit, rerank_by_alpha_jit
+
+        alpha, pi, _ = subgradient_alpha_jit(
+            self.n, self.knn_indices, self.knn_dists, self.metric, n_iters,
+        )
+        self.alpha_values = alpha
+        self.pi_values = pi
+
+        ranked_idx = self.knn_indices.copy()
+        ranked_dists = self.knn_dists.copy()
+        rerank_by_alpha_jit(ranked_idx, ranked_dists, alpha.copy())
+        alpha_k = min(alpha_k, ranked_idx.shape[1])
+        self.alpha_indices = np.ascontiguousarray(ranked_idx[:, :alpha_k])
+
+    def build_lower_bound(self, n_iters: int = 100) -> float:
+        """
+        Held-Karp нижняя граница длины тура: субградиент на 1-tree(k-NN ∪ hub star).
+
+        Валидна для полного евклидова графа (не только k-NN), поэтому
+        gap = (length - lower_bound) / lower_bound — гарантированная оценка
+        сверху на отклонение от оптимума. Требует точные k-NN списки
+        (build_knn), не build_alpha_augmented.
+        """
+        if self.knn_indices is None:
+            self.build_knn()
+
+        from src.core.numba_sparse import held_karp_bound_jit
+
+        lb, pi = held_karp_bound_jit(
+            self.n, self.knn_indices, self.knn_dists, n_iters,
+        )
+        self.lower_bound = float(lb)
+        self.lb_pi_values = pi
+        return self.lower_bound
+
+    def renumber(self, perm: NDArray[np.int64]) -> 'DistanceOracle':
+        """
+        Oracle в перенумерованном пространстве: новый город i = старый perm[i].
+
+        k-NN списки переносятся без нового KDTree-запроса (индексы
+        переотображаются через обратную перестановку). KDTree строится
+        лениво при следующем build_knn()/query_radius().
+        """
+        if self.graph is not None:
+            raise ValueError('renumber is not supported for graph metrics')
+        perm = np.asarray(perm, dtype=np.int64)
+        inv = np.empty_like(perm)
+        inv[perm] = np.arange(self.n, dtype=np.int64)
+
+        other = DistanceOracle(self.coords[perm], knn_k=self.knn_k)
+        if self.knn_indices is not None:
+            knn = self.knn_indices[perm]
+            other.knn_indices = np.where(knn >= 0, inv[knn], -1).astype(np.int32)
+            other.knn_dists = self.knn_dists[perm].copy()
+            other.nn_dists = self.nn_dists[perm].copy()
+        if self.alpha_indices is not None:
+            alpha = self.alpha_indices[perm]
+            other.alpha_indices = np.where(alpha >= 0, inv[alpha], -1).astype(np.int32)
+        other.lower_bound = self.lower_bound  # инвариантна к нумерации
+        return other
+
     def query_radius(self, i: int, radius: float) -> NDArray[np.int64]:
         """All cities within radius of city i. Uses KDTree."""
         if self._tree is None:
@@ -16,14 +16,18 @@ from __future__ import annotations
 
 import numpy as np
 from numpy.typing import NDArray
+from typing import Optional
 from numba import njit
 import time
 
 from src.core.numba_sparse import (
     tour_length_coords_jit, lk_opt_coords_jit,
     two_opt_nn_coords_jit, double_bridge_coords_jit,
-    or_opt_pass_coords_jit, dist_jit,
+    or_opt_pass_coords_jit, dist_jit, metric_n, STATS_KW,
 )
+from src.core.anytime import Convergence, SolveControl
+from src.core.checkpoint import CheckpointStore
+from src.core.trace import NULL_TRACER, step
 
 
 # ═══════════════════════════════════════════════════════════
@@ -91,12 +95,17 @@ def decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities):
     """
     AB-cycle decomposition через массивы.
 
-    Возвращает:
-        cycle_cities: int32[max_cycles, max_len] — города в каждом цикле
-        cycle_sources: int8[max_cycles, max_len] — источник ребра (0=A, 1=B)
-        cycle_lengths: int32[max_cycles] — длина каждого цикла
+    Возвращает (CSR, O(N) памяти вместо прежних буферов N x 2N):
+        cycle_ptr: int64[max_cycles + 1] — цикл ci занимает
+            [cycle_ptr[ci], cycle_ptr[ci + 1]) в плоских массивах
+        cycle_cities: int32[cap] — города циклов подряд
+        cycle_sources: int8[cap] — источник ребра (0=A, 1=B)
         n_cycles: int — количество найденных циклов
 
+    Каждое не-общее ребро попадает не более чем в одну трассу (рёбра
+    неудачной трассы тоже помечаются used, её записи перезаписываются),
+    плюс одна замыкающая запись на цикл: cap = 3N + 8 достаточно.
+
     Цикл хранится как последовательность городов:
         city[0] --(source[0])--> city[1] --(source[1])--> city[2] ...
         source[i] = тип ребра (city[i] → city[i+1])
@@ -104,10 +113,11 @@ def decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities):
     # Максимальные размеры буферов
     max_cycles = n_cities  # теоретический максимум N/2 циклов
     max_len = n_cities * 2  # длина одного цикла (безопасный запас)
+    cap = 3 * n_cities + 8
 
-    cycle_cities = np.zeros((max_cycles, max_len), dtype=np.int32)
-    cycle_sources = np.zeros((max_cycles, max_len), dtype=np.int8)
-    cycle_lengths = np.zeros(max_cycles, dtype=np.int32)
+    cycle_ptr = np.zeros(max_cycles + 1, dtype=np.int64)
+    cycle_cities = np.zeros(cap, dtype=np.int32)
+    cycle_sources = np.zeros(cap, dtype=np.int8)
     n_cycles = 0
 
     # Маска использованных рёбер: used[city, k, src]
@@ -135,11 +145,14 @@ def decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities):
             current_k = start_k
 
             success = False
+            base = cycle_ptr[n_cycles]
 
             for _safety in range(max_len):
+                if base + path_len + 1 >= cap:
+                    break
                 # Записываем текущее ребро
-                cycle_cities[n_cycles, path_len] = current
-                cycle_sources[n_cycles, path_len] = current_src
+                cycle_cities[base + path_len] = current
+                cycle_sources[base + path_len] = current_src
                 path_len += 1
 
                 # Помечаем ребро как использованное
@@ -175,8 +188,8 @@ def decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities):
                             continue
                         # Замыкание цикла?
                         if nb == start and path_len >= 3:
-                            cycle_cities[n_cycles, path_len] = current
-                            cycle_sources[n_cycles, path_len] = 0
+                            cycle_cities[base + path_len] = current
+                            cycle_sources[base + path_len] = 0
                             path_len += 1
                             # Помечаем замыкающее ребро
                             used_a[current, kk] = True
@@ -202,8 +215,8 @@ def decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities):
                         if nb < 0:
                             continue
                         if nb == start and path_len >= 3:
-                            cycle_cities[n_cycles, path_len] = current
-                            cycle_sources[n_cycles, path_len] = 1
+                            cycle_cities[base + path_len] = current
+                            cycle_sources[base + path_len] = 1
                             path_len += 1
                             used_b[current, kk] = True
                             for kkk in range(2):
@@ -224,7 +237,7 @@ def decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities):
                     break
 
             if success and path_len >= 4:
-                cycle_lengths[n_cycles] = path_len
+                cycle_ptr[n_cycles + 1] = base + path_len
                 n_cycles += 1
                 if n_cycles >= max_cycles:
                     break
@@ -232,7 +245,7 @@ def decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities):
         if n_cycles >= max_cycles:
             break
 
-    return cycle_cities, cycle_sources, cycle_lengths, n_cycles
+    return cycle_ptr, cycle_cities, cycle_sources, n_cycles
 
 
 @njit(cache=True)
@@ -607,10 +620,14 @@ def eax_crossover_jit(tour_a, tour_b, coords, nn_indices):
     4. Оцениваем gain каждого цикла
     5. Пробуем top-5 по gain: apply → reconnect
 
+    work-аргумента нет намеренно: это один непрерывный O(n) шаг без
+    промежуточного состояния (прерванный crossover не даёт ребёнка), а
+    eax_population_optimize проверяет бюджет между поколениями.
+
     Returns:
         child: int64[n_cities]. child[0]=-1 если неудача.
     """
-    n_cities = coords.shape[0]
+    n_cities = metric_n(coords)
 
     # 1. Adjacency
     adj_a = build_adjacency_jit(tour_a, n_cities)
@@ -620,7 +637,7 @@ def eax_crossover_jit(tour_a, tour_b, coords, nn_indices):
     common_a, common_b = find_common_edges_jit(adj_a, adj_b, n_cities)
 
     # 3. AB-cycles
-    cycle_cities, cycle_sources, cycle_lengths, n_cycles = \
+    cycle_ptr, cycle_cities, cycle_sources, n_cycles = \
         decompose_ab_cycles_jit(adj_a, adj_b, common_a, common_b, n_cities)
 
     if n_cycles == 0:
@@ -631,12 +648,13 @@ def eax_crossover_jit(tour_a, tour_b, coords, nn_indices):
     # 4. Оцениваем gain для каждого цикла
     gains = np.zeros(n_cycles, dtype=np.float64)
     for ci in range(n_cycles):
-        clen = cycle_lengths[ci]
+        p0 = cycle_ptr[ci]
+        clen = cycle_ptr[ci + 1] - p0
         gain = 0.0
         for i in range(clen - 1):
-            city = cycle_cities[ci, i]
-            next_city = cycle_cities[ci, i + 1]
-            src = cycle_sources[ci, i]
+            city = cycle_cities[p0 + i]
+            next_city = cycle_cities[p0 + i + 1]
+            src = cycle_sources[p0 + i]
             d = dist_jit(coords, city, next_city)
             if src == 0:
                 gain += d
@@ -660,15 +678,17 @@ def eax_crossover_jit(tour_a, tour_b, coords, nn_indices):
     # 6. Пробуем top-5 циклов
     for ti in range(top_k):
         ci = order[ti]
-        clen = cycle_lengths[ci]
+        p0 = cycle_ptr[ci]
+        p1 = cycle_ptr[ci + 1]
+        clen = p1 - p0
         if clen < 4:
             continue
 
         # Прямое применение (без reconnect)
         child = apply_cycle_jit(
             tour_a,
-            cycle_cities[ci],
-            cycle_sources[ci],
+            cycle_cities[p0:p1],
+            cycle_sources[p0:p1],
             clen,
             n_cities,
         )
@@ -678,8 +698,8 @@ def eax_crossover_jit(tour_a, tour_b, coords, nn_indices):
         # С reconnect
         child = apply_cycle_with_reconnect_jit(
             tour_a,
-            cycle_cities[ci],
-            cycle_sources[ci],
+            cycle_cities[p0:p1],
+            cycle_sources[p0:p1],
             clen,
             n_cities,
             coords,
@@ -1139,7 +1159,7 @@ def eax_crossover(
 
     # Fallback: Python implementation
     n = len(tour_a)
-    n_cities = coords.shape[0]
+    n_cities = metric_n(coords)
 
     cycles = decompose_ab_cycles(tour_a, tour_b, n_cities)
     if not cycles:
@@ -1194,6 +1214,13 @@ def eax_population_optimize(
     lk_iters: int = 30,
     lk_no_improve: int = 2,
     verbose: bool = False,
+    target_length: Optional[float] = None,
+    control: Optional[SolveControl] = None,
+    checkpoint: Optional[CheckpointStore] = None,
+    checkpoint_interval: float = 30.0,
+    tracer=NULL_TRACER,
+    rng: Optional[np.random.Generator] = None,
+    convergence: Optional[Convergence] = None,
 ) -> tuple[NDArray[np.int64], float]:
     """
     Population-based EAX optimization.
@@ -1207,12 +1234,21 @@ def eax_population_optimize(
         time_budget: бюджет времени (секунды)
         lk_iters: итерации LK для offspring
         lk_no_improve: early stop LK
+        target_length: досрочный выход, как только best_length ≤ target_length
+        control: anytime SolveControl — новые best → report('eax'), stop() → выход
+        checkpoint: CheckpointStore — best + популяция каждые checkpoint_interval с
+        tracer: span на поколение (src.core.trace)
+        rng: выбор родителей (tournament); None — из энтропии ОС. Double-bridge
+            мутации — из глобального np.random numba (seed_jit вызывающего)
+        convergence: новые best → кривая сходимости (src.core.anytime.Convergence)
 
     Returns:
         (best_tour, best_length)
     """
     t_start = time.perf_counter()
-    n_cities = coords.shape[0]
+    n_cities = metric_n(coords)
+    if rng is None:
+        rng = np.random.default_rng()
 
     # Инициализация популяции
     pop_tours: list[NDArray[np.int64]] = []
@@ -1228,7 +1264,7 @@ def eax_population_optimize(
     best_idx = int(np.argmin(pop_lengths))
     while len(pop_tours) < pop_size:
         p = double_bridge_coords_jit(pop_tours[best_idx])
-        lk_opt_coords_jit(p, coords, nn_indices, lk_iters, lk_no_improve)
+        lk_opt_coords_jit(p, coords, nn_indices, lk_iters, lk_no_improve, **STATS_KW)
         p_len = float(tour_length_coords_jit(p, coords))
         pop_tours.append(p)
         pop_lengths.append(p_len)
@@ -1238,19 +1274,29 @@ def eax_population_optimize(
     best_length = pop_lengths[best_idx]
 
     stagnant = 0
+    next_checkpoint = time.perf_counter() + checkpoint_interval
 
     for gen in range(max_generations):
+        if checkpoint is not None and time.perf_counter() >= next_checkpoint:
+            checkpoint.save_best(best_tour, best_length, list(zip(pop_lengths, pop_tours)))
+            next_checkpoint = time.perf_counter() + checkpoint_interval
         if time.perf_counter() - t_start > time_budget:
             break
+        if target_length is not None and best_length <= target_length:
+            break
+        if control is not None and control.should_stop():
+            break
 
+        t_gen = tracer.now()
         # Tournament selection (2 родителя)
-        idx_a, idx_b = _tournament_select(pop_lengths)
+        idx_a, idx_b = _tournament_select(pop_lengths, rng)
 
-        # EAX crossover
-        child = eax_crossover(
-            pop_tours[idx_a], pop_tours[idx_b],
-            coords, nn_indices,
-        )
+        # EAX crossover (буферы adjacency/циклов — пик памяти поколения)
+        with step('eax.crossover'):
+            child = eax_crossover(
+                pop_tours[idx_a], pop_tours[idx_b],
+                coords, nn_indices,
+            )
 
         if child is None:
             stagnant += 1
@@ -1258,17 +1304,18 @@ def eax_population_optimize(
                 # Diversity injection: double_bridge + LK
                 worst_idx = int(np.argmax(pop_lengths))
                 p = double_bridge_coords_jit(best_tour)
-                lk_opt_coords_jit(p, coords, nn_indices, lk_iters, lk_no_improve)
+                lk_opt_coords_jit(p, coords, nn_indices, lk_iters, lk_no_improve, **STATS_KW)
                 p_len = float(tour_length_coords_jit(p, coords))
                 pop_tours[worst_idx] = p
                 pop_lengths[worst_idx] = p_len
                 stagnant = 0
+            tracer.complete('eax_generation', 'eax', t_gen, gen=gen, child=False)
             continue
 
         # Sequential LK refinement offspring
-        lk_opt_coords_jit(child, coords, nn_indices, lk_iters, lk_no_improve)
+        lk_opt_coords_jit(child, coords, nn_indices, lk_iters, lk_no_improve, **STATS_KW)
         # Or-opt pass
-        or_opt_pass_coords_jit(child, coords, nn_indices)
+        or_opt_pass_coords_jit(child, coords, nn_indices, **STATS_KW)
         child_length = float(tour_length_coords_jit(child, coords))
 
         # Replacement: worst in population
@@ -1281,6 +1328,10 @@ def eax_population_optimize(
             if child_length < best_length:
                 best_tour = child.copy()
                 best_length = child_length
+                if convergence is not None:
+                    convergence.record('eax', best_length)
+                if control is not None:
+                    control.report('eax', best_tour, best_length)
                 if verbose:
                     print(f'  EAX gen {gen}: new best = {best_length:.0f}')
         else:
@@ -1290,22 +1341,26 @@ def eax_population_optimize(
         if stagnant >= 5:
             worst_idx = int(np.argmax(pop_lengths))
             p = double_bridge_coords_jit(best_tour)
-            lk_opt_coords_jit(p, coords, nn_indices, lk_iters, lk_no_improve)
+            lk_opt_coords_jit(p, coords, nn_indices, lk_iters, lk_no_improve, **STATS_KW)
             p_len = float(tour_length_coords_jit(p, coords))
             pop_tours[worst_idx] = p
             pop_lengths[worst_idx] = p_len
             stagnant = 0
+        tracer.complete('eax_generation', 'eax', t_gen, gen=gen, child=True,
+                        child_length=child_length, best_length=best_length)
 
+    if checkpoint is not None:
+        checkpoint.save_best(best_tour, best_length, list(zip(pop_lengths, pop_tours)))
     return best_tour, best_length
 
 
 def _tournament_select(
     lengths: list[float],
+    rng: np.random.Generator,
     tournament_size: int = 3,
 ) -> tuple[int, int]:
     """Tournament selection: выбираем двух разных родителей."""
     n = len(lengths)
-    rng = np.random.default_rng()
 
     def _pick() -> int:
         candidates = rng.choice(n, size=min(tournament_size, n), replace=False)
@@ -75,6 +75,7 @@ class SolverConfig:
 
     # Global polish (whatever remains)
     polish_budget_fraction: float = 0.35  # не используется напрямую, остаток
+    use_eax: bool = True  # Phase B polish: EAX по популяции ILS-туров
 
     # Описание для логов
     strategy_name: str = "default"
@@ -95,13 +96,18 @@ def compute_fingerprint(oracle: DistanceOracle, fast: bool = True) -> InstanceFi
     mean_nn = float(np.mean(nn_dists))
     cv_nn_dist = float(np.std(nn_dists) / (mean_nn + 1e-12))
 
-    # aspect_ratio — bounding box (O(N), быстро)
-    x_range = float(coords[:, 0].max() - coords[:, 0].min())
-    y_range = float(coords[:, 1].max() - coords[:, 1].min())
-    aspect_ratio = max(x_range, y_range) / (min(x_range, y_range) + 1e-12)
+    if coords is not None:
+        # aspect_ratio — bounding box (O(N), быстро)
+        x_range = float(coords[:, 0].max() - coords[:, 0].min())
+        y_range = float(coords[:, 1].max() - coords[:, 1].min())
+        aspect_ratio = max(x_range, y_range) / (min(x_range, y_range) + 1e-12)
 
-    # density_cv — CV локальной плотности по 4×4 сетке (O(N), быстро)
-    density_cv = _compute_density_cv(coords, grid_size=4)
+        # density_cv — CV локальной плотности по 4×4 сетке (O(N), быстро)
+        density_cv = _compute_density_cv(coords, grid_size=4)
+    else:
+        # Граф без координат (graph_metric): геометрии нет — нейтральные значения
+        aspect_ratio = 1.0
+        density_cv = 0.0
 
     # spectral_gap и modularity — дорогие, пропускаем в fast mode
     if fast:
@@ -271,7 +277,9 @@ class StrategyRouter:
 
         # === Rule 2: Alpha-nearness ===
         # v6.5: augment approach tested — MST edges already in k-NN (0% new edges).
-        # Real alpha benefit requires dual-candidate-list LK (architectural change).
+        # v6.7: dual-candidate-list LK есть (oracle.build_alpha_dual + *_dual_* ядра),
+        # use_alpha=True включает его в global polish. На 5K ILS-тестах выигрыш
+        # в пределах шума → по умолчанию OFF до полного бенчмарка.
         config.use_alpha = False
 
         # === Rule 3: Sequential LK ===
@@ -282,7 +290,11 @@ class StrategyRouter:
         else:
             config.use_sequential_lk = False
 
-        # === Rule 4: N-scale adjustments ===
+        # === Rule 4: EAX в global polish ===
+        # N ≤ 5K: чистый ILS (EAX Python overhead слишком велик для малых N)
+        config.use_eax = fp.n > 5000
+
+        # === Rule 5: N-scale adjustments ===
         if fp.n > 30000:
             # Ultra-scale: больше бюджета на polish (EAX dominant)
             config.polish_budget_fraction = max(config.polish_budget_fraction, 0.55)
@@ -298,6 +310,7 @@ class StrategyRouter:
             f"Decompose: {'ON' if config.use_decompose else 'OFF'} ({'spectral' if config.use_spectral_decompose else 'spatial'}, leaf={config.max_leaf_size})",
             f"Alpha: {'ON' if config.use_alpha else 'OFF'} (iters={config.alpha_iters})",
             f"SeqLK: {'ON' if config.use_sequential_lk else 'OFF'} (depth={config.lk_max_depth})",
+            f"EAX: {'ON' if config.use_eax else 'OFF'}",
             f"Budget split: leaf={config.leaf_budget_fraction:.0%}, "
             f"vcycle={config.v_cycle_budget_fraction:.0%}, "
             f"polish={config.polish_budget_fraction:.0%}",
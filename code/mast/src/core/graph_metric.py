@@ -0,0 +1,210 @@
+"""
+Sparse-metric режим: дорожный граф вместо евклидовых координат.
+
+Вызывающий передаёт CSR рёбер-кандидатов с весами (например, k ближайших
+по дороге остановок на каждую, посчитанных маршрутизатором), плюс
+опционально координаты — только для декомпозиции/stitching и для оценки
+рёбер вне графа. graph_metric() приводит граф к виду, который читают
+numba-ядра (numba_sparse.GraphMetric):
+- симметризация (i→j и j→i → min веса), без петель;
+- строки CSR отсортированы по соседу (бинарный поиск в graph_dist_jit);
+- fallback для рёбер вне графа: detour * евклидово расстояние (detour —
+  95-й перцентиль cost/euclid по рёбрам графа), без координат —
+  missing_cost (по умолчанию 10 × максимальный вес: такие рёбра LK
+  убирает первыми).
+
+Память — O(nnz) вместо N×N: 50K остановок × 16 соседей ≈ 20 MB против
+20 GB плотной матрицы.
+
+    metric = graph_metric(indptr, indices, costs, coords=xy)
+    res = solve_v5(graph=metric, time_budget=60)
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.core.numba_sparse import GraphMetric, metric_n
+
+DETOUR_PERCENTILE = 95.0
+MISSING_COST_FACTOR = 10.0
+
+
+def graph_metric(
+    indptr,
+    indices,
+    costs,
+    coords: Optional[NDArray[np.float64]] = None,
+    detour: Optional[float] = None,
+    missing_cost: Optional[float] = None,
+    symmetrize: bool = True,
+) -> GraphMetric:
+    """
+    Собрать GraphMetric из CSR (indptr[N+1], indices[nnz], costs[nnz]).
+
+    Args:
+        coords: (N, 2) координаты — декомпозиция + fallback-оценка
+        detour: множитель евклидова расстояния для рёбер вне графа
+            (None — 95-й перцентиль cost/euclid по рёбрам графа)
+        missing_cost: вес ребра вне графа без координат
+            (None — 10 × максимальный вес)
+        symmetrize: добавить обратные рёбра (min из двух направлений);
+            False — граф уже симметричен и отсортирован
+
+    Raises:
+        ValueError: некорректный CSR, отрицательные/нечисловые веса,
+            изолированный город.
+    """
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    costs = np.asarray(costs, dtype=np.float64)
+    n = len(indptr) - 1
+    if n < 1 or indptr[0] != 0 or np.any(np.diff(indptr) < 0) or indptr[-1] != len(indices):
+        raise ValueError('invalid CSR indptr')
+    if len(costs) != len(indices):
+        raise ValueError(f'costs has {len(costs)} entries, indices has {len(indices)}')
+    if len(indices) and (indices.min() < 0 or indices.max() >= n):
+        raise ValueError(f'edge endpoint out of range [0, {n})')
+    if not np.all(np.isfinite(costs)) or np.any(costs < 0):
+        raise ValueError('edge costs must be finite and non-negative')
+
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+    cols = indices
+    if symmetrize:
+        rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+        costs = np.concatenate([costs, costs])
+    keep = rows != cols
+    rows, cols, costs = rows[keep], cols[keep], costs[keep]
+
+    # Сортировка (row, col, cost); дубликаты ребра → минимальный вес
+    order = np.lexsort((costs, cols, rows))
+    rows, cols, costs = rows[order], cols[order], costs[order]
+    if len(rows):
+        first = np.ones(len(rows), dtype=np.bool_)
+        first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        rows, cols, costs = rows[first], cols[first], costs[first]
+
+    degree = np.bincount(rows, minlength=n)
+    if np.any(degree == 0):
+        raise ValueError(f'{int(np.sum(degree == 0))} cities have no edges '
+                         f'(first: {int(np.argmax(degree == 0))})')
+    new_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degree, out=new_indptr[1:])
+
+    if coords is not None:
+        coords = np.ascontiguousarray(coords, dtype=np.float64)
+        if coords.shape != (n, 2):
+            raise ValueError(f'coords shape {coords.shape} != ({n}, 2)')
+        if detour is None:
+            euclid = np.sqrt(((coords[rows] - coords[cols]) ** 2).sum(axis=1))
+            ok = euclid > 0
+            ratio = costs[ok] / euclid[ok]
+            detour = max(1.0, float(np.percentile(ratio, DETOUR_PERCENTILE))) if len(ratio) else 1.0
+    else:
+        coords = np.empty((0, 2), dtype=np.float64)
+    if detour is None:
+        detour = 1.0
+    if missing_cost is None:
+        missing_cost = MISSING_COST_FACTOR * float(costs.max()) if len(costs) else 1.0
+
+    return GraphMetric(
+        indptr=new_indptr,
+        indices=cols.astype(np.int32),
+        costs=np.ascontiguousarray(costs),
+        coords=coords,
+        fallback=np.array([detour, missing_cost], dtype=np.float64),
+    )
+
+
+def is_graph(metric) -> bool:
+    """True для GraphMetric, False для массива координат."""
+    return isinstance(metric, GraphMetric)
+
+
+def graph_coords(metric) -> Optional[NDArray[np.float64]]:
+    """Координаты метрики (для декомпозиции); None у графа без координат."""
+    if isinstance(metric, GraphMetric):
+        return metric.coords if len(metric.coords) else None
+    return metric
+
+
+def metric_take(metric, cities) -> 'NDArray[np.float64] | GraphMetric':
+    """
+    Подынстанс на cities (локальные id 0..len(cities)-1 в порядке cities):
+    для координат — coords[cities], для графа — индуцированный подграф
+    (рёбра наружу отбрасываются, fallback тот же). O(сумма степеней).
+    """
+    cities = np.asarray(cities, dtype=np.int64)
+    if not isinstance(metric, GraphMetric):
+        return metric[cities]
+
+    n = metric_n(metric)
+    m = len(cities)
+    g2l = np.full(n, -1, dtype=np.int64)
+    g2l[cities] = np.arange(m, dtype=np.int64)
+
+    starts = metric.indptr[cities]
+    counts = metric.indptr[cities + 1] - starts
+    total = int(counts.sum())
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    edge = offsets + np.arange(total, dtype=np.int64)
+    rows = np.repeat(np.arange(m, dtype=np.int64), counts)
+    cols = g2l[metric.indices[edge]]
+    keep = cols >= 0
+    rows, cols, costs = rows[keep], cols[keep], metric.costs[edge[keep]]
+
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=m), out=indptr[1:])
+    return GraphMetric(
+        indptr=indptr,
+        indices=cols[order].astype(np.int32),
+        costs=np.ascontiguousarray(costs[order]),
+        coords=metric.coords[cities] if len(metric.coords) else metric.coords,
+        fallback=metric.fallback,
+    )
+
+
+def metric_knn(metric, k: int) -> tuple[NDArray[np.int32], NDArray[np.float64]]:
+    """
+    k ближайших соседей: cKDTree по координатам или k самых дешёвых рёбер
+    строки графа. Строки короче k дополняются -1 / inf (ядра обрывают
+    перебор кандидатов на -1).
+    """
+    if not isinstance(metric, GraphMetric):
+        from scipy.spatial import cKDTree
+        k = min(k, len(metric) - 1)
+        d, idx = cKDTree(metric).query(metric, k=k + 1)
+        return (np.ascontiguousarray(idx[:, 1:], dtype=np.int32),
+                np.ascontiguousarray(d[:, 1:], dtype=np.float64))
+
+    n = metric_n(metric)
+    degree = np.diff(metric.indptr)
+    k = max(1, min(k, int(degree.max()) if n else 1))
+    rows = np.repeat(np.arange(n, dtype=np.int64), degree)
+    order = np.lexsort((metric.costs, rows))
+    pos = np.arange(len(rows), dtype=np.int64) - metric.indptr[rows]
+    sel = pos < k
+    knn_idx = np.full((n, k), -1, dtype=np.int32)
+    knn_d = np.full((n, k), np.inf, dtype=np.float64)
+    knn_idx[rows[sel], pos[sel]] = metric.indices[order][sel]
+    knn_d[rows[sel], pos[sel]] = metric.costs[order][sel]
+    return knn_idx, knn_d
+
+
+def missing_edges(tour, metric) -> int:
+    """Число рёбер тура вне графа (оценены fallback-ом); 0 для координат."""
+    if not isinstance(metric, GraphMetric):
+        return 0
+    tour = np.asarray(tour, dtype=np.int64)
+    nxt = np.roll(tour, -1)
+    count = 0
+    for a, b in zip(tour.tolist(), nxt.tolist()):
+        row = metric.indices[metric.indptr[a]:metric.indptr[a + 1]]
+        i = int(np.searchsorted(row, b))
+        if i >= len(row) or row[i] != b:
+            count += 1
+    return count
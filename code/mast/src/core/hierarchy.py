@@ -28,12 +28,15 @@ import warnings
 warnings.filterwarnings('ignore', message='.*Exited.*', category=UserWarning)
 
 from src.core.distance_oracle import DistanceOracle
+from src.core.graph_metric import metric_take, metric_knn
+from src.core.anytime import SolveControl
+from src.core.trace import NULL_TRACER, step
 from src.core.numba_sparse import (
     tour_length_coords_jit, nn_tour_coords_jit,
     two_opt_nn_coords_jit, three_opt_full_pass_coords_jit,
     or_opt_pass_coords_jit, dist_jit,
     lk_opt_coords_jit, double_bridge_coords_jit,
-    remap_knn_to_local_jit,
+    remap_knn_to_local_jit, metric_n, STATS_KW,
 )
 
 # V-cycle адаптивные константы
@@ -180,7 +183,7 @@ def _spectral_partition(
     except Exception:
         # Fallback: случайная partition
         idx = np.arange(n)
-        np.random.shuffle(idx)
+        np.random.RandomState(42).shuffle(idx)
         chunk = n // n_parts
         parts = []
         for p in range(n_parts):
@@ -382,20 +385,21 @@ def _decompose_recursive(
     # Fallback на spatial при n > 15000 (spectral слишком дорого).
     use_spatial = not use_spectral or (n > 15000)
 
-    if use_spatial:
-        # Quad для больших, bisect для средних
-        n_parts = 4 if n > 4 * max_leaf_size else 2
-        parts = _spatial_partition(coords, cities, n_parts=n_parts)
-    else:
-        # Определяем branching factor
-        n_parts = _choose_branching(coords, cities, knn_k, gap_threshold)
-        # Спектральная партиция
-        parts = _spectral_partition(coords, cities, n_parts=n_parts, knn_k=knn_k)
+    with step('decompose.partition'):
+        if use_spatial:
+            # Quad для больших, bisect для средних
+            n_parts = 4 if n > 4 * max_leaf_size else 2
+            parts = _spatial_partition(coords, cities, n_parts=n_parts)
+        else:
+            # Определяем branching factor
+            n_parts = _choose_branching(coords, cities, knn_k, gap_threshold)
+            # Спектральная партиция
+            parts = _spectral_partition(coords, cities, n_parts=n_parts, knn_k=knn_k)
 
-        # Проверка на вырожденность: макс. часть > 80% → fallback на spatial
-        max_part = max(len(p) for p in parts)
-        if max_part > 0.8 * n:
-            parts = _spatial_partition(coords, cities, n_parts=2)
+            # Проверка на вырожденность: макс. часть > 80% → fallback на spatial
+            max_part = max(len(p) for p in parts)
+            if max_part > 0.8 * n:
+                parts = _spatial_partition(coords, cities, n_parts=2)
 
     # Проверка: все части достаточного размера?
     valid_parts = []
@@ -408,13 +412,14 @@ def _decompose_recursive(
 
     # Перераспределяем маленькие кусочки
     if small_remainder and valid_parts:
-        remainder = np.array(small_remainder, dtype=np.int64)
-        # Ближайший к центроиду каждой valid part
-        centroids = np.array([coords[p].mean(axis=0) for p in valid_parts])
-        for city in remainder:
-            dists = np.sum((centroids - coords[city]) ** 2, axis=1)
-            best = np.argmin(dists)
-            valid_parts[best] = np.append(valid_parts[best], city)
+        with step('decompose.reassign'):
+            remainder = np.array(small_remainder, dtype=np.int64)
+            # Ближайший к центроиду каждой valid part
+            centroids = np.array([coords[p].mean(axis=0) for p in valid_parts])
+            for city in remainder:
+                dists = np.sum((centroids - coords[city]) ** 2, axis=1)
+                best = np.argmin(dists)
+                valid_parts[best] = np.append(valid_parts[best], city)
 
     if len(valid_parts) <= 1:
         # Не удалось разбить — лист
@@ -611,38 +616,41 @@ def stitch_leaf_tours(
             leaf.tour = leaf.cities.copy()
 
     # Шаг 1: Находим порядок обхода кластеров (meta-TSP)
-    centroids = np.array([coords[leaf.cities].mean(axis=0) for leaf in leaves])
-    cluster_order = _greedy_cluster_order(centroids)
+    with step('stitch.meta_tsp'):
+        centroids = np.array([coords[leaf.cities].mean(axis=0) for leaf in leaves])
+        cluster_order = _greedy_cluster_order(centroids)
 
     # Шаг 2: Определяем entry/exit точки для каждого кластера
     # Для каждой пары соседних кластеров: ищем ближайшую пару городов
-    global_tour_parts = []
+    with step('stitch.entry_exit'):
+        global_tour_parts = []
 
-    for ci in range(n_leaves):
-        leaf_curr = leaves[cluster_order[ci]]
-        leaf_next = leaves[cluster_order[(ci + 1) % n_leaves]]
+        for ci in range(n_leaves):
+            leaf_curr = leaves[cluster_order[ci]]
+            leaf_next = leaves[cluster_order[(ci + 1) % n_leaves]]
 
-        tour_curr = leaf_curr.tour
-        cities_next = leaf_next.cities
+            tour_curr = leaf_curr.tour
+            cities_next = leaf_next.cities
 
-        # Ближайший город из curr к next
-        tree_next = cKDTree(coords[cities_next])
-        coords_curr_boundary = coords[tour_curr]
-        dists, _ = tree_next.query(coords_curr_boundary, k=1)
-        exit_local_idx = int(np.argmin(dists))
+            # Ближайший город из curr к next
+            tree_next = cKDTree(coords[cities_next])
+            coords_curr_boundary = coords[tour_curr]
+            dists, _ = tree_next.query(coords_curr_boundary, k=1)
+            exit_local_idx = int(np.argmin(dists))
 
-        # Ротируем тур так, чтобы exit_point был последним
-        # (или entry предыдущего — первым)
-        rotated = np.roll(tour_curr, -(exit_local_idx + 1))
-        global_tour_parts.append(rotated)
+            # Ротируем тур так, чтобы exit_point был последним
+            # (или entry предыдущего — первым)
+            rotated = np.roll(tour_curr, -(exit_local_idx + 1))
+            global_tour_parts.append(rotated)
 
     # Собираем глобальный тур
     global_tour = np.concatenate(global_tour_parts)
 
     # Шаг 3: Boundary polish
-    global_tour = _boundary_polish(
-        global_tour, coords, oracle, leaves, cluster_order,
-    )
+    with step('stitch.boundary_polish'):
+        global_tour = _boundary_polish(
+            global_tour, coords, oracle, leaves, cluster_order,
+        )
 
     return global_tour
 
@@ -749,7 +757,8 @@ def stitch_leaf_tours_v2(
                 cluster_dist[j, i] = unique_pairs[0][2]
 
     # ─── Шаг 2: Meta-TSP на кластерах (NN-greedy + 2-opt improve) ───
-    cluster_order = _meta_tsp_solve(cluster_dist, n_leaves)
+    with step('stitch.meta_tsp'):
+        cluster_order = _meta_tsp_solve(cluster_dist, n_leaves)
 
     # ─── Шаг 3: Для каждого перехода выбираем лучшую entry/exit пару ───
     # entry[i] = город в кластере cluster_order[i], через который входим
@@ -1152,17 +1161,17 @@ def _boundary_polish_v2(
             )
 
             # 2-opt (thorough — больше итераций)
-            two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 20, 5)
+            two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 20, 5, **STATS_KW)
 
             # Or-opt pass
-            or_opt_pass_coords_jit(local_tour, local_coords, local_nn)
+            or_opt_pass_coords_jit(local_tour, local_coords, local_nn, **STATS_KW)
 
             # 3-opt pass (если окно не слишком большое)
             if seg_len <= 500:
-                three_opt_full_pass_coords_jit(local_tour, local_coords, local_nn)
+                three_opt_full_pass_coords_jit(local_tour, local_coords, local_nn, **STATS_KW)
 
             # Ещё один 2-opt после or-opt/3-opt
-            two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 10, 3)
+            two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 10, 3, **STATS_KW)
 
             # Mapping back
             improved_sub = np.array(
@@ -1266,7 +1275,7 @@ def _boundary_polish(
         local_tour = np.array([city_to_local[int(c)] for c in sub_tour], dtype=np.int64)
 
         # 2-opt на локальном
-        two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 10, 3)
+        two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 10, 3, **STATS_KW)
 
         # Mapping back
         improved_sub = np.array([sub_cities[local_tour[i]] for i in range(len(local_tour))], dtype=np.int64)
@@ -1341,6 +1350,8 @@ def v_cycle_refine(
     leaves: Optional[list] = None,
     time_budget: float = 60.0,
     stitch_metrics: Optional[dict] = None,
+    control: Optional[SolveControl] = None,
+    tracer=NULL_TRACER,
 ) -> NDArray[np.int64]:
     """
     Boundary-focused V-cycle: оптимизирует ТОЛЬКО зоны стыков между кластерами.
@@ -1353,6 +1364,9 @@ def v_cycle_refine(
     5. Повторяем n_cycles раз
 
     Если leaves не переданы — fallback на uniform sliding window.
+    control.stop() — выход между окнами (тур после каждого окна валиден).
+    coords — метрика ядер: координаты или GraphMetric (окна — подграфы).
+    tracer: span на оптимизированное окно (src.core.trace).
     """
     import time as time_mod
     t_start = time_mod.perf_counter()
@@ -1365,120 +1379,130 @@ def v_cycle_refine(
         return _v_cycle_uniform(tour, coords, oracle, n_cycles, segment_size, overlap)
 
     # Строим mapping: city → cluster_id
-    city_to_cluster = np.full(coords.shape[0], -1, dtype=np.int32)
+    city_to_cluster = np.full(metric_n(coords), -1, dtype=np.int32)
     for ci, leaf in enumerate(leaves):
         for c in leaf.cities:
             city_to_cluster[int(c)] = ci
 
+    # Dense global→local mapping: один буфер на все окна (int32[N] на окно
+    # давал O(N * n_windows) аллокаций); после окна сбрасываются только его города
+    g2l = np.full(metric_n(coords), -1, dtype=np.int32)
+
     for cycle in range(n_cycles):
         if time_mod.perf_counter() - t_start > time_budget:
             break
 
-        # Находим позиции стыков (boundary) + stress-edges (длинные рёбра)
-        stitch_positions = []
-        for i in range(n):
-            c1 = city_to_cluster[tour[i]]
-            c2 = city_to_cluster[tour[(i + 1) % n]]
-            if c1 != c2 and c1 >= 0 and c2 >= 0:
-                stitch_positions.append(i)
-
-        # Stress-edge detection: находим top-K самых длинных рёбер
-        edge_lengths = np.empty(n, dtype=np.float64)
-        for i in range(n):
-            edge_lengths[i] = dist_jit(coords, tour[i], tour[(i + 1) % n])
-        # Top 2% длиннейших рёбер (минимум 4, максимум 20)
-        n_stress = min(20, max(4, n // 50))
-        stress_idx = np.argsort(edge_lengths)[-n_stress:]
-        stress_positions = [int(idx) for idx in stress_idx
-                          if int(idx) not in set(stitch_positions)]
-
-        all_positions = stitch_positions + stress_positions
-        if not all_positions:
-            break
-
-        # Адаптивный half_w: увеличиваем окна при высоком stress
-        base_half_w = segment_size // 2
-        if stitch_metrics and stitch_metrics['max_stitch_stress'] > _STRESS_FACTOR_HIGH:
-            half_w = min(int(base_half_w * 1.8), n // 4)
-        elif stitch_metrics and stitch_metrics['max_stitch_stress'] > _STRESS_FACTOR_MED:
-            half_w = min(int(base_half_w * 1.3), n // 4)
-        else:
-            half_w = base_half_w
-        windows = _merge_boundary_windows(all_positions, half_w, n)
-
-        # Оптимизируем каждое окно
-        for win_start, win_end in windows:
-            if time_mod.perf_counter() - t_start > time_budget:
+        with step('v_cycle.scan'):
+            # Находим позиции стыков (boundary) + stress-edges (длинные рёбра)
+            stitch_positions = []
+            for i in range(n):
+                c1 = city_to_cluster[tour[i]]
+                c2 = city_to_cluster[tour[(i + 1) % n]]
+                if c1 != c2 and c1 >= 0 and c2 >= 0:
+                    stitch_positions.append(i)
+
+            # Stress-edge detection: находим top-K самых длинных рёбер
+            edge_lengths = np.empty(n, dtype=np.float64)
+            for i in range(n):
+                edge_lengths[i] = dist_jit(coords, tour[i], tour[(i + 1) % n])
+            # Top 2% длиннейших рёбер (минимум 4, максимум 20)
+            n_stress = min(20, max(4, n // 50))
+            stress_idx = np.argsort(edge_lengths)[-n_stress:]
+            stress_positions = [int(idx) for idx in stress_idx
+                              if int(idx) not in set(stitch_positions)]
+
+            all_positions = stitch_positions + stress_positions
+            if not all_positions:
                 break
 
-            # Извлекаем линейный segment (start < end гарантировано)
-            seg = tour[win_start:win_end].copy()
-            seg_len = len(seg)
+            # Адаптивный half_w: увеличиваем окна при высоком stress
+            base_half_w = segment_size // 2
+            if stitch_metrics and stitch_metrics['max_stitch_stress'] > _STRESS_FACTOR_HIGH:
+                half_w = min(int(base_half_w * 1.8), n // 4)
+            elif stitch_metrics and stitch_metrics['max_stitch_stress'] > _STRESS_FACTOR_MED:
+                half_w = min(int(base_half_w * 1.3), n // 4)
+            else:
+                half_w = base_half_w
+            windows = _merge_boundary_windows(all_positions, half_w, n)
 
-            if seg_len < 20:
-                continue
+        # Оптимизируем каждое окно
+        with step('v_cycle.windows'):
+            for win_start, win_end in windows:
+                if time_mod.perf_counter() - t_start > time_budget:
+                    break
+                if control is not None and control.should_stop():
+                    return tour
 
-            # Локальный k-NN через oracle remap (без cKDTree rebuild)
-            seg_unique = np.unique(seg)
-            if len(seg_unique) < 10:
-                continue
+                t_win = tracer.now()
+                # Извлекаем линейный segment (start < end гарантировано)
+                seg = tour[win_start:win_end].copy()
+                seg_len = len(seg)
 
-            local_coords = coords[seg_unique]
-            k_local = min(oracle.knn_k, len(seg_unique) - 1)
-            if k_local < 2:
-                continue
+                if seg_len < 20:
+                    continue
 
-            # Dense global→local mapping
-            g2l = np.full(coords.shape[0], -1, dtype=np.int32)
-            for i_loc in range(len(seg_unique)):
-                g2l[seg_unique[i_loc]] = i_loc
-
-            # Ремаппим oracle k-NN в локальные индексы
-            local_nn = remap_knn_to_local_jit(
-                seg_unique.astype(np.int64),
-                oracle.knn_indices,
-                g2l,
-                k_local,
-            )
+                # Локальный k-NN через oracle remap (без cKDTree rebuild)
+                seg_unique = np.unique(seg)
+                if len(seg_unique) < 10:
+                    continue
 
-            local_tour = np.array([g2l[int(c)] for c in seg], dtype=np.int64)
+                local_coords = metric_take(coords, seg_unique)
+                k_local = min(oracle.knn_k, len(seg_unique) - 1)
+                if k_local < 2:
+                    continue
 
-            # Интенсивная оптимизация границы
-            best_local = local_tour.copy()
-            best_len = tour_length_coords_jit(best_local, local_coords)
+                g2l[seg_unique] = np.arange(len(seg_unique), dtype=np.int32)
 
-            # 2-opt (thorough)
-            two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 30, 5)
+                # Ремаппим oracle k-NN в локальные индексы
+                local_nn = remap_knn_to_local_jit(
+                    seg_unique.astype(np.int64),
+                    oracle.knn_indices,
+                    g2l,
+                    k_local,
+                )
 
-            # 3-opt + or-opt
-            for _ in range(3):
-                imp_or = or_opt_pass_coords_jit(local_tour, local_coords, local_nn)
-                imp3 = three_opt_full_pass_coords_jit(local_tour, local_coords, local_nn)
-                if not imp_or and not imp3:
-                    break
+                local_tour = g2l[seg].astype(np.int64)
+                g2l[seg_unique] = -1
 
-            cur_len = tour_length_coords_jit(local_tour, local_coords)
-            if cur_len < best_len:
+                # Интенсивная оптимизация границы
                 best_local = local_tour.copy()
-                best_len = cur_len
-
-            # LK-ILS на границе (до 8 попыток, время сэкономлено на oracle k-NN remap)
-            for _ in range(8):
-                if time_mod.perf_counter() - t_start > time_budget:
-                    break
-                perturbed = double_bridge_coords_jit(best_local)
-                lk_opt_coords_jit(perturbed, local_coords, local_nn, 30, 2)
-                p_len = tour_length_coords_jit(perturbed, local_coords)
-                if p_len < best_len - 1e-10:
-                    best_local = perturbed
-                    best_len = p_len
-
-            # Map back (линейный segment, start < end)
-            improved = np.array(
-                [seg_unique[best_local[i]] for i in range(seg_len)],
-                dtype=np.int64,
-            )
-            tour[win_start:win_end] = improved
+                best_len = tour_length_coords_jit(best_local, local_coords)
+
+                # 2-opt (thorough)
+                two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 30, 5, **STATS_KW)
+
+                # 3-opt + or-opt
+                for _ in range(3):
+                    imp_or = or_opt_pass_coords_jit(local_tour, local_coords, local_nn, **STATS_KW)
+                    imp3 = three_opt_full_pass_coords_jit(local_tour, local_coords, local_nn, **STATS_KW)
+                    if not imp_or and not imp3:
+                        break
+
+                cur_len = tour_length_coords_jit(local_tour, local_coords)
+                if cur_len < best_len:
+                    best_local = local_tour.copy()
+                    best_len = cur_len
+
+                # LK-ILS на границе (до 8 попыток, время сэкономлено на oracle k-NN remap)
+                for _ in range(8):
+                    if time_mod.perf_counter() - t_start > time_budget:
+                        break
+                    perturbed = double_bridge_coords_jit(best_local)
+                    lk_opt_coords_jit(perturbed, local_coords, local_nn, 30, 2, **STATS_KW)
+                    p_len = tour_length_coords_jit(perturbed, local_coords)
+                    if p_len < best_len - 1e-10:
+                        best_local = perturbed
+                        best_len = p_len
+
+                # Map back (линейный segment, start < end)
+                improved = np.array(
+                    [seg_unique[best_local[i]] for i in range(seg_len)],
+                    dtype=np.int64,
+                )
+                tour[win_start:win_end] = improved
+                if tracer.enabled:
+                    tracer.complete('v_cycle_window', 'v_cycle', t_win, cycle=cycle,
+                                    start=int(win_start), n=int(seg_len), length=float(best_len))
 
     return tour
 
@@ -1589,22 +1613,20 @@ def _v_cycle_uniform(
                 pos += segment_size - overlap
                 continue
 
-            local_coords = coords[seg_unique]
+            local_coords = metric_take(coords, seg_unique)
             k_local = min(15, len(seg_unique) - 1)
             if k_local < 2:
                 pos += segment_size - overlap
                 continue
 
-            local_tree = cKDTree(local_coords)
-            _, local_nn = local_tree.query(local_coords, k=k_local + 1)
-            local_nn = local_nn[:, 1:].astype(np.int32)
+            local_nn, _ = metric_knn(local_coords, k_local)
 
             city_to_local = {int(c): i for i, c in enumerate(seg_unique)}
             local_tour = np.array([city_to_local[int(c)] for c in seg], dtype=np.int64)
 
-            two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 15, 3)
-            three_opt_full_pass_coords_jit(local_tour, local_coords, local_nn)
-            or_opt_pass_coords_jit(local_tour, local_coords, local_nn)
+            two_opt_nn_coords_jit(local_tour, local_coords, local_nn, 15, 3, **STATS_KW)
+            three_opt_full_pass_coords_jit(local_tour, local_coords, local_nn, **STATS_KW)
+            or_opt_pass_coords_jit(local_tour, local_coords, local_nn, **STATS_KW)
 
             improved = np.array(
                 [seg_unique[local_tour[i]] for i in range(len(local_tour))],
@@ -7,33 +7,51 @@ v3.3: Numba JIT ускорение + 3-opt + адаптивный pipeline (lega
 
 Dispatch:
   solve(D=...) → v4 (D-matrix)
-  solve(coords=...) → v5 if N>3000, else v4
+  solve(coords=...) → v5 if N>3000, else solve_small (sparse engine, без D)
+
+Legacy D-стек (preskip_solver, local_search, numba_accel, swarm_engine, ...)
+импортируется при первом вызове solve_hybrid/solve_v3/solve_v4: эти модули
+не входят в src/core, а coordinate-путь solve() в них не нуждается.
 """
 
 from __future__ import annotations
 
+import inspect
 import time
 import numpy as np
 from numpy.typing import NDArray
 from typing import Optional
 
-from .preskip_solver import solve_preskip
-from .local_search import two_opt, or_opt
-from .numba_accel import (
-    HAS_NUMBA, warmup,
-    nn_tour_jit, tour_length_jit,
-    two_opt_jit, two_opt_nn_jit,
-    or_opt_jit, build_neighbor_lists_jit,
-    three_opt_pass_jit, three_opt_full_pass_jit,
-    double_bridge_jit,
-)
-
-# JIT warmup при импорте (1-2 сек один раз)
+# JIT warmup при первом вызове legacy-пути (1-2 сек один раз)
+_LEGACY_LOADED = False
 _WARMED_UP = False
 
 
+def _load_legacy():
+    """Импорт legacy D-стека в глобалы модуля (ImportError, если его нет)."""
+    global _LEGACY_LOADED
+    global solve_preskip, two_opt, or_opt, HAS_NUMBA, warmup
+    global nn_tour_jit, tour_length_jit, two_opt_jit, two_opt_nn_jit
+    global or_opt_jit, build_neighbor_lists_jit
+    global three_opt_pass_jit, three_opt_full_pass_jit, double_bridge_jit
+    if _LEGACY_LOADED:
+        return
+    from .preskip_solver import solve_preskip
+    from .local_search import two_opt, or_opt
+    from .numba_accel import (
+        HAS_NUMBA, warmup,
+        nn_tour_jit, tour_length_jit,
+        two_opt_jit, two_opt_nn_jit,
+        or_opt_jit, build_neighbor_lists_jit,
+        three_opt_pass_jit, three_opt_full_pass_jit,
+        double_bridge_jit,
+    )
+    _LEGACY_LOADED = True
+
+
 def _ensure_warmup():
     global _WARMED_UP
+    _load_legacy()
     if not _WARMED_UP and HAS_NUMBA:
         warmup()
         _WARMED_UP = True
@@ -748,26 +766,38 @@ def solve(
     D: Optional[NDArray[np.float64]] = None,
     coords: Optional[NDArray[np.float64]] = None,
     time_budget: Optional[float] = None,
+    target_gap: Optional[float] = None,
     **kwargs,
 ) -> dict:
     """
     Universal TSP solver dispatcher.
 
-    - D provided → solve_v4 (D-matrix based)
+    - D provided → solve_v4 (D-matrix based, legacy)
     - coords provided, N>3000 → solve_v5 (coordinate-first ultra)
-    - coords provided, N≤3000 → compute D, solve_v4
+    - coords provided, N≤3000 → solve_small (k-NN + numba-ядра, O(N*k)
+      памяти, без D-матрицы)
+    - target_gap задан → solve_v5 для любого N (нужна Held-Karp граница
+      на k-NN графе из координат; для D-матрицы не поддерживается)
+    - kwargs, которых нет у solve_small (store, max_memory_mb, control,
+      checkpoint_dir, limits, ...) → solve_v5 для любого N, как target_gap
+
+    kwargs передаются выбранному солверу как есть (неизвестный → TypeError).
     """
     if coords is not None:
+        from src.core.small_solver import solve_small
+        coords = np.asarray(coords, dtype=np.float64)
         n = len(coords)
-        if n > 3000:
+        v5_only = set(kwargs) - set(inspect.signature(solve_small).parameters)
+        if n > 3000 or target_gap is not None or v5_only:
             from src.core.ultra_solver import solve_v5
             budget = time_budget if time_budget else max(60.0, n * 0.03)
-            return solve_v5(coords, time_budget=budget, **kwargs)
-        else:
-            D = np.sqrt(((coords[:, None] - coords[None, :]) ** 2).sum(axis=2))
+            return solve_v5(coords, time_budget=budget, target_gap=target_gap, **kwargs)
+        return solve_small(coords, time_budget=time_budget, **kwargs)
 
     if D is None:
         raise ValueError("Either D or coords must be provided")
+    if target_gap is not None:
+        raise ValueError("target_gap requires coords (Held-Karp bound on k-NN graph)")
 
     budget = time_budget if time_budget else None
     return solve_v4(D, time_budget=budget)
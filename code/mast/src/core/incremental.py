@@ -0,0 +1,224 @@
+"""
+Warm start / инкрементальная переоптимизация после изменения набора городов.
+
+resolve(coords, previous_tour, added_coords, removed_ids):
+  1. splice — удалённые города вырезаются из предыдущего тура
+     (порядок остальных сохраняется, их соседи по туру становятся «грязными»);
+  2. cheapest insertion новых городов по k-NN (DistanceOracle);
+  3. LK-DLB только вокруг грязной области (DLB выставлены у всех остальных);
+  4. локальный ILS: double-bridge в окне позиций вокруг случайного грязного
+     города + LK-DLB по окну, принимается только улучшение.
+
+Стоимость — O(N) на проход/kick (линейные сканы массивов), без повторной
+декомпозиции: на 100K городов и изменении в ~1% — секунды против минут solve_v5.
+
+Нумерация результата: сохранённые города — 0..n_kept-1 в исходном порядке,
+добавленные — n_kept.. в порядке added_coords. old_to_new[old_id] = new id
+(-1 для удалённых).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.core.distance_oracle import DistanceOracle
+from src.core.jit_cache import ensure_warm
+from src.core.numba_sparse import (
+    tour_length_coords_jit,
+    cheapest_insertion_jit,
+    lk_opt_dirty_cached_jit,
+    local_kick_lk_jit,
+    seed_jit,
+)
+from src.core.seeding import stream_rng, stream_seed
+from src.core.ultra_solver import _log
+
+
+def resolve(
+    coords: NDArray[np.float64],
+    previous_tour,
+    added_coords: Optional[NDArray[np.float64]] = None,
+    removed_ids=None,
+    time_budget: float = 5.0,
+    knn_k: int = 20,
+    dirty_radius: int = 5,
+    kicks_per_change: int = 10,
+    kick_window: int = 50,
+    verbose: bool = False,
+    seed: Optional[int] = None,
+) -> dict:
+    """
+    Переоптимизировать тур previous_tour (по coords) после изменения городов.
+
+    Args:
+        coords: (N, 2) координаты предыдущего инстанса
+        previous_tour: перестановка range(N)
+        added_coords: (M, 2) новые города (None — нет)
+        removed_ids: id удаляемых городов в нумерации coords (None — нет)
+        time_budget: лимит времени на всё (сек)
+        knn_k: ширина k-NN oracle
+        dirty_radius: сколько k-NN соседей грязных городов тоже будить в LK
+        kicks_per_change: лимит локальных kicks на город стыка/вставки
+            (ранний выход до time_budget; kick ~O(N) из-за копии тура)
+        kick_window: ширина окна позиций локального double-bridge
+        verbose: печать прогресса
+        seed: поток 'resolve' (src.core.seeding) — выбор центров kicks и
+            np.random ядер; None — из энтропии ОС
+
+    Returns:
+        dict в формате solve_v5 (tour, length, phases, time_total, n)
+        + coords (новый инстанс), old_to_new, n_added, n_removed, n_dirty.
+    """
+    t_start = time.perf_counter()
+    coords = np.asarray(coords, dtype=np.float64)
+    n_old = len(coords)
+    previous_tour = np.asarray(previous_tour, dtype=np.int64)
+    if len(previous_tour) != n_old or not np.array_equal(
+        np.sort(previous_tour), np.arange(n_old, dtype=np.int64)
+    ):
+        raise ValueError(f'previous_tour is not a permutation of range({n_old})')
+
+    if added_coords is None:
+        added_coords = np.empty((0, 2), dtype=np.float64)
+    added_coords = np.asarray(added_coords, dtype=np.float64).reshape(-1, 2)
+    removed = np.unique(np.asarray(removed_ids if removed_ids is not None else [], dtype=np.int64))
+    if len(removed) and (removed[0] < 0 or removed[-1] >= n_old):
+        raise ValueError(f'removed_ids out of range [0, {n_old})')
+
+    phases: dict = {}
+    ensure_warm(lazy=True)
+
+    # ═══════════ Splice ═══════════
+    t0 = time.perf_counter()
+    keep = np.ones(n_old, dtype=np.bool_)
+    keep[removed] = False
+    n_kept = int(keep.sum())
+    old_to_new = np.full(n_old, -1, dtype=np.int64)
+    old_to_new[keep] = np.arange(n_kept, dtype=np.int64)
+
+    new_coords = np.ascontiguousarray(np.vstack([coords[keep], added_coords]))
+    n = len(new_coords)
+    added_ids = np.arange(n_kept, n, dtype=np.int64)
+
+    mapped = old_to_new[previous_tour]
+    tour = mapped[mapped >= 0]
+    # Соседи вырезанных участков: города тура, за которыми шёл удалённый
+    # (и первый сохранённый после него) — стык нового ребра.
+    dirty_parts = [added_ids]
+    if len(removed) and len(tour):
+        gone = mapped < 0
+        before = mapped[np.roll(gone, -1) & ~gone]
+        after = mapped[np.roll(gone, 1) & ~gone]
+        dirty_parts += [before, after]
+    phases['splice'] = {'time': time.perf_counter() - t0, 'n_kept': n_kept}
+
+    if n < 3:
+        tour = np.concatenate([tour, added_ids])
+        total_time = time.perf_counter() - t_start
+        return _result(tour, new_coords, old_to_new, phases, total_time,
+                       len(added_ids), len(removed), 0)
+
+    # ═══════════ Oracle + insertion ═══════════
+    t0 = time.perf_counter()
+    oracle = DistanceOracle(new_coords, knn_k=min(knn_k, n - 1))
+    oracle.build_knn()
+    knn, knn_d = oracle.knn_indices, oracle.knn_dists
+    phases['oracle'] = {'time': time.perf_counter() - t0}
+
+    t0 = time.perf_counter()
+    if len(added_ids):
+        # Порядок вставки: сначала ближайшие к текущему туру (у кого больше
+        # уже вставленных соседей) — дальние точки получают лучших кандидатов.
+        in_old = (knn[added_ids] < n_kept).sum(axis=1)
+        order = added_ids[np.argsort(-in_old, kind='stable')]
+        tour = cheapest_insertion_jit(tour, new_coords, knn, order)
+    insert_length = float(tour_length_coords_jit(tour, new_coords))
+    phases['insertion'] = {
+        'time': time.perf_counter() - t0,
+        'length': insert_length,
+        'n_added': int(len(added_ids)),
+    }
+
+    # ═══════════ Dirty-region LK ═══════════
+    t0 = time.perf_counter()
+    dirty = np.unique(np.concatenate(dirty_parts)).astype(np.int64)
+    n_changed = len(dirty)
+    if len(dirty) and dirty_radius > 0:
+        ring = knn[dirty, :dirty_radius].ravel().astype(np.int64)
+        dirty = np.unique(np.concatenate([dirty, ring]))
+    no_alpha = knn[:, :0]
+    lk_opt_dirty_cached_jit(tour, new_coords, no_alpha, knn, knn_d, dirty, 50)
+    best_length = float(tour_length_coords_jit(tour, new_coords))
+    phases['dirty_lk'] = {
+        'time': time.perf_counter() - t0,
+        'n_dirty': int(len(dirty)),
+        'length': best_length,
+    }
+    if verbose:
+        _log(f'[resolve] N={n} (+{len(added_ids)}/-{len(removed)}), dirty={len(dirty)}: '
+             f'insertion={insert_length:.0f} → LK={best_length:.0f}')
+
+    # ═══════════ Local ILS ═══════════
+    t0 = time.perf_counter()
+    rng = stream_rng(seed, 'resolve')
+    if seed is not None:
+        seed_jit(stream_seed(seed, 'resolve'))
+    max_kicks = kicks_per_change * n_changed
+    t_end = t_start + time_budget
+    pos = np.empty(n, dtype=np.int64)
+    kicks = 0
+    accepted = 0
+    while kicks < max_kicks and time.perf_counter() < t_end and n >= 8:
+        pos[tour] = np.arange(n, dtype=np.int64)
+        center = int(pos[dirty[rng.integers(len(dirty))]])
+        candidate = local_kick_lk_jit(
+            tour, new_coords, no_alpha, knn, knn_d, center, kick_window, 50,
+        )
+        kicks += 1
+        length = float(tour_length_coords_jit(candidate, new_coords))
+        if length < best_length - 1e-10:
+            tour, best_length = candidate, length
+            accepted += 1
+    phases['local_ils'] = {
+        'time': time.perf_counter() - t0,
+        'kicks': kicks,
+        'accepted': accepted,
+        'length': best_length,
+    }
+
+    total_time = time.perf_counter() - t_start
+    if verbose:
+        _log(f'[resolve] DONE: length={best_length:.0f}, kicks={kicks} '
+             f'({accepted} accepted), time={total_time:.2f}s')
+    return _result(tour, new_coords, old_to_new, phases, total_time,
+                   len(added_ids), len(removed), len(dirty))
+
+
+def _result(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    old_to_new: NDArray[np.int64],
+    phases: dict,
+    total_time: float,
+    n_added: int,
+    n_removed: int,
+    n_dirty: int,
+) -> dict:
+    length = float(tour_length_coords_jit(tour, coords)) if len(tour) > 1 else 0.0
+    return {
+        'tour': tour.tolist(),
+        'length': length,
+        'phases': phases,
+        'time_total': total_time,
+        'n': len(coords),
+        'coords': coords,
+        'old_to_new': old_to_new,
+        'n_added': n_added,
+        'n_removed': n_removed,
+        'n_dirty': n_dirty,
+    }
+
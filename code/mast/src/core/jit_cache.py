@@ -0,0 +1,385 @@
+"""
+Кэш скомпилированных ядер: версионированный bundle + AOT-модуль small-пайплайна.
+
+Без него каждый свежий процесс платит за numba: импорт (~0.35 с),
+инициализацию CPU target при первом вызове dispatcher'а (~0.4-0.6 с, даже
+когда ядро берётся из кэша) и warmup_sparse() в каждом solve_v5. Для
+коротких batch-задач это заметная доля wall time.
+
+Bundle — каталог {MAST_JIT_CACHE или code/mast/.jit_cache}/{tag},
+tag = numba{версия}-py{XY}-{platform}-{machine}:
+  numba/          — кэш @njit(cache=True) из src/core. install() (вызывается
+                    numba_sparse до декораторов) ставит свой cache locator
+                    первым: путь не зависит от расположения checkout'а, ключ
+                    свежести — sha256 исходника (как у numba).
+  manifest.json   — sha256 исходников с ядрами, прогретые варианты
+                    ('coords', 'graph'), имя AOT-модуля.
+  mast_kernels*.so — AOT (numba.pycc, generic CPU) ядра coordinate-first
+                    пайплайна небольших инстансов: грузится без numba.
+
+ensure_warm() заменяет warmup_sparse() в библиотечных точках входа: один раз
+на процесс; при свежем bundle — только загрузка из кэша (lazy=True — и её нет,
+ядра грузятся при первом вызове), иначе компиляция и запись варианта в
+manifest.
+kernels(coords) — AOT-модуль для евклидовых coords (тот же набор имён), для
+GraphMetric / KERNEL_STATS / без bundle — JIT-ядра numba_sparse.
+
+Сборка: scripts/build_jit_cache.py (прогрев всех вариантов + AOT).
+MAST_JIT_CACHE=off или NUMBA_CACHE_DIR — поведение numba по умолчанию.
+
+    from src.core.jit_cache import kernels
+    K = kernels(coords)
+    length = K.tour_length(tour, coords)
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import sys
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(os.path.dirname(_CORE_DIR))
+DEFAULT_DIR = os.path.join(_ROOT, '.jit_cache')
+
+KERNEL_SOURCES = ('numba_sparse.py', 'eax_sparse.py')
+AOT_NAME = 'mast_kernels'
+VARIANTS = ('coords', 'graph')
+
+_installed = False
+_install_failed = False  # приватный API numba.core.caching не подошёл
+_warm: set = set()
+_aot = None
+_aot_loaded = False
+_jit = None
+
+
+# ═══════════════════════════════════════════════════════════
+#  BUNDLE LAYOUT
+# ═══════════════════════════════════════════════════════════
+
+def enabled() -> bool:
+    """Bundle используется: не MAST_JIT_CACHE=off и не задан NUMBA_CACHE_DIR."""
+    return (os.environ.get('MAST_JIT_CACHE', '').lower() not in ('off', '0')
+            and not os.environ.get('NUMBA_CACHE_DIR'))
+
+
+def _numba_version() -> str:
+    if 'numba' in sys.modules:
+        return sys.modules['numba'].__version__
+    from importlib.metadata import version
+    return version('numba')
+
+
+def bundle_tag() -> str:
+    """'numba0.61.0-py311-linux-x86_64' — кэш и AOT валидны только для него."""
+    return (f'numba{_numba_version()}-py{sys.version_info[0]}{sys.version_info[1]}-'
+            f'{sys.platform}-{platform.machine()}')
+
+
+@functools.lru_cache(maxsize=None)
+def bundle_dir() -> str:
+    root = os.environ.get('MAST_JIT_CACHE') or DEFAULT_DIR
+    return os.path.join(root, bundle_tag())
+
+
+def source_hashes() -> dict:
+    """sha256 исходников с ядрами — ключ свежести bundle."""
+    out = {}
+    for name in KERNEL_SOURCES:
+        with open(os.path.join(_CORE_DIR, name), 'rb') as f:
+            out[name] = hashlib.sha256(f.read()).hexdigest()
+    return out
+
+
+def read_manifest() -> dict:
+    try:
+        with open(os.path.join(bundle_dir(), 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest: dict) -> None:
+    path = os.path.join(bundle_dir(), 'manifest.json')
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(bundle_dir(), exist_ok=True)
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _fresh_manifest() -> Optional[dict]:
+    """Manifest, если он построен для текущих исходников, иначе None."""
+    manifest = read_manifest()
+    if manifest.get('sources') != source_hashes():
+        return None
+    return manifest
+
+
+def bundle_fresh(variant: str = 'coords') -> bool:
+    """
+    В bundle есть прогретый variant для текущих исходников. Не импортирует
+    numba: свежий bundle + AOT — процесс может обойтись без неё вовсе.
+    """
+    if not enabled() or _install_failed:
+        return False
+    manifest = _fresh_manifest()
+    return manifest is not None and variant in manifest.get('variants', [])
+
+
+def _record_variant(variant: str, **extra) -> None:
+    manifest = _fresh_manifest() or {'tag': bundle_tag(), 'sources': source_hashes(), 'variants': []}
+    if variant not in manifest['variants']:
+        manifest['variants'].append(variant)
+    manifest.update(extra)
+    _write_manifest(manifest)
+
+
+# ═══════════════════════════════════════════════════════════
+#  NUMBA CACHE LOCATOR
+# ═══════════════════════════════════════════════════════════
+
+def install() -> bool:
+    """
+    Направить кэш numba для ядер src/core в bundle. Вызывать до @njit —
+    locator выбирается при декорировании. Идемпотентно.
+
+    Locator опирается на приватный API numba.core.caching: если в этой
+    версии numba его нет (AttributeError / TypeError) — False, ядра
+    кэшируются как обычно (cache=True рядом с исходником), bundle_fresh()
+    всегда False.
+    """
+    global _installed, _install_failed
+    if _installed or _install_failed or not enabled():
+        return _installed
+    from numba.core import caching
+
+    cache_path = os.path.join(bundle_dir(), 'numba')
+
+    try:
+        class BundleCacheLocator(caching._SourceFileBackedLocatorMixin, caching._CacheLocator):
+            """Кэш ядер src/core в bundle_dir()/numba (не зависит от пути checkout'а)."""
+
+            def __init__(self, py_func, py_file):
+                self._py_file = py_file
+                self._lineno = py_func.__code__.co_firstlineno
+
+            def get_cache_path(self):
+                return cache_path
+
+            @classmethod
+            def from_function(cls, py_func, py_file):
+                if os.path.dirname(os.path.abspath(py_file)) != _CORE_DIR:
+                    return None
+                return super().from_function(py_func, py_file)
+
+        caching.CacheImpl._locator_classes.insert(0, BundleCacheLocator)
+    except (AttributeError, TypeError):
+        _install_failed = True
+        return False
+    _installed = True
+    return True
+
+
+# ═══════════════════════════════════════════════════════════
+#  WARMUP
+# ═══════════════════════════════════════════════════════════
+
+def _stats_enabled() -> bool:
+    module = sys.modules.get('src.core.numba_sparse')
+    if module is not None:
+        return module.KERNEL_STATS
+    return os.environ.get('MAST_KERNEL_STATS', '') not in ('', '0')
+
+
+def ensure_warm(graph: bool = False, lazy: bool = False) -> str:
+    """
+    Прогрев JIT один раз на процесс (graph — специализации GraphMetric).
+
+    lazy=True при свежем bundle ничего не грузит: ядра поднимутся из кэша
+    при первом вызове (однопроцессные пути, воркеры batch). lazy=False —
+    загрузить всё сейчас, чтобы fork-воркеры унаследовали тёплые ядра.
+
+    Returns: 'warm' (уже в этом процессе), 'lazy', 'bundle' (загружено из
+    bundle) или 'compiled' (компиляция; вариант записан в manifest).
+    """
+    variant = 'graph' if graph else 'coords'
+    if variant in _warm:
+        return 'warm'
+    stats = _stats_enabled()
+    fresh = not stats and bundle_fresh(variant)
+    if fresh and lazy:
+        return 'lazy'
+    from src.core.numba_sparse import warmup_sparse
+    warmup_sparse(graph=graph)
+    # KERNEL_STATS: инструментированные ядра cache=False — в bundle не записаны
+    if not fresh and _installed and not stats:
+        _record_variant(variant)
+    _warm.add(variant)
+    return 'bundle' if fresh else 'compiled'
+
+
+# ═══════════════════════════════════════════════════════════
+#  KERNELS: AOT / JIT
+# ═══════════════════════════════════════════════════════════
+
+# имя → (сигнатура pycc, ядро numba_sparse). Аргументы по умолчанию
+# (work, stats) в AOT не экспортируются — только полная фиксированная арность.
+AOT_EXPORTS = {
+    'tour_length': ('f8(i8[:], f8[:,:])', 'tour_length_coords_jit'),
+    'nn_tour': ('i8[:](f8[:,:], i4[:,:], f8[:,:], i8)', 'nn_tour_coords_jit'),
+    'init_succ_len': ('f8[:](i8[:], f8[:,:])', 'init_succ_len_jit'),
+    'two_opt_nn_cached': ('i8(i8[:], f8[:,:], i4[:,:], f8[:,:], i8, i8)', 'two_opt_nn_cached_jit'),
+    'or_opt_pass_cached': ('b1(i8[:], f8[:,:], i4[:,:], f8[:,:], f8[:])', 'or_opt_pass_cached_jit'),
+    'three_opt_full_pass': ('b1(i8[:], f8[:,:], i4[:,:])', 'three_opt_full_pass_coords_jit'),
+    'seed': ('void(i8)', 'seed_jit'),
+    'local_kick_lk': ('i8[:](i8[:], f8[:,:], i4[:,:], i4[:,:], f8[:,:], i8, i8, i8)', 'local_kick_lk_jit'),
+}
+# ядра с stats-аргументом (KERNEL_STATS → JIT-вариант получает **STATS_KW)
+_STATS_KERNELS = ('two_opt_nn_cached', 'or_opt_pass_cached', 'three_opt_full_pass')
+
+
+def aot_module():
+    """AOT-модуль bundle или None (нет, собран для других исходников, не грузится)."""
+    global _aot, _aot_loaded
+    if _aot_loaded:
+        return _aot
+    _aot_loaded = True
+    if not enabled():
+        return None
+    manifest = _fresh_manifest()
+    if manifest is None or not manifest.get('aot'):
+        return None
+    path = os.path.join(bundle_dir(), manifest['aot'])
+    try:
+        spec = importlib.util.spec_from_file_location(AOT_NAME, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except (ImportError, OSError):
+        return None
+    _aot = module
+    return _aot
+
+
+def jit_kernels() -> SimpleNamespace:
+    """JIT-ядра numba_sparse под именами AOT_EXPORTS (с **STATS_KW)."""
+    global _jit
+    if _jit is None:
+        import src.core.numba_sparse as ns
+        table = {}
+        for name, (_, attr) in AOT_EXPORTS.items():
+            kernel = getattr(ns, attr)
+            if name in _STATS_KERNELS and ns.STATS_KW:
+                kernel = functools.partial(kernel, **ns.STATS_KW)
+            table[name] = kernel
+        _jit = SimpleNamespace(**table)
+    return _jit
+
+
+def kernels(coords=None):
+    """
+    Ядра coordinate-first пайплайна для данной метрики: AOT для евклидовых
+    coords (ndarray) при свежем bundle и выключенной статистике, иначе JIT.
+    """
+    if coords is None or isinstance(coords, np.ndarray):
+        if not _stats_enabled():
+            module = aot_module()
+            if module is not None:
+                return module
+    return jit_kernels()
+
+
+# ═══════════════════════════════════════════════════════════
+#  BUILD
+# ═══════════════════════════════════════════════════════════
+
+def _aot_wrapper(kernel, arity: int):
+    """Замыкание фиксированной арности (pycc не экспортирует аргументы по умолчанию)."""
+    if arity == 1:
+        return lambda a: kernel(a)
+    if arity == 2:
+        return lambda a, b: kernel(a, b)
+    if arity == 3:
+        return lambda a, b, c: kernel(a, b, c)
+    if arity == 4:
+        return lambda a, b, c, d: kernel(a, b, c, d)
+    if arity == 5:
+        return lambda a, b, c, d, e: kernel(a, b, c, d, e)
+    if arity == 6:
+        return lambda a, b, c, d, e, f: kernel(a, b, c, d, e, f)
+    if arity == 7:
+        return lambda a, b, c, d, e, f, g: kernel(a, b, c, d, e, f, g)
+    if arity == 8:
+        return lambda a, b, c, d, e, f, g, h: kernel(a, b, c, d, e, f, g, h)
+    raise ValueError(f'unsupported arity {arity}')
+
+
+def build_aot(verbose: bool = False) -> str:
+    """Собрать AOT-модуль в bundle_dir() (generic CPU) → имя файла."""
+    import src.core.numba_sparse as ns
+    from numba.pycc import CC
+
+    cc = CC(AOT_NAME)
+    cc.output_dir = bundle_dir()
+    cc.verbose = verbose
+    for name, (signature, attr) in AOT_EXPORTS.items():
+        cc.export(name, signature)(_aot_wrapper(getattr(ns, attr), _arity(signature)))
+    cc.compile()
+    return cc.output_file
+
+
+def _arity(signature: str) -> int:
+    """Число аргументов в сигнатуре pycc ('i8(i8[:], f8[:,:])' → 2)."""
+    args = signature[signature.index('(') + 1:signature.rindex(')')]
+    depth, count = 0, 1
+    for ch in args:
+        if ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            count += 1
+    return count
+
+
+def build_bundle(aot: bool = True, verbose: bool = False) -> dict:
+    """
+    Полная сборка: прогрев coords + graph (+ EAX) в кэш bundle, AOT-модуль,
+    manifest. Требует install() (импорт numba_sparse его вызывает).
+
+    Raises:
+        RuntimeError: bundle выключен (MAST_JIT_CACHE=off / NUMBA_CACHE_DIR / нет API locator) или KERNEL_STATS.
+    """
+    from src.core.numba_sparse import warmup_sparse
+    from src.core.eax_sparse import eax_crossover_fast
+
+    if not _installed:
+        raise RuntimeError('jit cache bundle is disabled (MAST_JIT_CACHE=off, NUMBA_CACHE_DIR set '
+                           'or numba cache locator API unavailable)')
+    if _stats_enabled():
+        raise RuntimeError('build the bundle with MAST_KERNEL_STATS unset (instrumented kernels are not cached)')
+    for variant in VARIANTS:
+        warmup_sparse(graph=variant == 'graph')
+        _record_variant(variant)
+    rng = np.random.default_rng(0)
+    coords = rng.random((12, 2))
+    nn = np.argsort(((coords[:, None] - coords[None]) ** 2).sum(-1), axis=1)[:, 1:6].astype(np.int32)
+    eax_crossover_fast(rng.permutation(12).astype(np.int64), np.arange(12, dtype=np.int64), coords, nn)
+    if aot:
+        _record_variant('coords', aot=build_aot(verbose))
+    global _aot_loaded
+    _aot_loaded = False
+    return read_manifest()
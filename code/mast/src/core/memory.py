@@ -0,0 +1,279 @@
+"""
+Память solve_v5: пиковый RSS по фазам и подбор конфигурации под max_memory_mb.
+
+MemoryTracker — VmHWM процесса (/proc/self/status) после каждой фазы; на
+Linux пик сбрасывается через /proc/self/clear_refs, так что в phases
+попадает пик именно этой фазы. Воркеры листьев (fork) — отдельно, через
+getrusage(RUSAGE_CHILDREN).
+
+plan_memory() — оценка пика по фазам из того, что реально занимает память:
+k-NN (с временными массивами cKDTree.query и rebuild k=30 в polish),
+воркеры листьев (приватная память процесса + подынстанс листа, его
+cKDTree/k-NN), популяция и архив good_tours в polish, буферы EAX
+(adjacency, CSR-циклы, дети), g2l/кластеры V-cycle. Если оценка не
+влезает, параметры урезаются по одному (сначала то, что меньше всего
+влияет на качество); если не влезает и минимальная конфигурация —
+MemoryError до построения oracle.
+
+Коэффициенты (байт на город) откалиброваны по пикам на uniform 50K-200K.
+"""
+
+from __future__ import annotations
+
+import resource
+from dataclasses import dataclass, field
+from typing import Optional
+
+MB = 1024.0 * 1024.0
+
+# Байт на город (калибровка, см. docstring модуля)
+COORDS_BYTES = 16
+KNN_BYTES_PER_K = 12            # int32 индексы + float64 расстояния
+KNN_QUERY_BYTES_PER_K = 16      # int64 + float64 из cKDTree.query (временно)
+KDTREE_BYTES = 48
+ALPHA_BYTES = 5 * 4
+DECOMPOSE_BYTES = 160           # дерево + локальные лапласианы на верхних уровнях
+TOUR_BYTES = 8
+SOLVE_TOURS = 6                 # best/global/refined/polished/... копии тура
+VCYCLE_BYTES = 40               # g2l, city_to_cluster, edge_lengths, argsort
+EAX_BYTES = 150                 # adjacency, CSR-циклы, common, дети, order
+WORKER_BASE_MB = 15.0           # приватная (COW-dirty) память fork-воркера
+JIT_RUNTIME_MB = 60.0           # загруженные numba-ядра после warmup_sparse()
+LEAF_BYTES_PER_K = 28           # query + локальный k-NN листа
+LEAF_BYTES = 150                # coords (+pickle), cKDTree, туры, succ_len листа
+
+MIN_KNN_K = 8
+MIN_LEAF_SIZE = 500
+
+# Пик, стёртый сбросом VmHWM внутри фазы (окна под-шагов, src.core.trace.step):
+# MemoryTracker.mark() учитывает его в пике фазы
+_carried_peak = 0.0
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса, MB (0.0, если /proc недоступен)."""
+    return _status_kb('VmRSS') / 1024.0
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS с последнего сброса (VmHWM), иначе getrusage — за всю жизнь."""
+    hwm = _status_kb('VmHWM')
+    if hwm > 0:
+        return hwm / 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def children_peak_rss_mb() -> float:
+    """Максимальный пиковый RSS среди завершённых дочерних процессов, MB."""
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024.0
+
+
+def _status_kb(key: str) -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(key + ':'):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return 0.0
+
+
+def _reset_peak() -> bool:
+    """Сбросить VmHWM (Linux ≥ 4.0). False — сброс недоступен."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def begin_peak_window() -> Optional[float]:
+    """
+    Окно пика внутри фазы: текущий VmHWM сохраняется для пика фазы, VmHWM
+    сбрасывается. Returns: пик до окна (MB) или None — сброс недоступен
+    (пик окна тогда не измерить).
+    """
+    global _carried_peak
+    before = peak_rss_mb()
+    if not _reset_peak():
+        return None
+    _carried_peak = max(_carried_peak, before)
+    return before
+
+
+class MemoryTracker:
+    """
+    Пиковый RSS по фазам: mark(phase) в конце каждой фазы.
+
+    Без сброса VmHWM (не Linux) пик фазы — пик с начала процесса, т.е.
+    значения по фазам монотонны и верны только для максимума.
+    """
+
+    def __init__(self):
+        self.start_mb = rss_mb()
+        self.peaks: dict[str, float] = {}
+        self.per_phase = _reset_peak()
+
+    def mark(self, phase: str) -> float:
+        """Пик RSS с предыдущей отметки → peaks[phase]; возвращает его."""
+        global _carried_peak
+        peak = max(peak_rss_mb(), _carried_peak)
+        _carried_peak = 0.0
+        self.peaks[phase] = max(self.peaks.get(phase, 0.0), peak)
+        if self.per_phase:
+            _reset_peak()
+        return peak
+
+    def summary(self) -> dict:
+        return {
+            'start_rss_mb': self.start_mb,
+            'peak_rss_mb': max(self.peaks.values(), default=peak_rss_mb()),
+            'phase_peak_rss_mb': dict(self.peaks),
+            'worker_peak_rss_mb': children_peak_rss_mb(),
+            'per_phase': self.per_phase,
+        }
+
+
+@dataclass
+class MemoryPlan:
+    """Конфигурация solve_v5, оценённая в max_memory_mb."""
+    max_memory_mb: float
+    knn_k: int
+    knn_k_polish: int
+    max_leaf_size: int
+    n_workers: int
+    pop_size: int
+    archive_size: int
+    estimate_mb: float = 0.0
+    phases_mb: dict[str, float] = field(default_factory=dict)
+    reductions: list[str] = field(default_factory=list)
+
+
+def estimate_memory(
+    n: int,
+    knn_k: int,
+    knn_k_polish: int,
+    max_leaf_size: int,
+    n_workers: int,
+    pop_size: int,
+    archive_size: int,
+    base_mb: float = 0.0,
+    use_alpha: bool = True,
+    jit_loaded: bool = False,
+) -> dict[str, float]:
+    """
+    Оценка пика (MB) по фазам solve_v5 — включая base_mb (RSS до вызова),
+    numba-ядра (если ещё не загружены: jit_loaded=False) и приватную
+    память воркеров листьев. Ключ 'total' — максимум по фазам.
+
+    RSS после фазы обычно не возвращается (аллокатор держит освобождённое),
+    поэтому временные массивы polish (rebuild k-NN) и популяция EAX
+    складываются, а не берутся по максимуму.
+    """
+    persistent = (COORDS_BYTES + knn_k * KNN_BYTES_PER_K + KDTREE_BYTES
+                  + (ALPHA_BYTES if use_alpha else 0)) * n
+    tours = SOLVE_TOURS * TOUR_BYTES * n
+
+    leaf = max_leaf_size * (LEAF_BYTES + knn_k * LEAF_BYTES_PER_K)
+    worker = WORKER_BASE_MB * MB + leaf
+    workers = n_workers * worker if n_workers > 1 else leaf
+
+    # polish: rebuild k-NN держит старые и новые списки + временные query
+    polish_knn = (knn_k_polish * (KNN_BYTES_PER_K + KNN_QUERY_BYTES_PER_K) * n
+                  if knn_k_polish > knn_k else 0)
+    eax = (pop_size * TOUR_BYTES + EAX_BYTES) * n if pop_size >= 3 else 0
+    archive = (archive_size + 1) * TOUR_BYTES * n
+
+    phases = {
+        'oracle': persistent + (knn_k + 1) * KNN_QUERY_BYTES_PER_K * n,
+        'decomposition': persistent + DECOMPOSE_BYTES * n,
+        'leaf_optimization': persistent + tours + workers,
+        'v_cycle': persistent + tours + VCYCLE_BYTES * n,
+        'global_polish': persistent + polish_knn + tours + archive + eax,
+    }
+    base_mb = base_mb + (0.0 if jit_loaded else JIT_RUNTIME_MB)
+    out = {phase: base_mb + b / MB for phase, b in phases.items()}
+    out['total'] = max(out.values())
+    return out
+
+
+def plan_memory(
+    n: int,
+    max_memory_mb: float,
+    knn_k: int = 20,
+    knn_k_polish: int = 30,
+    max_leaf_size: int = 3000,
+    n_workers: int = 1,
+    pop_size: int = 15,
+    archive_size: int = 20,
+    base_mb: Optional[float] = None,
+    fixed_knn: bool = False,
+    use_alpha: bool = True,
+    jit_loaded: bool = False,
+) -> MemoryPlan:
+    """
+    Подобрать конфигурацию, чья оценка пика влезает в max_memory_mb.
+
+    Порядок урезания: архив good_tours → популяция EAX (до 0 = без EAX) →
+    rebuild k-NN в polish → воркеры листьев → knn_k (до MIN_KNN_K, если не
+    fixed_knn — k задан готовым oracle) → размер листа.
+
+    Raises:
+        MemoryError: не влезает и минимальная конфигурация.
+    """
+    if base_mb is None:
+        base_mb = rss_mb()
+    plan = MemoryPlan(
+        max_memory_mb=float(max_memory_mb),
+        knn_k=knn_k,
+        knn_k_polish=max(knn_k_polish, knn_k),
+        max_leaf_size=max_leaf_size,
+        n_workers=max(1, n_workers),
+        pop_size=pop_size,
+        archive_size=max(archive_size, pop_size),
+    )
+
+    def fits() -> bool:
+        plan.phases_mb = estimate_memory(
+            n, plan.knn_k, plan.knn_k_polish, plan.max_leaf_size, plan.n_workers,
+            plan.pop_size, plan.archive_size, base_mb, use_alpha, jit_loaded,
+        )
+        plan.estimate_mb = plan.phases_mb['total']
+        return plan.estimate_mb <= max_memory_mb
+
+    def reduce() -> Optional[str]:
+        """Один шаг урезания; None — урезать больше нечего."""
+        if plan.archive_size > plan.pop_size + 1:
+            plan.archive_size = plan.pop_size + 1
+            return f'archive_size={plan.archive_size}'
+        if plan.pop_size >= 3:
+            plan.pop_size = plan.pop_size // 2 if plan.pop_size > 5 else 0
+            plan.archive_size = plan.pop_size + 1
+            return f'pop_size={plan.pop_size}'
+        if plan.knn_k_polish > plan.knn_k:
+            plan.knn_k_polish = plan.knn_k
+            return f'knn_k_polish={plan.knn_k_polish}'
+        if plan.n_workers > 1:
+            plan.n_workers //= 2
+            return f'n_workers={plan.n_workers}'
+        if not fixed_knn and plan.knn_k > MIN_KNN_K:
+            plan.knn_k = max(MIN_KNN_K, plan.knn_k * 2 // 3)
+            plan.knn_k_polish = plan.knn_k
+            return f'knn_k={plan.knn_k}'
+        if plan.max_leaf_size > MIN_LEAF_SIZE:
+            plan.max_leaf_size = max(MIN_LEAF_SIZE, plan.max_leaf_size // 2)
+            return f'max_leaf_size={plan.max_leaf_size}'
+        return None
+
+    while not fits():
+        step = reduce()
+        if step is None:
+            raise MemoryError(
+                f'N={n} does not fit in max_memory_mb={max_memory_mb:.0f}: minimal '
+                f'configuration needs ~{plan.estimate_mb:.0f} MB '
+                f'(already in use: {base_mb:.0f} MB)'
+            )
+        plan.reductions.append(step)
+    return plan
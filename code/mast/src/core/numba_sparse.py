@@ -6,26 +6,287 @@ Numba JIT functions for coordinate-based (sparse) TSP — v5.0.
 
 Ключевое преимущество: для N>10K, on-the-fly dist (~10ns)
 БЫСТРЕЕ D[i,j] lookup (~50-100ns из-за cache misses на огромной матрице).
+
+Метрика: аргумент coords ядер — либо float64[N, 2] (евклидова), либо
+GraphMetric (CSR рёбер-кандидатов с весами, дорожные сети). Ядра читают
+расстояния только через dist_jit / metric_n, так что numba компилирует
+отдельную специализацию на каждый тип метрики без изменения кода ядер.
 """
 
 from __future__ import annotations
 
+import os
+import time
+from typing import NamedTuple, Optional
+
 import numpy as np
 from numpy.typing import NDArray
-from numba import njit
+from numba import njit, objmode, types
+from numba.extending import overload
+
+from src.core.jit_cache import install as _install_jit_cache
+
+# Кэш ядер — в версионированный bundle (src/core/jit_cache); до первого @njit
+_install_jit_cache()
 
 # ═══════════════════════════════════════════════════════════
 #  DISTANCE PRIMITIVE
 # ═══════════════════════════════════════════════════════════
 
+
+class GraphMetric(NamedTuple):
+    """
+    Разреженная метрика: симметричный CSR рёбер-кандидатов с весами.
+
+    Ребро (i, j) вне графа стоит fallback[0] * |coords_i - coords_j|
+    (detour-коэффициент), если coords заданы, иначе fallback[1].
+    Строится src.core.graph_metric.graph_metric().
+    """
+    indptr: NDArray[np.int64]     # [N + 1]
+    indices: NDArray[np.int32]    # [nnz], по возрастанию внутри строки
+    costs: NDArray[np.float64]    # [nnz]
+    coords: NDArray[np.float64]   # [N, 2] или [0, 2] — без координат
+    fallback: NDArray[np.float64]  # [detour, missing_cost]
+
+
+def metric_n(coords) -> int:
+    """Число городов метрики (ndarray или GraphMetric); работает и в njit."""
+    if isinstance(coords, GraphMetric):
+        return len(coords.indptr) - 1
+    return coords.shape[0]
+
+
+@overload(metric_n)
+def _metric_n_overload(coords):
+    if isinstance(coords, types.Array):
+        return lambda coords: coords.shape[0]
+    if isinstance(coords, types.BaseTuple):
+        return lambda coords: len(coords[0]) - 1
+
+
 @njit(cache=True)
-def dist_jit(coords: NDArray[np.float64], i: int, j: int) -> float:
-    """Евклидово расстояние из координат. ~10ns."""
+def graph_dist_jit(
+    indptr: NDArray[np.int64],
+    indices: NDArray[np.int32],
+    costs: NDArray[np.float64],
+    coords: NDArray[np.float64],
+    fallback: NDArray[np.float64],
+    i: int,
+    j: int,
+) -> float:
+    """Вес ребра (i, j): бинарный поиск в строке i CSR, иначе fallback. ~30ns."""
+    if i == j:
+        return 0.0
+    lo = indptr[i]
+    hi = indptr[i + 1]
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        v = indices[mid]
+        if v < j:
+            lo = mid + 1
+        elif v > j:
+            hi = mid
+        else:
+            return costs[mid]
+    if coords.shape[0] > 0:
+        dx = coords[i, 0] - coords[j, 0]
+        dy = coords[i, 1] - coords[j, 1]
+        return fallback[0] * np.sqrt(dx * dx + dy * dy)
+    return fallback[1]
+
+
+def _metric_dist(coords, i, j):
+    """Python-версия dist_jit (только для overload ниже)."""
+    if isinstance(coords, GraphMetric):
+        return graph_dist_jit(*coords, i, j)
     dx = coords[i, 0] - coords[j, 0]
     dy = coords[i, 1] - coords[j, 1]
     return np.sqrt(dx * dx + dy * dy)
 
 
+@overload(_metric_dist)
+def _metric_dist_overload(coords, i, j):
+    if isinstance(coords, types.Array):
+        def euclid(coords, i, j):
+            dx = coords[i, 0] - coords[j, 0]
+            dy = coords[i, 1] - coords[j, 1]
+            return np.sqrt(dx * dx + dy * dy)
+        return euclid
+    if isinstance(coords, types.BaseTuple):
+        def graph(coords, i, j):
+            return graph_dist_jit(coords[0], coords[1], coords[2], coords[3], coords[4], i, j)
+        return graph
+
+
+@njit(cache=True)
+def dist_jit(coords: NDArray[np.float64], i: int, j: int) -> float:
+    """Расстояние метрики: евклидово из координат (~10ns) или вес ребра GraphMetric."""
+    return _metric_dist(coords, i, j)
+
+
+# ═══════════════════════════════════════════════════════════
+#  WORK BUDGET (bounded kernel slices)
+# ═══════════════════════════════════════════════════════════
+#
+# numba не видит часов, поэтому долгие ядра принимают work (int64[WORK_SLOTS])
+# и считают работу: одна единица ≈ одна оценка кандидата. Как только
+# used ≥ limit, ядро возвращается, оставив тур корректным (частичный прогресс),
+# а проход запоминает cursor = позиция + 1 — следующий вызов с тем же work
+# продолжит с неё. Циклы проходов хранят в work номер итерации и счётчик
+# проходов без улучшения. Перевод секунд в единицы — src.core.budget.run_sliced.
+# work=None — прежнее поведение без ограничений.
+
+WORK_USED = 0         # потрачено единиц
+WORK_LIMIT = 1        # потолок единиц
+WORK_CURSOR = 2       # 0 — проход завершён, иначе позиция прерывания + 1
+WORK_MOVES = 3        # применённые улучшающие ходы
+WORK_ITER = 4         # итерация цикла проходов (для продолжения)
+WORK_NO_IMPROVE = 5   # подряд проходов без улучшения
+WORK_PASS_MOVES = 6   # moves на начало текущего прохода
+WORK_SLOTS = 7
+WORK_UNLIMITED = 1 << 62
+
+
+@njit(cache=True)
+def new_work_jit(limit: int) -> NDArray[np.int64]:
+    """Пустой счётчик работы с потолком limit."""
+    work = np.zeros(WORK_SLOTS, dtype=np.int64)
+    work[WORK_LIMIT] = limit
+    return work
+
+
+# ═══════════════════════════════════════════════════════════
+#  KERNEL STATS (compile-time gated counters)
+# ═══════════════════════════════════════════════════════════
+#
+# Что реально делают ядра локального поиска — для подбора max_iterations,
+# max_no_improve, k_use и глубины seqLK. KERNEL_STATS — глобальная константа:
+# numba замораживает её при компиляции, и при False ветки
+# `if KERNEL_STATS and stats is not None` вырезаются целиком (ноль накладных
+# расходов). Включается до импорта: MAST_KERNEL_STATS=1. Кэш numba не знает
+# о значении константы, поэтому инструментированные ядра — cache=_CACHE
+# (при включённой статистике компилируются заново, без записи в кэш).
+# Цена — полная компиляция ядер в каждом процессе (~1 мин на одном ядре);
+# solve_v5 делает её до старта часов бюджета, иначе она съедала бы фазы.
+#
+# stats — int64[STAT_SLOTS], накапливается (не сбрасывается ядрами).
+# Ядра получают его последним аргументом (stats=None — без счётчиков);
+# kernel_stats() — общий массив процесса (None, если KERNEL_STATS выключен),
+# его передают call sites solve_v5 (**STATS_KW) и run_sliced.
+
+KERNEL_STATS = os.environ.get('MAST_KERNEL_STATS', '') not in ('', '0')
+_CACHE = not KERNEL_STATS
+
+STAT_EVALS = 0          # оценённые кандидаты (delta хода посчитана)
+STAT_DLB_SKIPS = 1      # города, пропущенные по don't-look bit
+STAT_MOVES_2OPT = 2     # 2-opt / LK-style 2-opt ходы
+STAT_MOVES_OR_OPT = 3   # or-opt переносы сегмента
+STAT_MOVES_3OPT = 4     # 3-opt reconnection
+STAT_MOVES_LK = 5       # seqLK: первый ход цепочки
+STAT_MOVES_LK_DEEP = 6  # seqLK: продолжения цепочки (depth ≥ 2)
+STAT_REVERSAL_LEN = 7   # элементов тура переписано ходами (reversal / перенос)
+STAT_PASSES = 8         # вызовы pass-ядер (срез прерванного прохода — отдельно)
+STAT_PASS_NS = 9        # время в pass-ядрах, нс
+STAT_SLOTS = 10
+STAT_FIELDS = (
+    'evals', 'dlb_skips', 'moves_2opt', 'moves_or_opt', 'moves_3opt',
+    'moves_lk', 'moves_lk_deep', 'reversal_len', 'passes', 'pass_ns',
+)
+
+_STATS = np.zeros(STAT_SLOTS, dtype=np.int64)
+
+
+def kernel_stats() -> Optional[NDArray[np.int64]]:
+    """Общий stats-массив процесса или None (KERNEL_STATS выключен)."""
+    return _STATS if KERNEL_STATS else None
+
+
+# Для прямых вызовов: kernel(..., **STATS_KW). При выключенной статистике
+# аргумент не передаётся вовсе — stats=None дал бы лишнюю специализацию numba.
+STATS_KW: dict = {'stats': _STATS} if KERNEL_STATS else {}
+
+
+def kernel_stats_snapshot() -> NDArray[np.int64]:
+    """Копия текущих счётчиков процесса (для разницы до/после)."""
+    return _STATS.copy()
+
+
+def absorb_kernel_stats(delta: Optional[NDArray[np.int64]]) -> None:
+    """Добавить счётчики другого процесса (fork-воркер листа)."""
+    if delta is not None:
+        _STATS[:] += delta
+
+
+def stats_dict(stats: NDArray[np.int64]) -> dict:
+    """int64[STAT_SLOTS] → {поле: значение} + производные доли."""
+    out = {name: int(stats[i]) for i, name in enumerate(STAT_FIELDS)}
+    moves = sum(out[name] for name in STAT_FIELDS if name.startswith('moves_'))
+    out['moves'] = moves
+    out['evals_per_move'] = round(out['evals'] / moves, 1) if moves else None
+    out['mean_reversal'] = round(out['reversal_len'] / moves, 1) if moves else None
+    out['pass_ms'] = round(out['pass_ns'] / 1e6, 3)
+    return out
+
+
+@njit(cache=_CACHE)
+def _stats_clock() -> int:
+    """perf_counter_ns из numba (objmode; вызывается только при KERNEL_STATS)."""
+    with objmode(t='int64'):
+        t = time.perf_counter_ns()
+    return t
+
+
+@njit(cache=_CACHE)
+def _stats_pass_done(stats: NDArray[np.int64], t0: int):
+    stats[STAT_PASSES] += 1
+    stats[STAT_PASS_NS] += _stats_clock() - t0
+
+
+@njit(cache=True)
+def _work_begin(work: NDArray[np.int64]) -> int:
+    """Стартовая позиция прохода (продолжение прерванного) и сброс cursor."""
+    start = work[WORK_CURSOR] - 1 if work[WORK_CURSOR] > 0 else 0
+    work[WORK_CURSOR] = 0
+    return start
+
+
+@njit(cache=True)
+def _work_take(work: NDArray[np.int64], position: int, units: int) -> bool:
+    """Списать units; True — бюджет исчерпан, cursor = position + 1."""
+    if work[WORK_USED] >= work[WORK_LIMIT]:
+        work[WORK_CURSOR] = position + 1
+        return True
+    work[WORK_USED] += units
+    return False
+
+
+@njit(cache=True)
+def _work_pass_start(work: NDArray[np.int64]):
+    """Начало нового (не продолжаемого) прохода: запомнить moves."""
+    if work[WORK_CURSOR] == 0:
+        work[WORK_PASS_MOVES] = work[WORK_MOVES]
+
+
+@njit(cache=True)
+def _work_pass_end(work: NDArray[np.int64], iteration: int, max_no_improve: int) -> bool:
+    """
+    После прохода в цикле: True — цикл завершён (прерван бюджетом или
+    max_no_improve проходов без улучшения). При прерывании iteration
+    сохраняется в work — продолжение начнётся с неё.
+    """
+    if work[WORK_CURSOR] > 0:
+        work[WORK_ITER] = iteration
+        return True
+    work[WORK_ITER] = iteration + 1
+    if work[WORK_MOVES] > work[WORK_PASS_MOVES]:
+        work[WORK_NO_IMPROVE] = 0
+    else:
+        work[WORK_NO_IMPROVE] += 1
+        if work[WORK_NO_IMPROVE] >= max_no_improve:
+            return True
+    return False
+
+
 # ═══════════════════════════════════════════════════════════
 #  TOUR LENGTH
 # ═══════════════════════════════════════════════════════════
@@ -59,7 +320,7 @@ def nn_tour_coords_jit(
     Nearest Neighbor тур из k-NN lists.
     O(N*k) с brute-force fallback для последних городов.
     """
-    n = coords.shape[0]
+    n = metric_n(coords)
     k = nn_indices.shape[1]
     tour = np.empty(n, dtype=np.int64)
     visited = np.zeros(n, dtype=np.bool_)
@@ -119,24 +380,41 @@ def nn_tour_coords_jit(
 #  2-OPT WITH NEIGHBOR LISTS
 # ═══════════════════════════════════════════════════════════
 
-@njit(cache=True)
+@njit(cache=_CACHE)
 def two_opt_pass_nn_coords_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
     nn_indices: NDArray[np.int32],
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> bool:
-    """2-opt проход на координатах с neighbor lists. O(N*k)."""
+    """
+    2-opt проход на координатах с neighbor lists. O(N*k). work — см. WORK BUDGET,
+    stats — см. KERNEL STATS.
+    """
     n = len(tour)
     k = nn_indices.shape[1]
     improved = False
 
     # Позиция каждого города в туре
-    max_city = coords.shape[0]
+    max_city = metric_n(coords)
     pos = np.empty(max_city, dtype=np.int64)
     for i in range(n):
         pos[tour[i]] = i
 
-    for idx in range(n):
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
+    start = 0
+    if work is not None:
+        start = _work_begin(work)
+    for idx in range(start, n):
+        if work is not None:
+            if _work_take(work, idx, k):
+                if KERNEL_STATS and stats is not None:
+                    _stats_pass_done(stats, t_pass)
+                return improved
         city_i = tour[idx]
         idx_next = (idx + 1) % n
         city_ip1 = tour[idx_next]
@@ -167,6 +445,8 @@ def two_opt_pass_nn_coords_jit(
 
             old_cost = dist_jit(coords, a, b) + dist_jit(coords, c, d_city)
             new_cost = dist_jit(coords, a, c) + dist_jit(coords, b, d_city)
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_EVALS] += 1
 
             if new_cost < old_cost - 1e-10:
                 # Reverse segment [i_eff+1 .. j_eff]
@@ -182,28 +462,38 @@ def two_opt_pass_nn_coords_jit(
                 for m in range(i_eff + 1, j_eff + 1):
                     pos[tour[m]] = m
                 improved = True
+                if work is not None:
+                    work[WORK_MOVES] += 1
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_MOVES_2OPT] += 1
+                    stats[STAT_REVERSAL_LEN] += j_eff - i_eff
                 break
 
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
     return improved
 
 
-@njit(cache=True)
+@njit(cache=_CACHE)
 def two_opt_nn_coords_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
     nn_indices: NDArray[np.int32],
     max_iterations: int = 50,
     max_no_improve: int = 5,
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> int:
     """Полный 2-opt цикл. Returns число итераций."""
-    no_improve = 0
-    for iteration in range(max_iterations):
-        if two_opt_pass_nn_coords_jit(tour, coords, nn_indices):
-            no_improve = 0
-        else:
-            no_improve += 1
-            if no_improve >= max_no_improve:
-                return iteration + 1
+    if work is None:
+        w = new_work_jit(WORK_UNLIMITED)
+    else:
+        w = work
+    for iteration in range(w[WORK_ITER], max_iterations):
+        _work_pass_start(w)
+        two_opt_pass_nn_coords_jit(tour, coords, nn_indices, w, stats)
+        if _work_pass_end(w, iteration, max_no_improve):
+            return iteration + 1
     return max_iterations
 
 
@@ -222,23 +512,40 @@ def _reverse_segment_inplace(tour: NDArray[np.int64], lo: int, hi: int):
         hi -= 1
 
 
-@njit(cache=True)
+@njit(cache=_CACHE)
 def three_opt_full_pass_coords_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
     nn_indices: NDArray[np.int32],
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> bool:
-    """3-opt с 7 вариантами reconnection на координатах. O(N*k²)."""
+    """
+    3-opt с 7 вариантами reconnection на координатах. O(N*k²). work — см.
+    WORK BUDGET, stats — см. KERNEL STATS (evals — тройки рёбер).
+    """
     n = len(tour)
     k = nn_indices.shape[1]
     improved = False
 
-    max_city = coords.shape[0]
+    max_city = metric_n(coords)
     pos = np.empty(max_city, dtype=np.int64)
     for i in range(n):
         pos[tour[i]] = i
 
-    for idx_i in range(n):
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
+    start = 0
+    if work is not None:
+        start = _work_begin(work)
+    for idx_i in range(start, n):
+        if work is not None:
+            if _work_take(work, idx_i, k * k):
+                if KERNEL_STATS and stats is not None:
+                    _stats_pass_done(stats, t_pass)
+                return improved
         city_i = tour[idx_i]
 
         for ki in range(k):
@@ -277,6 +584,8 @@ def three_opt_full_pass_coords_jit(
                 d_CE = dist_jit(coords, C, E)
                 d_FG = dist_jit(coords, F, G)
                 old_cost = d_AB + d_CE + d_FG
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_EVALS] += 1
 
                 # Предвычисление 12 уникальных расстояний
                 d_AC = dist_jit(coords, A, C)
@@ -387,12 +696,24 @@ def three_opt_full_pass_coords_jit(
                 for m in range(i2, (idx_k + 1) if idx_k + 1 <= n else n):
                     pos[tour[m]] = m
                 improved = True
+                if work is not None:
+                    work[WORK_MOVES] += 1
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_MOVES_3OPT] += 1
+                    if best_variant == 1:
+                        stats[STAT_REVERSAL_LEN] += j1 - i2 + 1
+                    elif best_variant == 2:
+                        stats[STAT_REVERSAL_LEN] += k1 - j2 + 1
+                    else:
+                        stats[STAT_REVERSAL_LEN] += k1 - i2 + 1
                 break
             if improved:
                 break
         if improved:
             break
 
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
     return improved
 
 
@@ -400,26 +721,45 @@ def three_opt_full_pass_coords_jit(
 #  OR-OPT WITH NEIGHBOR LISTS
 # ═══════════════════════════════════════════════════════════
 
-@njit(cache=True)
+@njit(cache=_CACHE)
 def or_opt_pass_coords_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
     nn_indices: NDArray[np.int32],
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> bool:
-    """Or-opt проход: переставляет сегменты 1-3 города. O(N*k)."""
+    """
+    Or-opt проход: переставляет сегменты 1-3 города. O(N*k). work — см.
+    WORK BUDGET, stats — см. KERNEL STATS.
+    """
     n = len(tour)
     k = nn_indices.shape[1]
     improved = False
 
-    max_city = coords.shape[0]
+    max_city = metric_n(coords)
     pos = np.empty(max_city, dtype=np.int64)
     for i in range(n):
         pos[tour[i]] = i
 
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
+    start = 0
+    if work is not None:
+        start = _work_begin(work)
     for seg_len in (1, 2, 3):
         if improved:
             break
-        for i in range(n):
+        if start >= seg_len * n:
+            continue
+        for i in range(max(start - (seg_len - 1) * n, 0), n):
+            if work is not None:
+                if _work_take(work, (seg_len - 1) * n + i, k):
+                    if KERNEL_STATS and stats is not None:
+                        _stats_pass_done(stats, t_pass)
+                    return improved
             # Сегмент tour[i..i+seg_len-1]
             prev_idx = (i - 1) % n
             seg_end_idx = (i + seg_len - 1) % n
@@ -456,6 +796,8 @@ def or_opt_pass_coords_jit(
                 current_edge = dist_jit(coords, tour[j], tour[j_next])
 
                 delta = (bridge_cost - remove_cost) + (insert_cost - current_edge)
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_EVALS] += 1
 
                 if delta < -1e-10:
                     # Выполняем or-opt move
@@ -496,11 +838,18 @@ def or_opt_pass_coords_jit(
                         for t in range(n):
                             pos[tour[t]] = t
                         improved = True
+                        if work is not None:
+                            work[WORK_MOVES] += 1
+                        if KERNEL_STATS and stats is not None:
+                            stats[STAT_MOVES_OR_OPT] += 1
+                            stats[STAT_REVERSAL_LEN] += n
                         break
 
             if improved:
                 break
 
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
     return improved
 
 
@@ -521,7 +870,7 @@ def build_knn_from_coords(
     """
     from scipy.spatial import cKDTree
 
-    n = coords.shape[0]
+    n = metric_n(coords)
     k = min(k, n - 1)
     
     tree = cKDTree(coords)
@@ -537,6 +886,15 @@ def build_knn_from_coords(
 #  DOUBLE BRIDGE (не требует D)
 # ═══════════════════════════════════════════════════════════
 
+@njit(cache=True)
+def seed_jit(seed: int) -> None:
+    """
+    Seed глобального np.random numba в этом процессе (double_bridge,
+    local_kick_lk). Потоки по фазам / листьям — src.core.seeding.stream_seed.
+    """
+    np.random.seed(seed)
+
+
 @njit(cache=True)
 def double_bridge_coords_jit(tour: NDArray[np.int64]) -> NDArray[np.int64]:
     """Double-bridge perturbation. Не использует координаты."""
@@ -588,26 +946,45 @@ def double_bridge_coords_jit(tour: NDArray[np.int64]) -> NDArray[np.int64]:
 # ═══════════════════════════════════════════════════════════
 
 @njit(cache=True)
-def lk_opt_pass_coords_jit(
+def _in_candidate_row(cand: NDArray[np.int32], row: int, city: int) -> bool:
+    """Линейный поиск city в строке candidate-списка (k маленькое, ~5)."""
+    for ki in range(cand.shape[1]):
+        c = cand[row, ki]
+        if c < 0:
+            return False
+        if c == city:
+            return True
+    return False
+
+
+@njit(cache=_CACHE)
+def lk_opt_pass_dual_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
     nn_indices: NDArray[np.int32],
     dlb: NDArray[np.bool_],
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> bool:
     """
-    2-opt с Don't-Look Bits (LK-style).
+    2-opt с Don't-Look Bits (LK-style), dual candidate lists.
 
     DLB — ключевая оптимизация из LKH:
     - Города без недавних изменений пропускаются → ~3-5x быстрее
     - После хода DLB сбрасывается для 4 затронутых городов
     - First-improvement стратегия для скорости
 
+    Кандидаты города: сначала alpha-список (alpha_indices, alpha-ranked), затем
+    distance-список (nn_indices) без дубликатов. alpha_indices ширины 0 →
+    обычный single-list 2-opt.
+
     Модифицирует tour и dlb in-place.
     Returns: True если найдено улучшение.
     """
     n = len(tour)
+    k_a = alpha_indices.shape[1]
     k = nn_indices.shape[1]
-    max_city = coords.shape[0]
+    max_city = metric_n(coords)
     improved = False
 
     # Позиция каждого города в туре — O(1) lookup
@@ -615,20 +992,33 @@ def lk_opt_pass_coords_jit(
     for i in range(n):
         pos[tour[i]] = i
 
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
     for scan in range(n):
         idx = scan
         city_a = tour[idx]
         if dlb[city_a]:
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_DLB_SKIPS] += 1
             continue
 
         idx_b = (idx + 1) % n
         city_b = tour[idx_b]
 
         found = False
-        for ki in range(k):
-            city_c = nn_indices[city_a, ki]
-            if city_c < 0:
-                break
+        for ci in range(k_a + k):
+            if ci < k_a:
+                city_c = alpha_indices[city_a, ci]
+                if city_c < 0:
+                    continue
+            else:
+                city_c = nn_indices[city_a, ci - k_a]
+                if city_c < 0:
+                    break
+                if k_a > 0 and _in_candidate_row(alpha_indices, city_a, city_c):
+                    continue
 
             idx_c = pos[city_c]
 
@@ -656,6 +1046,8 @@ def lk_opt_pass_coords_jit(
 
             old_cost = dist_jit(coords, a, b) + dist_jit(coords, c, d_city)
             new_cost = dist_jit(coords, a, c) + dist_jit(coords, b, d_city)
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_EVALS] += 1
 
             if new_cost < old_cost - 1e-10:
                 # Reverse tour[i_eff+1 .. j_eff]
@@ -679,24 +1071,43 @@ def lk_opt_pass_coords_jit(
 
                 improved = True
                 found = True
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_MOVES_2OPT] += 1
+                    stats[STAT_REVERSAL_LEN] += j_eff - i_eff
                 break
 
         if not found:
             dlb[city_a] = True
 
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
     return improved
 
 
-@njit(cache=True)
-def lk_opt_coords_jit(
+@njit(cache=_CACHE)
+def lk_opt_pass_coords_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    nn_indices: NDArray[np.int32],
+    dlb: NDArray[np.bool_],
+    stats: Optional[NDArray[np.int64]] = None,
+) -> bool:
+    """2-opt с DLB на одном distance-списке (см. lk_opt_pass_dual_jit)."""
+    return lk_opt_pass_dual_jit(tour, coords, nn_indices[:, :0], nn_indices, dlb, stats)
+
+
+@njit(cache=_CACHE)
+def lk_opt_dual_coords_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
     nn_indices: NDArray[np.int32],
     max_iterations: int,
     max_no_improve: int,
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> int:
     """
-    Полный LK-style 2-opt цикл с DLB.
+    Полный LK-style 2-opt цикл с DLB, dual candidate lists.
 
     DLB-состояние сохраняется между проходами:
     после хода сбрасываются DLB для затронутых городов →
@@ -704,12 +1115,12 @@ def lk_opt_coords_jit(
 
     Returns: число выполненных итераций.
     """
-    max_city = coords.shape[0]
+    max_city = metric_n(coords)
     dlb = np.zeros(max_city, dtype=np.bool_)
 
     no_improve = 0
     for iteration in range(max_iterations):
-        if lk_opt_pass_coords_jit(tour, coords, nn_indices, dlb):
+        if lk_opt_pass_dual_jit(tour, coords, alpha_indices, nn_indices, dlb, stats):
             no_improve = 0
         else:
             no_improve += 1
@@ -718,168 +1129,880 @@ def lk_opt_coords_jit(
     return max_iterations
 
 
-
+@njit(cache=_CACHE)
+def lk_opt_coords_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    nn_indices: NDArray[np.int32],
+    max_iterations: int,
+    max_no_improve: int,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> int:
+    """Полный LK-style 2-opt цикл с DLB на одном distance-списке."""
+    return lk_opt_dual_coords_jit(
+        tour, coords, nn_indices[:, :0], nn_indices, max_iterations, max_no_improve, stats,
+    )
 
 
 # ═══════════════════════════════════════════════════════════
-#  ALPHA-NEARNESS (1-tree subgradient)
+#  CACHED EDGE COSTS (knn_dists + successor lengths)
 # ═══════════════════════════════════════════════════════════
+#
+# Варианты 2-opt / LK-DLB / Or-opt без sqrt в горячих местах:
+# - стоимость candidate-ребра (city, nn[city, ki]) читается из nn_dists;
+# - длина текущего ребра tour[i] → tour[i+1] хранится в succ_len[city]
+#   и обновляется на каждом ходе (при reversal — сдвигом по сегменту).
+# dist_jit остаётся только для «нового» ребра, которого нет в списке.
 
 @njit(cache=True)
-def _uf_find(parent, i):
-    """Union-Find: find с path compression."""
-    while parent[i] != i:
-        parent[i] = parent[parent[i]]
-        i = parent[i]
-    return i
-
-
-@njit(cache=True)
-def _uf_union(parent, rank, a, b):
-    """Union-Find: union by rank. Возвращает True если merged."""
-    ra = _uf_find(parent, a)
-    rb = _uf_find(parent, b)
-    if ra == rb:
-        return False
-    if rank[ra] < rank[rb]:
-        parent[ra] = rb
-    elif rank[ra] > rank[rb]:
-        parent[rb] = ra
-    else:
-        parent[rb] = ra
-        rank[ra] += 1
-    return True
+def init_succ_len_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+) -> NDArray[np.float64]:
+    """succ_len[city] = длина ребра city → следующий город тура."""
+    n = len(tour)
+    succ_len = np.zeros(metric_n(coords), dtype=np.float64)
+    for i in range(n):
+        succ_len[tour[i]] = dist_jit(coords, tour[i], tour[(i + 1) % n])
+    return succ_len
 
 
 @njit(cache=True)
-def sparse_kruskal_mst_jit(
-    n: int,
-    edges_from: NDArray[np.int32],
-    edges_to: NDArray[np.int32],
-    edges_weight: NDArray[np.float64],
+def _apply_2opt_cached(
+    tour: NDArray[np.int64],
+    pos: NDArray[np.int64],
+    succ_len: NDArray[np.float64],
+    dlb: NDArray[np.bool_],
+    i_eff: int,
+    j_eff: int,
+    d_ac: float,
+    d_bd: float,
+    reset_dlb: bool,
 ):
     """
-    Kruskal MST на sparse edge list. Union-Find с path compression.
+    2-opt (a,b),(c,d) → (a,c),(b,d) с обновлением pos, succ_len и DLB.
 
-    Returns:
-        mst_adj: int32[n, 2] — для каждой вершины до 2 MST-соседей (для 1-tree)
-                 Реально MST — дерево, но мы храним как adjacency list.
-        mst_parent: int64[n] — parent в MST (для LCA / bottleneck path)
-        mst_parent_weight: float64[n] — вес ребра к parent
-        n_edges_mst: int — кол-во рёбер в MST
+    Разворачивается более короткая сторона цикла: внутренний сегмент
+    [i_eff+1 .. j_eff] (b..c) или внешний [j_eff+1 .. i_eff] (d..a, через
+    wrap) — набор рёбер одинаковый. После разворота преемник s_m — бывший
+    предшественник s_{m-1}: succ_len[s_m] = старое succ_len[s_{m-1}]
+    (сдвиг с конца сегмента, O(seg)).
     """
-    ne = len(edges_from)
+    n = len(tour)
+    inner = j_eff - i_eff
+    if inner <= n - inner:
+        l = i_eff + 1
+        length = inner
+    else:
+        l = (j_eff + 1) % n
+        length = n - inner
+    pred = tour[(l - 1 + n) % n]
+    s0 = tour[l]
+
+    for m in range(length - 1, 0, -1):
+        succ_len[tour[(l + m) % n]] = succ_len[tour[(l + m - 1) % n]]
+    # Внутренний: pred=a, s0=b. Внешний: pred=c, s0=d.
+    succ_len[pred] = d_ac
+    succ_len[s0] = d_bd
+
+    lo = 0
+    hi = length - 1
+    while lo < hi:
+        p_lo = (l + lo) % n
+        p_hi = (l + hi) % n
+        tmp = tour[p_lo]
+        tour[p_lo] = tour[p_hi]
+        tour[p_hi] = tmp
+        lo += 1
+        hi -= 1
+    for m in range(length):
+        p = (l + m) % n
+        pos[tour[p]] = p
+        if reset_dlb:
+            dlb[tour[p]] = False
+    if reset_dlb:
+        dlb[pred] = False
+        dlb[tour[(l + length) % n]] = False
+
+
+@njit(cache=_CACHE)
+def two_opt_pass_nn_cached_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    nn_indices: NDArray[np.int32],
+    nn_dists: NDArray[np.float64],
+    succ_len: NDArray[np.float64],
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> bool:
+    """
+    2-opt проход (как two_opt_pass_nn_coords_jit) на cached edge costs. O(N*k).
 
-    # Сортировка рёбер по весу (indirect sort)
-    order = np.argsort(edges_weight)
+    d(a,c) = nn_dists[city, ki] (a, c — это city и его сосед в любом порядке),
+    удаляемые рёбра — succ_len[a] + succ_len[c]. Один sqrt на кандидата
+    (ребро b-d) и только если кандидат прошёл отсечку по d(a,c).
+    """
+    n = len(tour)
+    k = nn_indices.shape[1]
+    improved = False
+    no_dlb = np.zeros(0, dtype=np.bool_)
 
-    # Union-Find
-    parent = np.arange(n, dtype=np.int64)
-    rank = np.zeros(n, dtype=np.int64)
+    max_city = metric_n(coords)
+    pos = np.empty(max_city, dtype=np.int64)
+    for i in range(n):
+        pos[tour[i]] = i
 
-    # MST adjacency list: каждая вершина может иметь до degree N-1
-    # Храним как edge list
-    mst_from = np.empty(n - 1, dtype=np.int32)
-    mst_to = np.empty(n - 1, dtype=np.int32)
-    mst_weight = np.empty(n - 1, dtype=np.float64)
-    mst_count = 0
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
+    start = 0
+    if work is not None:
+        start = _work_begin(work)
+    for idx in range(start, n):
+        if work is not None:
+            if _work_take(work, idx, k):
+                if KERNEL_STATS and stats is not None:
+                    _stats_pass_done(stats, t_pass)
+                return improved
+        city_i = tour[idx]
+        idx_next = (idx + 1) % n
 
-    for idx in range(ne):
-        ei = order[idx]
-        u = edges_from[ei]
-        v = edges_to[ei]
-        w = edges_weight[ei]
-        if _uf_union(parent, rank, u, v):
-            mst_from[mst_count] = u
-            mst_to[mst_count] = v
-            mst_weight[mst_count] = w
-            mst_count += 1
-            if mst_count == n - 1:
+        for ki in range(k):
+            neighbor = nn_indices[city_i, ki]
+            if neighbor < 0:
                 break
+            j = pos[neighbor]
+            if j == idx or j == idx_next:
+                continue
 
-    # Построение parent-массива для LCA (BFS от вершины 0)
-    # adj list через массивы
-    adj_head = np.full(n, -1, dtype=np.int64)
-    adj_next = np.full(2 * mst_count, -1, dtype=np.int64)
-    adj_to_node = np.empty(2 * mst_count, dtype=np.int32)
-    adj_wt = np.empty(2 * mst_count, dtype=np.float64)
-    edge_idx = 0
-    for i in range(mst_count):
-        u = mst_from[i]
-        v = mst_to[i]
-        w = mst_weight[i]
-        # u -> v
-        adj_next[edge_idx] = adj_head[u]
-        adj_head[u] = edge_idx
-        adj_to_node[edge_idx] = v
-        adj_wt[edge_idx] = w
-        edge_idx += 1
-        # v -> u
-        adj_next[edge_idx] = adj_head[v]
-        adj_head[v] = edge_idx
-        adj_to_node[edge_idx] = u
-        adj_wt[edge_idx] = w
-        edge_idx += 1
+            i_eff = idx
+            j_eff = j
+            if i_eff > j_eff:
+                i_eff, j_eff = j_eff, i_eff
 
-    # BFS для parent tree
-    mst_parent = np.full(n, -1, dtype=np.int64)
-    mst_parent_weight = np.zeros(n, dtype=np.float64)
-    mst_depth = np.zeros(n, dtype=np.int64)
-    visited = np.zeros(n, dtype=np.bool_)
+            if j_eff == n - 1 and i_eff == 0:
+                continue
 
-    queue = np.empty(n, dtype=np.int64)
-    q_front = 0
-    q_back = 0
-    queue[q_back] = 0
-    q_back += 1
-    visited[0] = True
-    mst_parent[0] = 0
+            a = tour[i_eff]
+            c = tour[j_eff]
+            old_cost = succ_len[a] + succ_len[c]
+            d_ac = nn_dists[city_i, ki]
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_EVALS] += 1
+            if d_ac >= old_cost - 1e-10:
+                continue
 
-    while q_front < q_back:
-        u = queue[q_front]
-        q_front += 1
-        e = adj_head[u]
-        while e != -1:
-            v = adj_to_node[e]
-            w = adj_wt[e]
-            if not visited[v]:
-                visited[v] = True
-                mst_parent[v] = u
-                mst_parent_weight[v] = w
-                mst_depth[v] = mst_depth[u] + 1
-                queue[q_back] = v
-                q_back += 1
+            b = tour[i_eff + 1]
+            d_city = tour[(j_eff + 1) % n]
+            d_bd = dist_jit(coords, b, d_city)
+
+            if d_ac + d_bd < old_cost - 1e-10:
+                _apply_2opt_cached(
+                    tour, pos, succ_len, no_dlb, i_eff, j_eff, d_ac, d_bd, False,
+                )
+                improved = True
+                if work is not None:
+                    work[WORK_MOVES] += 1
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_MOVES_2OPT] += 1
+                    stats[STAT_REVERSAL_LEN] += min(j_eff - i_eff, n - j_eff + i_eff)
+                break
+
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
+    return improved
+
+
+@njit(cache=_CACHE)
+def two_opt_nn_cached_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    nn_indices: NDArray[np.int32],
+    nn_dists: NDArray[np.float64],
+    max_iterations: int = 50,
+    max_no_improve: int = 5,
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> int:
+    """Полный 2-opt цикл на cached edge costs. Returns число итераций."""
+    if work is None:
+        w = new_work_jit(WORK_UNLIMITED)
+    else:
+        w = work
+    succ_len = init_succ_len_jit(tour, coords)
+    for iteration in range(w[WORK_ITER], max_iterations):
+        _work_pass_start(w)
+        two_opt_pass_nn_cached_jit(tour, coords, nn_indices, nn_dists, succ_len, w, stats)
+        if _work_pass_end(w, iteration, max_no_improve):
+            return iteration + 1
+    return max_iterations
+
+
+@njit(cache=_CACHE)
+def lk_opt_pass_cached_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
+    nn_indices: NDArray[np.int32],
+    nn_dists: NDArray[np.float64],
+    dlb: NDArray[np.bool_],
+    succ_len: NDArray[np.float64],
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> bool:
+    """
+    LK-style 2-opt с DLB (как lk_opt_pass_dual_jit) на cached edge costs.
+
+    Distance-кандидаты берут d(a,c) из nn_dists; alpha-кандидаты (без таблицы
+    расстояний) считают его через dist_jit. Текущие рёбра — из succ_len.
+    """
+    n = len(tour)
+    k_a = alpha_indices.shape[1]
+    k = nn_indices.shape[1]
+    max_city = metric_n(coords)
+    improved = False
+
+    pos = np.empty(max_city, dtype=np.int64)
+    for i in range(n):
+        pos[tour[i]] = i
+
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
+    start = 0
+    if work is not None:
+        start = _work_begin(work)
+    for scan in range(start, n):
+        idx = scan
+        city_a = tour[idx]
+        if work is not None:
+            if _work_take(work, scan, 1 if dlb[city_a] else k_a + k):
+                if KERNEL_STATS and stats is not None:
+                    _stats_pass_done(stats, t_pass)
+                return improved
+        if dlb[city_a]:
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_DLB_SKIPS] += 1
+            continue
+
+        idx_b = (idx + 1) % n
+
+        found = False
+        for ci in range(k_a + k):
+            if ci < k_a:
+                city_c = alpha_indices[city_a, ci]
+                if city_c < 0:
+                    continue
+                d_ac = -1.0
+            else:
+                city_c = nn_indices[city_a, ci - k_a]
+                if city_c < 0:
+                    break
+                if k_a > 0 and _in_candidate_row(alpha_indices, city_a, city_c):
+                    continue
+                d_ac = nn_dists[city_a, ci - k_a]
+
+            idx_c = pos[city_c]
+            if idx_c == idx or idx_c == idx_b:
+                continue
+
+            i_eff = idx
+            j_eff = idx_c
+            if i_eff > j_eff:
+                i_eff, j_eff = j_eff, i_eff
+
+            if j_eff == n - 1 and i_eff == 0:
+                continue
+
+            a = tour[i_eff]
+            c = tour[j_eff]
+            old_cost = succ_len[a] + succ_len[c]
+            if d_ac < 0.0:
+                d_ac = dist_jit(coords, city_a, city_c)
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_EVALS] += 1
+            if d_ac >= old_cost - 1e-10:
+                continue
+
+            b = tour[i_eff + 1]
+            d_city = tour[(j_eff + 1) % n]
+            d_bd = dist_jit(coords, b, d_city)
+
+            if d_ac + d_bd < old_cost - 1e-10:
+                _apply_2opt_cached(
+                    tour, pos, succ_len, dlb, i_eff, j_eff, d_ac, d_bd, True,
+                )
+                improved = True
+                found = True
+                if work is not None:
+                    work[WORK_MOVES] += 1
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_MOVES_2OPT] += 1
+                    stats[STAT_REVERSAL_LEN] += min(j_eff - i_eff, n - j_eff + i_eff)
+                break
+
+        if not found:
+            dlb[city_a] = True
+
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
+    return improved
+
+
+@njit(cache=_CACHE)
+def lk_opt_cached_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
+    nn_indices: NDArray[np.int32],
+    nn_dists: NDArray[np.float64],
+    max_iterations: int,
+    max_no_improve: int,
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> int:
+    """
+    Полный LK-style 2-opt цикл с DLB на cached edge costs.
+
+    succ_len и DLB живут между проходами. alpha_indices ширины 0 →
+    single-list режим.
+
+    work: прерванный вызов продолжается с cursor прохода, но с чистыми DLB.
+
+    Returns: число выполненных итераций.
+    """
+    max_city = metric_n(coords)
+    dlb = np.zeros(max_city, dtype=np.bool_)
+    succ_len = init_succ_len_jit(tour, coords)
+    if work is None:
+        w = new_work_jit(WORK_UNLIMITED)
+    else:
+        w = work
+
+    for iteration in range(w[WORK_ITER], max_iterations):
+        _work_pass_start(w)
+        lk_opt_pass_cached_jit(
+            tour, coords, alpha_indices, nn_indices, nn_dists, dlb, succ_len, w, stats,
+        )
+        if _work_pass_end(w, iteration, max_no_improve):
+            return iteration + 1
+    return max_iterations
+
+
+@njit(cache=_CACHE)
+def or_opt_pass_cached_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    nn_indices: NDArray[np.int32],
+    nn_dists: NDArray[np.float64],
+    succ_len: NDArray[np.float64],
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> bool:
+    """
+    Or-opt проход (как or_opt_pass_coords_jit) на cached edge costs.
+
+    Удаляемые рёбра и текущее ребро вставки — из succ_len, ребро
+    target → seg_first — из nn_dists. Сегмент переносится без разворота,
+    поэтому после хода меняются ровно три succ_len (O(1)).
+    """
+    n = len(tour)
+    k = nn_indices.shape[1]
+    improved = False
+
+    max_city = metric_n(coords)
+    pos = np.empty(max_city, dtype=np.int64)
+    for i in range(n):
+        pos[tour[i]] = i
+
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
+    start = 0
+    if work is not None:
+        start = _work_begin(work)
+    for seg_len in (1, 2, 3):
+        if improved:
+            break
+        if start >= seg_len * n:
+            continue
+        for i in range(max(start - (seg_len - 1) * n, 0), n):
+            if work is not None:
+                if _work_take(work, (seg_len - 1) * n + i, k):
+                    if KERNEL_STATS and stats is not None:
+                        _stats_pass_done(stats, t_pass)
+                    return improved
+            prev_idx = (i - 1) % n
+            seg_end_idx = (i + seg_len - 1) % n
+            next_idx = (i + seg_len) % n
+
+            seg_first = tour[i]
+            seg_last = tour[seg_end_idx]
+            city_prev = tour[prev_idx]
+
+            remove_cost = succ_len[city_prev] + succ_len[seg_last]
+            bridge_cost = -1.0  # лениво: нужен только если вставка дешевле
+
+            for ki in range(k):
+                target = nn_indices[seg_first, ki]
+                if target < 0:
+                    break
+                j = pos[target]
+
+                skip = False
+                for s in range(seg_len + 2):
+                    check = (i - 1 + s) % n
+                    if j == check:
+                        skip = True
+                        break
+                if skip:
+                    continue
+
+                d_ins1 = nn_dists[seg_first, ki]
+                current_edge = succ_len[target]
+                # Нижняя оценка delta без двух sqrt: bridge ≥ 0, d_ins2 ≥ 0
+                if d_ins1 - current_edge - remove_cost >= -1e-10:
+                    continue
+
+                if bridge_cost < 0.0:
+                    bridge_cost = dist_jit(coords, city_prev, tour[next_idx])
+                j_next = (j + 1) % n
+                d_ins2 = dist_jit(coords, seg_last, tour[j_next])
+
+                delta = (bridge_cost - remove_cost) + (d_ins1 + d_ins2 - current_edge)
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_EVALS] += 1
+
+                if delta < -1e-10:
+                    seg = np.empty(seg_len, dtype=np.int64)
+                    for s in range(seg_len):
+                        seg[s] = tour[(i + s) % n]
+
+                    new_tour = np.empty(n, dtype=np.int64)
+                    write = 0
+                    inserted = False
+                    for t in range(n):
+                        in_seg = False
+                        for s in range(seg_len):
+                            if t == (i + s) % n:
+                                in_seg = True
+                                break
+                        if in_seg:
+                            continue
+
+                        new_tour[write] = tour[t]
+                        write += 1
+
+                        if tour[t] == target and not inserted:
+                            for s in range(seg_len):
+                                new_tour[write] = seg[s]
+                                write += 1
+                            inserted = True
+
+                    if write == n:
+                        succ_len[city_prev] = bridge_cost
+                        succ_len[target] = d_ins1
+                        succ_len[seg_last] = d_ins2
+                        for t in range(n):
+                            tour[t] = new_tour[t]
+                        for t in range(n):
+                            pos[tour[t]] = t
+                        improved = True
+                        if work is not None:
+                            work[WORK_MOVES] += 1
+                        if KERNEL_STATS and stats is not None:
+                            stats[STAT_MOVES_OR_OPT] += 1
+                            stats[STAT_REVERSAL_LEN] += n
+                        break
+
+            if improved:
+                break
+
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
+    return improved
+
+
+# ═══════════════════════════════════════════════════════════
+#  ALPHA-NEARNESS (1-tree subgradient)
+# ═══════════════════════════════════════════════════════════
+
+@njit(cache=True)
+def _uf_find(parent, i):
+    """Union-Find: find с path compression."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+@njit(cache=True)
+def _uf_union(parent, rank, a, b):
+    """Union-Find: union by rank. Возвращает True если merged."""
+    ra = _uf_find(parent, a)
+    rb = _uf_find(parent, b)
+    if ra == rb:
+        return False
+    if rank[ra] < rank[rb]:
+        parent[ra] = rb
+    elif rank[ra] > rank[rb]:
+        parent[rb] = ra
+    else:
+        parent[rb] = ra
+        rank[ra] += 1
+    return True
+
+
+@njit(cache=True)
+def sparse_kruskal_mst_jit(
+    n: int,
+    edges_from: NDArray[np.int32],
+    edges_to: NDArray[np.int32],
+    edges_weight: NDArray[np.float64],
+):
+    """
+    Kruskal MST на sparse edge list. Union-Find с path compression.
+
+    Returns:
+        mst_adj: int32[n, 2] — для каждой вершины до 2 MST-соседей (для 1-tree)
+                 Реально MST — дерево, но мы храним как adjacency list.
+        mst_parent: int64[n] — parent в MST (для LCA / bottleneck path)
+        mst_parent_weight: float64[n] — вес ребра к parent
+        n_edges_mst: int — кол-во рёбер в MST
+    """
+    ne = len(edges_from)
+
+    # Сортировка рёбер по весу (indirect sort)
+    order = np.argsort(edges_weight)
+
+    # Union-Find
+    parent = np.arange(n, dtype=np.int64)
+    rank = np.zeros(n, dtype=np.int64)
+
+    # MST adjacency list: каждая вершина может иметь до degree N-1
+    # Храним как edge list
+    mst_from = np.empty(n - 1, dtype=np.int32)
+    mst_to = np.empty(n - 1, dtype=np.int32)
+    mst_weight = np.empty(n - 1, dtype=np.float64)
+    mst_count = 0
+
+    for idx in range(ne):
+        ei = order[idx]
+        u = edges_from[ei]
+        v = edges_to[ei]
+        w = edges_weight[ei]
+        if _uf_union(parent, rank, u, v):
+            mst_from[mst_count] = u
+            mst_to[mst_count] = v
+            mst_weight[mst_count] = w
+            mst_count += 1
+            if mst_count == n - 1:
+                break
+
+    # Построение parent-массива для LCA (BFS от вершины 0)
+    # adj list через массивы
+    adj_head = np.full(n, -1, dtype=np.int64)
+    adj_next = np.full(2 * mst_count, -1, dtype=np.int64)
+    adj_to_node = np.empty(2 * mst_count, dtype=np.int32)
+    adj_wt = np.empty(2 * mst_count, dtype=np.float64)
+    edge_idx = 0
+    for i in range(mst_count):
+        u = mst_from[i]
+        v = mst_to[i]
+        w = mst_weight[i]
+        # u -> v
+        adj_next[edge_idx] = adj_head[u]
+        adj_head[u] = edge_idx
+        adj_to_node[edge_idx] = v
+        adj_wt[edge_idx] = w
+        edge_idx += 1
+        # v -> u
+        adj_next[edge_idx] = adj_head[v]
+        adj_head[v] = edge_idx
+        adj_to_node[edge_idx] = u
+        adj_wt[edge_idx] = w
+        edge_idx += 1
+
+    # BFS для parent tree
+    mst_parent = np.full(n, -1, dtype=np.int64)
+    mst_parent_weight = np.zeros(n, dtype=np.float64)
+    mst_depth = np.zeros(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=np.bool_)
+
+    queue = np.empty(n, dtype=np.int64)
+    q_front = 0
+    q_back = 0
+    queue[q_back] = 0
+    q_back += 1
+    visited[0] = True
+    mst_parent[0] = 0
+
+    while q_front < q_back:
+        u = queue[q_front]
+        q_front += 1
+        e = adj_head[u]
+        while e != -1:
+            v = adj_to_node[e]
+            w = adj_wt[e]
+            if not visited[v]:
+                visited[v] = True
+                mst_parent[v] = u
+                mst_parent_weight[v] = w
+                mst_depth[v] = mst_depth[u] + 1
+                queue[q_back] = v
+                q_back += 1
             e = adj_next[e]
 
     return mst_parent, mst_parent_weight, mst_depth, mst_count
 
 
 @njit(cache=True)
-def _bottleneck_on_path(u, v, mst_parent, mst_parent_weight, mst_depth):
-    """Max edge weight на пути u→v в MST (через LCA)."""
-    max_w = 0.0
-    # Выравниваем глубины
-    while mst_depth[u] > mst_depth[v]:
-        w = mst_parent_weight[u]
-        if w > max_w:
-            max_w = w
-        u = mst_parent[u]
-    while mst_depth[v] > mst_depth[u]:
-        w = mst_parent_weight[v]
-        if w > max_w:
-            max_w = w
-        v = mst_parent[v]
-    # Поднимаемся до LCA
-    while u != v:
-        wu = mst_parent_weight[u]
-        wv = mst_parent_weight[v]
-        if wu > max_w:
-            max_w = wu
-        if wv > max_w:
-            max_w = wv
-        u = mst_parent[u]
-        v = mst_parent[v]
-    return max_w
+def build_candidate_csr_jit(
+    n: int,
+    knn_indices: NDArray[np.int32],
+    knn_dists: NDArray[np.float64],
+):
+    """
+    Симметричный CSR-граф кандидатов из k-NN списков.
+
+    Каждое неориентированное ребро (i, j) присутствует ровно один раз в строке i
+    и один раз в строке j (дубликаты i∈knn(j) ∧ j∈knn(i) схлопываются).
+    Отрицательные индексы (хвост augmented-списков) игнорируются.
+
+    Returns:
+        indptr: int64[n+1], adj: int32[nnz], w: float64[nnz]
+    """
+    k = knn_indices.shape[1]
+    deg = np.zeros(n + 1, dtype=np.int64)
+    for i in range(n):
+        for ki in range(k):
+            j = knn_indices[i, ki]
+            if j < 0:
+                break
+            deg[i] += 1
+            # Обратное ребро добавляем только если i ∉ knn(j)
+            mutual = False
+            for kj in range(k):
+                jj = knn_indices[j, kj]
+                if jj < 0:
+                    break
+                if jj == i:
+                    mutual = True
+                    break
+            if not mutual:
+                deg[j] += 1
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    for i in range(n):
+        indptr[i + 1] = indptr[i] + deg[i]
+    fill = indptr[:n].copy()
+    adj = np.empty(indptr[n], dtype=np.int32)
+    w = np.empty(indptr[n], dtype=np.float64)
+
+    for i in range(n):
+        for ki in range(k):
+            j = knn_indices[i, ki]
+            if j < 0:
+                break
+            d = knn_dists[i, ki]
+            adj[fill[i]] = j
+            w[fill[i]] = d
+            fill[i] += 1
+            mutual = False
+            for kj in range(k):
+                jj = knn_indices[j, kj]
+                if jj < 0:
+                    break
+                if jj == i:
+                    mutual = True
+                    break
+            if not mutual:
+                adj[fill[j]] = np.int32(i)
+                w[fill[j]] = d
+                fill[j] += 1
+
+    return indptr, adj, w
+
+
+@njit(cache=True)
+def _heap_sift_up(heap, pos, key, i, v):
+    """Indexed binary heap: поднять вершину v с позиции i (decrease-key)."""
+    kv = key[v]
+    while i > 0:
+        p = (i - 1) >> 1
+        hp = heap[p]
+        if key[hp] <= kv:
+            break
+        heap[i] = hp
+        pos[hp] = i
+        i = p
+    heap[i] = v
+    pos[v] = i
+
+
+@njit(cache=True)
+def _heap_pop_min(heap, pos, key, size):
+    """Indexed binary heap: извлечь минимум. Возвращает (vertex, new_size)."""
+    top = heap[0]
+    size -= 1
+    if size > 0:
+        last = heap[size]
+        kl = key[last]
+        i = 0
+        while True:
+            c = 2 * i + 1
+            if c >= size:
+                break
+            if c + 1 < size and key[heap[c + 1]] < key[heap[c]]:
+                c += 1
+            if key[heap[c]] >= kl:
+                break
+            heap[i] = heap[c]
+            pos[heap[i]] = i
+            i = c
+        heap[i] = last
+        pos[last] = i
+    return top, size
+
+
+@njit(cache=True)
+def sparse_prim_mst_jit(
+    n: int,
+    indptr: NDArray[np.int64],
+    adj: NDArray[np.int32],
+    w_base: NDArray[np.float64],
+    pi: NDArray[np.float64],
+):
+    """
+    Prim MST на CSR-графе кандидатов с весами w_base[e] + pi[u] + pi[v].
+
+    Indexed binary heap с decrease-key (размер ≤ n): O(E log V), без сортировки
+    всех рёбер на каждой субградиентной итерации (в отличие от Kruskal).
+    Несвязный граф → лес: корень каждой компоненты имеет parent[root] = root.
+
+    Returns:
+        mst_parent: int64[n], mst_parent_weight: float64[n],
+        order: int64[n] — порядок добавления (parent всегда раньше child)
+    """
+    key = np.full(n, np.inf)
+    mst_parent = np.full(n, -1, dtype=np.int64)
+    state = np.zeros(n, dtype=np.int8)  # 0 = не видели, 1 = в heap, 2 = в дереве
+    pos = np.zeros(n, dtype=np.int64)
+    heap = np.empty(n, dtype=np.int64)
+    order = np.empty(n, dtype=np.int64)
+    size = 0
+    cnt = 0
+
+    for root in range(n):
+        if state[root] == 2:
+            continue
+        key[root] = 0.0
+        mst_parent[root] = root
+        state[root] = 1
+        heap[0] = root
+        pos[root] = 0
+        size = 1
+        while size > 0:
+            u, size = _heap_pop_min(heap, pos, key, size)
+            state[u] = 2
+            order[cnt] = u
+            cnt += 1
+            pu = pi[u]
+            for e in range(indptr[u], indptr[u + 1]):
+                v = adj[e]
+                if state[v] == 2:
+                    continue
+                wv = w_base[e] + pu + pi[v]
+                if wv < key[v]:
+                    key[v] = wv
+                    mst_parent[v] = u
+                    if state[v] == 0:
+                        state[v] = 1
+                        size += 1
+                        _heap_sift_up(heap, pos, key, size - 1, v)
+                    else:
+                        _heap_sift_up(heap, pos, key, pos[v], v)
+
+    # key[v] = вес ребра (parent[v], v) в D_pi; для корней 0
+    return mst_parent, key, order
+
+
+@njit(cache=True)
+def build_bottleneck_table_jit(
+    mst_parent: NDArray[np.int64],
+    mst_parent_weight: NDArray[np.float64],
+    order: NDArray[np.int64],
+):
+    """
+    Binary lifting таблица для max-edge запросов на MST (лесе).
+
+    up[v, j] — предок v на 2^j уровней выше, mx[v, j] — max вес ребра на этом
+    участке. Layout [n, LOG]: один запрос читает одну-две строки (cache-friendly).
+
+    Returns:
+        depth: int64[n], up: int32[n, LOG], mx: float64[n, LOG]
+    """
+    n = mst_parent.shape[0]
+    log = 1
+    while (1 << log) < n:
+        log += 1
+    depth = np.zeros(n, dtype=np.int64)
+    up = np.empty((n, log), dtype=np.int32)
+    mx = np.zeros((n, log), dtype=np.float64)
+
+    # order гарантирует: parent обработан раньше child
+    for idx in range(n):
+        v = order[idx]
+        p = mst_parent[v]
+        up[v, 0] = np.int32(p)
+        if p != v:
+            mx[v, 0] = mst_parent_weight[v]
+            depth[v] = depth[p] + 1
+
+    for j in range(1, log):
+        for v in range(n):
+            mid = up[v, j - 1]
+            up[v, j] = up[mid, j - 1]
+            a = mx[v, j - 1]
+            b = mx[mid, j - 1]
+            mx[v, j] = a if a > b else b
+
+    return depth, up, mx
+
+
+@njit(cache=True)
+def bottleneck_query_jit(u, v, depth, up, mx):
+    """Max edge weight на пути u→v в MST за O(log n) (binary lifting LCA)."""
+    best = 0.0
+    if depth[u] < depth[v]:
+        u, v = v, u
+    diff = depth[u] - depth[v]
+    j = 0
+    while diff > 0:
+        if diff & 1:
+            if mx[u, j] > best:
+                best = mx[u, j]
+            u = up[u, j]
+        diff >>= 1
+        j += 1
+    if u == v:
+        return best
+    for j in range(up.shape[1] - 1, -1, -1):
+        if up[u, j] != up[v, j]:
+            if mx[u, j] > best:
+                best = mx[u, j]
+            if mx[v, j] > best:
+                best = mx[v, j]
+            u = up[u, j]
+            v = up[v, j]
+    if mx[u, 0] > best:
+        best = mx[u, 0]
+    if mx[v, 0] > best:
+        best = mx[v, 0]
+    return best
 
 
 @njit(cache=True)
@@ -898,45 +2021,30 @@ def subgradient_alpha_jit(
     2. Итеративно: MST на D_pi → степени вершин → pi += step*(degree-2)
     3. alpha[i][j] = D_pi[i][j] - bottleneck_path(i,j) на MST
 
+    MST: Prim на симметричном CSR-графе (граф строится один раз, сортировки
+    рёбер на итерации нет). Bottleneck: binary lifting, O(log n) на запрос
+    вместо O(depth) подъёма по parent-цепочке.
+
     Returns:
         alpha: float64[n, k] — alpha-value для каждого k-NN ребра
         pi: float64[n] — финальные Lagrangian multipliers
+        mst_parent: int64[n] — финальный MST (лес) на D_pi, parent[root] = root
     """
     k = knn_indices.shape[1]
-    n_edges = n * k
-
-    # Массивы рёбер (sparse k-NN graph)
-    edges_from = np.empty(n_edges, dtype=np.int32)
-    edges_to = np.empty(n_edges, dtype=np.int32)
-    edges_base_weight = np.empty(n_edges, dtype=np.float64)
-    edges_pi_weight = np.empty(n_edges, dtype=np.float64)
-
-    idx = 0
-    for i in range(n):
-        for ki in range(k):
-            edges_from[idx] = np.int32(i)
-            edges_to[idx] = knn_indices[i, ki]
-            edges_base_weight[idx] = knn_dists[i, ki]
-            idx += 1
+    indptr, adj, w_base = build_candidate_csr_jit(n, knn_indices, knn_dists)
 
     pi = np.zeros(n, dtype=np.float64)
     best_lb = -1e18  # лучшая нижняя граница
+    degree = np.zeros(n, dtype=np.int64)
 
     # Субградиентная оптимизация
     for it in range(n_iters):
-        # Пересчёт D_pi для всех k-NN рёбер
-        for e in range(n_edges):
-            u = edges_from[e]
-            v = edges_to[e]
-            edges_pi_weight[e] = edges_base_weight[e] + pi[u] + pi[v]
-
-        # MST на D_pi графе
-        mst_parent, mst_parent_weight, mst_depth, mst_n = sparse_kruskal_mst_jit(
-            n, edges_from, edges_to, edges_pi_weight,
+        mst_parent, mst_parent_weight, _ = sparse_prim_mst_jit(
+            n, indptr, adj, w_base, pi,
         )
 
         # Степени вершин в MST
-        degree = np.zeros(n, dtype=np.int64)
+        degree[:] = 0
         for i in range(n):
             p = mst_parent[i]
             if p != i:  # не корень
@@ -973,27 +2081,24 @@ def subgradient_alpha_jit(
             g = float(degree[i]) - 2.0
             pi[i] += step * g
 
-    # Финальные D_pi
-    for e in range(n_edges):
-        u = edges_from[e]
-        v = edges_to[e]
-        edges_pi_weight[e] = edges_base_weight[e] + pi[u] + pi[v]
-
     # Финальный MST для alpha вычисления
-    mst_parent, mst_parent_weight, mst_depth, _ = sparse_kruskal_mst_jit(
-        n, edges_from, edges_to, edges_pi_weight,
+    mst_parent, mst_parent_weight, order = sparse_prim_mst_jit(
+        n, indptr, adj, w_base, pi,
     )
+    depth, up, mx = build_bottleneck_table_jit(mst_parent, mst_parent_weight, order)
 
     # Alpha-values: alpha[i][ki] = D_pi(i, knn[i][ki]) - bottleneck(i, knn[i][ki])
-    alpha = np.empty((n, k), dtype=np.float64)
+    alpha = np.full((n, k), np.inf)
     for i in range(n):
         for ki in range(k):
             j = knn_indices[i, ki]
+            if j < 0:
+                break
             d_pi = knn_dists[i, ki] + pi[i] + pi[j]
-            btl = _bottleneck_on_path(i, j, mst_parent, mst_parent_weight, mst_depth)
+            btl = bottleneck_query_jit(i, j, depth, up, mx)
             alpha[i, ki] = max(0.0, d_pi - btl)
 
-    return alpha, pi
+    return alpha, pi, mst_parent
 
 
 @njit(cache=True)
@@ -1076,9 +2181,7 @@ def augment_knn_by_alpha_jit(
                     already = True
                     break
             if not already and extra_col < new_k:
-                dx = coords[i, 0] - coords[p, 0]
-                dy = coords[i, 1] - coords[p, 1]
-                d = np.sqrt(dx * dx + dy * dy)
+                d = dist_jit(coords, i, p)
                 new_indices[i, extra_col] = np.int32(p)
                 new_dists[i, extra_col] = d
                 extra_col += 1
@@ -1116,9 +2219,7 @@ def augment_knn_by_alpha_jit(
                     slot = j
                     break
             if slot >= 0:
-                dx = coords[p, 0] - coords[child, 0]
-                dy = coords[p, 1] - coords[child, 1]
-                d = np.sqrt(dx * dx + dy * dy)
+                d = dist_jit(coords, p, child)
                 new_indices[p, slot] = np.int32(child)
                 new_dists[p, slot] = d
 
@@ -1126,16 +2227,254 @@ def augment_knn_by_alpha_jit(
 
 
 # ═══════════════════════════════════════════════════════════
-#  SEQUENTIAL LK (Real Lin-Kernighan, depth 2-3)
+#  HELD-KARP LOWER BOUND (certified)
 # ═══════════════════════════════════════════════════════════
+#
+# best_lb из subgradient_alpha_jit — MST только на k-NN графе. Он НЕ является
+# нижней границей: MST разреженного графа ≥ MST полного графа. Чтобы граница
+# была валидной для полного евклидова графа, добавляем "hub star":
+#
+#   r_i = расстояние до k-го соседа, s_i = r_i / 2 + pi_i.
+#   Ребро (i, j) вне k-NN графа: j ∉ knn(i) и i ∉ knn(j) ⇒ d_ij ≥ max(r_i, r_j),
+#   значит d_ij + pi_i + pi_j ≥ s_i + s_j.
+#
+# Заменяем все не-графовые рёбра их нижней оценкой s_i + s_j. MST такого полного
+# графа = MST(k-NN граф ∪ звезда из hub = argmin s с весами s_i + s_hub): любое
+# ребро (i, j) с весом s_i + s_j — максимальное на цикле i-hub-j.
+#
+# Граница — 1-tree, а не MST: MST на вершинах без special-вершины 0 плюс два
+# самых дешёвых её ребра (вне графа — оценка s_0 + s_hub). Тур — частный случай
+# 1-tree при любых pi, поэтому
+#   L(pi) = 1-tree_hub(pi) - 2 * sum(pi) ≤ длина любого тура (Held-Karp).
+# Голый MST так не ограничен: тур минус ребро ≥ MST только при неотрицательном
+# весе ребра в D_pi, а при отрицательных pi L(pi) может превысить оптимум.
+# Требование: строка knn — точные k ближайших (build_knn; rerank по alpha
+# допустим), НЕ augmented — лишние рёбра завышают r_i.
+
 
 @njit(cache=True)
-def lk_sequential_pass_jit(
+def sparse_prim_hub_mst_jit(
+    n: int,
+    indptr: NDArray[np.int64],
+    adj: NDArray[np.int32],
+    w_base: NDArray[np.float64],
+    pi: NDArray[np.float64],
+    s: NDArray[np.float64],
+    hub: int,
+    skip: int,
+):
+    """
+    Prim MST на CSR-графе (веса w_base[e] + pi[u] + pi[v]) ∪ звезда из hub
+    (веса s[v] + s[hub]) без вершины skip (-1 — по всем вершинам; hub ≠ skip).
+    Граф всегда связен → одно дерево с корнем root = 0 (1, если skip = 0).
+
+    Звезда не материализуется: hub релаксирует всех при извлечении (O(n) один
+    раз), остальные вершины релаксируют ребро к hub за O(1).
+
+    Returns:
+        mst_parent: int64[n] (parent[root] = root, parent[skip] = -1),
+        mst_parent_weight: float64[n]
+    """
+    key = np.full(n, np.inf)
+    mst_parent = np.full(n, -1, dtype=np.int64)
+    state = np.zeros(n, dtype=np.int8)  # 0 = не видели, 1 = в heap, 2 = в дереве
+    pos = np.zeros(n, dtype=np.int64)
+    heap = np.empty(n, dtype=np.int64)
+    s_hub = s[hub]
+
+    root = 0
+    if skip == 0:
+        root = 1
+    if skip >= 0:
+        state[skip] = 2  # вне дерева: не извлекается и не релаксируется
+    key[root] = 0.0
+    mst_parent[root] = root
+    state[root] = 1
+    heap[0] = root
+    pos[root] = 0
+    size = 1
+    while size > 0:
+        u, size = _heap_pop_min(heap, pos, key, size)
+        state[u] = 2
+        pu = pi[u]
+        for e in range(indptr[u], indptr[u + 1]):
+            v = adj[e]
+            if state[v] == 2:
+                continue
+            wv = w_base[e] + pu + pi[v]
+            if wv < key[v]:
+                key[v] = wv
+                mst_parent[v] = u
+                if state[v] == 0:
+                    state[v] = 1
+                    size += 1
+                    _heap_sift_up(heap, pos, key, size - 1, v)
+                else:
+                    _heap_sift_up(heap, pos, key, pos[v], v)
+        # Рёбра звезды
+        if u == hub:
+            for v in range(n):
+                if state[v] == 2:
+                    continue
+                wv = s[v] + s_hub
+                if wv < key[v]:
+                    key[v] = wv
+                    mst_parent[v] = u
+                    if state[v] == 0:
+                        state[v] = 1
+                        size += 1
+                        _heap_sift_up(heap, pos, key, size - 1, v)
+                    else:
+                        _heap_sift_up(heap, pos, key, pos[v], v)
+        elif state[hub] != 2:
+            wv = s[u] + s_hub
+            if wv < key[hub]:
+                key[hub] = wv
+                mst_parent[hub] = u
+                if state[hub] == 0:
+                    state[hub] = 1
+                    size += 1
+                    _heap_sift_up(heap, pos, key, size - 1, hub)
+                else:
+                    _heap_sift_up(heap, pos, key, pos[hub], hub)
+
+    return mst_parent, key
+
+
+@njit(cache=True)
+def held_karp_bound_jit(
+    n: int,
+    knn_indices: NDArray[np.int32],
+    knn_dists: NDArray[np.float64],
+    n_iters: int = 100,
+):
+    """
+    Сертифицированная нижняя граница Held-Karp для евклидова TSP.
+
+    Субградиент по pi на 1-tree(k-NN ∪ hub star) со special-вершиной 0 —
+    каждое L(pi) валидно для полного графа (см. комментарий секции). Шаг Polyak:
+        t = lam * (1.05 * best_lb - L(pi)) / ||deg - 2||²,
+    lam = 1.0, делится пополам после 5 итераций без улучшения L. Target от
+    верхней границы (длина тура) здесь хуже: NN-тур на +25% даёт слишком
+    длинные шаги, и за 100 итераций граница остаётся на 3-4% ниже.
+
+    Returns:
+        best_lb: float — max_pi L(pi) за n_iters итераций
+        best_pi: float64[n] — pi, на котором достигнут best_lb
+    """
+    if n < 3:
+        return 0.0, np.zeros(n, dtype=np.float64)
+
+    k = knn_indices.shape[1]
+    indptr, adj, w_base = build_candidate_csr_jit(n, knn_indices, knn_dists)
+    # Есть ли у special-вершины 0 рёбра вне графа (оценка снизу s_0 + s_hub)
+    has_outside = indptr[1] - indptr[0] < n - 1
+
+    # r_i: расстояние до k-го соседа (max по строке — порядок строки не важен)
+    r = np.zeros(n, dtype=np.float64)
+    for i in range(n):
+        for ki in range(k):
+            if knn_indices[i, ki] < 0:
+                break
+            if knn_dists[i, ki] > r[i]:
+                r[i] = knn_dists[i, ki]
+
+    pi = np.zeros(n, dtype=np.float64)
+    best_pi = pi.copy()
+    best_lb = -np.inf
+    s = np.empty(n, dtype=np.float64)
+    degree = np.zeros(n, dtype=np.int64)
+    lam = 1.0
+    no_improve = 0
+
+    for it in range(n_iters):
+        for i in range(n):
+            s[i] = 0.5 * r[i] + pi[i]
+        hub = 1
+        for i in range(2, n):
+            if s[i] < s[hub]:
+                hub = i
+
+        mst_parent, mst_parent_weight = sparse_prim_hub_mst_jit(
+            n, indptr, adj, w_base, pi, s, hub, 0,
+        )
+
+        degree[:] = 0
+        mst_cost = 0.0
+        pi_sum = pi[0]
+        for i in range(1, n):
+            pi_sum += pi[i]
+            p = mst_parent[i]
+            if p != i:
+                degree[i] += 1
+                degree[p] += 1
+                mst_cost += mst_parent_weight[i]
+
+        # Два самых дешёвых ребра вершины 0 в D_pi; ребро вне графа → hub
+        w1 = np.inf
+        w2 = np.inf
+        v1 = -1
+        v2 = -1
+        if has_outside:
+            w1 = s[0] + s[hub]
+            w2 = w1
+            v1 = hub
+            v2 = hub
+        p0 = pi[0]
+        for e in range(indptr[0], indptr[1]):
+            v = adj[e]
+            wv = w_base[e] + p0 + pi[v]
+            if wv < w1:
+                w2 = w1
+                v2 = v1
+                w1 = wv
+                v1 = v
+            elif wv < w2:
+                w2 = wv
+                v2 = v
+        degree[0] = 2
+        degree[v1] += 1
+        degree[v2] += 1
+        lb = mst_cost + w1 + w2 - 2.0 * pi_sum
+
+        if it == 0 or lb > best_lb + 1e-9 * abs(best_lb):
+            best_lb = lb
+            best_pi[:] = pi
+            no_improve = 0
+        else:
+            no_improve += 1
+            if no_improve >= 5:
+                lam *= 0.5
+                no_improve = 0
+
+        grad_norm_sq = 0.0
+        for i in range(n):
+            g = float(degree[i]) - 2.0
+            grad_norm_sq += g * g
+        if grad_norm_sq < 1e-12:
+            break  # 1-tree — гамильтонов цикл, дальше не улучшить
+
+        step = lam * max(1.05 * best_lb - lb, 1e-9 * abs(lb)) / grad_norm_sq
+        for i in range(n):
+            pi[i] += step * (float(degree[i]) - 2.0)
+
+    return best_lb, best_pi
+
+
+# ═══════════════════════════════════════════════════════════
+#  SEQUENTIAL LK (Real Lin-Kernighan, depth 2-3)
+# ═══════════════════════════════════════════════════════════
+
+@njit(cache=_CACHE)
+def lk_sequential_pass_dual_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
     nn_indices: NDArray[np.int32],
     dlb: NDArray[np.bool_],
     max_depth: int = 3,
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> bool:
     """
     Real Lin-Kernighan sequential exchange с positive gain criterion.
@@ -1143,15 +2482,23 @@ def lk_sequential_pass_jit(
     Depth 1 = 2-opt (с DLB, как lk_opt_pass но ищет кандидатов t2).
     Depth 2 = sequential 3-opt: после первого обмена продолжаем цепочку.
 
+    Dual candidate lists: первый ход (depth 1) берёт кандидатов только из
+    alpha-списка, продолжение цепочки (depth 2+) — из distance-списка.
+    alpha_indices ширины 0 → single-list LK (depth 1 по k_use ближайшим).
+
     Безопасная application: на каждом уровне проверяем gain на copy тура,
     применяем только если тур реально короче.
 
+    work: единица — оценка кандидата (город с DLB — 1); прерванный проход
+    продолжается с cursor (см. WORK BUDGET).
+
     Модифицирует tour и dlb IN-PLACE.
     Returns: True если хотя бы одно улучшение найдено.
     """
     n = len(tour)
     k = nn_indices.shape[1]
-    max_city = coords.shape[0]
+    k_a = alpha_indices.shape[1]
+    max_city = metric_n(coords)
     improved = False
 
     pos = np.empty(max_city, dtype=np.int64)
@@ -1159,10 +2506,26 @@ def lk_sequential_pass_jit(
         pos[tour[i]] = i
 
     k_use = min(k, 7)
+    k_first = k_a if k_a > 0 else k_use  # кандидаты первого хода
+    city_units = 4 * k_first + (max_depth - 1) * k_use
 
-    for scan_start in range(n):
+    t_pass = 0
+    if KERNEL_STATS and stats is not None:
+        t_pass = _stats_clock()
+
+    start = 0
+    if work is not None:
+        start = _work_begin(work)
+    for scan_start in range(start, n):
         t1 = tour[scan_start]
+        if work is not None:
+            if _work_take(work, scan_start, 1 if dlb[t1] else city_units):
+                if KERNEL_STATS and stats is not None:
+                    _stats_pass_done(stats, t_pass)
+                return improved
         if dlb[t1]:
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_DLB_SKIPS] += 1
             continue
 
         found = False
@@ -1183,8 +2546,8 @@ def lk_sequential_pass_jit(
             d_x1 = dist_jit(coords, t1, t2)  # cost of removed edge (t1,t2)
 
             # Depth 1: стандартный 2-opt через кандидатов t2
-            for ki in range(k_use):
-                t3 = nn_indices[t2, ki]
+            for ci in range(k_first):
+                t3 = alpha_indices[t2, ci] if k_a > 0 else nn_indices[t2, ci]
                 if t3 < 0 or t3 == t1 or t3 == t2:
                     continue
 
@@ -1210,6 +2573,8 @@ def lk_sequential_pass_jit(
                 old_cost = dist_jit(coords, a, b) + dist_jit(coords, c, d_city)
                 new_cost = dist_jit(coords, a, c) + dist_jit(coords, b, d_city)
                 gain = old_cost - new_cost
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_EVALS] += 1
 
                 if gain > best_gain:
                     best_gain = gain
@@ -1217,8 +2582,8 @@ def lk_sequential_pass_jit(
                     best_j = j_eff
 
             # Depth 1: также кандидаты t1 (стандартный 2-opt)
-            for ki in range(k_use):
-                t3 = nn_indices[t1, ki]
+            for ci in range(k_first):
+                t3 = alpha_indices[t1, ci] if k_a > 0 else nn_indices[t1, ci]
                 if t3 < 0 or t3 == t1 or t3 == t2:
                     continue
 
@@ -1237,6 +2602,8 @@ def lk_sequential_pass_jit(
                 old_cost = dist_jit(coords, a, b) + dist_jit(coords, c, d_city)
                 new_cost = dist_jit(coords, a, c) + dist_jit(coords, b, d_city)
                 gain = old_cost - new_cost
+                if KERNEL_STATS and stats is not None:
+                    stats[STAT_EVALS] += 1
 
                 if gain > best_gain:
                     best_gain = gain
@@ -1262,6 +2629,11 @@ def lk_sequential_pass_jit(
 
             improved = True
             found = True
+            if work is not None:
+                work[WORK_MOVES] += 1
+            if KERNEL_STATS and stats is not None:
+                stats[STAT_MOVES_LK] += 1
+                stats[STAT_REVERSAL_LEN] += best_j - best_i
 
             # === Depth 2+: после успешного 2-opt, пробуем продолжить цепочку ===
             if max_depth >= 2:
@@ -1291,6 +2663,8 @@ def lk_sequential_pass_jit(
                         oc = dist_jit(coords, a2, b2) + dist_jit(coords, c2, d2)
                         nc = dist_jit(coords, a2, c2) + dist_jit(coords, b2, d2)
                         eg = oc - nc
+                        if KERNEL_STATS and stats is not None:
+                            stats[STAT_EVALS] += 1
                         if eg > best_eg:
                             best_eg = eg
                             best_ei = ie
@@ -1314,16 +2688,76 @@ def lk_sequential_pass_jit(
                         new_b = tour[best_ei + 1]
                         p_nb = best_ei + 1
                         extra_found = True
+                        if work is not None:
+                            work[WORK_MOVES] += 1
+                        if KERNEL_STATS and stats is not None:
+                            stats[STAT_MOVES_LK_DEEP] += 1
+                            stats[STAT_REVERSAL_LEN] += best_ej - best_ei
                     else:
                         break
 
         if not found:
             dlb[t1] = True
 
+    if KERNEL_STATS and stats is not None:
+        _stats_pass_done(stats, t_pass)
     return improved
 
 
-@njit(cache=True)
+@njit(cache=_CACHE)
+def lk_sequential_dual_coords_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
+    nn_indices: NDArray[np.int32],
+    max_iterations: int,
+    max_no_improve: int,
+    max_depth: int = 3,
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> int:
+    """
+    Real sequential LK с DLB, multi-pass, dual candidate lists.
+
+    work: прерванный вызов продолжается с cursor прохода, но с чистыми DLB
+    (как lk_opt_cached_jit).
+
+    Returns: число выполненных итераций.
+    """
+    max_city = metric_n(coords)
+    dlb = np.zeros(max_city, dtype=np.bool_)
+    if work is None:
+        w = new_work_jit(WORK_UNLIMITED)
+    else:
+        w = work
+
+    for iteration in range(w[WORK_ITER], max_iterations):
+        _work_pass_start(w)
+        lk_sequential_pass_dual_jit(
+            tour, coords, alpha_indices, nn_indices, dlb, max_depth, w, stats,
+        )
+        if _work_pass_end(w, iteration, max_no_improve):
+            return iteration + 1
+    return max_iterations
+
+
+@njit(cache=_CACHE)
+def lk_sequential_pass_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    nn_indices: NDArray[np.int32],
+    dlb: NDArray[np.bool_],
+    max_depth: int = 3,
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
+) -> bool:
+    """Sequential LK pass на одном distance-списке (см. lk_sequential_pass_dual_jit)."""
+    return lk_sequential_pass_dual_jit(
+        tour, coords, nn_indices[:, :0], nn_indices, dlb, max_depth, work, stats,
+    )
+
+
+@njit(cache=_CACHE)
 def lk_sequential_coords_jit(
     tour: NDArray[np.int64],
     coords: NDArray[np.float64],
@@ -1331,26 +2765,218 @@ def lk_sequential_coords_jit(
     max_iterations: int,
     max_no_improve: int,
     max_depth: int = 3,
+    work: Optional[NDArray[np.int64]] = None,
+    stats: Optional[NDArray[np.int64]] = None,
 ) -> int:
     """
     Real sequential LK с DLB, multi-pass.
 
     Returns: число выполненных итераций.
     """
-    max_city = coords.shape[0]
-    dlb = np.zeros(max_city, dtype=np.bool_)
+    return lk_sequential_dual_coords_jit(
+        tour, coords, nn_indices[:, :0], nn_indices,
+        max_iterations, max_no_improve, max_depth, work, stats,
+    )
+
+
+# ═══════════════════════════════════════════════════════════
+#  INCREMENTAL (cheapest insertion + dirty-region LK)
+# ═══════════════════════════════════════════════════════════
+#
+# Для resolve(): тур после небольшого изменения набора городов.
+# Вставка — через двусвязный список succ/pred по id города, кандидатные
+# рёбра — (a, succ a) и (pred a, a) для a ∈ knn(c), уже стоящих в туре.
+# Локальный поиск — LK-DLB на cached edge costs, где DLB изначально
+# выставлены везде, кроме «грязных» городов: проход по остальному туру
+# стоит O(1) на город, и поиск расползается только вслед за улучшениями.
+
+@njit(cache=True)
+def cheapest_insertion_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    nn_indices: NDArray[np.int32],
+    new_cities: NDArray[np.int64],
+) -> NDArray[np.int64]:
+    """
+    Вставить new_cities в tour (по одному, в заданном порядке) на самое
+    дешёвое ребро среди k-NN кандидатов.
+
+    Если ни один сосед c ещё не в туре — вставка рядом с ближайшим городом
+    тура (линейный поиск, O(N); на практике только для изолированных точек).
+
+    Returns: новый тур длины len(tour) + len(new_cities).
+    """
+    n = len(tour)
+    m = len(new_cities)
+    max_city = metric_n(coords)
+    k = nn_indices.shape[1]
+
+    succ = np.full(max_city, -1, dtype=np.int64)
+    pred = np.full(max_city, -1, dtype=np.int64)
+    in_tour = np.zeros(max_city, dtype=np.bool_)
+    for i in range(n):
+        a = tour[i]
+        b = tour[(i + 1) % n]
+        succ[a] = b
+        pred[b] = a
+        in_tour[a] = True
+    size = n
+    start = tour[0] if n > 0 else -1
+
+    for t in range(m):
+        c = new_cities[t]
+        if size == 0:
+            succ[c] = c
+            pred[c] = c
+            in_tour[c] = True
+            start = c
+            size = 1
+            continue
+
+        best_cost = np.inf
+        best_a = -1
+        for j in range(k):
+            a = nn_indices[c, j]
+            if a < 0 or not in_tour[a]:
+                continue
+            d_ca = dist_jit(coords, c, a)
+            # (a, succ a)
+            b = succ[a]
+            cost = d_ca + dist_jit(coords, c, b) - dist_jit(coords, a, b)
+            if cost < best_cost:
+                best_cost = cost
+                best_a = a
+            # (pred a, a)
+            p = pred[a]
+            cost = d_ca + dist_jit(coords, c, p) - dist_jit(coords, p, a)
+            if cost < best_cost:
+                best_cost = cost
+                best_a = p
+
+        if best_a < 0:
+            best_d = np.inf
+            a = start
+            for _ in range(size):
+                d = dist_jit(coords, c, a)
+                if d < best_d:
+                    best_d = d
+                    best_a = a
+                a = succ[a]
+            b = succ[best_a]
+            p = pred[best_a]
+            if (dist_jit(coords, c, p) - dist_jit(coords, p, best_a)
+                    < dist_jit(coords, c, b) - dist_jit(coords, best_a, b)):
+                best_a = p
+
+        b = succ[best_a]
+        succ[best_a] = c
+        pred[c] = best_a
+        succ[c] = b
+        pred[b] = c
+        in_tour[c] = True
+        size += 1
+
+    new_tour = np.empty(size, dtype=np.int64)
+    a = start
+    for i in range(size):
+        new_tour[i] = a
+        a = succ[a]
+    return new_tour
+
+
+@njit(cache=True)
+def lk_opt_dirty_cached_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
+    nn_indices: NDArray[np.int32],
+    nn_dists: NDArray[np.float64],
+    dirty: NDArray[np.int64],
+    max_iterations: int,
+) -> int:
+    """
+    LK-DLB (lk_opt_pass_cached_jit) только вокруг dirty: DLB = True у всех,
+    кроме dirty. Концы каждого хода сбрасывают DLB, так что область
+    расширяется ровно туда, где нашлись улучшения.
+
+    Returns: число выполненных проходов.
+    """
+    max_city = metric_n(coords)
+    dlb = np.ones(max_city, dtype=np.bool_)
+    for i in range(len(dirty)):
+        dlb[dirty[i]] = False
+    succ_len = init_succ_len_jit(tour, coords)
 
-    no_improve = 0
     for iteration in range(max_iterations):
-        if lk_sequential_pass_jit(tour, coords, nn_indices, dlb, max_depth):
-            no_improve = 0
-        else:
-            no_improve += 1
-            if no_improve >= max_no_improve:
-                return iteration + 1
+        if not lk_opt_pass_cached_jit(
+            tour, coords, alpha_indices, nn_indices, nn_dists, dlb, succ_len,
+        ):
+            return iteration + 1
     return max_iterations
 
 
+@njit(cache=True)
+def local_kick_lk_jit(
+    tour: NDArray[np.int64],
+    coords: NDArray[np.float64],
+    alpha_indices: NDArray[np.int32],
+    nn_indices: NDArray[np.int32],
+    nn_dists: NDArray[np.float64],
+    center: int,
+    window: int,
+    max_iterations: int,
+) -> NDArray[np.int64]:
+    """
+    Локальный double-bridge: три разреза в окне позиций
+    [center - window/2, center + window/2) (по модулю n), сегменты
+    между ними меняются местами; затем LK-DLB только по городам окна.
+
+    Исходный tour не меняется. Returns: новый тур.
+    """
+    n = len(tour)
+    new_tour = tour.copy()
+    if window > n:
+        window = n
+    if window < 8:
+        return new_tour
+
+    s = center - window // 2
+    if s < 0:
+        s += n
+
+    # 3 различных разреза 1 <= a < b < c <= window - 1
+    a = np.random.randint(1, window)
+    b = np.random.randint(1, window)
+    c = np.random.randint(1, window)
+    while a == b or b == c or a == c:
+        a = np.random.randint(1, window)
+        b = np.random.randint(1, window)
+        c = np.random.randint(1, window)
+    if a > b:
+        a, b = b, a
+    if b > c:
+        b, c = c, b
+    if a > b:
+        a, b = b, a
+
+    # [s+a, s+b) и [s+b, s+c) → B + A
+    idx = s + a
+    for i in range(s + b, s + c):
+        new_tour[idx % n] = tour[i % n]
+        idx += 1
+    for i in range(s + a, s + b):
+        new_tour[idx % n] = tour[i % n]
+        idx += 1
+
+    dirty = np.empty(window, dtype=np.int64)
+    for i in range(window):
+        dirty[i] = new_tour[(s + i) % n]
+    lk_opt_dirty_cached_jit(
+        new_tour, coords, alpha_indices, nn_indices, nn_dists, dirty, max_iterations,
+    )
+    return new_tour
+
+
 # ═══════════════════════════════════════════════════════════
 #  V-CYCLE HELPERS
 # ═══════════════════════════════════════════════════════════
@@ -1395,8 +3021,12 @@ def remap_knn_to_local_jit(
 
 HAS_NUMBA_SPARSE = True
 
-def warmup_sparse():
-    """Прогрев всех JIT функций на мини-инстансе."""
+def warmup_sparse(graph: bool = False):
+    """
+    Прогрев всех JIT функций на мини-инстансе.
+
+    graph=True — специализации для GraphMetric (полный граф мини-инстанса).
+    """
     n = 10
     coords = np.random.rand(n, 2).astype(np.float64)
     nn_idx = np.zeros((n, 3), dtype=np.int32)
@@ -1415,8 +3045,15 @@ def warmup_sparse():
             nn_dist[i, ki] = dists[ki][0]
     
     tour = np.arange(n, dtype=np.int64)
+    if graph:
+        indptr = np.arange(0, n * (n - 1) + 1, n - 1).astype(np.int64)
+        indices = np.array([j for i in range(n) for j in range(n) if j != i], dtype=np.int32)
+        costs = np.array([np.sqrt(((coords[i] - coords[j]) ** 2).sum())
+                          for i in range(n) for j in range(n) if j != i])
+        coords = GraphMetric(indptr, indices, costs, coords, np.array([1.0, 1.0]))
     
-    # Прогрев
+    # Прогрев; seed_jit — значением из np.random (состояние numba остаётся случайным)
+    seed_jit(np.random.randint(0, 2**31))
     _ = dist_jit(coords, 0, 1)
     _ = tour_length_coords_jit(tour, coords)
     _ = nn_tour_coords_jit(coords, nn_idx, nn_dist, 0)
@@ -1429,9 +3066,66 @@ def warmup_sparse():
     _ = lk_opt_pass_coords_jit(tour.copy(), coords, nn_idx, dlb)
     _ = lk_opt_coords_jit(tour.copy(), coords, nn_idx, 2, 1)
     # Alpha-nearness
-    alpha, pi = subgradient_alpha_jit(n, nn_idx, nn_dist, coords, 2)
+    alpha, pi, _ = subgradient_alpha_jit(n, nn_idx, nn_dist, coords, 2)
     rerank_by_alpha_jit(nn_idx.copy(), nn_dist.copy(), alpha.copy())
+    # Held-Karp lower bound
+    _ = held_karp_bound_jit(n, nn_idx, nn_dist, 2)
     # Sequential LK
     dlb_test = np.zeros(n, dtype=np.bool_)
     _ = lk_sequential_pass_jit(tour.copy(), coords, nn_idx, dlb_test, 2)
     _ = lk_sequential_coords_jit(tour.copy(), coords, nn_idx, 1, 1, 2)
+    # Dual candidate lists (alpha + distance)
+    alpha_idx = np.ascontiguousarray(nn_idx[:, :2])
+    _ = lk_opt_dual_coords_jit(tour.copy(), coords, alpha_idx, nn_idx, 2, 1)
+    _ = lk_sequential_dual_coords_jit(tour.copy(), coords, alpha_idx, nn_idx, 1, 1, 2)
+    # Cached edge costs
+    t_c = tour.copy()
+    _ = two_opt_nn_cached_jit(t_c, coords, nn_idx, nn_dist, 2, 1)
+    _ = or_opt_pass_cached_jit(t_c, coords, nn_idx, nn_dist, init_succ_len_jit(t_c, coords))
+    _ = lk_opt_cached_jit(t_c, coords, nn_idx[:, :0], nn_idx, nn_dist, 2, 1)
+    _ = lk_opt_cached_jit(t_c, coords, alpha_idx, nn_idx, nn_dist, 2, 1)
+    # Work-bounded варианты (отдельные специализации numba)
+    w = new_work_jit(50)
+    _ = two_opt_nn_coords_jit(tour.copy(), coords, nn_idx, 2, 1, w)
+    w = new_work_jit(50)
+    _ = three_opt_full_pass_coords_jit(tour.copy(), coords, nn_idx, w)
+    w = new_work_jit(50)
+    _ = or_opt_pass_coords_jit(tour.copy(), coords, nn_idx, w)
+    w = new_work_jit(50)
+    _ = two_opt_nn_cached_jit(t_c, coords, nn_idx, nn_dist, 2, 1, w)
+    w = new_work_jit(50)
+    _ = or_opt_pass_cached_jit(t_c, coords, nn_idx, nn_dist, init_succ_len_jit(t_c, coords), w)
+    w = new_work_jit(50)
+    _ = lk_opt_cached_jit(t_c, coords, nn_idx[:, :0], nn_idx, nn_dist, 2, 1, w)
+    w = new_work_jit(50)
+    _ = lk_sequential_coords_jit(tour.copy(), coords, nn_idx, 1, 1, 2, w)
+    w = new_work_jit(50)
+    _ = lk_sequential_dual_coords_jit(tour.copy(), coords, alpha_idx, nn_idx, 1, 1, 2, w)
+    if KERNEL_STATS:
+        # Специализации со stats (отдельный массив — warmup не в счётчиках)
+        st = np.zeros(STAT_SLOTS, dtype=np.int64)
+        _ = two_opt_nn_coords_jit(tour.copy(), coords, nn_idx, 2, 1, stats=st)
+        _ = three_opt_full_pass_coords_jit(tour.copy(), coords, nn_idx, stats=st)
+        _ = or_opt_pass_coords_jit(tour.copy(), coords, nn_idx, stats=st)
+        _ = lk_opt_coords_jit(tour.copy(), coords, nn_idx, 2, 1, stats=st)
+        _ = lk_sequential_coords_jit(tour.copy(), coords, nn_idx, 1, 1, 2, stats=st)
+        _ = lk_sequential_dual_coords_jit(tour.copy(), coords, alpha_idx, nn_idx, 1, 1, 2, stats=st)
+        _ = two_opt_nn_cached_jit(t_c, coords, nn_idx, nn_dist, 2, 1, stats=st)
+        _ = or_opt_pass_cached_jit(t_c, coords, nn_idx, nn_dist, init_succ_len_jit(t_c, coords), stats=st)
+        _ = lk_opt_cached_jit(t_c, coords, nn_idx[:, :0], nn_idx, nn_dist, 2, 1, stats=st)
+        _ = lk_opt_cached_jit(t_c, coords, alpha_idx, nn_idx, nn_dist, 2, 1, stats=st)
+        # run_sliced: work + stats
+        _ = two_opt_nn_cached_jit(t_c, coords, nn_idx, nn_dist, 2, 1, new_work_jit(50), st)
+        _ = three_opt_full_pass_coords_jit(tour.copy(), coords, nn_idx, new_work_jit(50), st)
+        _ = or_opt_pass_cached_jit(
+            t_c, coords, nn_idx, nn_dist, init_succ_len_jit(t_c, coords), new_work_jit(50), st,
+        )
+        _ = lk_opt_cached_jit(t_c, coords, nn_idx[:, :0], nn_idx, nn_dist, 2, 1, new_work_jit(50), st)
+        _ = lk_sequential_coords_jit(tour.copy(), coords, nn_idx, 1, 1, 2, new_work_jit(50), st)
+        _ = lk_sequential_dual_coords_jit(
+            tour.copy(), coords, alpha_idx, nn_idx, 1, 1, 2, new_work_jit(50), st,
+        )
+    # Incremental resolve
+    t_i = cheapest_insertion_jit(tour[:7].copy(), coords, nn_idx, tour[7:].copy())
+    _ = lk_opt_dirty_cached_jit(t_i, coords, nn_idx[:, :0], nn_idx, nn_dist, tour[7:].copy(), 2)
+    _ = local_kick_lk_jit(t_i, coords, nn_idx[:, :0], nn_idx, nn_dist, 0, 8, 2)
@@ -0,0 +1,48 @@
+"""
+Детерминированный режим: независимые потоки случайности из одного seed.
+
+Источники случайности solver-а:
+- глобальный np.random numba (double_bridge_coords_jit, local_kick_lk_jit) —
+  одно состояние на процесс (и отдельное у AOT-модуля jit_cache), fork-воркеры
+  наследуют его от родителя;
+- np.random.Generator на Python-стороне (EAX tournament selection, ILS
+  optimize_coords_small — solve_small, листья, batch; локальный ILS resolve).
+
+Поток задаётся ключом — имя фазы и/или индексы (лист i, инстанс i batch):
+SeedSequence(seed, spawn_key=(crc32(имя), i, ...)), как в src/core/synthetic.
+Потоки не зависят ни друг от друга, ни от порядка вызовов, ни от того, в
+каком процессе выполняется лист. seed=None — прежнее недетерминированное
+поведение (numba не пересеивается, Generator из энтропии ОС).
+
+Побитовая воспроизводимость — только при работе, не зависящей от часов
+(solve_v5(limits=WorkLimits(...))): с бюджетом по времени число ILS-итераций
+зависит от скорости машины.
+
+    rng = stream_rng(seed, 'eax')
+    kernels.seed(stream_seed(seed, 'leaf', i))
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import Optional
+
+import numpy as np
+
+
+def _key(parts: tuple) -> tuple[int, ...]:
+    return tuple(zlib.crc32(p.encode()) if isinstance(p, str) else int(p) for p in parts)
+
+
+def stream_seed(seed: Optional[int], *key) -> Optional[int]:
+    """uint32-seed потока key для numba (seed_jit / kernels.seed); seed=None → None."""
+    if seed is None:
+        return None
+    return int(np.random.SeedSequence(seed, spawn_key=_key(key)).generate_state(1)[0])
+
+
+def stream_rng(seed: Optional[int], *key) -> np.random.Generator:
+    """Generator потока key; seed=None → из энтропии ОС."""
+    if seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=_key(key)))
@@ -0,0 +1,569 @@
+"""
+Локальный сервис задач solve_v5: очередь с приоритетами, резерв ядер,
+отмена, прогресс, кэш oracle между задачами.
+
+Сервер — asyncio + минимальный HTTP/1.1 поверх stdlib (TCP на localhost или
+Unix socket), JSON в обе стороны. Клиент — ServiceClient (http.client).
+
+Выполнение:
+- родитель один раз прогревает numba (jit_cache.ensure_warm); каждая задача — это
+  AnytimeSolve (fork), так что воркеры стартуют уже тёплыми;
+- у задачи есть cores (= n_workers solve_v5); сервис держит total_cores
+  (cpu_count - reserve_cores) и запускает задачи, пока хватает свободных ядер;
+- очередь: priority (больше — раньше), затем FIFO. Голова очереди не
+  обгоняется: если ей не хватает ядер, ждут все (иначе крупные задачи голодают);
+- OracleCache (LRU по хэшу координат и knn_k) строится в родителе и
+  передаётся в solve_v5(oracle=...): fork наследует k-NN без копирования,
+  Held-Karp граница (target_gap / compute_lower_bound) кэшируется там же;
+- cancel: задача в очереди снимается сразу, запущенная получает
+  кооперативный stop и завершается со state='cancelled' и лучшим туром.
+
+HTTP API:
+  POST /jobs                  {"coords": [[x, y], ...], "priority": 0,
+                               "cores": 1, "params": {solve_v5 kwargs}}
+  GET  /jobs                  все задачи (снимки)
+  GET  /jobs/<id>             снимок: state, phase, best_length, ...
+  GET  /jobs/<id>/best        текущий лучший тур (anytime)
+  GET  /jobs/<id>/result      result dict solve_v5 (409 — ещё не готов)
+  POST /jobs/<id>/cancel      (или DELETE /jobs/<id>)
+  GET  /status                ядра, очередь, статистика кэша
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import http.client
+import inspect
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.core.anytime import AnytimeSolve
+from src.core.checkpoint import coords_hash, to_jsonable
+from src.core.distance_oracle import DistanceOracle
+from src.core.jit_cache import ensure_warm
+from src.core.ultra_solver import solve_v5
+
+# Параметры solve_v5, которыми управляет сам сервис
+RESERVED_PARAMS = ('coords', 'n_workers', 'verbose', 'control', 'oracle')
+
+HTTP_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 409: 'Conflict', 500: 'Internal Server Error',
+}
+
+
+@dataclass
+class Job:
+    """Задача сервиса. coords освобождаются после завершения."""
+    id: str
+    coords: Optional[NDArray[np.float64]]
+    params: dict
+    priority: int = 0
+    cores: int = 1
+    seq: int = 0
+    n: int = 0
+    state: str = 'queued'       # queued | running | done | failed | cancelled
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    phase: str = ''
+    best_length: float = float('inf')
+    best_tour: Optional[NDArray[np.int64]] = None
+    n_events: int = 0
+    oracle_cached: bool = False
+    cancel_requested: bool = False
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    handle: Optional[AnytimeSolve] = None
+
+    def snapshot(self) -> dict:
+        """JSON-совместимое состояние (без туров)."""
+        end = self.finished if self.finished is not None else time.time()
+        return {
+            'id': self.id,
+            'state': self.state,
+            'n': self.n,
+            'priority': self.priority,
+            'cores': self.cores,
+            'phase': self.phase,
+            'best_length': self.best_length if self.best_length < float('inf') else None,
+            'events': self.n_events,
+            'oracle_cached': self.oracle_cached,
+            'cancel_requested': self.cancel_requested,
+            'queued_for': (self.started or end) - self.submitted,
+            'running_for': end - self.started if self.started is not None else 0.0,
+            'error': self.error,
+        }
+
+
+class OracleCache:
+    """
+    LRU DistanceOracle по (coords_hash, knn_k). Потокобезопасен: построение
+    идёт под lock (две задачи на одних координатах не строят k-NN дважды).
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int], DistanceOracle] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        coords: NDArray[np.float64],
+        knn_k: int,
+        lower_bound: bool = False,
+    ) -> tuple[DistanceOracle, bool]:
+        """(oracle, hit). lower_bound=True — досчитать Held-Karp, если его нет."""
+        key = (coords_hash(coords), int(knn_k))
+        with self._lock:
+            oracle = self._entries.get(key)
+            hit = oracle is not None
+            if hit:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+                oracle = DistanceOracle(coords, knn_k=knn_k)
+                oracle.build_knn()
+                self._entries[key] = oracle
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            if lower_bound and oracle.lower_bound is None:
+                # те же итерации, что solve_v5
+                oracle.build_lower_bound(n_iters=100 if oracle.n <= 50000 else 50)
+        return oracle, hit
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# ═══════════════════════════════════════════════════════════
+#  SERVICE
+# ═══════════════════════════════════════════════════════════
+
+class SolverService:
+    """
+    Очередь и исполнитель задач solve_v5 (внутри event loop).
+
+        service = SolverService(reserve_cores=1)
+        await service.start()
+        job = service.submit(coords, priority=5, cores=2, time_budget=60)
+        ...
+        service.cancel(job.id)
+
+    Или целиком с HTTP: await service.serve(unix_path='/tmp/mast.sock').
+    """
+
+    def __init__(
+        self,
+        total_cores: int = 0,
+        reserve_cores: int = 0,
+        cache_size: int = 8,
+        min_interval: float = 0.5,
+    ):
+        cores = total_cores if total_cores > 0 else (os.cpu_count() or 1)
+        self.total_cores = max(1, cores - reserve_cores)
+        self.free_cores = self.total_cores
+        self.min_interval = min_interval
+        self.cache = OracleCache(cache_size)
+        self.jobs: dict[str, Job] = {}
+        self._queue: list[tuple[int, int, str]] = []
+        self._seq = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.total_cores + 1)
+        self._wake: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._running: set[asyncio.Task] = set()
+        self._solve_params = set(inspect.signature(solve_v5).parameters) - set(RESERVED_PARAMS)
+
+    # ── lifecycle ──
+
+    async def start(self) -> None:
+        """Прогрев numba в родителе (наследуется fork) и запуск планировщика."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, ensure_warm)
+        self._wake = asyncio.Event()
+        self._scheduler = asyncio.create_task(self._schedule())
+        if self._queue:
+            self._wake.set()
+
+    async def close(self) -> None:
+        """Снять очередь, остановить запущенные задачи и дождаться их."""
+        for job in self.jobs.values():
+            if job.state in ('queued', 'running'):
+                self.cancel(job.id)
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+        self._executor.shutdown(wait=True)
+
+    # ── API ──
+
+    def submit(
+        self,
+        coords: NDArray[np.float64],
+        priority: int = 0,
+        cores: int = 1,
+        **params,
+    ) -> Job:
+        """Поставить задачу в очередь. ValueError — неверные параметры."""
+        coords = np.ascontiguousarray(coords, dtype=np.float64)
+        if coords.ndim != 2 or coords.shape[1] != 2 or len(coords) < 3:
+            raise ValueError(f'coords must be (N, 2) with N >= 3, got {coords.shape}')
+        if not 1 <= cores <= self.total_cores:
+            raise ValueError(f'cores must be in [1, {self.total_cores}], got {cores}')
+        unknown = set(params) - self._solve_params
+        if unknown:
+            raise ValueError(f'unsupported solve_v5 params: {sorted(unknown)}')
+
+        self._seq += 1
+        job = Job(
+            id=uuid.uuid4().hex[:12],
+            coords=coords,
+            params=params,
+            priority=int(priority),
+            cores=int(cores),
+            seq=self._seq,
+            n=len(coords),
+        )
+        self.jobs[job.id] = job
+        heapq.heappush(self._queue, (-job.priority, job.seq, job.id))
+        self._notify()
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Отменить задачу (KeyError — нет такой). Завершённые не меняются."""
+        job = self.jobs[job_id]
+        if job.state == 'queued':
+            job.state = 'cancelled'
+            job.finished = time.time()
+            job.coords = None
+            self._notify()  # голова очереди могла освободиться
+        elif job.state == 'running':
+            job.cancel_requested = True
+            if job.handle is not None:
+                job.handle.cancel()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        return self.jobs[job_id]
+
+    def stats(self) -> dict:
+        states: dict[str, int] = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {
+            'total_cores': self.total_cores,
+            'free_cores': self.free_cores,
+            'queued': sum(1 for job in self.jobs.values() if job.state == 'queued'),
+            'jobs': states,
+            'oracle_cache': self.cache.stats(),
+        }
+
+    # ── scheduling ──
+
+    def _notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _schedule(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._queue:
+                _, _, job_id = self._queue[0]
+                job = self.jobs[job_id]
+                if job.state != 'queued':
+                    heapq.heappop(self._queue)
+                    continue
+                if job.cores > self.free_cores:
+                    break  # голова ждёт ядер, без обгона
+                heapq.heappop(self._queue)
+                self.free_cores -= job.cores
+                job.state = 'running'
+                job.started = time.time()
+                task = asyncio.create_task(self._run(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _run(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            job.result = await loop.run_in_executor(self._executor, self._run_blocking, job)
+            job.state = 'cancelled' if job.cancel_requested else 'done'
+        except Exception as e:
+            job.state = 'failed'
+            job.error = f'{type(e).__name__}: {e}'
+        finally:
+            job.finished = time.time()
+            job.handle = None
+            job.coords = None
+            self.free_cores += job.cores
+            self._notify()
+
+    def _run_blocking(self, job: Job) -> Optional[dict]:
+        """Поток executor: oracle из кэша → AnytimeSolve → события → result."""
+        params = dict(job.params)
+        oracle = None
+        if params.get('reorder') != 'hilbert' and not params.get('resume'):
+            need_lb = params.get('target_gap') is not None or params.get('compute_lower_bound', False)
+            oracle, job.oracle_cached = self.cache.get(job.coords, params.get('knn_k', 20), need_lb)
+        if job.cancel_requested:
+            return None
+
+        handle = AnytimeSolve(
+            job.coords, min_interval=self.min_interval,
+            n_workers=job.cores, oracle=oracle, **params,
+        )
+        job.handle = handle
+        if job.cancel_requested:  # cancel() между проверкой и созданием handle
+            handle.cancel()
+        try:
+            for ev in handle:
+                job.phase = ev.phase
+                job.n_events += 1
+                if ev.length < job.best_length:
+                    job.best_length, job.best_tour = ev.length, ev.tour
+            return handle.result()
+        finally:
+            handle.close()
+
+    # ── HTTP ──
+
+    async def serve(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 8765,
+        unix_path: Optional[str] = None,
+    ) -> None:
+        """start() + HTTP-сервер до отмены (Ctrl-C в run_service)."""
+        await self.start()
+        if unix_path is not None:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            server = await asyncio.start_unix_server(self._handle_http, path=unix_path)
+        else:
+            server = await asyncio.start_server(self._handle_http, host=host, port=port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+            if unix_path is not None and os.path.exists(unix_path):
+                os.remove(unix_path)
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                return
+            method, path = request_line.split(' ')[:2]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, value = line.decode('latin-1').split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            try:
+                status, payload = self._route(method, path.rstrip('/'), body)
+            except (ValueError, TypeError, KeyError) as e:
+                status, payload = 400, {'error': f'{type(e).__name__}: {e}'}
+            except Exception:
+                status, payload = 500, {'error': traceback.format_exc()}
+            data = json.dumps(to_jsonable(payload)).encode()
+            writer.write(
+                f'HTTP/1.1 {status} {HTTP_REASONS.get(status, "")}\r\n'
+                f'Content-Type: application/json\r\n'
+                f'Content-Length: {len(data)}\r\n'
+                f'Connection: close\r\n\r\n'.encode() + data
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str, body: bytes) -> tuple[int, object]:
+        parts = [p for p in path.split('/') if p]
+        if parts == ['status'] and method == 'GET':
+            return 200, self.stats()
+        if not parts or parts[0] != 'jobs':
+            return 404, {'error': f'no route {method} {path}'}
+
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, [job.snapshot() for job in self.jobs.values()]
+            if method == 'POST':
+                req = json.loads(body or b'{}')
+                job = self.submit(
+                    np.asarray(req['coords'], dtype=np.float64),
+                    priority=req.get('priority', 0),
+                    cores=req.get('cores', 1),
+                    **req.get('params', {}),
+                )
+                return 200, job.snapshot()
+            return 405, {'error': f'{method} not allowed on /jobs'}
+
+        job = self.jobs.get(parts[1])
+        if job is None:
+            return 404, {'error': f'no job {parts[1]}'}
+        action = parts[2] if len(parts) > 2 else ''
+        if action == '' and method == 'GET':
+            return 200, job.snapshot()
+        if (action == 'cancel' and method == 'POST') or (action == '' and method == 'DELETE'):
+            return 200, self.cancel(job.id).snapshot()
+        if action == 'best' and method == 'GET':
+            tour = job.best_tour.tolist() if job.best_tour is not None else None
+            return 200, {'id': job.id, 'length': job.snapshot()['best_length'], 'tour': tour}
+        if action == 'result' and method == 'GET':
+            if job.result is None:
+                return 409, job.snapshot()
+            return 200, {**job.snapshot(), 'result': job.result}
+        return 404, {'error': f'no route {method} {path}'}
+
+
+def run_service(
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    unix_path: Optional[str] = None,
+    **service_kwargs,
+) -> None:
+    """Блокирующий запуск сервиса (для scripts/solver_service.py)."""
+    service = SolverService(**service_kwargs)
+    try:
+        asyncio.run(service.serve(host=host, port=port, unix_path=unix_path))
+    except KeyboardInterrupt:
+        pass
+
+
+# ═══════════════════════════════════════════════════════════
+#  CLIENT
+# ═══════════════════════════════════════════════════════════
+
+class ServiceError(RuntimeError):
+    """Ответ сервиса с HTTP-статусом ≥ 400."""
+
+    def __init__(self, status: int, payload):
+        super().__init__(f'HTTP {status}: {payload}')
+        self.status = status
+        self.payload = payload
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self._unix_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._unix_path)
+        self.sock = sock
+
+
+class ServiceClient:
+    """
+    Клиент локального сервиса (TCP или Unix socket).
+
+        client = ServiceClient(unix_path='/tmp/mast.sock')
+        job_id = client.submit(coords, priority=1, time_budget=30)
+        res = client.result(job_id)           # ждёт завершения
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 8765,
+        unix_path: Optional[str] = None,
+        timeout: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.timeout = timeout
+
+    def submit(self, coords, priority: int = 0, cores: int = 1, **params) -> str:
+        """Поставить задачу; возвращает job id."""
+        payload = {
+            'coords': np.asarray(coords, dtype=np.float64).tolist(),
+            'priority': priority,
+            'cores': cores,
+            'params': params,
+        }
+        return self._request('POST', '/jobs', payload)['id']
+
+    def status(self, job_id: Optional[str] = None) -> dict:
+        """Снимок задачи или (без job_id) состояние сервиса."""
+        return self._request('GET', f'/jobs/{job_id}' if job_id else '/status')
+
+    def jobs(self) -> list[dict]:
+        return self._request('GET', '/jobs')
+
+    def cancel(self, job_id: str) -> dict:
+        return self._request('POST', f'/jobs/{job_id}/cancel')
+
+    def best(self, job_id: str) -> dict:
+        """Текущий лучший тур задачи: {'length', 'tour'}."""
+        return self._request('GET', f'/jobs/{job_id}/best')
+
+    def result(
+        self,
+        job_id: str,
+        wait: bool = True,
+        poll: float = 0.5,
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """
+        Снимок + result dict solve_v5 завершённой задачи. wait=False и
+        задача не готова → ServiceError(409). state='failed' → ServiceError(500).
+        """
+        t_end = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            try:
+                res = self._request('GET', f'/jobs/{job_id}/result')
+            except ServiceError as e:
+                if e.status != 409 or not wait:
+                    raise
+                if e.payload.get('state') == 'failed':
+                    raise ServiceError(500, e.payload) from None
+                if e.payload.get('state') == 'cancelled':
+                    return e.payload  # снята из очереди, результата нет
+                if t_end is not None and time.perf_counter() > t_end:
+                    raise TimeoutError(f'job {job_id} did not finish in time') from None
+                time.sleep(poll)
+                continue
+            return res
+
+    def _request(self, method: str, path: str, payload=None):
+        if self.unix_path is not None:
+            conn = _UnixHTTPConnection(self.unix_path, self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            body = json.dumps(payload).encode() if payload is not None else None
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = json.loads(resp.read() or b'null')
+        finally:
+            conn.close()
+        if resp.status >= 400:
+            raise ServiceError(resp.status, data)
+        return data
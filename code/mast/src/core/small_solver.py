@@ -0,0 +1,82 @@
+"""
+Small-N strategy (N ≤ ~3000): coordinate-first, без плотной D-матрицы.
+
+solve() раньше строил для N≤3000 полную D через (N, N, 2) broadcast и шёл в
+solve_v4 (legacy D-стек). solve_small() вместо этого — тот же sparse engine,
+что и solve_v5, без декомпозиции: пайплайн листа
+ultra_solver.optimize_coords_small (k-NN → NN multi-start → 2-opt →
+Or-opt/3-opt → ILS локальными kicks) на весь бюджет. Одна small-N стратегия
+на solve(), листья solve_v5 и solve_batch.
+
+Ядра — src.core.jit_cache.kernels(): при собранном bundle это AOT-модуль,
+первый вызов не ждёт инициализации numba.
+
+Результат — в формате solve_v5 (tour, length, phases, time_total, n).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.core.jit_cache import ensure_warm
+from src.core.ultra_solver import _log, optimize_coords_small
+
+
+def solve_small(
+    coords: NDArray[np.float64],
+    time_budget: Optional[float] = None,
+    knn_k: int = 10,
+    kick_window: int = 50,
+    max_stall: Optional[int] = None,
+    verbose: bool = False,
+    seed: Optional[int] = None,
+) -> dict:
+    """
+    Решить небольшой инстанс по координатам.
+
+    Args:
+        coords: (N, 2) координаты
+        time_budget: лимит времени (сек); None = max(1, 0.002 * N)
+        knn_k: ширина k-NN списков
+        kick_window: ширина окна позиций локального double-bridge
+        max_stall: выход из ILS после стольких kicks подряд без улучшения
+            (None = max(2000, 10 * N))
+        verbose: печать прогресса
+        seed: поток 'ils' (src.core.seeding) — центры kicks и np.random
+            ядер; None — из энтропии ОС
+
+    Returns:
+        dict: tour, length, phases, time_total, n
+    """
+    t_start = time.perf_counter()
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    n = len(coords)
+    if time_budget is None:
+        time_budget = max(1.0, 0.002 * n)
+    phases: dict = {}
+
+    if n > 3:
+        ensure_warm(lazy=True)
+    tour, length = optimize_coords_small(
+        coords, knn_k, time_budget, deadline=t_start + time_budget, seed=seed,
+        kick_window=kick_window, max_stall=max_stall, phases=phases,
+    )
+
+    total_time = time.perf_counter() - t_start
+    if verbose and 'ils' in phases:
+        ils = phases['ils']
+        _log(f'[small] N={n}: construction={phases["construction"]["length"]:.0f} '
+             f'→ local search={phases["local_search"]["length"]:.0f}')
+        _log(f'[small] DONE: length={length:.0f}, kicks={ils["kicks"]} '
+             f'({ils["accepted"]} accepted), time={total_time:.2f}s')
+    return {
+        'tour': tour.tolist(),
+        'length': length,
+        'phases': phases,
+        'time_total': total_time,
+        'n': n,
+    }
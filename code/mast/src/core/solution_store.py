@@ -0,0 +1,335 @@
+"""
+Solution store: прошлые туры для повторяющихся инстансов.
+
+Каталог store:
+  index.sqlite          — таблица solutions: хэш координат, N, длина,
+                          бюджет, bbox, InstanceFingerprint (JSON + колонки)
+  tours/{hash}.npy      — тур (id в нумерации сохранённых coords)
+  coords/{hash}.npy     — координаты (для near match и проекции)
+  ids/{hash}.npy        — стабильные id городов (id клиентов), если заданы
+
+get(coords) — exact match по хэшу координат (O(N) хэш + один SELECT).
+lookup(coords, city_ids, fingerprint) — exact, иначе near match: кандидаты
+с совместимым N, ранжированные по расстоянию fingerprint/bbox; для лучших
+считается перекрытие — по city_ids, если они есть у обоих, иначе по
+совпадающим координатам (cKDTree, допуск coord_tol от диагонали bbox).
+Тур лучшего кандидата проецируется на новый инстанс: общие города — в
+старом порядке, новые — cheapest insertion по k-NN. Такой тур заменяет
+NN-construction в solve_v5 (solve_v5(store=...)).
+
+Массивы пишутся во временный файл и атомарно переименовываются, строка
+индекса — последней; SQLite-соединение на операцию (безопасно для fork).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.spatial import cKDTree
+
+from src.core.checkpoint import coords_hash, to_jsonable
+from src.core.fingerprint import InstanceFingerprint
+from src.core.numba_sparse import cheapest_insertion_jit, tour_length_coords_jit
+
+INDEX_FILE = 'index.sqlite'
+MIN_OVERLAP = 0.8
+MAX_CANDIDATES = 5
+COORD_TOL = 1e-7  # доля диагонали bbox: «те же» координаты
+INSERT_KNN_K = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    coords_hash   TEXT PRIMARY KEY,
+    n             INTEGER NOT NULL,
+    length        REAL NOT NULL,
+    time_budget   REAL,
+    created       REAL NOT NULL,
+    has_ids       INTEGER NOT NULL,
+    cx REAL, cy REAL, width REAL, height REAL,
+    cv_nn_dist    REAL,
+    modularity    REAL,
+    fingerprint   TEXT,
+    meta          TEXT
+);
+CREATE INDEX IF NOT EXISTS solutions_n ON solutions (n);
+"""
+
+
+@dataclass
+class StoreMatch:
+    """Найденное решение, тур — в нумерации запроса."""
+    kind: str                     # 'exact' | 'near'
+    key: str                      # coords_hash сохранённого инстанса
+    tour: NDArray[np.int64]
+    length: float                 # длина tour на запросе (после проекции)
+    stored_length: float
+    stored_n: int
+    time_budget: Optional[float]  # бюджет, с которым решение получено
+    overlap: float = 1.0          # общих городов / max(N запроса, N сохранённого)
+    n_inserted: int = 0           # новых городов, вставленных cheapest insertion
+    matched_by: str = 'coords'    # 'coords' | 'ids'
+
+    def info(self) -> dict:
+        """Метаданные для phases (без тура)."""
+        out = asdict(self)
+        del out['tour']
+        return out
+
+
+class SolutionStore:
+    """
+    Локальное хранилище туров: SQLite-индекс + .npy в каталоге.
+
+    put() хранит лучший тур на инстанс (хуже сохранённого — не пишется).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        for sub in ('tours', 'coords', 'ids'):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    # ── write ──
+
+    def put(
+        self,
+        coords: NDArray[np.float64],
+        tour,
+        length: Optional[float] = None,
+        city_ids=None,
+        fingerprint: Optional[InstanceFingerprint] = None,
+        time_budget: Optional[float] = None,
+        meta: Optional[dict] = None,
+    ) -> bool:
+        """
+        Сохранить тур инстанса coords. False — уже есть тур не длиннее.
+
+        Args:
+            tour: перестановка range(N)
+            length: длина тура (None — посчитать)
+            city_ids: (N,) стабильные int-id городов для near match по id
+            fingerprint: InstanceFingerprint (ранжирование near match)
+            time_budget: бюджет, с которым получен тур (solve_v5 решает,
+                отдавать ли exact match сразу)
+        """
+        coords = np.ascontiguousarray(coords, dtype=np.float64)
+        n = len(coords)
+        tour = np.asarray(tour, dtype=np.int64)
+        if len(tour) != n or not np.array_equal(np.sort(tour), np.arange(n, dtype=np.int64)):
+            raise ValueError(f'tour is not a permutation of range({n})')
+        ids = _check_ids(city_ids, n)
+        if length is None:
+            length = float(tour_length_coords_jit(tour, coords))
+        key = coords_hash(coords)
+
+        with self._connect() as conn:
+            row = conn.execute('SELECT length FROM solutions WHERE coords_hash = ?', (key,)).fetchone()
+        if row is not None and row[0] <= length:
+            return False
+
+        self._write_npy('tours', key, tour)
+        self._write_npy('coords', key, coords)
+        if ids is not None:
+            self._write_npy('ids', key, ids)
+        lo, hi = coords.min(axis=0), coords.max(axis=0)
+        fp = asdict(fingerprint) if fingerprint is not None else None
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO solutions VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)',
+                (key, n, float(length), time_budget, time.time(), int(ids is not None),
+                 float(lo[0] + hi[0]) / 2, float(lo[1] + hi[1]) / 2,
+                 float(hi[0] - lo[0]), float(hi[1] - lo[1]),
+                 fp['cv_nn_dist'] if fp else None, fp['modularity'] if fp else None,
+                 json.dumps(to_jsonable(fp)) if fp else None,
+                 json.dumps(to_jsonable(meta or {}))),
+            )
+        return True
+
+    # ── read ──
+
+    def get(self, coords: NDArray[np.float64]) -> Optional[StoreMatch]:
+        """Exact match: тот же хэш координат (тот же порядок городов)."""
+        coords = np.ascontiguousarray(coords, dtype=np.float64)
+        key = coords_hash(coords)
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT n, length, time_budget FROM solutions WHERE coords_hash = ?', (key,),
+            ).fetchone()
+        if row is None or not os.path.exists(self._path('tours', key)):
+            return None
+        tour = np.load(self._path('tours', key))
+        return StoreMatch(
+            kind='exact', key=key, tour=tour, length=float(row[1]),
+            stored_length=float(row[1]), stored_n=int(row[0]), time_budget=row[2],
+        )
+
+    def lookup(
+        self,
+        coords: NDArray[np.float64],
+        city_ids=None,
+        fingerprint: Optional[InstanceFingerprint] = None,
+        min_overlap: float = MIN_OVERLAP,
+        max_candidates: int = MAX_CANDIDATES,
+        coord_tol: float = COORD_TOL,
+    ) -> Optional[StoreMatch]:
+        """
+        Exact match, иначе near match с перекрытием ≥ min_overlap и
+        спроецированным туром; None — ничего подходящего.
+
+        Кандидаты: N в [n·min_overlap, n/min_overlap], по возрастанию
+        расстояния (|log N|, центр и размер bbox, cv_nn_dist/modularity из
+        fingerprint); перекрытие считается для первых max_candidates.
+        """
+        coords = np.ascontiguousarray(coords, dtype=np.float64)
+        exact = self.get(coords)
+        if exact is not None:
+            return exact
+        n = len(coords)
+        if n < 3:
+            return None
+        ids = _check_ids(city_ids, n)
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT coords_hash, n, length, time_budget, has_ids, cx, cy, width, height, '
+                'cv_nn_dist, modularity FROM solutions WHERE n BETWEEN ? AND ?',
+                (int(np.ceil(n * min_overlap)), int(n / min_overlap)),
+            ).fetchall()
+        if not rows:
+            return None
+
+        lo, hi = coords.min(axis=0), coords.max(axis=0)
+        size = hi - lo
+        diag = float(np.hypot(size[0], size[1])) or 1.0
+        center = (lo + hi) / 2
+
+        def distance(row) -> float:
+            d = abs(np.log(row[1] / n))
+            d += float(np.hypot(row[5] - center[0], row[6] - center[1])) / diag
+            d += (abs(row[7] - size[0]) + abs(row[8] - size[1])) / diag
+            if fingerprint is not None and row[9] is not None:
+                d += abs(row[9] - fingerprint.cv_nn_dist) + abs(row[10] - fingerprint.modularity)
+            return d
+
+        best = None
+        for row in sorted(rows, key=distance)[:max_candidates]:
+            key, n_old = row[0], int(row[1])
+            if not os.path.exists(self._path('tours', key)):
+                continue
+            if ids is not None and row[4]:
+                old_ids = np.load(self._path('ids', key), mmap_mode='r')
+                old_to_new = _match_ids(old_ids, ids)
+                matched_by = 'ids'
+            else:
+                old_coords = np.load(self._path('coords', key), mmap_mode='r')
+                old_to_new = _match_coords(old_coords, coords, coord_tol * diag)
+                matched_by = 'coords'
+            n_common = int(np.sum(old_to_new >= 0))
+            overlap = n_common / max(n, n_old)
+            if overlap >= min_overlap and (best is None or overlap > best[0]):
+                best = (overlap, row, old_to_new, matched_by)
+                if overlap >= 1.0:
+                    break
+        if best is None:
+            return None
+
+        overlap, row, old_to_new, matched_by = best
+        key = row[0]
+        tour, n_inserted = project_tour(np.load(self._path('tours', key)), old_to_new, coords)
+        return StoreMatch(
+            kind='near', key=key, tour=tour,
+            length=float(tour_length_coords_jit(tour, coords)),
+            stored_length=float(row[2]), stored_n=int(row[1]), time_budget=row[3],
+            overlap=overlap, n_inserted=n_inserted, matched_by=matched_by,
+        )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return int(conn.execute('SELECT COUNT(*) FROM solutions').fetchone()[0])
+
+    # ── I/O ──
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(os.path.join(self.directory, INDEX_FILE), timeout=30.0)
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.directory, kind, f'{key}.npy')
+
+    def _write_npy(self, kind: str, key: str, array: NDArray) -> None:
+        path = self._path(kind, key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, array)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+
+# ═══════════════════════════════════════════════════════════
+#  MATCHING + PROJECTION
+# ═══════════════════════════════════════════════════════════
+
+def project_tour(
+    old_tour: NDArray[np.int64],
+    old_to_new: NDArray[np.int64],
+    coords: NDArray[np.float64],
+) -> tuple[NDArray[np.int64], int]:
+    """
+    Тур старого инстанса → тур нового: общие города (old_to_new ≥ 0) в
+    старом порядке, остальные — cheapest insertion по k-NN нового инстанса
+    (сначала те, у кого больше соседей уже в туре). Returns: (tour, n_inserted).
+    """
+    n = len(coords)
+    mapped = old_to_new[np.asarray(old_tour, dtype=np.int64)]
+    tour = np.ascontiguousarray(mapped[mapped >= 0], dtype=np.int64)
+    present = np.zeros(n, dtype=np.bool_)
+    present[tour] = True
+    missing = np.flatnonzero(~present).astype(np.int64)
+    if len(missing) == 0:
+        return tour, 0
+    k = min(INSERT_KNN_K, n - 1)
+    knn = cKDTree(coords).query(coords, k=k + 1)[1][:, 1:].astype(np.int32)
+    in_tour = present[knn[missing]].sum(axis=1)
+    order = missing[np.argsort(-in_tour, kind='stable')]
+    return cheapest_insertion_jit(tour, coords, np.ascontiguousarray(knn), order), len(missing)
+
+
+def _match_ids(old_ids: NDArray, new_ids: NDArray[np.int64]) -> NDArray[np.int64]:
+    """old_to_new по совпадающим city_ids (-1 — города нет в запросе)."""
+    old_ids = np.asarray(old_ids, dtype=np.int64)
+    old_to_new = np.full(len(old_ids), -1, dtype=np.int64)
+    _, old_pos, new_pos = np.intersect1d(old_ids, new_ids, assume_unique=True, return_indices=True)
+    old_to_new[old_pos] = new_pos
+    return old_to_new
+
+
+def _match_coords(old_coords: NDArray, coords: NDArray[np.float64], tol: float) -> NDArray[np.int64]:
+    """old_to_new по совпадающим (в пределах tol) координатам, один к одному."""
+    old_coords = np.asarray(old_coords, dtype=np.float64)
+    dist, idx = cKDTree(old_coords).query(coords, k=1, distance_upper_bound=tol)
+    new_ids = np.flatnonzero(np.isfinite(dist))
+    old_ids = idx[new_ids]
+    # Дубликаты точек: каждый старый город — не более одному новому
+    old_ids, first = np.unique(old_ids, return_index=True)
+    old_to_new = np.full(len(old_coords), -1, dtype=np.int64)
+    old_to_new[old_ids] = new_ids[first]
+    return old_to_new
+
+
+def _check_ids(city_ids, n: int) -> Optional[NDArray[np.int64]]:
+    if city_ids is None:
+        return None
+    ids = np.asarray(city_ids, dtype=np.int64)
+    if ids.shape != (n,):
+        raise ValueError(f'city_ids shape {ids.shape} != ({n},)')
+    if len(np.unique(ids)) != n:
+        raise ValueError('city_ids must be unique')
+    return ids
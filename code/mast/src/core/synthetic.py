@@ -0,0 +1,284 @@
+"""
+Синтетические TSP-инстансы для scaling-исследований (1K … 10M точек).
+
+Виды (KINDS):
+- uniform   — равномерно в квадрате [0, scale)²;
+- clustered — гауссовы кластеры по DIMACS portcgen: N/10 центров,
+              σ = scale / √N;
+- fl        — «сверловка» (fl1400, fl3795): плотные прямоугольные решётки
+              отверстий с шагом ~0.1-0.3 · scale/√N, между ними пустоты;
+- pla       — «программируемые матрицы» (pla7397 … pla85900): точки с
+              малым шагом на горизонтальных линиях, отрезки разной длины
+              с разрывами, строки с большим шагом;
+- mona      — stippling-подобный (mona-lisa100K): плотность точек по
+              процедурному «изображению» (гауссовы пятна + низкочастотная
+              текстура) на сетке 512², внутри клетки — равномерно.
+
+Детерминизм: результат зависит только от (kind, n, seed, scale).
+Глобальная структура (центры, решётки, отрезки, поле плотности) — из
+потока SeedSequence(seed, spawn_key=(0,)), точки чанка i (CHUNK строк) —
+из SeedSequence(seed, spawn_key=(1, i)); каждый чанк генерируется
+векторно и независимо, поэтому generate_npy пишет .npy потоково
+(open_memmap) с памятью O(CHUNK + структура), а generate() даёт тот же
+массив целиком.
+
+    coords = generate('clustered', 100_000, seed=1)
+    path = generate_npy('benchmarks/synthetic/pla-1M-s0.npy', 'pla', 1_000_000)
+    coords = load_or_generate('mona-200K-s3', 'benchmarks/synthetic')
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Iterator, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+KINDS = ('uniform', 'clustered', 'fl', 'pla', 'mona')
+SCALE = 1e6
+CHUNK = 1 << 20
+GENERATOR_VERSION = 1   # меняется при изменении генераторов → новый кэш-файл
+
+MONA_GRID = 512
+_SPEC = re.compile(r'^([a-z]+)-(\d+(?:\.\d+)?)([KkMm]?)(?:-s(\d+))?$')
+
+
+# ═══════════════════════════════════════════════════════════
+#  PUBLIC API
+# ═══════════════════════════════════════════════════════════
+
+def generate(kind: str, n: int, seed: int = 0, scale: float = SCALE) -> NDArray[np.float64]:
+    """(n, 2) float64 координаты вида kind (в памяти целиком)."""
+    coords = np.empty((n, 2), dtype=np.float64)
+    start = 0
+    for chunk in iter_chunks(kind, n, seed, scale):
+        coords[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    return coords
+
+
+def generate_npy(
+    path: str,
+    kind: str,
+    n: int,
+    seed: int = 0,
+    scale: float = SCALE,
+) -> str:
+    """
+    Потоково записать инстанс в .npy (атомарно: tmp + os.replace).
+    Память — один чанк + глобальная структура вида, не n × 16 байт.
+    """
+    path = os.fspath(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float64, shape=(n, 2))
+        start = 0
+        for chunk in iter_chunks(kind, n, seed, scale):
+            out[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        out.flush()
+        del out
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def iter_chunks(
+    kind: str,
+    n: int,
+    seed: int = 0,
+    scale: float = SCALE,
+) -> Iterator[NDArray[np.float64]]:
+    """Чанки (≤ CHUNK, 2) подряд; конкатенация = generate(kind, n, seed)."""
+    if kind not in KINDS:
+        raise ValueError(f'kind must be one of {KINDS}, got {kind!r}')
+    if n < 1:
+        raise ValueError(f'n must be >= 1, got {n}')
+    structure = _STRUCTURES[kind](n, scale, _rng(seed, 0))
+    sampler = _SAMPLERS[kind]
+    for i, start in enumerate(range(0, n, CHUNK)):
+        stop = min(n, start + CHUNK)
+        yield sampler(structure, start, stop, scale, _rng(seed, 1, i))
+
+
+def spec_name(kind: str, n: int, seed: int = 0) -> str:
+    """Каноническое имя: 'uniform-1M-s0', 'pla-33810-s2'."""
+    if n % 1_000_000 == 0:
+        size = f'{n // 1_000_000}M'
+    elif n % 1000 == 0:
+        size = f'{n // 1000}K'
+    else:
+        size = str(n)
+    return f'{kind}-{size}-s{seed}'
+
+
+def parse_spec(name: str) -> Optional[tuple[str, int, int]]:
+    """'clustered-100K-s3' → ('clustered', 100000, 3); не синтетика → None."""
+    m = _SPEC.match(name)
+    if m is None or m.group(1) not in KINDS:
+        return None
+    mult = {'': 1, 'k': 1000, 'm': 1_000_000}[m.group(3).lower()]
+    return m.group(1), int(round(float(m.group(2)) * mult)), int(m.group(4) or 0)
+
+
+def load_or_generate(name: str, directory: str, mmap: bool = True) -> NDArray[np.float64]:
+    """
+    Инстанс по имени (parse_spec) из directory/{name}.v{VERSION}.npy;
+    нет файла — сгенерировать потоково. mmap — np.load(mmap_mode='c').
+
+    Raises:
+        ValueError: name — не синтетическая спецификация.
+    """
+    spec = parse_spec(name)
+    if spec is None:
+        raise ValueError(f'not a synthetic instance spec: {name!r} (expected e.g. uniform-100K-s0)')
+    kind, n, seed = spec
+    path = os.path.join(os.fspath(directory), f'{spec_name(kind, n, seed)}.v{GENERATOR_VERSION}.npy')
+    if not os.path.exists(path):
+        generate_npy(path, kind, n, seed)
+    return np.asarray(np.load(path, mmap_mode='c' if mmap else None))
+
+
+def _rng(seed: int, *key: int) -> np.random.Generator:
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+
+# ═══════════════════════════════════════════════════════════
+#  GENERATORS: structure(n, scale, rng) + sampler(structure, start, stop, scale, rng)
+# ═══════════════════════════════════════════════════════════
+
+def _uniform_structure(n: int, scale: float, rng: np.random.Generator) -> None:
+    return None
+
+
+def _uniform_sample(structure, start: int, stop: int, scale: float, rng) -> NDArray[np.float64]:
+    return rng.random((stop - start, 2)) * scale
+
+
+def _clustered_structure(n: int, scale: float, rng: np.random.Generator) -> dict:
+    return {
+        'centers': rng.random((max(1, n // 10), 2)) * scale,
+        'sigma': scale / np.sqrt(n),
+    }
+
+
+def _clustered_sample(structure: dict, start: int, stop: int, scale: float, rng) -> NDArray[np.float64]:
+    centers = structure['centers']
+    labels = rng.integers(len(centers), size=stop - start)
+    return centers[labels] + rng.normal(size=(stop - start, 2)) * structure['sigma']
+
+
+def _groups(n: int, n_groups: int, rng: np.random.Generator) -> NDArray[np.int64]:
+    """Размеры групп (сумма n, lognormal-веса) → смещения начала групп."""
+    weights = rng.lognormal(0.0, 1.0, n_groups)
+    counts = rng.multinomial(n, weights / weights.sum())
+    return np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+
+def _site_index(offsets: NDArray[np.int64], start: int, stop: int):
+    """Глобальные индексы [start, stop) → (группа, номер внутри группы)."""
+    j = np.arange(start, stop, dtype=np.int64)
+    group = np.searchsorted(offsets, j, side='right') - 1
+    return group, j - offsets[group]
+
+
+def _fl_structure(n: int, scale: float, rng: np.random.Generator) -> dict:
+    n_groups = max(1, n // 200)
+    offsets = _groups(n, n_groups, rng)
+    counts = np.diff(offsets)
+    aspect = np.exp(rng.uniform(np.log(0.25), np.log(4.0), n_groups))
+    return {
+        'offsets': offsets,
+        'origin': rng.random((n_groups, 2)) * scale,
+        'pitch': scale / np.sqrt(n) * rng.choice([0.1, 0.2, 0.3], n_groups),
+        'cols': np.maximum(1, np.ceil(np.sqrt(np.maximum(counts, 1) * aspect))).astype(np.int64),
+    }
+
+
+def _fl_sample(structure: dict, start: int, stop: int, scale: float, rng) -> NDArray[np.float64]:
+    group, k = _site_index(structure['offsets'], start, stop)
+    cols = structure['cols'][group]
+    pitch = structure['pitch'][group]
+    pts = structure['origin'][group].copy()
+    pts[:, 0] += (k % cols) * pitch
+    pts[:, 1] += (k // cols) * pitch
+    return pts[rng.permutation(len(pts))]
+
+
+def _pla_structure(n: int, scale: float, rng: np.random.Generator) -> dict:
+    """
+    Отрезки выкладываются подряд на «виртуальную линию» длины rows · scale,
+    которая режется на строки: точка — u = u0[отрезок] + k · px,
+    x = u mod scale, y = ⌊u / scale⌋ · row_pitch. Строк ~√N / 4, так что
+    инстанс квадратный, а шаг строк ≫ шага точек.
+    """
+    n_segments = max(1, n // 100)
+    offsets = _groups(n, n_segments, rng)
+    counts = np.diff(offsets)
+    rows = max(1, int(np.sqrt(n) / 4))
+    gaps = rng.integers(5, 50, n_segments).astype(np.float64)
+    # rows · scale = px · (n + Σ gaps)
+    px = rows * scale / (n + gaps.sum())
+    u0 = np.concatenate([[0.0], np.cumsum((counts + gaps) * px)[:-1]])
+    return {'offsets': offsets, 'u0': u0, 'px': px, 'row_pitch': scale / rows}
+
+
+def _pla_sample(structure: dict, start: int, stop: int, scale: float, rng) -> NDArray[np.float64]:
+    seg, k = _site_index(structure['offsets'], start, stop)
+    u = structure['u0'][seg] + k * structure['px']
+    row = np.floor(u / scale)
+    pts = np.column_stack([u - row * scale, row * structure['row_pitch']])
+    return pts[rng.permutation(len(pts))]
+
+
+def _mona_structure(n: int, scale: float, rng: np.random.Generator) -> dict:
+    """Процедурное «изображение» → CDF плотности по клеткам MONA_GRID²."""
+    g = MONA_GRID
+    axis = (np.arange(g) + 0.5) / g
+    x, y = np.meshgrid(axis, axis, indexing='xy')
+    field = np.zeros((g, g))
+    for _ in range(24):
+        cx, cy = rng.random(2)
+        sx, sy = rng.uniform(0.03, 0.25, 2)
+        amp = rng.uniform(-0.6, 1.0)
+        field += amp * np.exp(-((x - cx) ** 2 / (2 * sx ** 2) + (y - cy) ** 2 / (2 * sy ** 2)))
+    for _ in range(6):
+        fx, fy = rng.uniform(1.0, 8.0, 2)
+        phase = rng.uniform(0.0, 2 * np.pi)
+        field += 0.15 * np.sin(2 * np.pi * (fx * x + fy * y) + phase)
+    field -= field.min()
+    density = (field / field.max()) ** 2 + 0.01   # контраст + светлый фон
+    cdf = np.cumsum(density.ravel())
+    return {'cdf': cdf / cdf[-1]}
+
+
+def _mona_sample(structure: dict, start: int, stop: int, scale: float, rng) -> NDArray[np.float64]:
+    m = stop - start
+    g = MONA_GRID
+    cell = np.searchsorted(structure['cdf'], rng.random(m), side='right')
+    cell = np.minimum(cell, g * g - 1)
+    jitter = rng.random((m, 2))
+    return np.column_stack([cell % g + jitter[:, 0], cell // g + jitter[:, 1]]) * (scale / g)
+
+
+_STRUCTURES = {
+    'uniform': _uniform_structure,
+    'clustered': _clustered_structure,
+    'fl': _fl_structure,
+    'pla': _pla_structure,
+    'mona': _mona_structure,
+}
+_SAMPLERS = {
+    'uniform': _uniform_sample,
+    'clustered': _clustered_sample,
+    'fl': _fl_sample,
+    'pla': _pla_sample,
+    'mona': _mona_sample,
+}
@@ -0,0 +1,210 @@
+"""
+Timeline tracing solve_v5 в формате Chrome trace (chrome://tracing, Perfetto).
+
+    solve_v5(coords, trace='run.trace.json')        # или trace=Tracer()
+
+Что пишется:
+- фазы solve_v5 (cat='phase') + снимок памяти после каждой (counter 'memory');
+- листья (cat='leaf') — span в процессе воркера (pid воркера), время
+  меряется в самом воркере: perf_counter — CLOCK_MONOTONIC, общий для fork;
+- окна V-cycle (cat='v_cycle'), поколения EAX (cat='eax');
+- ILS kicks polish (cat='ils') — каждый kick_sample-й.
+
+Выключенный трейсинг — NULL_TRACER: методы пустые, now() не читает часы;
+ядра и горячие циклы не трогаются (span-ы — только на уровне Python-циклов,
+kick-и сэмплируются проверкой tracer.enabled).
+
+STEP PROFILE — суммарные время и пик памяти именованных под-шагов
+(find_boundary_cities, reassign в декомпозиции, EAX crossover, ...) для
+scaling-отчёта: `with step('stitch.boundary_cities'):` в коде, сбор —
+`with profile_steps() as prof:` вокруг solve_v5. Без активного профиля
+step() возвращает общий nullcontext.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+from src.core.memory import begin_peak_window, peak_rss_mb, rss_mb
+
+KICK_SAMPLE = 20
+
+
+class Tracer:
+    """Буфер событий Chrome trace (complete 'X', instant 'i', counter 'C')."""
+
+    enabled = True
+
+    def __init__(self, kick_sample: int = KICK_SAMPLE, origin: Optional[float] = None):
+        self.kick_sample = max(1, kick_sample)
+        self.origin = time.perf_counter() if origin is None else origin
+        self.pid = os.getpid()
+        self.events: list[dict] = []
+        self._named: set[tuple[int, int]] = set()
+        self.name_thread(self.pid, self.pid, 'solve_v5')
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def _ts(self, t: float) -> float:
+        return round((t - self.origin) * 1e6, 1)
+
+    def complete(
+        self,
+        name: str,
+        cat: str,
+        t0: float,
+        t1: Optional[float] = None,
+        pid: Optional[int] = None,
+        tid: Optional[int] = None,
+        **args,
+    ) -> None:
+        """Span [t0, t1] (perf_counter; t1=None — сейчас)."""
+        if t1 is None:
+            t1 = time.perf_counter()
+        pid = self.pid if pid is None else pid
+        self.events.append({
+            'name': name, 'cat': cat, 'ph': 'X',
+            'ts': self._ts(t0), 'dur': round((t1 - t0) * 1e6, 1),
+            'pid': pid, 'tid': pid if tid is None else tid,
+            'args': args,
+        })
+
+    def instant(self, name: str, cat: str, **args) -> None:
+        self.events.append({
+            'name': name, 'cat': cat, 'ph': 'i', 's': 'p',
+            'ts': self._ts(time.perf_counter()), 'pid': self.pid, 'tid': self.pid,
+            'args': args,
+        })
+
+    def counter(self, name: str, **values: float) -> None:
+        self.events.append({
+            'name': name, 'ph': 'C', 'ts': self._ts(time.perf_counter()),
+            'pid': self.pid, 'args': values,
+        })
+
+    def memory(self, **values: float) -> None:
+        """Counter 'memory': текущий RSS + переданные значения (пик фазы)."""
+        self.counter('memory', rss_mb=round(rss_mb(), 1), **values)
+
+    def sampled(self, i: int) -> bool:
+        """i-й kick попадает в trace (каждый kick_sample-й)."""
+        return i % self.kick_sample == 0
+
+    def name_thread(self, pid: int, tid: int, name: str) -> None:
+        """Метаданные: имя процесса/потока в UI (один раз на пару)."""
+        if (pid, tid) in self._named:
+            return
+        self._named.add((pid, tid))
+        self.events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                            'args': {'name': name}})
+        self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                            'args': {'name': name}})
+
+    def to_json(self) -> dict:
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path: str) -> None:
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.to_json(), f)
+        os.replace(tmp, path)
+
+
+class NullTracer:
+    """Трейсинг выключен: все методы — no-op."""
+
+    enabled = False
+    events: list = []
+
+    def now(self) -> float:
+        return 0.0
+
+    def complete(self, *args, **kwargs) -> None:
+        pass
+
+    def instant(self, *args, **kwargs) -> None:
+        pass
+
+    def counter(self, *args, **kwargs) -> None:
+        pass
+
+    def memory(self, **values) -> None:
+        pass
+
+    def sampled(self, i: int) -> bool:
+        return False
+
+    def name_thread(self, *args) -> None:
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+# ═══════════════════════════════════════════════════════════
+#  STEP PROFILE
+# ═══════════════════════════════════════════════════════════
+
+class StepProfile:
+    """
+    steps[name] = {'time': секунд суммарно, 'calls': вызовов, 'peak_mb':
+    максимальный прирост пикового RSS над RSS на входе в шаг}.
+
+    Пик шага — окно VmHWM (memory.begin_peak_window): сброс на входе, чтение
+    на выходе; пик фазы MemoryTracker при этом не теряется. Вложенный шаг
+    переносит пик до своего окна во все открытые внешние. Без сброса VmHWM
+    (не Linux) peak_mb = None. Воркеры листьев (fork) сюда не пишут.
+    """
+
+    def __init__(self):
+        self.steps: dict[str, dict] = {}
+        self._open: list[list[float]] = []   # [RSS на входе, пик до вложенных окон]
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        frame = [rss_mb(), 0.0]
+        before = begin_peak_window()
+        if before is not None:
+            for outer in self._open:
+                outer[1] = max(outer[1], before)
+        self._open.append(frame)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self._open.pop()
+            entry = self.steps.setdefault(name, {'time': 0.0, 'calls': 0, 'peak_mb': None})
+            entry['time'] += elapsed
+            entry['calls'] += 1
+            if before is not None:
+                grown = max(peak_rss_mb(), frame[1]) - frame[0]
+                entry['peak_mb'] = max(entry['peak_mb'] or 0.0, grown)
+
+
+_PROFILE: Optional[StepProfile] = None
+_NO_STEP = nullcontext()
+
+
+def step(name: str):
+    """Под-шаг для активного profile_steps(); иначе no-op контекст."""
+    if _PROFILE is None:
+        return _NO_STEP
+    return _PROFILE.measure(name)
+
+
+@contextmanager
+def profile_steps() -> Iterator[StepProfile]:
+    """Профиль под-шагов на время блока (процесс-глобально, вложение — внутренний)."""
+    global _PROFILE
+    previous = _PROFILE
+    _PROFILE = StepProfile()
+    try:
+        yield _PROFILE
+    finally:
+        _PROFILE = previous
@@ -0,0 +1,184 @@
+"""
+TSPLIB I/O без tsplib95: .tsp (NODE_COORD_SECTION) и .tour.
+
+tsplib95 разбирает файл построчно в Python-объекты — секунды на
+pla7397/d15112 и десятки секунд на pla85900/mona-lisa100K. Здесь заголовок
+читается построчно, а секция координат — одним split() всего остатка файла
+и одним преобразованием в float64 (numpy). Результат пишется рядом
+sidecar-ом {name}.tsp.npy; следующие загрузки — np.load с mmap (страницы
+подгружаются по требованию, copy-on-write: массив writeable, как обычный).
+Sidecar устаревает, если .tsp новее или DIMENSION не совпадает.
+
+.tour: TOUR_SECTION с 1-based id до -1 ↔ int64-перестановка 0-based.
+
+    coords = read_tsp('benchmarks/d15112.tsp')
+    write_tour('d15112.tour', result['tour'], name='d15112')
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+SIDECAR_SUFFIX = '.npy'
+COORD_SECTIONS = ('NODE_COORD_SECTION', 'DISPLAY_DATA_SECTION')
+_KEYWORD_LINE = re.compile(r'^[ \t]*[A-Za-z]', re.MULTILINE)
+
+
+def read_tsp(
+    path: str,
+    cache: bool = True,
+    mmap: bool = True,
+) -> NDArray[np.float64]:
+    """
+    Координаты (N, 2) из .tsp в порядке файла.
+
+    Args:
+        cache: читать/писать sidecar {path}.npy (если каталог недоступен
+            на запись — просто без sidecar)
+        mmap: sidecar через np.load(mmap_mode='c')
+
+    Raises:
+        ValueError: нет секции координат (EXPLICIT-матрица), не 2D,
+            число строк не совпадает с DIMENSION.
+    """
+    path = os.fspath(path)
+    sidecar = path + SIDECAR_SUFFIX
+    if cache and _sidecar_fresh(path, sidecar):
+        coords = np.load(sidecar, mmap_mode='c' if mmap else None)
+        if coords.shape == (int(read_tsp_header(path)['DIMENSION']), 2):
+            return np.asarray(coords)
+
+    header, body = _split_header(path, COORD_SECTIONS)
+    n = int(header['DIMENSION'])
+    coords = _parse_coords(body, n, path)
+    if cache:
+        tmp = f'{sidecar}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, coords)
+            os.replace(tmp, sidecar)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return coords
+
+
+def read_tsp_header(path: str) -> dict[str, str]:
+    """Заголовок .tsp/.tour (ключ → значение, без секций данных)."""
+    header, _ = _split_header(os.fspath(path), None)
+    return header
+
+
+def write_tsp(
+    path: str,
+    coords: NDArray[np.float64],
+    name: Optional[str] = None,
+    comment: Optional[str] = None,
+    edge_weight_type: str = 'EUC_2D',
+) -> None:
+    """Записать (N, 2) координаты как TSPLIB .tsp (целые — без дробной части)."""
+    coords = np.asarray(coords, dtype=np.float64)
+    n = len(coords)
+    name = name or os.path.splitext(os.path.basename(os.fspath(path)))[0]
+    integral = bool(np.all(coords == np.round(coords)))
+    table = np.column_stack([np.arange(1, n + 1, dtype=np.float64), coords])
+    with open(path, 'w') as f:
+        f.write(f'NAME : {name}\n')
+        if comment:
+            f.write(f'COMMENT : {comment}\n')
+        f.write(f'TYPE : TSP\nDIMENSION : {n}\nEDGE_WEIGHT_TYPE : {edge_weight_type}\n')
+        f.write('NODE_COORD_SECTION\n')
+        np.savetxt(f, table, fmt='%d %d %d' if integral else '%d %.10g %.10g')
+        f.write('EOF\n')
+
+
+def read_tour(path: str) -> NDArray[np.int64]:
+    """Тур из .tour: 0-based перестановка (TOUR_SECTION до -1)."""
+    path = os.fspath(path)
+    header, body = _split_header(path, ('TOUR_SECTION',))
+    ids = np.array(_section_data(body).split(), dtype=np.int64)
+    end = np.flatnonzero(ids == -1)
+    if len(end):
+        ids = ids[:end[0]]
+    tour = ids - 1
+    n = int(header.get('DIMENSION', len(tour)))
+    if len(tour) != n or not np.array_equal(np.sort(tour), np.arange(n, dtype=np.int64)):
+        raise ValueError(f'{path}: TOUR_SECTION is not a permutation of 1..{n}')
+    return tour
+
+
+def write_tour(
+    path: str,
+    tour,
+    name: Optional[str] = None,
+    comment: Optional[str] = None,
+) -> None:
+    """Записать 0-based тур как TSPLIB .tour (1-based id, -1, EOF)."""
+    tour = np.asarray(tour, dtype=np.int64)
+    name = name or os.path.splitext(os.path.basename(os.fspath(path)))[0]
+    with open(path, 'w') as f:
+        f.write(f'NAME : {name}\n')
+        if comment:
+            f.write(f'COMMENT : {comment}\n')
+        f.write(f'TYPE : TOUR\nDIMENSION : {len(tour)}\nTOUR_SECTION\n')
+        np.savetxt(f, tour + 1, fmt='%d')
+        f.write('-1\nEOF\n')
+
+
+# ═══════════════════════════════════════════════════════════
+#  PARSING
+# ═══════════════════════════════════════════════════════════
+
+def _split_header(path: str, sections) -> tuple[dict[str, str], str]:
+    """
+    (заголовок, остаток файла после строки секции). sections=None — только
+    заголовок до первой секции. ValueError, если нужной секции нет.
+    """
+    header: dict[str, str] = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            key = line.split(':', 1)[0].strip().upper()
+            if sections is None and (key.endswith('_SECTION') or key == 'EOF'):
+                return header, ''
+            if sections is not None and key in sections:
+                return header, f.read()
+            if key == 'EOF':
+                break
+            if ':' in line:
+                header[key] = line.split(':', 1)[1].strip()
+    if sections is None:
+        return header, ''
+    raise ValueError(f'{path}: no {" / ".join(sections)} '
+                     f'(EDGE_WEIGHT_TYPE={header.get("EDGE_WEIGHT_TYPE")})')
+
+
+def _parse_coords(body: str, n: int, path: str) -> NDArray[np.float64]:
+    """N строк 'id x y' → (N, 2) float64 одним преобразованием."""
+    tokens = _section_data(body).split()
+    if len(tokens) != 3 * n:
+        if len(tokens) == 4 * n:
+            raise ValueError(f'{path}: 3D coordinates are not supported')
+        raise ValueError(f'{path}: expected {n} coordinate rows, got {len(tokens) / 3:g}')
+    table = np.array(tokens, dtype=np.float64).reshape(n, 3)
+    return np.ascontiguousarray(table[:, 1:])
+
+
+def _section_data(body: str) -> str:
+    """Данные секции: до первой строки с буквы (EOF или следующая *_SECTION)."""
+    end = _KEYWORD_LINE.search(body)
+    return body[:end.start()] if end else body
+
+
+def _sidecar_fresh(path: str, sidecar: str) -> bool:
+    try:
+        return os.path.getmtime(sidecar) >= os.path.getmtime(path)
+    except OSError:
+        return False
@@ -18,23 +18,37 @@ from __future__ import annotations
 import numpy as np
 from numpy.typing import NDArray
 from typing import Optional
+import copy
 import time
 import multiprocessing
+import os
 import sys
+from dataclasses import asdict
 
 from src.core.distance_oracle import DistanceOracle
 from src.core.numba_sparse import (
-    warmup_sparse,
     tour_length_coords_jit,
     nn_tour_coords_jit,
-    two_opt_nn_coords_jit,
     two_opt_pass_nn_coords_jit,
     three_opt_full_pass_coords_jit,
-    or_opt_pass_coords_jit,
     double_bridge_coords_jit,
-    lk_opt_coords_jit,
+    seed_jit,
     lk_sequential_coords_jit,
+    lk_sequential_dual_coords_jit,
+    two_opt_nn_cached_jit,
+    or_opt_pass_cached_jit,
+    lk_opt_cached_jit,
+    init_succ_len_jit,
+    metric_n,
+    GraphMetric,
+    WORK_MOVES,
+    KERNEL_STATS,
+    STATS_KW,
+    absorb_kernel_stats,
+    kernel_stats_snapshot,
+    stats_dict,
 )
+from src.core.graph_metric import metric_take, metric_knn, missing_edges
 from src.core.eax_sparse import eax_population_optimize
 from src.core.hierarchy import (
     compute_stitch_ratio,
@@ -47,6 +61,15 @@ from src.core.hierarchy import (
     tree_stats,
 )
 from src.core.fingerprint import compute_fingerprint, StrategyRouter, SolverConfig
+from src.core.reorder import REORDER_MODES, hilbert_order, invert_permutation, tour_order
+from src.core.anytime import Convergence, SolveControl
+from src.core.checkpoint import CheckpointStore, flatten_tree, unflatten_tree
+from src.core.jit_cache import ensure_warm, kernels
+from src.core.budget import WORK_LIMITED_BUDGET, BudgetLedger, WorkLimits, run_sliced
+from src.core.seeding import stream_rng, stream_seed
+from src.core.memory import MemoryTracker, estimate_memory, plan_memory
+from src.core.solution_store import SolutionStore
+from src.core.trace import NULL_TRACER, Tracer, step
 
 
 # ═══════════════════════════════════════════════════════════
@@ -54,32 +77,211 @@ from src.core.fingerprint import compute_fingerprint, StrategyRouter, SolverConf
 # ═══════════════════════════════════════════════════════════
 
 def solve_v5(
-    coords: NDArray[np.float64],
+    coords: Optional[NDArray[np.float64]] = None,
     time_budget: float = 300.0,
     n_workers: int = 0,
     knn_k: int = 20,
     max_leaf_size: int = 1500,
     verbose: bool = True,
     adaptive_knn: bool = True,
+    use_alpha: Optional[bool] = None,
+    reorder: Optional[str] = None,
+    target_gap: Optional[float] = None,
+    compute_lower_bound: bool = False,
+    control: Optional[SolveControl] = None,
+    checkpoint_dir: Optional[str] = None,
+    resume: bool = False,
+    oracle: Optional[DistanceOracle] = None,
+    max_memory_mb: Optional[float] = None,
+    graph: Optional[GraphMetric] = None,
+    initial_tour=None,
+    store: Optional[SolutionStore] = None,
+    city_ids=None,
+    trace=None,
+    limits: Optional[WorkLimits] = None,
+    seed: Optional[int] = None,
+    config: Optional[SolverConfig] = None,
 ) -> dict:
     """
     Ultra-Scale TSP solver v5.0 with adaptive k-NN.
 
     Args:
-        coords: координаты городов [N, 2]
+        coords: координаты городов [N, 2] (None с graph)
         time_budget: бюджет времени в секундах
         n_workers: число параллельных процессов (0 = auto)
         knn_k: базовое k для k-NN (используется для leaf opt + v-cycle)
         max_leaf_size: макс. размер листа декомпозиции
         verbose: вывод прогресса
         adaptive_knn: если True, использовать k=10 для decompose, k=30 для global polish
+        use_alpha: dual candidate lists (alpha + distance) в global polish;
+            None = решение StrategyRouter
+        reorder: перенумерация городов для cache locality — 'hilbert'
+            (кривая Гильберта, до построения oracle), 'tour' (порядок NN-тура)
+            или None/'none'. Весь pipeline работает в новой нумерации,
+            result['tour'] — в id вызывающего.
+        target_gap: остановка, как только (length - lb) / lb ≤ target_gap
+            (lb — Held-Karp нижняя граница). Проверяется после stitch,
+            V-cycle и внутри global polish (ILS-итерация / EAX-поколение);
+            остаток бюджета возвращается в result['unspent_budget'].
+            Граница на uniform-инстансах ~1.5-2.5% ниже оптимума, поэтому
+            target_gap < ~3% обычно недостижим.
+        compute_lower_bound: посчитать lb без early termination
+            (подразумевается при target_gap).
+        control: anytime-канал (src.core.anytime.SolveControl) — события с
+            лучшим туром после каждой фазы и на улучшениях ILS/EAX, плюс
+            кооперативная остановка control.stop(). С control сразу после
+            warmup строится NN-тур, чтобы лучший тур существовал всегда.
+        checkpoint_dir: каталог состояния (src.core.checkpoint): oracle,
+            дерево декомпозиции, туры листьев, stitch/V-cycle туры, лучший
+            тур и популяция polish пишутся атомарно по завершении фаз
+            (best/популяция — ещё и каждые 30 с внутри polish).
+        resume: продолжить прогон из checkpoint_dir: завершённые фазы
+            загружаются, а не пересчитываются (решение роутера — тоже);
+            time_budget — бюджет ЭТОГО вызова. Если все фазы завершены,
+            вызов продолжает global polish с лучшего тура и популяции.
+            False → checkpoint_dir начинается заново.
+        oracle: готовый DistanceOracle для этих coords (кэш между задачами,
+            src.core.service): k-NN не перестраивается (knn_k берётся из
+            oracle), уже посчитанные alpha-списки и lower_bound
+            переиспользуются. Объект вызывающего не меняется (shallow copy).
+            Несовместим с reorder='hilbert'.
+        max_memory_mb: лимит пикового RSS (MB, вместе с уже занятым
+            процессом и воркерами листьев). knn_k, k-NN polish, max_leaf_size,
+            n_workers, популяция и архив polish урезаются до конфигурации,
+            оценка которой влезает (src.core.memory.plan_memory); если не
+            влезает и минимальная — MemoryError сразу, до построения oracle.
+            Пики RSS по фазам пишутся в phases['memory'] всегда.
+        graph: sparse-метрика вместо евклидовой (src.core.graph_metric):
+            CSR рёбер-кандидатов с весами (дорожная сеть), k-NN — самые
+            дешёвые рёбра строки, все ядра читают веса из графа. Координаты
+            графа (graph_metric(coords=...)) используются только для
+            декомпозиции/stitching и оценки рёбер вне графа; без них
+            декомпозиция отключается. Несовместим с reorder, oracle,
+            checkpoint_dir и Held-Karp границей (target_gap,
+            compute_lower_bound). phases['graph']: nnz, detour,
+            missing_edges (рёбра тура вне графа).
+        initial_tour: warm start — перестановка range(N) в id вызывающего;
+            вместо decompose/NN-construction тур сразу идёт в 2-opt/Or-opt/LK
+            (путь no_decompose) и global polish.
+        store: SolutionStore (src.core.solution_store). Exact match (тот же
+            хэш координат), полученный с бюджетом ≥ time_budget, возвращается
+            сразу (phases['store']); иначе exact/near match (перекрытие
+            городов ≥ 80%, спроецированный тур) — warm start, если не задан
+            initial_tour. Результат сохраняется в store (если лучше).
+            Несовместим с graph.
+        city_ids: (N,) стабильные int-id городов (id клиентов) — near match
+            в store по id, а не по совпадающим координатам.
+        trace: timeline в формате Chrome trace (src.core.trace): путь к
+            JSON (пишется в конце) или Tracer. Фазы + память, листья (pid
+            воркера), окна V-cycle, поколения EAX, каждый 20-й ILS kick.
+            None — NULL_TRACER, без накладных расходов.
+        limits: фиксированная работа фаз (src.core.budget.WorkLimits) вместо
+            времени — для scaling-исследований: дедлайны фаз отключены,
+            time_budget идёт только в StrategyRouter; leaf/polish ILS,
+            циклы V-cycle и поколения EAX ограничены числом итераций.
+            Под-шаги фаз (src.core.trace.step) пишутся в активный
+            profile_steps().
+        seed: детерминированный режим (src.core.seeding): у каждого листа,
+            V-cycle, ILS global polish и выбора родителей EAX — свой поток
+            из seed (numba np.random пересеивается в начале фазы / листа,
+            в том числе в fork-воркерах). Вместе с limits прогоны
+            побитово воспроизводимы; с бюджетом по времени — нет (число
+            итераций зависит от часов). None — без seed.
+        config: закреплённая конфигурация (SolverConfig) вместо решения
+            StrategyRouter — одинаковая стратегия при разных N (scaling-
+            отчёт). max_leaf_size берётся из config без N-scale поправок
+            (ограничения памяти и N // 3 остаются); use_alpha и graph
+            по-прежнему переопределяют её. None — роутер.
+
+    Счётчики ядер (MAST_KERNEL_STATS=1 до импорта, см. numba_sparse KERNEL
+    STATS): phases[phase]['kernel_stats'] по фазам (листья — сумма по
+    воркерам) и phases['kernel_stats'] за весь прогон. Инструментированные
+    ядра не кэшируются: первый solve_v5 процесса компилирует их (~1 мин на
+    одном ядре) до старта часов бюджета — time_total и фазы его не
+    включают, время — в phases['warmup']['untimed_compile'].
 
     Returns:
-        dict с ключами: tour, length, phases, time_total, n
+        dict с ключами: tour, length, phases, time_total, n,
+        lower_bound, gap_to_lb (None без lb), target_reached, unspent_budget,
+        stopped, seed, convergence — [[t, лучшая длина, фаза], ...] на
+        улучшениях (src.core.anytime.Convergence; t от старта solve_v5)
     """
+    t_compile = time.perf_counter()
+    if KERNEL_STATS:
+        # Инструментированные ядра не кэшируются: компиляция в каждом
+        # процессе (~минута) — до старта часов, не из time_budget
+        ensure_warm(graph=graph is not None)
     t_start = time.perf_counter()
-    n = len(coords)
+    if graph is not None:
+        if coords is not None:
+            raise ValueError('pass coordinates via graph_metric(coords=...), not together with graph')
+        if (reorder or 'none') != 'none' or oracle is not None or checkpoint_dir is not None:
+            raise ValueError('graph cannot be combined with reorder, oracle or checkpoint_dir')
+        if target_gap is not None or compute_lower_bound:
+            raise ValueError('Held-Karp lower bound is only certified for Euclidean coords')
+        if store is not None:
+            raise ValueError('solution store is keyed by coordinates and cannot be used with graph')
+        coords = graph  # метрика всех ядер; геометрия — oracle.coords
+    elif coords is None:
+        raise ValueError('coords or graph is required')
+    n = metric_n(coords)
     phases = {}
+    ledger = BudgetLedger(time_budget)
+    route_budget = time_budget
+    if limits is not None:
+        time_budget = WORK_LIMITED_BUDGET  # доли бюджета конечны, дедлайны не наступают
+
+    if initial_tour is not None:
+        initial_tour = np.asarray(initial_tour, dtype=np.int64)
+        if len(initial_tour) != n or not np.array_equal(
+            np.sort(initial_tour), np.arange(n, dtype=np.int64)
+        ):
+            raise ValueError(f'initial_tour is not a permutation of range({n})')
+    reorder = reorder or 'none'
+    if reorder not in REORDER_MODES:
+        raise ValueError(f'reorder must be one of {REORDER_MODES}, got {reorder!r}')
+    if target_gap is not None and target_gap < 0:
+        raise ValueError(f'target_gap must be >= 0, got {target_gap}')
+    if oracle is not None:
+        if reorder == 'hilbert':
+            raise ValueError("oracle cannot be combined with reorder='hilbert'")
+        if oracle.n != n or not np.array_equal(oracle.coords, coords):
+            raise ValueError('oracle was built for different coords')
+        oracle = copy.copy(oracle)  # polish перестраивает k-NN на своём экземпляре
+        knn_k = oracle.knn_k
+    caller_coords = coords  # для store: id и порядок вызывающего
+    store_match = None
+    if store is not None:
+        t0 = time.perf_counter()
+        store_match = store.get(coords)
+        instant = (store_match is not None and not resume
+                   and target_gap is None and not compute_lower_bound
+                   and (store_match.time_budget or 0.0) >= time_budget)
+        if instant:
+            # Exact match не хуже того, что даст этот бюджет — сразу
+            total_time = time.perf_counter() - t_start
+            phases['store'] = {'time': total_time, 'match': store_match.info(), 'saved': False}
+            if verbose:
+                _log(f'[v5] Store exact match: length={store_match.length:.0f}')
+            return {
+                'tour': store_match.tour.tolist(),
+                'length': store_match.length,
+                'phases': phases,
+                'time_total': total_time,
+                'n': n,
+                'lower_bound': None,
+                'gap_to_lb': None,
+                'target_reached': False,
+                'unspent_budget': max(0.0, time_budget - total_time),
+                'stopped': False,
+                'seed': seed,
+                'convergence': [[round(total_time, 4), float(store_match.length), 'store']],
+            }
+        phases['store'] = {'time': time.perf_counter() - t0}
+
+    perm = None  # perm[new_id] = caller id
+    if control is not None:
+        control.start()
 
     if verbose:
         _log(f'[v5] Starting: N={n}, budget={time_budget:.0f}s, knn_k={knn_k}')
@@ -88,232 +290,540 @@ def solve_v5(
     if n_workers <= 0:
         n_workers = min(multiprocessing.cpu_count(), 12)
 
-    # ═══════════ Phase 0: DistanceOracle ═══════════
-    t0 = time.perf_counter()
-    if verbose:
-        _log(f'[v5] Phase 0: Building DistanceOracle (k={knn_k}, adaptive={adaptive_knn})...')
-
-    # Phase 0: Oracle построен с базовым k (для листьев и V-cycle)
-    oracle = DistanceOracle(coords, knn_k=knn_k)
-    oracle.build_knn()
-    oracle_knn_k_initial = knn_k  # Сохраняем начальное k
-
-    # Instance Fingerprint + Strategy Router
-    fp = compute_fingerprint(oracle)
-    router = StrategyRouter()
-    config = router.route(fp, time_budget=time_budget)
-    cv_nn_dist = fp.cv_nn_dist
-
-    if verbose:
-        _log(f'[v5] Phase 0a: {router.explain(fp, config)}')
-
-    # Alpha-nearness augment (управляется роутером)
-    use_alpha = config.use_alpha
-    if use_alpha:
-        t_alpha = time.perf_counter()
-        oracle.build_alpha_augmented(n_iters=config.alpha_iters, max_extra=5)
+    # Memory budget: конфигурация под max_memory_mb (fail fast до oracle)
+    mem = MemoryTracker()
+    tracer = NULL_TRACER
+    if trace is not None:
+        tracer = trace if isinstance(trace, Tracer) else Tracer(origin=t_start)
+
+    stats_start = stats_mark = kernel_stats_snapshot() if KERNEL_STATS else None
+    convergence = Convergence(t_start)
+
+    def _phase_done(phase: str) -> None:
+        """
+        Конец фазы: пик RSS фазы → phases['memory'], span + память → trace,
+        счётчики ядер за фазу → phases[phase]['kernel_stats'] (KERNEL_STATS).
+        """
+        nonlocal stats_mark
+        if KERNEL_STATS and isinstance(phases.get(phase), dict):
+            current = kernel_stats_snapshot()
+            phases[phase]['kernel_stats'] = stats_dict(current - stats_mark)
+            stats_mark = current
+        peak = mem.mark(phase)
+        if tracer.enabled:
+            tracer.complete(phase, 'phase', tracer.now() - float(phases.get(phase, {}).get('time', 0.0)))
+            tracer.memory(peak_rss_mb=round(peak, 1))
+    knn_k_polish = max(knn_k, min(30, n - 1)) if adaptive_knn else knn_k
+    pop_size, archive_size = 15, 20
+    mem_plan = None
+    if max_memory_mb is not None:
+        mem_plan = plan_memory(
+            n, max_memory_mb,
+            knn_k=knn_k,
+            knn_k_polish=knn_k_polish,
+            max_leaf_size=3000,
+            n_workers=n_workers,
+            base_mb=mem.start_mb,
+            fixed_knn=oracle is not None,
+            jit_loaded=bool(tour_length_coords_jit.signatures),
+        )
+        knn_k = mem_plan.knn_k
+        knn_k_polish = mem_plan.knn_k_polish
+        n_workers = mem_plan.n_workers
+        pop_size, archive_size = mem_plan.pop_size, mem_plan.archive_size
         if verbose:
-            _log(f'  alpha augment done: k={oracle.knn_k}, {time.perf_counter() - t_alpha:.1f}s')
-
-    # Adaptive leaf_size: роутер + N-scale overrides
-    if config.use_decompose:
-        if max_leaf_size == 1500:  # дефолтное значение → адаптируем
-            max_leaf_size = config.max_leaf_size
-            if n > 20000:
-                target_leaves = max(24, min(100, n // 1500))
-                max_leaf_size = max(2000, n // target_leaves)
-                if cv_nn_dist > 0.8:
-                    max_leaf_size = int(max_leaf_size * 0.85)
-        max_leaf_size = min(max_leaf_size, 3000)
-        max_leaf_size = min(max_leaf_size, n // 3)
-
-    phases['oracle'] = {
-        'time': time.perf_counter() - t0,
-        'knn_k': knn_k,
-        'memory_mb': _estimate_memory(n, knn_k),
-        'cv_nn_dist': cv_nn_dist,
-        'adaptive_leaf_size': max_leaf_size,
-    }
-    if verbose:
-        _log(f'  oracle built: {phases["oracle"]["time"]:.1f}s, ~{phases["oracle"]["memory_mb"]:.0f} MB, '
-             f'cv_nn={cv_nn_dist:.3f}, leaf_size={max_leaf_size}')
+            _log(f'[v5] Memory plan: ~{mem_plan.estimate_mb:.0f}/{max_memory_mb:.0f} MB'
+                 + (f', reduced: {", ".join(mem_plan.reductions)}' if mem_plan.reductions else ''))
+
+    reached_in = None
+
+    def _finished() -> bool:
+        """target_gap достигнут или запрошена остановка (control.stop())."""
+        return reached_in is not None or (control is not None and control.should_stop())
+
+    # Checkpoint: новый прогон или продолжение (параметры, от которых зависят
+    # сохранённые массивы, должны совпасть)
+    ckpt = None
+    if checkpoint_dir is not None:
+        ckpt = CheckpointStore(checkpoint_dir)
+        ckpt_params = {'knn_k': knn_k, 'reorder': reorder}
+        if not resume:
+            ckpt.begin(coords, ckpt_params)
+        elif ckpt.resume(coords, ckpt_params) and verbose:
+            _log(f'[v5] Resuming from {checkpoint_dir}: completed={ckpt.state["completed"]}, '
+                 f'best={ckpt.state["best_length"]}')
 
-    # ═══════════ Phase 0.5: Warmup Numba ═══════════
+    # ═══════════ Phase 0: DistanceOracle ═══════════
     t0 = time.perf_counter()
-    warmup_sparse()
-    phases['warmup'] = {'time': time.perf_counter() - t0}
-
-    leaves = None  # для fallback
-    if config.use_decompose:
-        # ═══════════ Phase 1: Hierarchical decomposition ═══════════
-        t0 = time.perf_counter()
+    fp = None
+    if ckpt is not None and ckpt.completed('oracle'):
+        # Resume: k-NN, перестановка и решение роутера — из checkpoint
+        oracle, perm, config, oracle_info = _restore_oracle(ckpt, coords, knn_k)
+        coords = oracle.coords
+        max_leaf_size = oracle_info['max_leaf_size']
+        phases.update(oracle_info['phases'])
         if verbose:
-            _log(f'[v5] Phase 1: Spectral decomposition (max_leaf={max_leaf_size})...')
-
-        decompose_k = min(knn_k, 15)
-        root = decompose(
-            coords,
-            max_leaf_size=max_leaf_size,
-            min_leaf_size=50,
-            knn_k=decompose_k,
-            use_spectral=config.use_spectral_decompose,
-        )
-        stats = tree_stats(root)
-        phases['decomposition'] = {
-            'time': time.perf_counter() - t0,
-            'n_leaves': stats['n_leaves'],
-            'max_depth': stats['max_depth'],
-            'leaf_min': min(stats['leaf_sizes']),
-            'leaf_max': max(stats['leaf_sizes']),
-            'leaf_mean': float(np.mean(stats['leaf_sizes'])),
-        }
+            _log(f'[v5] Phase 0: oracle restored ({config.strategy_name}, '
+                 f'leaf_size={max_leaf_size})')
+    else:
         if verbose:
-            _log(f'  decomposed: {stats["n_leaves"]} leaves, depth={stats["max_depth"]}, '
-                 f'leaf_size={min(stats["leaf_sizes"])}-{max(stats["leaf_sizes"])}')
-
-        # ═══════════ Phase 2: Parallel leaf optimization ═══════════
-        time_remaining = time_budget - (time.perf_counter() - t_start)
-        leaf_fraction = config.leaf_budget_fraction if n <= 20000 else 0.35
-        leaf_budget = time_remaining * leaf_fraction
+            _log(f'[v5] Phase 0: Building DistanceOracle (k={knn_k}, adaptive={adaptive_knn})...')
+
+        # Phase 0-: перенумерация городов (cache locality)
+        reorder_time = 0.0
+        if reorder == 'hilbert':
+            t_re = time.perf_counter()
+            perm = hilbert_order(coords)
+            coords = np.ascontiguousarray(np.asarray(coords, dtype=np.float64)[perm])
+            reorder_time += time.perf_counter() - t_re
+
+        # Phase 0: Oracle построен с базовым k (для листьев и V-cycle)
+        if graph is not None:
+            oracle = DistanceOracle(None, knn_k=knn_k, graph=graph)
+        elif oracle is None:
+            oracle = DistanceOracle(coords, knn_k=knn_k)
+        if oracle.knn_indices is None:
+            with step('oracle.knn'):
+                oracle.build_knn()
+        if reorder == 'tour':
+            t_re = time.perf_counter()
+            perm = tour_order(oracle)
+            oracle = oracle.renumber(perm)
+            coords = oracle.coords
+            reorder_time += time.perf_counter() - t_re
+        if perm is not None:
+            phases['reorder'] = {'mode': reorder, 'time': reorder_time}
+            if verbose:
+                _log(f'  reorder={reorder}: {phases["reorder"]["time"]:.2f}s')
+
+        # Instance Fingerprint + Strategy Router
+        with step('oracle.fingerprint'):
+            fp = compute_fingerprint(oracle)
+        router = StrategyRouter()
+        pinned = config is not None
+        config = copy.copy(config) if pinned else router.route(fp, time_budget=route_budget)
+        if use_alpha is not None:
+            config.use_alpha = use_alpha
+        if oracle.coords is None:
+            config.use_decompose = False  # граф без координат: нечего резать
+        cv_nn_dist = fp.cv_nn_dist
 
-        t0 = time.perf_counter()
         if verbose:
-            _log(f'[v5] Phase 2: Optimizing {stats["n_leaves"]} leaves '
-                 f'({n_workers} workers, budget={leaf_budget:.0f}s)...')
+            _log(f'[v5] Phase 0a: {router.explain(fp, config)}')
 
-        leaves = get_leaves(root)
-        _optimize_leaves_parallel(
-            coords, oracle, leaves,
-            n_workers=n_workers,
-            time_budget=leaf_budget,
-            verbose=verbose,
-        )
-
-        leaf_lengths = [l.tour_length for l in leaves if l.tour is not None]
-        phases['leaf_optimization'] = {
+        # Alpha-nearness dual candidate lists (управляется роутером)
+        if config.use_alpha and oracle.alpha_indices is None:
+            t_alpha = time.perf_counter()
+            oracle.build_alpha_dual(n_iters=config.alpha_iters, alpha_k=5)
+            if verbose:
+                _log(f'  alpha dual lists done: alpha_k={oracle.alpha_indices.shape[1]}, '
+                     f'{time.perf_counter() - t_alpha:.1f}s')
+
+        # Adaptive leaf_size: роутер + N-scale overrides
+        if config.use_decompose:
+            if max_leaf_size == 1500:  # дефолтное значение → адаптируем
+                max_leaf_size = config.max_leaf_size
+                if n > 20000 and not pinned:
+                    target_leaves = max(24, min(100, n // 1500))
+                    max_leaf_size = max(2000, n // target_leaves)
+                    if cv_nn_dist > 0.8:
+                        max_leaf_size = int(max_leaf_size * 0.85)
+            max_leaf_size = min(max_leaf_size, 3000)
+            if mem_plan is not None:
+                max_leaf_size = min(max_leaf_size, mem_plan.max_leaf_size)
+            max_leaf_size = min(max_leaf_size, n // 3)
+
+        phases['oracle'] = {
             'time': time.perf_counter() - t0,
-            'n_leaves': len(leaves),
-            'sum_length': sum(leaf_lengths),
+            'knn_k': knn_k,
+            'memory_mb': estimate_memory(
+                n, knn_k, knn_k_polish, max_leaf_size, n_workers, pop_size, archive_size,
+                mem.start_mb, config.use_alpha, bool(tour_length_coords_jit.signatures),
+            )['total'],
+            'cv_nn_dist': cv_nn_dist,
+            'adaptive_leaf_size': max_leaf_size,
         }
         if verbose:
-            _log(f'  leaves optimized: {time.perf_counter()-t0:.1f}s')
-
-        # ═══════════ Phase 3: Stitching ═══════════
-        t0 = time.perf_counter()
-        if verbose:
-            _log(f'[v5] Phase 3: Stitching {stats["n_leaves"]} leaf tours...')
-
-        find_boundary_cities(coords, root, n_boundary=20)
-        global_tour = stitch_leaf_tours(coords, root, oracle)
-
-        if len(global_tour) != n or len(set(global_tour.tolist())) != n:
+            _log(f'  oracle built: {phases["oracle"]["time"]:.1f}s, ~{phases["oracle"]["memory_mb"]:.0f} MB, '
+                 f'cv_nn={cv_nn_dist:.3f}, leaf_size={max_leaf_size}')
+
+        if ckpt is not None:
+            oracle_arrays = {'knn_indices': oracle.knn_indices, 'knn_dists': oracle.knn_dists}
+            if oracle.alpha_indices is not None:
+                oracle_arrays['alpha_indices'] = oracle.alpha_indices
+            if perm is not None:
+                oracle_arrays['perm'] = perm
+            ckpt.save_phase('oracle', oracle_arrays, {
+                'config': asdict(config),
+                'max_leaf_size': max_leaf_size,
+                'phases': {key: phases[key] for key in ('reorder', 'oracle') if key in phases},
+            })
+
+    _phase_done('oracle')
+    if control is not None and perm is not None:
+        control.perm = perm
+
+    # Warm start: тур вызывающего или из store (exact / near match, проекция)
+    warm_tour = None
+    if initial_tour is None and store is not None:
+        t_store = time.perf_counter()
+        if store_match is None:
+            store_match = store.lookup(caller_coords, city_ids=city_ids, fingerprint=fp)
+        phases['store']['time'] += time.perf_counter() - t_store
+        phases['store']['match'] = store_match.info() if store_match is not None else None
+        if store_match is not None:
+            initial_tour = store_match.tour
             if verbose:
-                _log(f'  WARNING: stitch invalid tour. Rebuilding...')
-            global_tour = _rebuild_tour_fallback(coords, oracle, leaves)
+                _log(f'[v5] Store {store_match.kind} match: overlap={store_match.overlap:.1%}, '
+                     f'inserted={store_match.n_inserted}, length={store_match.length:.0f}')
+    if initial_tour is not None:
+        warm_tour = initial_tour
+        if perm is not None:
+            warm_tour = invert_permutation(perm)[initial_tour]
+        warm_tour = np.ascontiguousarray(warm_tour, dtype=np.int64)
+        config.use_decompose = False  # тур уже есть: декомпозиция не нужна
+        phases['warm_start'] = {
+            'source': 'store' if store_match is not None and initial_tour is store_match.tour else 'caller',
+            'length': float(tour_length_coords_jit(warm_tour, coords)),
+        }
+    oracle_knn_k_initial = knn_k  # Сохраняем начальное k
 
-        stitch_length = tour_length_coords_jit(global_tour, coords)
-        phases['stitching'] = {
-            'time': time.perf_counter() - t0,
-            'length': float(stitch_length),
+    # Held-Karp lower bound (на точных k-NN, до rebuild k-NN в polish)
+    lower_bound = None
+    target_length = None
+    if ckpt is not None and ckpt.completed('lower_bound'):
+        phases['lower_bound'] = ckpt.info('lower_bound')
+        lower_bound = phases['lower_bound']['value']
+    elif (target_gap is not None or compute_lower_bound) and oracle.lower_bound is not None:
+        lower_bound = oracle.lower_bound
+        phases['lower_bound'] = {'time': 0.0, 'value': lower_bound, 'cached': True}
+    elif target_gap is not None or compute_lower_bound:
+        t_lb = time.perf_counter()
+        lb_iters = 100 if n <= 50000 else 50
+        lower_bound = oracle.build_lower_bound(n_iters=lb_iters)
+        phases['lower_bound'] = {
+            'time': time.perf_counter() - t_lb,
+            'value': lower_bound,
+            'n_iters': lb_iters,
         }
+        _phase_done('lower_bound')
+        if ckpt is not None:
+            ckpt.save_phase('lower_bound', None, phases['lower_bound'])
         if verbose:
-            _log(f'  stitched: length={stitch_length:.0f}, t={time.perf_counter()-t0:.1f}s')
+            _log(f'  Held-Karp lower bound: {lower_bound:.0f} '
+                 f'({phases["lower_bound"]["time"]:.1f}s, {lb_iters} iters)')
+    if target_gap is not None:
+        target_length = lower_bound * (1.0 + target_gap)
 
-        best_tour = global_tour.copy()
-        best_length = float(stitch_length)
-
-        # Stitch quality metrics (для адаптивного V-cycle)
-        stitch_metrics = compute_stitch_ratio(global_tour, coords, leaves)
-        phases['stitching']['stitch_ratio'] = stitch_metrics['stitch_ratio']
-        phases['stitching']['stitch_count'] = stitch_metrics['stitch_count']
-        phases['stitching']['max_stitch_stress'] = stitch_metrics['max_stitch_stress']
-        if verbose:
-            _log(f'  stitch quality: ratio={stitch_metrics["stitch_ratio"]:.3f}, '
-                 f'count={stitch_metrics["stitch_count"]}, '
-                 f'stress={stitch_metrics["max_stitch_stress"]:.1f}x')
-
-        # ═══════════ Phase 4: V-cycle refinement ═══════════
-        time_remaining = time_budget - (time.perf_counter() - t_start)
-
-        # Адаптивный бюджет V-cycle на основе stitch quality
-        base_fraction = config.v_cycle_budget_fraction if n <= 20000 else 0.75
-        sr = stitch_metrics['stitch_ratio']
-        if sr > 0.15:
-            vcycle_fraction = min(0.85, base_fraction * 1.3)
-        elif sr < 0.05:
-            vcycle_fraction = max(0.30, base_fraction * 0.6)
+    # ═══════════ Phase 0.5: Warmup Numba ═══════════
+    t0 = time.perf_counter()
+    # n_workers > 1: загрузить ядра до fork, воркеры листьев унаследуют их
+    warmup_mode = ensure_warm(graph=graph is not None, lazy=n_workers == 1)
+    phases['warmup'] = {'time': time.perf_counter() - t0, 'mode': warmup_mode}
+    if KERNEL_STATS:
+        phases['warmup']['untimed_compile'] = t_start - t_compile
+    tracer.complete('warmup', 'phase', t0)
+
+    best_tour = None
+    best_length = float('inf')
+    if control is not None:
+        # Anytime: тур есть сразу (warm start или NN, O(N*k)), stop() до stitch вернёт его
+        if warm_tour is not None:
+            best_tour = warm_tour.copy()
         else:
-            vcycle_fraction = base_fraction
-        vcycle_budget = time_remaining * vcycle_fraction
+            best_tour = nn_tour_coords_jit(coords, oracle.knn_indices, oracle.knn_dists, 0)
+        best_length = float(tour_length_coords_jit(best_tour, coords))
+        convergence.record('initial', best_length)
+        control.report('initial', best_tour, best_length, kind='phase')
 
-        t0 = time.perf_counter()
-        if verbose:
-            _log(f'[v5] Phase 4: V-cycle refinement (budget={vcycle_budget:.0f}s, '
-                 f'fraction={vcycle_fraction:.0%})...')
-
-        # Адаптивный segment size
-        base_seg_size = min(4000, max(1000, n // 10))
-        if sr > 0.15:
-            seg_size = min(6000, int(base_seg_size * 1.5))
-        elif sr < 0.05:
-            seg_size = max(800, int(base_seg_size * 0.7))
+    leaves = None  # для fallback
+    if config.use_decompose and not _finished():
+        if ckpt is not None and ckpt.completed('leaf_optimization'):
+            # Resume: дерево декомпозиции вместе с турами листьев
+            root = unflatten_tree(ckpt.load_arrays('leaf_optimization'))
+            stats = tree_stats(root)
+            leaves = get_leaves(root)
+            phases['decomposition'] = ckpt.info('decomposition')
+            phases['leaf_optimization'] = ckpt.info('leaf_optimization')
+            if verbose:
+                _log(f'[v5] Phase 1-2: {len(leaves)} optimized leaves restored')
         else:
-            seg_size = base_seg_size
-        n_cycles = max(1, min(3, int(vcycle_budget / max(n / 3000, 1))))
-
-        refined = v_cycle_refine(
-            best_tour, coords, oracle,
-            n_cycles=n_cycles,
-            segment_size=seg_size,
-            overlap=seg_size // 5,
-            leaves=leaves,
-            time_budget=vcycle_budget,
-            stitch_metrics=stitch_metrics,
-        )
-        refined_length = tour_length_coords_jit(refined, coords)
+            if ckpt is not None and ckpt.completed('decomposition'):
+                root = unflatten_tree(ckpt.load_arrays('decomposition'))
+                stats = tree_stats(root)
+                phases['decomposition'] = ckpt.info('decomposition')
+                if verbose:
+                    _log(f'[v5] Phase 1: decomposition restored ({stats["n_leaves"]} leaves)')
+            else:
+                # ═══════════ Phase 1: Hierarchical decomposition ═══════════
+                t0 = time.perf_counter()
+                if verbose:
+                    _log(f'[v5] Phase 1: Spectral decomposition (max_leaf={max_leaf_size})...')
+
+                decompose_k = min(knn_k, 15)
+                root = decompose(
+                    oracle.coords,
+                    max_leaf_size=max_leaf_size,
+                    min_leaf_size=50,
+                    knn_k=decompose_k,
+                    use_spectral=config.use_spectral_decompose,
+                )
+                stats = tree_stats(root)
+                phases['decomposition'] = {
+                    'time': time.perf_counter() - t0,
+                    'n_leaves': stats['n_leaves'],
+                    'max_depth': stats['max_depth'],
+                    'leaf_min': min(stats['leaf_sizes']),
+                    'leaf_max': max(stats['leaf_sizes']),
+                    'leaf_mean': float(np.mean(stats['leaf_sizes'])),
+                }
+                if verbose:
+                    _log(f'  decomposed: {stats["n_leaves"]} leaves, depth={stats["max_depth"]}, '
+                         f'leaf_size={min(stats["leaf_sizes"])}-{max(stats["leaf_sizes"])}')
+                _phase_done('decomposition')
+                if ckpt is not None:
+                    ckpt.save_phase('decomposition', flatten_tree(root), phases['decomposition'])
+
+            # ═══════════ Phase 2: Parallel leaf optimization ═══════════
+            time_remaining = time_budget - (time.perf_counter() - t_start)
+            leaf_fraction = config.leaf_budget_fraction if n <= 20000 else 0.35
+            leaf_budget = time_remaining * leaf_fraction
+            ledger.plan('leaf_optimization', leaf_budget)
+
+            t0 = time.perf_counter()
+            if verbose:
+                _log(f'[v5] Phase 2: Optimizing {stats["n_leaves"]} leaves '
+                     f'({n_workers} workers, budget={leaf_budget:.0f}s)...')
+
+            leaves = get_leaves(root)
+            _optimize_leaves_parallel(
+                coords, oracle, leaves,
+                n_workers=n_workers,
+                time_budget=leaf_budget,
+                verbose=verbose,
+                control=control,
+                tracer=tracer,
+                max_kicks=limits.leaf_kicks if limits is not None else None,
+                seed=seed,
+            )
 
-        if refined_length < best_length:
-            best_tour = refined
-            best_length = float(refined_length)
+            leaf_lengths = [l.tour_length for l in leaves if l.tour is not None]
+            phases['leaf_optimization'] = {
+                'time': time.perf_counter() - t0,
+                'n_leaves': len(leaves),
+                'sum_length': sum(leaf_lengths),
+            }
+            _phase_done('leaf_optimization')
+            if verbose:
+                _log(f'  leaves optimized: {time.perf_counter()-t0:.1f}s')
+            # Прерванная фаза (control.stop()) не сохраняется
+            if ckpt is not None and all(leaf.tour is not None for leaf in leaves):
+                ckpt.save_phase('leaf_optimization', flatten_tree(root), phases['leaf_optimization'])
+
+    if config.use_decompose and not _finished():
+        if ckpt is not None and ckpt.completed('stitching'):
+            global_tour = ckpt.load_arrays('stitching')['tour']
+            stitch_info = ckpt.info('stitching')
+            phases['stitching'] = stitch_info['phase']
+            stitch_metrics = stitch_info['metrics']
+            stitch_length = phases['stitching']['length']
+            if verbose:
+                _log(f'[v5] Phase 3: stitched tour restored (length={stitch_length:.0f})')
+        else:
+            # ═══════════ Phase 3: Stitching ═══════════
+            t0 = time.perf_counter()
+            if verbose:
+                _log(f'[v5] Phase 3: Stitching {stats["n_leaves"]} leaf tours...')
 
-        phases['v_cycle'] = {
-            'time': time.perf_counter() - t0,
-            'length': best_length,
-            'n_cycles': n_cycles,
-            'segment_size': seg_size,
-            'improvement': float(stitch_length - best_length),
-        }
-        if verbose:
-            _log(f'  v-cycle: {stitch_length:.0f} -> {best_length:.0f} '
-                 f'(-{(stitch_length-best_length)/stitch_length*100:.1f}%)')
+            # Геометрия (у графа — его координаты), длины дальше — по метрике
+            with step('stitch.boundary_cities'):
+                find_boundary_cities(oracle.coords, root, n_boundary=20)
+            global_tour = stitch_leaf_tours(oracle.coords, root, oracle)
 
-    else:
-        # ═══════════ NO DECOMPOSE: direct NN + LK ═══════════
-        t0 = time.perf_counter()
-        if verbose:
-            _log(f'[v5] Skip decompose (strategy={config.strategy_name})')
-            _log(f'[v5] Building initial tour via NN + LK...')
-
-        tour = nn_tour_coords_jit(coords, oracle.knn_indices, oracle.knn_dists, 0)
-        two_opt_nn_coords_jit(tour, coords, oracle.knn_indices, 30, 3)
-        three_opt_full_pass_coords_jit(tour, coords, oracle.knn_indices)
-        or_opt_pass_coords_jit(tour, coords, oracle.knn_indices)
-        lk_opt_coords_jit(tour, coords, oracle.knn_indices, 30, 3)
+            if len(global_tour) != n or len(set(global_tour.tolist())) != n:
+                if verbose:
+                    _log(f'  WARNING: stitch invalid tour. Rebuilding...')
+                global_tour = _rebuild_tour_fallback(
+                    coords, oracle, leaves, deadline=t_start + time_budget,
+                )
+
+            stitch_length = tour_length_coords_jit(global_tour, coords)
+            phases['stitching'] = {
+                'time': time.perf_counter() - t0,
+                'length': float(stitch_length),
+            }
+            _phase_done('stitching')
+            if verbose:
+                _log(f'  stitched: length={stitch_length:.0f}, t={time.perf_counter()-t0:.1f}s')
+
+            # Stitch quality metrics (для адаптивного V-cycle)
+            with step('stitch.ratio'):
+                stitch_metrics = compute_stitch_ratio(global_tour, oracle.coords, leaves)
+            phases['stitching']['stitch_ratio'] = stitch_metrics['stitch_ratio']
+            phases['stitching']['stitch_count'] = stitch_metrics['stitch_count']
+            phases['stitching']['max_stitch_stress'] = stitch_metrics['max_stitch_stress']
+            if verbose:
+                _log(f'  stitch quality: ratio={stitch_metrics["stitch_ratio"]:.3f}, '
+                     f'count={stitch_metrics["stitch_count"]}, '
+                     f'stress={stitch_metrics["max_stitch_stress"]:.1f}x')
+            if ckpt is not None:
+                ckpt.save_phase('stitching', {'tour': global_tour},
+                                {'phase': phases['stitching'], 'metrics': stitch_metrics})
 
-        best_tour = tour.copy()
-        best_length = float(tour_length_coords_jit(tour, coords))
+        best_tour = global_tour.copy()
+        best_length = float(stitch_length)
+        convergence.record('stitching', best_length)
+        if control is not None:
+            control.report('stitching', best_tour, best_length, kind='phase')
+        if _target_reached(best_length, target_length):
+            reached_in = 'stitching'
+
+    if config.use_decompose and not _finished():
+        if ckpt is not None and ckpt.completed('v_cycle'):
+            best_tour = ckpt.load_arrays('v_cycle')['tour']
+            phases['v_cycle'] = ckpt.info('v_cycle')
+            best_length = phases['v_cycle']['length']
+            if verbose:
+                _log(f'[v5] Phase 4: V-cycle tour restored (length={best_length:.0f})')
+        else:
+            # ═══════════ Phase 4: V-cycle refinement ═══════════
+            time_remaining = time_budget - (time.perf_counter() - t_start)
+
+            # Адаптивный бюджет V-cycle на основе stitch quality
+            base_fraction = config.v_cycle_budget_fraction if n <= 20000 else 0.75
+            sr = stitch_metrics['stitch_ratio']
+            if sr > 0.15:
+                vcycle_fraction = min(0.85, base_fraction * 1.3)
+            elif sr < 0.05:
+                vcycle_fraction = max(0.30, base_fraction * 0.6)
+            else:
+                vcycle_fraction = base_fraction
+            vcycle_budget = time_remaining * vcycle_fraction
+            ledger.plan('v_cycle', vcycle_budget)
+
+            t0 = time.perf_counter()
+            if verbose:
+                _log(f'[v5] Phase 4: V-cycle refinement (budget={vcycle_budget:.0f}s, '
+                     f'fraction={vcycle_fraction:.0%})...')
+
+            # Адаптивный segment size
+            base_seg_size = min(4000, max(1000, n // 10))
+            if sr > 0.15:
+                seg_size = min(6000, int(base_seg_size * 1.5))
+            elif sr < 0.05:
+                seg_size = max(800, int(base_seg_size * 0.7))
+            else:
+                seg_size = base_seg_size
+            n_cycles = max(1, min(3, int(vcycle_budget / max(n / 3000, 1))))
+            if limits is not None:
+                n_cycles = limits.v_cycles
+
+            if seed is not None:
+                seed_jit(stream_seed(seed, 'v_cycle'))
+            refined = v_cycle_refine(
+                best_tour, coords, oracle,
+                n_cycles=n_cycles,
+                segment_size=seg_size,
+                overlap=seg_size // 5,
+                leaves=leaves,
+                time_budget=vcycle_budget,
+                stitch_metrics=stitch_metrics,
+                control=control,
+                tracer=tracer,
+            )
+            refined_length = tour_length_coords_jit(refined, coords)
+
+            if refined_length < best_length:
+                best_tour = refined
+                best_length = float(refined_length)
+
+            phases['v_cycle'] = {
+                'time': time.perf_counter() - t0,
+                'length': best_length,
+                'n_cycles': n_cycles,
+                'segment_size': seg_size,
+                'improvement': float(stitch_length - best_length),
+            }
+            _phase_done('v_cycle')
+            if verbose:
+                _log(f'  v-cycle: {stitch_length:.0f} -> {best_length:.0f} '
+                     f'(-{(stitch_length-best_length)/stitch_length*100:.1f}%)')
+            if ckpt is not None:
+                ckpt.save_phase('v_cycle', {'tour': best_tour}, phases['v_cycle'])
+
+        convergence.record('v_cycle', best_length)
+        if control is not None:
+            control.report('v_cycle', best_tour, best_length, kind='phase')
+        if _target_reached(best_length, target_length):
+            reached_in = 'v_cycle'
+
+    if not config.use_decompose and not _finished():
+        if ckpt is not None and ckpt.completed('no_decompose'):
+            best_tour = ckpt.load_arrays('no_decompose')['tour']
+            phases['no_decompose'] = ckpt.info('no_decompose')
+            best_length = phases['no_decompose']['initial_length']
+            if verbose:
+                _log(f'[v5] initial tour restored (length={best_length:.0f})')
+        else:
+            # ═══════════ NO DECOMPOSE: direct NN (или warm start) + LK ═══════════
+            t0 = time.perf_counter()
+            if verbose:
+                _log(f'[v5] Skip decompose (strategy={config.strategy_name})')
+                _log(f'[v5] Building initial tour via {"warm start" if warm_tour is not None else "NN"} + LK...')
+
+            # Половина остатка: дальше локальный поиск продолжит polish
+            nd_budget = 0.5 * (time_budget - (t0 - t_start))
+            ledger.plan('no_decompose', nd_budget)
+            nd_deadline = t0 + nd_budget
+
+            knn, knn_d = oracle.knn_indices, oracle.knn_dists
+            if warm_tour is not None:
+                tour = warm_tour.copy()
+            else:
+                tour = nn_tour_coords_jit(coords, knn, knn_d, 0)
+            run_sliced(two_opt_nn_cached_jit, tour, coords, knn, knn_d, 30, 3, deadline=nd_deadline)
+            run_sliced(three_opt_full_pass_coords_jit, tour, coords, knn, deadline=nd_deadline)
+            run_sliced(or_opt_pass_cached_jit, tour, coords, knn, knn_d,
+                       init_succ_len_jit(tour, coords), deadline=nd_deadline)
+            run_sliced(lk_opt_cached_jit, tour, coords, knn[:, :0], knn, knn_d, 30, 3,
+                       deadline=nd_deadline)
+
+            tour_len = float(tour_length_coords_jit(tour, coords))
+            if tour_len < best_length:
+                best_tour = tour.copy()
+                best_length = tour_len
+
+            phases['no_decompose'] = {
+                'time': time.perf_counter() - t0,
+                'initial_length': best_length,
+            }
+            _phase_done('no_decompose')
+            if verbose:
+                _log(f'  initial tour: {best_length:.0f} ({time.perf_counter()-t0:.1f}s)')
+            if ckpt is not None:
+                ckpt.save_phase('no_decompose', {'tour': best_tour}, phases['no_decompose'])
 
-        phases['no_decompose'] = {
-            'time': time.perf_counter() - t0,
-            'initial_length': best_length,
-        }
-        if verbose:
-            _log(f'  initial tour: {best_length:.0f} ({time.perf_counter()-t0:.1f}s)')
+        convergence.record('no_decompose', best_length)
+        if control is not None:
+            control.report('no_decompose', best_tour, best_length, kind='phase')
+        if _target_reached(best_length, target_length):
+            reached_in = 'no_decompose'
 
     # ═══════════ Phase 5: Global polish ═══════════
     time_remaining = time_budget - (time.perf_counter() - t_start)
+    if _finished():
+        time_remaining = 0.0  # цель достигнута / остановка — polish пропускаем
+
+    # Resume: лучший тур и популяция прошлого polish
+    polish_population = None
+    if ckpt is not None:
+        saved = ckpt.load_best()
+        if saved is not None and saved[1] < best_length:
+            best_tour, best_length = saved[0].copy(), saved[1]
+        polish_population = ckpt.load_population()
 
     t0 = time.perf_counter()
+    ledger.plan('global_polish', time_remaining)
     if verbose:
         _log(f'[v5] Phase 5: Global polish (budget={time_remaining:.0f}s)...')
 
@@ -322,15 +832,14 @@ def solve_v5(
     knn_rebuild_time = 0.0
 
     if adaptive_knn and time_remaining > 3.0:
-        # Переход к k=30 для более thorough global search
-        knn_k_polish = min(30, n - 1)  # cap at n-1
+        # Переход к k=30 для более thorough global search (cap: n-1, memory plan)
         if knn_k_polish > oracle_knn_k_initial:
             t_knn_rebuild = time.perf_counter()
             oracle.knn_k = knn_k_polish
-            oracle.build_knn()
-            # Re-apply alpha augment на расширенном k-NN
-            if use_alpha:
-                oracle.build_alpha_augmented(n_iters=30, max_extra=5)
+            with step('polish.knn_rebuild'):
+                oracle.build_knn()
+            # alpha_indices (если есть) остаётся валидным: distance-список
+            # расширяется, alpha-список первого хода не меняется
             knn_rebuild_time = time.perf_counter() - t_knn_rebuild
             oracle_knn_k_polish = knn_k_polish
 
@@ -345,12 +854,28 @@ def solve_v5(
         verbose=verbose,
         use_sequential_lk=config.use_sequential_lk,
         lk_max_depth=config.lk_max_depth,
+        use_eax=config.use_eax,
+        target_length=target_length,
+        control=control,
+        checkpoint=ckpt,
+        init_population=polish_population,
+        pop_size=pop_size,
+        archive_size=archive_size,
+        tracer=tracer,
+        max_kicks=limits.polish_kicks if limits is not None else None,
+        max_generations=limits.eax_generations if limits is not None else 300,
+        seed=seed,
+        convergence=convergence,
     )
     polish_length = tour_length_coords_jit(polished, coords)
 
     if polish_length < best_length:
         best_tour = polished
         best_length = float(polish_length)
+    convergence.record('global_polish', best_length)  # не улучшение — no-op
+    if reached_in is None and _target_reached(best_length, target_length):
+        reached_in = 'global_polish'
+    stopped = control is not None and control.should_stop()
 
     phases['global_polish'] = {
         'time': time.perf_counter() - t0,
@@ -358,13 +883,67 @@ def solve_v5(
         'knn_k': oracle_knn_k_polish,
         'knn_rebuild_time': knn_rebuild_time,
     }
+    _phase_done('global_polish')
     if verbose:
         _log(f'  polish: -> {best_length:.0f}')
+    if ckpt is not None:
+        ckpt.save_best(best_tour, best_length)
+        ckpt.save_phase('global_polish', None, phases['global_polish'])
 
     # ═══════════ Result ═══════════
+    if control is not None:
+        control.report('done', best_tour, best_length, kind='done')
+    if perm is not None:
+        best_tour = perm[best_tour]  # обратно в id вызывающего
+
+    gap_to_lb = None
+    if lower_bound is not None and lower_bound > 0:
+        gap_to_lb = (best_length - lower_bound) / lower_bound
+    if target_length is not None:
+        phases['target_gap'] = {
+            'target_gap': target_gap,
+            'target_length': target_length,
+            'reached_in': reached_in,
+        }
+
+    if graph is not None:
+        phases['graph'] = {
+            'nnz': int(len(graph.indices)),
+            'has_coords': oracle.coords is not None,
+            'detour': float(graph.fallback[0]),
+            'missing_cost': float(graph.fallback[1]),
+            'missing_edges': missing_edges(best_tour, graph),
+        }
+    if store is not None:
+        t_store = time.perf_counter()
+        # Прерванный / остановленный по target_gap прогон бюджет не выбрал:
+        # записываем фактически потраченное время, иначе exact match с
+        # неполным туром отдавался бы сразу при том же бюджете
+        spent = route_budget
+        if stopped or reached_in is not None:
+            spent = min(route_budget, t_store - t_start)
+        saved = store.put(caller_coords, best_tour, best_length, city_ids=city_ids,
+                          fingerprint=fp, time_budget=spent)
+        phases['store']['saved'] = saved
+        phases['store']['time'] += time.perf_counter() - t_store
+    phases['memory'] = mem.summary()
+    if KERNEL_STATS:
+        phases['kernel_stats'] = stats_dict(kernel_stats_snapshot() - stats_start)
+    if mem_plan is not None:
+        phases['memory']['plan'] = asdict(mem_plan)
+
     total_time = time.perf_counter() - t_start
+    phases['budget_ledger'] = ledger.close(phases, total_time)
+    if tracer.enabled:
+        tracer.complete('solve_v5', 'solve', t_start, n=n, length=best_length)
+        phases['trace'] = {'events': len(tracer.events), 'path': trace if isinstance(trace, str) else None}
+        if isinstance(trace, str):
+            tracer.save(trace)
+    if ckpt is not None:
+        ckpt.finish(total_time)
     if verbose:
-        _log(f'[v5] DONE: length={best_length:.0f}, time={total_time:.1f}s')
+        gap_msg = f', gap_to_lb={gap_to_lb:.2%}' if gap_to_lb is not None else ''
+        _log(f'[v5] DONE: length={best_length:.0f}, time={total_time:.1f}s{gap_msg}')
 
     return {
         'tour': best_tour.tolist(),
@@ -372,6 +951,13 @@ def solve_v5(
         'phases': phases,
         'time_total': total_time,
         'n': n,
+        'lower_bound': lower_bound,
+        'gap_to_lb': gap_to_lb,
+        'target_reached': reached_in is not None,
+        'unspent_budget': max(0.0, route_budget - total_time),
+        'stopped': stopped,
+        'seed': seed,
+        'convergence': convergence.points,
     }
 
 
@@ -381,66 +967,136 @@ def solve_v5(
 # ═══════════════════════════════════════════════════════════
 
 def _optimize_single_leaf(args: tuple) -> tuple:
-    """Worker: оптимизирует один лист. Для multiprocessing."""
-    cities, coords_all, knn_k, leaf_budget = args
+    """
+    Worker: оптимизирует один лист. Для multiprocessing.
 
-    n_local = len(cities)
-    local_coords = coords_all[cities]
+    Returns: (тур в глобальных id, длина, (pid, t_start, t_end), stats) —
+    тайминг для trace (perf_counter общий у fork-воркеров) и счётчики ядер
+    листа (KERNEL_STATS, иначе None).
+    """
+    cities, local_coords, knn_k, leaf_budget, max_kicks, seed = args
+    t_start = time.perf_counter()
+    stats_before = kernel_stats_snapshot() if KERNEL_STATS else None
 
-    # Строим локальную D-матрицу (помещается в RAM для N≤1000)
-    from scipy.spatial import cKDTree
-    k_local = min(knn_k, n_local - 1)
+    best_tour, best_length = optimize_coords_small(
+        local_coords, knn_k, leaf_budget * 0.5, max_kicks=max_kicks, seed=seed,
+    )
 
-    if n_local <= 5:
-        # Тривиальный случай
+    # Map back to global indices
+    global_tour = cities[best_tour].tolist()
+    stats = kernel_stats_snapshot() - stats_before if KERNEL_STATS else None
+    return global_tour, float(best_length), (os.getpid(), t_start, time.perf_counter()), stats
+
+
+def optimize_coords_small(
+    local_coords: NDArray[np.float64],
+    knn_k: int,
+    ils_budget: float,
+    deadline: Optional[float] = None,
+    max_kicks: Optional[int] = None,
+    seed: Optional[int] = None,
+    kick_window: int = 50,
+    max_stall: Optional[int] = None,
+    phases: Optional[dict] = None,
+) -> tuple[NDArray[np.int64], float]:
+    """
+    Small-N стратегия — единственный coordinate-first пайплайн небольшого
+    инстанса (solve_small, листья solve_v5, solve_batch):
+      1. k-NN (cKDTree; у GraphMetric — рёбра подграфа);
+      2. NN multi-start (3 старта) → 2-opt (cached edge costs);
+      3. Or-opt + 3-opt до отсутствия ходов;
+      4. ILS: локальный double-bridge в окне kick_window позиций + LK-DLB
+         только по окну (local_kick_lk_jit) — стоимость kick не растёт с N,
+         принимается только улучшение.
+
+    ils_budget: секунд на шаги 3-4; deadline (perf_counter) — не позже,
+        бюджет с учётом setup.
+    max_kicks: не больше стольких ILS-итераций (WorkLimits.leaf_kicks).
+    max_stall: выход из ILS после стольких kicks подряд без улучшения
+        (None = max(2000, 10 * N); при max_kicks — max_kicks).
+    seed: поток 'ils' (src.core.seeding) — центры kicks и np.random ядер;
+        None — из энтропии ОС.
+    phases: dict → заполняются construction / local_search / ils.
+
+    Ядра — jit_cache.kernels(): AOT-модуль bundle для евклидовых coords
+    (batch-воркер и solve_small не платят за инициализацию numba), иначе JIT.
+
+    Returns: (tour в локальных id, length).
+    """
+    n_local = metric_n(local_coords)
+    K = kernels(local_coords)
+    if phases is None:
+        phases = {}
+    if n_local <= 3:
         tour = np.arange(n_local, dtype=np.int64)
-        length = tour_length_coords_jit(tour, local_coords)
-        return cities[tour].tolist(), float(length)
-
-    tree = cKDTree(local_coords)
-    _, nn_idx = tree.query(local_coords, k=k_local + 1)
-    nn_idx = nn_idx[:, 1:].astype(np.int32)
-    nn_dists = np.zeros_like(nn_idx, dtype=np.float64)
-    for i in range(n_local):
-        for j in range(nn_idx.shape[1]):
-            nn_dists[i, j] = np.sqrt(((local_coords[i] - local_coords[nn_idx[i, j]]) ** 2).sum())
-
-    # NN greedy tour
-    best_tour = nn_tour_coords_jit(local_coords, nn_idx, nn_dists, 0)
-    best_length = tour_length_coords_jit(best_tour, local_coords)
-
-    # Мульти-старт NN (3 старта)
-    for start in [n_local // 3, 2 * n_local // 3]:
-        cand = nn_tour_coords_jit(local_coords, nn_idx, nn_dists, start)
-        cand_len = tour_length_coords_jit(cand, local_coords)
+        length = K.tour_length(tour, local_coords) if n_local > 1 else 0.0
+        return tour, float(length)
+    if max_stall is None:
+        # max_kicks — фиксированная работа: stall её не обрезает
+        max_stall = max_kicks if max_kicks is not None else max(2000, 10 * n_local)
+
+    # ═══════════ Construction: NN multi-start + 2-opt ═══════════
+    t0 = time.perf_counter()
+    nn_idx, nn_dists = metric_knn(local_coords, min(knn_k, n_local - 1))
+    best_tour = K.nn_tour(local_coords, nn_idx, nn_dists, 0)
+    best_length = K.tour_length(best_tour, local_coords)
+    for start in (n_local // 3, 2 * n_local // 3):
+        cand = K.nn_tour(local_coords, nn_idx, nn_dists, start)
+        cand_len = K.tour_length(cand, local_coords)
         if cand_len < best_length:
-            best_tour = cand
-            best_length = cand_len
-
-    # Phase 1: детерминированный 2-opt для быстрого начального улучшения
-    two_opt_nn_coords_jit(best_tour, local_coords, nn_idx, 50, 5)
-    best_length = tour_length_coords_jit(best_tour, local_coords)
-
-    # Phase 2: детерминированный ILS (or-opt + 3-opt → double_bridge + LK)
-    t_end = time.perf_counter() + leaf_budget * 0.5
-
-    # Начальная полировка: or-opt + 3-opt
-    or_opt_pass_coords_jit(best_tour, local_coords, nn_idx)
-    three_opt_full_pass_coords_jit(best_tour, local_coords, nn_idx)
-    best_length = tour_length_coords_jit(best_tour, local_coords)
-
-    # ILS loop: double_bridge perturbation + LK recovery
-    while time.perf_counter() < t_end:
-        perturbed = double_bridge_coords_jit(best_tour)
-        lk_opt_coords_jit(perturbed, local_coords, nn_idx, 30, 2)
-        p_len = tour_length_coords_jit(perturbed, local_coords)
-        if p_len < best_length - 1e-10:
-            best_tour = perturbed
-            best_length = p_len
+            best_tour, best_length = cand, cand_len
+    K.two_opt_nn_cached(best_tour, local_coords, nn_idx, nn_dists, 50, 5)
+    best_length = float(K.tour_length(best_tour, local_coords))
+    phases['construction'] = {'time': time.perf_counter() - t0, 'length': best_length}
 
-    # Map back to global indices
-    global_tour = cities[best_tour].tolist()
-    return global_tour, float(best_length)
+    t_end = time.perf_counter() + ils_budget
+    if deadline is not None:
+        t_end = min(t_end, deadline)
+
+    # ═══════════ Local search: Or-opt + 3-opt ═══════════
+    t0 = time.perf_counter()
+    for _ in range(10):
+        imp_or = K.or_opt_pass_cached(
+            best_tour, local_coords, nn_idx, nn_dists, K.init_succ_len(best_tour, local_coords),
+        )
+        imp_3 = K.three_opt_full_pass(best_tour, local_coords, nn_idx)
+        if (not imp_or and not imp_3) or time.perf_counter() > t_end:
+            break
+    best_length = float(K.tour_length(best_tour, local_coords))
+    phases['local_search'] = {'time': time.perf_counter() - t0, 'length': best_length}
+
+    # ═══════════ ILS: локальные kicks ═══════════
+    t0 = time.perf_counter()
+    rng = stream_rng(seed, 'ils')
+    if seed is not None:
+        K.seed(stream_seed(seed, 'ils'))
+    no_alpha = nn_idx[:, :0]
+    kicks = 0
+    accepted = 0
+    stall = 0
+    if n_local >= 8:
+        while (stall < max_stall and time.perf_counter() < t_end
+               and (max_kicks is None or kicks < max_kicks)):
+            candidate = K.local_kick_lk(
+                best_tour, local_coords, no_alpha, nn_idx, nn_dists,
+                int(rng.integers(n_local)), kick_window, 50,
+            )
+            kicks += 1
+            length = float(K.tour_length(candidate, local_coords))
+            if length < best_length - 1e-10:
+                best_tour, best_length = candidate, length
+                accepted += 1
+                stall = 0
+            else:
+                stall += 1
+    phases['ils'] = {
+        'time': time.perf_counter() - t0,
+        'kicks': kicks,
+        'accepted': accepted,
+        'stalled': stall >= max_stall,
+        'length': best_length,
+    }
+    return best_tour, float(best_length)
 
 
 def _optimize_leaves_parallel(
@@ -450,23 +1106,38 @@ def _optimize_leaves_parallel(
     n_workers: int = 8,
     time_budget: float = 120.0,
     verbose: bool = True,
+    control: Optional[SolveControl] = None,
+    tracer=NULL_TRACER,
+    max_kicks: Optional[int] = None,
+    seed: Optional[int] = None,
 ):
-    """Параллельная оптимизация всех листьев."""
+    """
+    Параллельная оптимизация всех листьев (max_kicks — ILS-итераций на лист,
+    seed — поток stream_seed(seed, 'leaf', i) у листа i, в любом воркере).
+
+    control.stop() прерывает фазу: последовательно — между листьями,
+    параллельно — pool.terminate() (опрос раз в 50 мс). Листья без тура
+    остаются с tour=None; solve_v5 после остановки stitch не выполняет.
+    """
     n_leaves = len(leaves)
     per_leaf_budget = time_budget / max(n_leaves / n_workers, 1)
 
-    # Подготовка аргументов
+    # Подготовка аргументов: воркер получает только подынстанс листа
     args_list = [
-        (leaf.cities, coords, oracle.knn_k, per_leaf_budget)
-        for leaf in leaves
+        (leaf.cities, metric_take(coords, leaf.cities), oracle.knn_k, per_leaf_budget, max_kicks,
+         stream_seed(seed, 'leaf', i))
+        for i, leaf in enumerate(leaves)
     ]
 
     if n_workers <= 1 or n_leaves <= 2:
         # Последовательно
         for i, args in enumerate(args_list):
-            tour_global, length = _optimize_single_leaf(args)
+            if control is not None and control.should_stop():
+                return
+            tour_global, length, timing, _ = _optimize_single_leaf(args)
             leaves[i].tour = np.array(tour_global, dtype=np.int64)
             leaves[i].tour_length = length
+            _trace_leaf(tracer, i, leaves[i].n, length, timing)
             if verbose and (i + 1) % 5 == 0:
                 _log(f'    leaf {i+1}/{n_leaves}: N={leaves[i].n}, len={length:.0f}')
     else:
@@ -474,17 +1145,37 @@ def _optimize_leaves_parallel(
         try:
             ctx = multiprocessing.get_context('fork')
             with ctx.Pool(n_workers) as pool:
-                results = pool.map(_optimize_single_leaf, args_list)
-            for i, (tour_global, length) in enumerate(results):
+                pending = pool.map_async(_optimize_single_leaf, args_list)
+                while not pending.ready():
+                    pending.wait(0.05)
+                    if control is not None and control.should_stop():
+                        pool.terminate()
+                        return
+                results = pending.get()
+            for i, (tour_global, length, timing, stats) in enumerate(results):
                 leaves[i].tour = np.array(tour_global, dtype=np.int64)
                 leaves[i].tour_length = length
+                _trace_leaf(tracer, i, leaves[i].n, length, timing)
+                absorb_kernel_stats(stats)  # счётчики воркера → процесс solve_v5
         except Exception as e:
             if verbose:
                 _log(f'  WARNING: parallel failed ({e}), falling back to sequential')
             for i, args in enumerate(args_list):
-                tour_global, length = _optimize_single_leaf(args)
+                if control is not None and control.should_stop():
+                    return
+                tour_global, length, timing, _ = _optimize_single_leaf(args)
                 leaves[i].tour = np.array(tour_global, dtype=np.int64)
                 leaves[i].tour_length = length
+                _trace_leaf(tracer, i, leaves[i].n, length, timing)
+
+
+def _trace_leaf(tracer, index: int, n: int, length: float, timing: tuple) -> None:
+    """Span листа в процессе воркера (pid воркера = трек в UI)."""
+    if not tracer.enabled:
+        return
+    pid, t0, t1 = timing
+    tracer.name_thread(pid, pid, 'solve_v5' if pid == tracer.pid else f'leaf worker {pid}')
+    tracer.complete('leaf', 'leaf', t0, t1, pid=pid, leaf=index, n=n, length=length)
 
 
 # ═══════════════════════════════════════════════════════════
@@ -499,6 +1190,19 @@ def _global_polish(
     verbose: bool = False,
     use_sequential_lk: bool = False,
     lk_max_depth: int = 3,
+    target_length: Optional[float] = None,
+    control: Optional[SolveControl] = None,
+    checkpoint: Optional[CheckpointStore] = None,
+    init_population: Optional[list[tuple[float, NDArray[np.int64]]]] = None,
+    checkpoint_interval: float = 30.0,
+    pop_size: int = 15,
+    archive_size: int = 20,
+    use_eax: bool = True,
+    tracer=NULL_TRACER,
+    max_kicks: Optional[int] = None,
+    max_generations: int = 300,
+    seed: Optional[int] = None,
+    convergence: Optional[Convergence] = None,
 ) -> NDArray[np.int64]:
     """
     Глобальный polish: гибрид ILS + EAX.
@@ -507,6 +1211,20 @@ def _global_polish(
     разнообразные хорошие туры для популяции.
     Phase B (40% времени): EAX population — рекомбинирует лучшие рёбра
     из ILS-туров.
+
+    target_length: досрочный выход, как только best_length ≤ target_length.
+    control: улучшения ILS/EAX → control.report(); control.stop() — выход.
+    checkpoint: лучший тур + популяция сохраняются каждые checkpoint_interval
+    секунд и в конце ILS; init_population (resume) добавляется к ILS-турам.
+    pop_size / archive_size: популяция EAX и архив ILS-туров для неё
+    (архив > archive_size → лучшие pop_size); pop_size < 3 — без EAX.
+    use_eax: Phase B (решение роутера, SolverConfig.use_eax).
+    tracer: каждый tracer.kick_sample-й ILS kick и поколения EAX → trace.
+    max_kicks / max_generations: потолок ILS-итераций и поколений EAX
+    (WorkLimits); None — только время.
+    seed: потоки 'global_polish' (numba np.random ILS / мутаций EAX) и
+    'eax' (выбор родителей) — src.core.seeding.
+    convergence: улучшения local search / ILS / EAX → кривая сходимости.
     """
     tour = tour.copy()
     n = len(tour)
@@ -514,77 +1232,146 @@ def _global_polish(
 
     if time_budget < 1.0:
         return tour
+    if seed is not None:
+        seed_jit(stream_seed(seed, 'global_polish'))
+
+    # Phase A-0: deterministic local search (не больше половины бюджета:
+    # на 100K один проход 3-opt — секунды, ядра режутся по deadline)
+    with step('polish.local_search'):
+        best_length = tour_length_coords_jit(tour, coords)
+        knn, knn_d = oracle.knn_indices, oracle.knn_dists
+        ls_deadline = time.perf_counter() + 0.5 * time_budget
+        max_2opt = min(20, max(3, int(time_budget / 5)))
+        run_sliced(two_opt_nn_cached_jit, tour, coords, knn, knn_d, max_2opt, 3, deadline=ls_deadline)
 
-    # Phase A-0: deterministic local search
-    best_length = tour_length_coords_jit(tour, coords)
-    max_2opt = min(20, max(3, int(time_budget / 5)))
-    two_opt_nn_coords_jit(tour, coords, oracle.knn_indices, max_2opt, 3)
-
-    remaining = t_end - time.perf_counter()
-    if remaining > 5.0:
-        for _ in range(3):
-            if time.perf_counter() > t_end:
-                break
-            imp_or = or_opt_pass_coords_jit(tour, coords, oracle.knn_indices)
-            imp3 = three_opt_full_pass_coords_jit(tour, coords, oracle.knn_indices)
-            if not imp_or and not imp3:
-                break
+        remaining = t_end - time.perf_counter()
+        if remaining > 5.0:
+            for _ in range(3):
+                if time.perf_counter() > ls_deadline or (control is not None and control.should_stop()):
+                    break
+                _, work_or = run_sliced(
+                    or_opt_pass_cached_jit, tour, coords, knn, knn_d,
+                    init_succ_len_jit(tour, coords), deadline=ls_deadline,
+                )
+                _, work_3 = run_sliced(
+                    three_opt_full_pass_coords_jit, tour, coords, oracle.knn_indices,
+                    deadline=ls_deadline,
+                )
+                if work_or[WORK_MOVES] == 0 and work_3[WORK_MOVES] == 0:
+                    break
 
     best_length = tour_length_coords_jit(tour, coords)
     best_tour = tour.copy()
-
-    # Для N > 5K: hybrid ILS (60%) + EAX (40%)
-    # Для N ≤ 5K: чистый ILS (EAX Python overhead слишком велик для малых N)
-    use_eax = n > 5000
+    if convergence is not None:
+        convergence.record('local_search', best_length)
+    if control is not None:
+        control.report('local_search', best_tour, best_length)
+        if control.should_stop():
+            return best_tour
+    if _target_reached(best_length, target_length):
+        return best_tour
+
+    # use_eax: hybrid ILS (60%) + EAX (40%), иначе чистый ILS
+    use_eax = use_eax and pop_size >= 3
 
     # Phase A-1: ILS — double_bridge + LK-DLB
     remaining = t_end - time.perf_counter()
     ils_fraction = 0.60 if use_eax else 1.0
     ils_end = time.perf_counter() + remaining * ils_fraction
     good_tours: list[tuple[float, NDArray[np.int64]]] = [(best_length, best_tour.copy())]
-
-    while time.perf_counter() < ils_end:
-        perturbed = double_bridge_coords_jit(tour)
-        if use_sequential_lk:
-            # seqLK: deeper search, slower but better quality per iteration
-            lk_sequential_coords_jit(perturbed, coords, oracle.knn_indices, 30, 2, lk_max_depth)
-        else:
-            lk_opt_coords_jit(perturbed, coords, oracle.knn_indices, 30, 2)
-        p_len = tour_length_coords_jit(perturbed, coords)
-
-        if p_len < best_length - 1e-10:
-            best_tour = perturbed.copy()
-            best_length = float(p_len)
-            tour = perturbed
-
-        # Сохраняем хорошие туры для EAX
-        if use_eax:
-            good_tours.append((float(p_len), perturbed.copy()))
-            if len(good_tours) > 20:
-                good_tours.sort(key=lambda x: x[0])
-                good_tours = good_tours[:15]
+    if init_population:
+        good_tours.extend((l, t.copy()) for l, t in init_population[:archive_size])
+    next_checkpoint = time.perf_counter() + checkpoint_interval
+
+    alpha_indices = oracle.alpha_indices
+    kicks = 0
+    with step('polish.ils'):
+        while time.perf_counter() < ils_end and (max_kicks is None or kicks < max_kicks):
+            if control is not None and control.should_stop():
+                break
+            t_kick = tracer.now()
+            perturbed = double_bridge_coords_jit(tour)
+            if use_sequential_lk:
+                # seqLK: deeper search, slower but better quality per iteration.
+                # Срезами до ils_end; под WorkLimits — целиком (срез сбрасывает
+                # DLB, и результат зависел бы от часов).
+                kick_deadline = None if max_kicks is not None else ils_end
+                if alpha_indices is not None:
+                    run_sliced(
+                        lk_sequential_dual_coords_jit, perturbed, coords, alpha_indices,
+                        oracle.knn_indices, 30, 2, lk_max_depth, deadline=kick_deadline,
+                    )
+                else:
+                    run_sliced(
+                        lk_sequential_coords_jit, perturbed, coords, oracle.knn_indices,
+                        30, 2, lk_max_depth, deadline=kick_deadline,
+                    )
+            else:
+                # Dual lists (если есть): alpha-кандидаты первыми, distance следом
+                lk_opt_cached_jit(
+                    perturbed, coords,
+                    alpha_indices if alpha_indices is not None else knn[:, :0],
+                    knn, knn_d, 30, 2, **STATS_KW,
+                )
+            p_len = tour_length_coords_jit(perturbed, coords)
+            if tracer.enabled and tracer.sampled(kicks):
+                tracer.complete('ils_kick', 'ils', t_kick, kick=kicks, length=float(p_len))
+            kicks += 1
+
+            if p_len < best_length - 1e-10:
+                best_tour = perturbed.copy()
+                best_length = float(p_len)
+                tour = perturbed
+                if convergence is not None:
+                    convergence.record('ils', best_length)
+                if control is not None:
+                    control.report('ils', best_tour, best_length)
+                if _target_reached(best_length, target_length):
+                    break
+
+            # Сохраняем хорошие туры для EAX
+            if use_eax:
+                good_tours.append((float(p_len), perturbed.copy()))
+                if len(good_tours) > archive_size:
+                    good_tours.sort(key=lambda x: x[0])
+                    good_tours = good_tours[:pop_size]
+
+            if checkpoint is not None and time.perf_counter() >= next_checkpoint:
+                checkpoint.save_best(best_tour, best_length, good_tours if use_eax else None)
+                next_checkpoint = time.perf_counter() + checkpoint_interval
+
+    if checkpoint is not None:
+        checkpoint.save_best(best_tour, best_length, good_tours if use_eax else None)
 
     if verbose:
         _log(f'  ILS phase: {best_length:.0f}' +
              (f', collected {len(good_tours)} tours' if use_eax else ''))
 
     # Phase B: EAX population (только для N > 10K)
-    if use_eax:
+    stopped = control is not None and control.should_stop()
+    if use_eax and not stopped and not _target_reached(best_length, target_length):
         remaining = t_end - time.perf_counter()
         if remaining > 3.0 and len(good_tours) >= 3:
             good_tours.sort(key=lambda x: x[0])
-            pop_size = min(15, len(good_tours))
             init_tours = [t for _, t in good_tours[:pop_size]]
 
-            eax_best, eax_len = eax_population_optimize(
-                coords, oracle.knn_indices, init_tours,
-                pop_size=pop_size,
-                max_generations=300,
-                time_budget=remaining - 0.5,
-                lk_iters=25,
-                lk_no_improve=2,
-                verbose=verbose,
-            )
+            with step('polish.eax'):
+                eax_best, eax_len = eax_population_optimize(
+                    coords, oracle.knn_indices, init_tours,
+                    pop_size=min(pop_size, len(good_tours)),
+                    max_generations=max_generations,
+                    time_budget=remaining - 0.5,
+                    lk_iters=25,
+                    lk_no_improve=2,
+                    verbose=verbose,
+                    target_length=target_length,
+                    control=control,
+                    checkpoint=checkpoint,
+                    checkpoint_interval=checkpoint_interval,
+                    tracer=tracer,
+                    rng=stream_rng(seed, 'eax'),
+                    convergence=convergence,
+                )
 
             if eax_len < best_length:
                 best_tour = eax_best
@@ -604,21 +1391,44 @@ def _rebuild_tour_fallback(
     coords: NDArray[np.float64],
     oracle: DistanceOracle,
     leaves: list,
+    deadline: Optional[float] = None,
 ) -> NDArray[np.int64]:
     """Fallback: строим тур из всех городов если stitching не удался."""
     n = len(coords)
     # NN greedy на полном наборе
     tour = nn_tour_coords_jit(coords, oracle.knn_indices, oracle.knn_dists, 0)
-    two_opt_nn_coords_jit(tour, coords, oracle.knn_indices, 20, 5)
+    run_sliced(
+        two_opt_nn_cached_jit, tour, coords, oracle.knn_indices, oracle.knn_dists, 20, 5,
+        deadline=deadline,
+    )
     return tour
 
 
-def _estimate_memory(n: int, knn_k: int) -> float:
-    """Оценка памяти в MB."""
-    coords_mb = n * 2 * 8 / 1024 / 1024
-    knn_mb = n * knn_k * (4 + 8) / 1024 / 1024  # indices + dists
-    tour_mb = n * 8 / 1024 / 1024
-    return coords_mb + knn_mb + tour_mb + 20  # overhead
+def _restore_oracle(
+    ckpt: CheckpointStore,
+    coords: NDArray[np.float64],
+    knn_k: int,
+) -> tuple[DistanceOracle, Optional[NDArray[np.int64]], SolverConfig, dict]:
+    """Oracle (в нумерации после reorder), perm, SolverConfig и info из checkpoint."""
+    arrays = ckpt.load_arrays('oracle')
+    info = ckpt.info('oracle')
+    perm = arrays.get('perm')
+    coords = np.asarray(coords, dtype=np.float64)
+    if perm is not None:
+        coords = coords[perm]
+    oracle = DistanceOracle(np.ascontiguousarray(coords), knn_k=knn_k)
+    oracle.knn_indices = arrays['knn_indices']
+    oracle.knn_dists = arrays['knn_dists']
+    oracle.nn_dists = oracle.knn_dists[:, 0].copy()
+    oracle.alpha_indices = arrays.get('alpha_indices')
+    # checkpoint до SolverConfig.use_eax: правило роутера N > 5000
+    config = {'use_eax': len(coords) > 5000, **info['config']}
+    return oracle, perm, SolverConfig(**config), info
+
+
+def _target_reached(length: float, target_length: Optional[float]) -> bool:
+    """length ≤ target_length (target_gap early termination); None → False."""
+    return target_length is not None and length <= target_length
 
 
 def _log(msg: str):
@@ -0,0 +1,41 @@
+"""
+Регрессия: граница Held-Karp (held_karp_bound_jit) не превышает оптимум.
+
+Оптимум — полный перебор туров для N ≤ 9; k-NN и полный (k = N-1), и
+разреженный (проверяет оценку рёбер вне графа через hub star).
+
+Запуск:
+  cd code/mast
+  PYTHONPATH=. python3 -m pytest -q tests
+"""
+
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from src.core.distance_oracle import DistanceOracle
+
+
+def brute_force_optimum(coords: np.ndarray) -> float:
+    d = np.sqrt(((coords[:, None, :] - coords[None, :, :]) ** 2).sum(-1))
+    n = len(coords)
+    best = np.inf
+    for rest in permutations(range(1, n)):
+        if rest[0] > rest[-1]:
+            continue  # тот же тур в обратном направлении
+        tour = (0,) + rest
+        length = sum(d[tour[i], tour[(i + 1) % n]] for i in range(n))
+        best = min(best, length)
+    return best
+
+
+@pytest.mark.parametrize('n', [7, 8, 9])
+@pytest.mark.parametrize('k', [3, None])
+@pytest.mark.parametrize('seed', range(4))
+def test_held_karp_bound_below_optimum(n, k, seed):
+    coords = np.random.default_rng(seed).random((n, 2)) * 1000
+    oracle = DistanceOracle(coords, knn_k=k or n - 1)
+    lb = oracle.build_lower_bound(n_iters=100)
+    opt = brute_force_optimum(coords)
+    assert 0.0 < lb <= opt * (1 + 1e-9)